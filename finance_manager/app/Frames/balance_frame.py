@@ -2,8 +2,9 @@
 Фрейм для отображения баланса
 """
 import customtkinter as ctk
-from datetime import datetime
 from .base_frame import BaseFrame
+from ..currency import currency_symbol
+from ..money import format_minor
 
 
 class BalanceFrame(BaseFrame):
@@ -57,76 +58,43 @@ class BalanceFrame(BaseFrame):
         )
         self.expense_label.grid(row=0, column=2, padx=20, pady=10)
 
+        # Изменение к прошлому месяцу
+        self.income_trend_label = ctk.CTkLabel(self.stats_frame, text="", font=("Arial", 11))
+        self.income_trend_label.grid(row=1, column=1, padx=20, pady=(0, 8))
+
+        self.expense_trend_label = ctk.CTkLabel(self.stats_frame, text="", font=("Arial", 11))
+        self.expense_trend_label.grid(row=1, column=2, padx=20, pady=(0, 8))
+
+    @staticmethod
+    def _trend(percent, growth_is_good: bool):
+        """Стрелка, текст и цвет изменения к прошлому месяцу"""
+        if percent is None:
+            return "нет данных за прошлый месяц", "gray"
+        if abs(percent) < 0.05:
+            return "► без изменений к прошлому месяцу", "gray"
+        arrow = "▲" if percent > 0 else "▼"
+        good = (percent > 0) == growth_is_good
+        return f"{arrow} {abs(percent):.1f}% к прошлому месяцу", "green" if good else "red"
+
     def update_data(self):
         """Обновление показателей баланса"""
-        if not self.db:
+        if not self.analytics:
             return
 
         try:
-            # Расчет баланса
-            balance = self._calculate_balance()
-            monthly_income = self._calculate_monthly_income()
-            monthly_expense = self._calculate_monthly_expense()
+            overview = self.analytics.balance_overview()
+            symbol = currency_symbol(overview['currency'])
 
             # Обновление меток
-            self.balance_label.configure(text=f"Баланс: {balance:,.2f} ₽".replace(",", " "))
-            self.income_label.configure(text=f"Доходы: {monthly_income:,.2f} ₽".replace(",", " "))
-            self.expense_label.configure(text=f"Расходы: {monthly_expense:,.2f} ₽".replace(",", " "))
+            self.balance_label.configure(text=f"Баланс: {format_minor(overview['balance_minor'], symbol)}")
+            self.income_label.configure(
+                text=f"Доходы: {format_minor(overview['monthly_income_minor'], symbol)}")
+            self.expense_label.configure(
+                text=f"Расходы: {format_minor(overview['monthly_expense_minor'], symbol)}")
+
+            text, color = self._trend(overview['monthly_income_change'], growth_is_good=True)
+            self.income_trend_label.configure(text=text, text_color=color)
+            text, color = self._trend(overview['monthly_expense_change'], growth_is_good=False)
+            self.expense_trend_label.configure(text=text, text_color=color)
         except Exception as e:
             print(f"Ошибка обновления баланса: {e}")
-
-    def _calculate_balance(self) -> float:
-        """Расчет общего баланса"""
-        if not self.db:
-            return 0.0
-
-        income = 0.0
-        expense = 0.0
-
-        for transaction in self.db.transactions:
-            if transaction.type == 'income':
-                income += transaction.amount
-            else:
-                expense += transaction.amount
-
-        return income - expense
-
-    def _calculate_monthly_income(self) -> float:
-        """Расчет доходов за текущий месяц"""
-        if not self.db:
-            return 0.0
-
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        income = 0.0
-
-        for transaction in self.db.transactions:
-            try:
-                date = datetime.strptime(transaction.date, "%Y-%m-%d %H:%M:%S")
-                if date.month == current_month and date.year == current_year:
-                    if transaction.type == 'income':
-                        income += transaction.amount
-            except ValueError:
-                continue
-
-        return income
-
-    def _calculate_monthly_expense(self) -> float:
-        """Расчет расходов за текущий месяц"""
-        if not self.db:
-            return 0.0
-
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        expense = 0.0
-
-        for transaction in self.db.transactions:
-            try:
-                date = datetime.strptime(transaction.date, "%Y-%m-%d %H:%M:%S")
-                if date.month == current_month and date.year == current_year:
-                    if transaction.type == 'expense':
-                        expense += transaction.amount
-            except ValueError:
-                continue
-
-        return expense
@@ -3,6 +3,8 @@
 """
 import customtkinter as ctk
 
+from ..profiling import metrics
+
 
 class BaseFrame(ctk.CTkFrame):
     """Базовый фрейм с общими методами"""
@@ -36,6 +38,13 @@ class BaseFrame(ctk.CTkFrame):
             return self._controller.get_database()
         return None
 
+    @property
+    def analytics(self):
+        """Сервис аналитики через контроллер"""
+        if self._controller:
+            return self._controller.analytics
+        return None
+
     def update_data(self):
         """Обновление данных (может быть переопределен)"""
         pass
@@ -43,6 +52,8 @@ class BaseFrame(ctk.CTkFrame):
     def refresh(self):
         """Обновление UI"""
         try:
-            self.update_data()
+            with metrics.measure(f"{self.__class__.__name__}.update_data"):
+                self.update_data()
         except Exception as e:
+            metrics.increment("errors.frame_update")
             print(f"Ошибка обновления данных во фрейме {self.__class__.__name__}: {e}")
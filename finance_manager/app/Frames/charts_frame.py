@@ -2,14 +2,20 @@
 Фрейм для отображения графиков и диаграмм
 """
 import customtkinter as ctk
-from datetime import datetime
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 import numpy as np
 
+from ..profiling import timed
 from .base_frame import BaseFrame
 
+TREND_PERIODS = {"3 мес.": 3, "6 мес.": 6, "12 мес.": 12, "24 мес.": 24}
+MAX_SLICES = 10
+BUDGET_BARS = 8
+FORECAST_MONTHS = 6
+POLL_MS = 100
+
 
 class ChartsFrame(BaseFrame):
     """Фрейм графиков с визуализацией финансовых данных"""
@@ -20,6 +26,9 @@ class ChartsFrame(BaseFrame):
         self.figures = []
         self.canvases = []
         self.current_tab = 0
+        self.trend_months = 6
+        self.category_parent = None  # раскрытая категория на круговой диаграмме
+        self._pending = None  # фоновый расчет данных всех графиков
 
     def setup_ui(self):
         """Настройка интерфейса"""
@@ -44,6 +53,7 @@ class ChartsFrame(BaseFrame):
         self.categories_tab = self.tabview.add("По категориям")
         self.trends_tab = self.tabview.add("Динамика")
         self.budget_tab = self.tabview.add("Бюджет")
+        self.forecast_tab = self.tabview.add("Прогноз")
 
         # Настройка вкладок
         self.tabview.grid_columnconfigure(0, weight=1)
@@ -77,12 +87,46 @@ class ChartsFrame(BaseFrame):
             traceback.print_exc()
 
     def refresh_all_charts(self):
-        """Обновление всех графиков"""
+        """Обновление всех графиков: данные считаются в фоне по снимку базы
+
+        Первый расчет строит помесячные агрегаты по всей истории; они
+        остаются базе, и перерисовка отдельных вкладок дальше идет сразу.
+        """
+        if not self.analytics:
+            return
+        if self.category_parent not in self.analytics.category_tree():
+            self.category_parent = None  # категория удалена или переименована
+        requested = (self.category_parent, self.trend_months)
+        self._pending = self.analytics.submit('batch', [
+            'month_totals',
+            ('category_breakdown', self.category_parent),
+            ('trends', self.trend_months),
+            ('budget_usage', BUDGET_BARS),
+            ('forecast', FORECAST_MONTHS),
+        ])
+        self._wait_charts(self._pending, requested)
+
+    def _wait_charts(self, future, requested):
+        """Перерисовка по готовности данных (опрос из цикла событий: Tk нельзя вызывать из потока)"""
+        if future is not self._pending or not self.winfo_exists():
+            return  # запущен более новый расчет
+        if not future.done():
+            self.after(POLL_MS, self._wait_charts, future, requested)
+            return
+        self._pending = None
+        try:
+            summary, breakdown, trends, usage, forecast = self.analytics.collect(future)
+        except Exception as e:
+            print(f"Ошибка расчета графиков: {e}")
+            return
+        if requested != (self.category_parent, self.trend_months):
+            breakdown = trends = None  # раскрытие или период сменились - пересчет сразу
         self.clear_charts()
-        self.create_income_expense_chart()
-        self.create_categories_chart()
-        self.create_trends_chart()
-        self.create_budget_chart()
+        self.create_income_expense_chart(summary)
+        self.create_categories_chart(breakdown)
+        self.create_trends_chart(trends)
+        self.create_budget_chart(usage)
+        self.create_forecast_chart(forecast)
         self.update_canvases()
 
     def refresh_current_chart(self):
@@ -97,6 +141,8 @@ class ChartsFrame(BaseFrame):
             self.create_trends_chart()
         elif self.current_tab == "Бюджет":
             self.create_budget_chart()
+        elif self.current_tab == "Прогноз":
+            self.create_forecast_chart()
 
         self.update_canvases()
 
@@ -117,6 +163,12 @@ class ChartsFrame(BaseFrame):
         self.figures.clear()
         self.canvases.clear()
 
+        # Кнопки и подписи вкладок (выбор периода, возврат из подкатегории)
+        for tab in (self.income_expense_tab, self.categories_tab, self.trends_tab,
+                    self.budget_tab, self.forecast_tab):
+            for widget in tab.winfo_children():
+                widget.destroy()
+
     def clear_current_tab(self):
         """Очистка текущей вкладки"""
         current_frame = None
@@ -129,34 +181,28 @@ class ChartsFrame(BaseFrame):
             current_frame = self.trends_tab
         elif self.current_tab == "Бюджет":
             current_frame = self.budget_tab
+        elif self.current_tab == "Прогноз":
+            current_frame = self.forecast_tab
 
         if current_frame:
             for widget in current_frame.winfo_children():
                 widget.destroy()
 
-    def create_income_expense_chart(self):
-        """Создание графика доходов/расходов"""
-        if not self.db:
+    @timed()
+    def create_income_expense_chart(self, summary=None):
+        """Создание графика доходов/расходов (summary - уже посчитанные итоги месяца)"""
+        if not self.analytics:
             return
 
         try:
             # Получение данных за текущий месяц
-            current_month = datetime.now().month
-            current_year = datetime.now().year
-
-            income = 0
-            expense = 0
-
-            for transaction in self.db.transactions:
-                try:
-                    date = datetime.strptime(transaction.date, "%Y-%m-%d %H:%M:%S")
-                    if date.month == current_month and date.year == current_year:
-                        if transaction.type == 'income':
-                            income += transaction.amount
-                        else:
-                            expense += transaction.amount
-                except:
-                    continue
+            if summary is None:
+                summary = self.analytics.month_totals()
+            symbol = self.analytics.currency_symbol
+            current_month = summary['month']
+            current_year = summary['year']
+            income = summary['income']
+            expense = summary['expense']
 
             # Создание графика
             fig = Figure(figsize=(6, 4), dpi=100)
@@ -172,17 +218,17 @@ class ChartsFrame(BaseFrame):
             for bar, value in zip(bars, values):
                 height = bar.get_height()
                 ax.text(bar.get_x() + bar.get_width() / 2., height + max(values) * 0.02,
-                        f'{value:,.0f} ₽', ha='center', va='bottom', fontsize=10)
+                        f'{value:,.0f} {symbol}', ha='center', va='bottom', fontsize=10)
 
             ax.set_title(f'Доходы и расходы за {current_month}.{current_year}',
                          fontsize=14, fontweight='bold')
-            ax.set_ylabel('Сумма (₽)', fontsize=12)
+            ax.set_ylabel(f'Сумма ({symbol})', fontsize=12)
             ax.grid(axis='y', alpha=0.3)
             ax.set_axisbelow(True)
 
             # Расчет баланса
             balance = income - expense
-            ax.text(0.5, -0.15, f'Баланс: {balance:,.0f} ₽',
+            ax.text(0.5, -0.15, f'Баланс: {balance:,.0f} {symbol}',
                     transform=ax.transAxes, ha='center', fontsize=12,
                     fontweight='bold', color='green' if balance >= 0 else 'red')
 
@@ -199,23 +245,31 @@ class ChartsFrame(BaseFrame):
         except Exception as e:
             print(f"Ошибка создания графика доходов/расходов: {e}")
 
-    def create_categories_chart(self):
-        """Создание круговой диаграммы по категориям"""
-        if not self.db:
+    @timed()
+    def create_categories_chart(self, rows=None):
+        """Создание круговой диаграммы по категориям (с раскрытием подкатегорий)"""
+        if not self.analytics:
             return
 
         try:
-            # Анализ расходов по категориям
-            categories_data = {}
-
-            for transaction in self.db.transactions:
-                if transaction.type == 'expense':  # Только расходы
-                    category = transaction.category
-                    if category not in categories_data:
-                        categories_data[category] = 0
-                    categories_data[category] += transaction.amount
+            # Итоги поддеревьев из помесячных агрегатов
+            if self.category_parent not in self.analytics.category_tree():
+                self.category_parent = None  # категория удалена или переименована
+                rows = None
+            if rows is None:
+                rows = self.analytics.category_breakdown(self.category_parent)
+            symbol = self.analytics.currency_symbol
+
+            if self.category_parent is not None:
+                path = " › ".join(self.analytics.category_tree().path(self.category_parent))
+                ctk.CTkButton(
+                    self.categories_tab,
+                    text=f"← {path}",
+                    command=lambda: self._drill_category(self.analytics.category_tree().parent(self.category_parent)),
+                    width=120
+                ).pack(anchor="nw", padx=10, pady=(5, 0))
 
-            if not categories_data:
+            if not rows:
                 # Если нет данных, показываем сообщение
                 label = ctk.CTkLabel(
                     self.categories_tab,
@@ -226,12 +280,15 @@ class ChartsFrame(BaseFrame):
                 label.pack(expand=True)
                 return
 
-            # Сортировка и выбор топ-10 категорий
-            sorted_categories = sorted(categories_data.items(), key=lambda x: x[1], reverse=True)
-            top_categories = sorted_categories[:10]
+            # Не больше MAX_SLICES секторов, остальное - "Другие"
+            if len(rows) > MAX_SLICES:
+                rest = sum(r['amount'] for r in rows[MAX_SLICES - 1:])
+                rows = rows[:MAX_SLICES - 1] + [{'category': "Другие", 'amount': rest,
+                                                 'has_children': False, 'own': False}]
 
-            labels = [cat for cat, _ in top_categories]
-            values = [val for _, val in top_categories]
+            labels = [f"{r['category']} (без подкатегории)" if r['own']
+                      else r['category'] + (" ▸" if r['has_children'] else "") for r in rows]
+            values = [r['amount'] for r in rows]
 
             # Создание графика
             fig = Figure(figsize=(6, 4), dpi=100)
@@ -244,18 +301,25 @@ class ChartsFrame(BaseFrame):
                 values,
                 labels=labels,
                 colors=colors,
-                autopct=lambda pct: f'{pct:.1f}%\n({pct * sum(values) / 100:,.0f} ₽)',
+                autopct=lambda pct: f'{pct:.1f}%\n({pct * sum(values) / 100:,.0f} {symbol})',
                 startangle=90,
                 textprops={'fontsize': 9}
             )
 
-            ax.set_title('Расходы по категориям', fontsize=14, fontweight='bold')
+            title = 'Расходы по категориям' if self.category_parent is None else f'Расходы: {self.category_parent}'
+            ax.set_title(title, fontsize=14, fontweight='bold')
 
             # Настройка отображения процентов
             for autotext in autotexts:
                 autotext.set_color('black')
                 autotext.set_fontsize(8)
 
+            # Клик по сектору с подкатегориями раскрывает его
+            for wedge, row in zip(wedges, rows):
+                wedge.set_picker(row['has_children'])
+                wedge.category = row['category']
+            fig.canvas.mpl_connect('pick_event', lambda event: self._drill_category(event.artist.category))
+
             fig.tight_layout()
 
             # Добавление на вкладку
@@ -269,43 +333,34 @@ class ChartsFrame(BaseFrame):
         except Exception as e:
             print(f"Ошибка создания круговой диаграммы: {e}")
 
-    def create_trends_chart(self):
-        """Создание графика динамики"""
-        if not self.db:
+    def _drill_category(self, category):
+        """Раскрытие категории (None - возврат на верхний уровень)"""
+        self.category_parent = category
+        self.current_tab = "По категориям"
+        # Перестроение после выхода из обработчика: холст будет удален
+        self.after(0, self.refresh_current_chart)
+
+    @timed()
+    def create_trends_chart(self, trends=None):
+        """Создание графика динамики (trends - уже посчитанные месяцы)"""
+        if not self.analytics:
             return
 
         try:
-            # Анализ данных за последние 6 месяцев
-            current_date = datetime.now()
-            months_data = {}
-
-            for i in range(6):
-                month = current_date.month - i
-                year = current_date.year
-                if month <= 0:
-                    month += 12
-                    year -= 1
-
-                months_data[f"{month:02d}/{year}"] = {'income': 0, 'expense': 0}
-
-            # Сбор данных
-            for transaction in self.db.transactions:
-                try:
-                    date = datetime.strptime(transaction.date, "%Y-%m-%d %H:%M:%S")
-                    month_key = f"{date.month:02d}/{date.year}"
-
-                    if month_key in months_data:
-                        if transaction.type == 'income':
-                            months_data[month_key]['income'] += transaction.amount
-                        else:
-                            months_data[month_key]['expense'] += transaction.amount
-                except:
-                    continue
-
-            # Подготовка данных для графика
-            months = list(reversed(list(months_data.keys())))
-            income_data = [months_data[m]['income'] for m in months]
-            expense_data = [months_data[m]['expense'] for m in months]
+            # Выбор количества месяцев
+            period_combo = ctk.CTkComboBox(self.trends_tab, values=list(TREND_PERIODS),
+                                           command=self._on_trend_period_change, width=100)
+            period_combo.set(next(label for label, months in TREND_PERIODS.items()
+                                  if months == self.trend_months))
+            period_combo.pack(anchor="ne", padx=10, pady=(5, 0))
+
+            # Данные за последние trend_months месяцев
+            if trends is None:
+                trends = self.analytics.trends(self.trend_months)
+            symbol = self.analytics.currency_symbol
+            months = [m['label'] for m in trends]
+            income_data = [m['income'] for m in trends]
+            expense_data = [m['expense'] for m in trends]
 
             # Создание графика
             fig = Figure(figsize=(6, 4), dpi=100)
@@ -318,7 +373,7 @@ class ChartsFrame(BaseFrame):
             bars2 = ax.bar(x + width / 2, expense_data, width, label='Расходы', color='#F44336')
 
             ax.set_xlabel('Месяц', fontsize=12)
-            ax.set_ylabel('Сумма (₽)', fontsize=12)
+            ax.set_ylabel(f'Сумма ({symbol})', fontsize=12)
             ax.set_title('Динамика доходов и расходов', fontsize=14, fontweight='bold')
             ax.set_xticks(x)
             ax.set_xticklabels(months, rotation=45, ha='right')
@@ -351,14 +406,25 @@ class ChartsFrame(BaseFrame):
         except Exception as e:
             print(f"Ошибка создания графика динамики: {e}")
 
-    def create_budget_chart(self):
-        """Создание графика бюджета"""
-        if not self.db:
+    def _on_trend_period_change(self, label: str):
+        """Перестроение графика динамики за выбранное число месяцев"""
+        self.trend_months = TREND_PERIODS[label]
+        self.current_tab = "Динамика"
+        # Перестроение после выхода из обработчика: комбобокс будет удален
+        self.after(0, self.refresh_current_chart)
+
+    @timed()
+    def create_budget_chart(self, usage=None):
+        """Создание графика бюджета (usage - уже посчитанное использование)"""
+        if not self.analytics:
             return
 
         try:
             # Проверяем наличие бюджетов
-            if not hasattr(self.db, 'budgets') or not self.db.budgets:
+            if usage is None:
+                usage = self.analytics.budget_usage(BUDGET_BARS)
+            symbol = self.analytics.currency_symbol
+            if not usage:
                 # Если нет бюджетов, показываем сообщение
                 label = ctk.CTkLabel(
                     self.budget_tab,
@@ -369,24 +435,11 @@ class ChartsFrame(BaseFrame):
                 label.pack(expand=True)
                 return
 
-            # Подготовка данных для графика
-            categories = []
-            limits = []
-            spent = []
-            percentages = []
-
-            for budget in self.db.budgets[:8]:  # Показываем топ-8 бюджетов
-                # В реальном приложении здесь должен быть расчет потраченных средств
-                # Для демонстрации используем случайные данные
-                import random
-                actual_spent = budget.spent if hasattr(budget, 'spent') else random.uniform(0, budget.limit)
-
-                categories.append(budget.category)
-                limits.append(budget.limit)
-                spent.append(actual_spent)
-
-                percentage = (actual_spent / budget.limit * 100) if budget.limit > 0 else 0
-                percentages.append(percentage)
+            # Подготовка данных для графика (топ-8 бюджетов)
+            categories = [b['category'] for b in usage]
+            limits = [b['limit'] for b in usage]
+            spent = [b['spent'] for b in usage]
+            percentages = [b['percentage'] for b in usage]
 
             # Создание графика
             fig = Figure(figsize=(6, 4), dpi=100)
@@ -402,7 +455,7 @@ class ChartsFrame(BaseFrame):
                         ha='center', fontsize=9, fontweight='bold', color=color)
 
             ax.set_xlabel('Категории', fontsize=12)
-            ax.set_ylabel('Сумма (₽)', fontsize=12)
+            ax.set_ylabel(f'Сумма ({symbol})', fontsize=12)
             ax.set_title('Использование бюджета', fontsize=14, fontweight='bold')
             ax.set_xticks(x)
             ax.set_xticklabels(categories, rotation=45, ha='right', fontsize=9)
@@ -423,6 +476,74 @@ class ChartsFrame(BaseFrame):
         except Exception as e:
             print(f"Ошибка создания графика бюджета: {e}")
 
+    @timed()
+    def create_forecast_chart(self, forecast=None):
+        """Создание графика прогноза баланса (forecast - уже посчитанный прогноз)"""
+        if not self.analytics:
+            return
+
+        try:
+            if forecast is None:
+                forecast = self.analytics.forecast(FORECAST_MONTHS)
+            symbol = self.analytics.currency_symbol
+
+            if not forecast:
+                label = ctk.CTkLabel(
+                    self.forecast_tab,
+                    text="Недостаточно данных для прогноза\n(нужна история минимум за 3 месяца)",
+                    font=("Arial", 14),
+                    text_color="gray"
+                )
+                label.pack(expand=True)
+                return
+
+            fig = Figure(figsize=(6, 4), dpi=100)
+            ax = fig.add_subplot(111)
+
+            history = forecast['history_months']
+            x_history = np.arange(len(history))
+            x_forecast = np.arange(len(history), len(history) + len(forecast['months']))
+
+            if history:
+                ax.plot(x_history, forecast['history_balance'], color='#2196F3',
+                        marker='o', linewidth=2, label='Факт')
+                # Соединяем факт с прогнозом
+                ax.plot([x_history[-1], x_forecast[0]],
+                        [forecast['history_balance'][-1], forecast['balance'][0]],
+                        color='#FF9800', linestyle='--', linewidth=2)
+
+            ax.plot(x_forecast, forecast['balance'], color='#FF9800', linestyle='--',
+                    marker='o', linewidth=2, label='Прогноз')
+            ax.fill_between(x_forecast, forecast['lower'], forecast['upper'],
+                            color='#FF9800', alpha=0.2, label='95% интервал')
+
+            ax.set_title(f"Прогноз баланса на {len(forecast['months'])} мес.",
+                         fontsize=14, fontweight='bold')
+            ax.set_ylabel(f'Баланс ({symbol})', fontsize=12)
+            ax.set_xticks(np.concatenate((x_history, x_forecast)))
+            ax.set_xticklabels(history + forecast['months'], rotation=45, ha='right', fontsize=8)
+            ax.legend(loc='upper left')
+            ax.grid(alpha=0.3)
+            ax.set_axisbelow(True)
+
+            if forecast['top_expenses']:
+                lines = [f"{name}: {amount:,.0f} {symbol}" for name, amount in forecast['top_expenses'][:3]]
+                ax.text(0.99, 0.02, "Ожидаемые расходы:\n" + "\n".join(lines),
+                        transform=ax.transAxes, ha='right', va='bottom', fontsize=8,
+                        bbox=dict(boxstyle='round', facecolor='white', alpha=0.7))
+
+            fig.tight_layout()
+
+            canvas = FigureCanvasTkAgg(fig, self.forecast_tab)
+            canvas.draw()
+            canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
+
+            self.figures.append(fig)
+            self.canvases.append(canvas)
+
+        except Exception as e:
+            print(f"Ошибка создания графика прогноза: {e}")
+
     def update_canvases(self):
         """Обновление всех канвасов"""
         for canvas in self.canvases:
@@ -431,6 +552,3 @@ class ChartsFrame(BaseFrame):
             except:
                 pass
 
-    def refresh(self):
-        """Обновление фрейма (реализация метода из BaseFrame)"""
-        self.update_data()
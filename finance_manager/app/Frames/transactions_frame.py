@@ -3,19 +3,31 @@
 """
 import customtkinter as ctk
 from tkinter import ttk, messagebox
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 from ..models import TransactionType
+from ..currency import currency_symbol
+from ..money import format_minor
 from .base_frame import BaseFrame
 
+# Сколько операций показывать: для массовых действий над импортом нужны все
+ROW_LIMITS = {"50": 50, "500": 500, "5000": 5000, "Все": None}
+ALL_TRANSACTIONS = "Все операции"
+
 
 class TransactionsFrame(BaseFrame):
     """Фрейм транзакций"""
 
-    def __init__(self, parent, controller=None, on_delete=None, on_edit=None, **kwargs):
+    def __init__(self, parent, controller=None, on_delete=None, on_edit=None, on_bulk_edit=None,
+                 on_manage_filters=None, **kwargs):
         self.on_delete_callback = on_delete
         self.on_edit_callback = on_edit
+        self.on_bulk_edit_callback = on_bulk_edit
+        self.on_manage_filters_callback = on_manage_filters
+        self.row_limit = 50
+        self.tag_query = ""
+        self.filter_id = None  # выбранный сохраненный фильтр
         # Передаем контроллер в родительский конструктор
         super().__init__(parent, controller=controller, **kwargs)
 
@@ -35,6 +47,15 @@ class TransactionsFrame(BaseFrame):
         )
         self.title_label.grid(row=0, column=0, padx=10, pady=(10, 5), sticky="w")
 
+        # Фильтр по тегам: отпуск AND NOT возмещено
+        self.tag_filter_entry = ctk.CTkEntry(
+            self,
+            width=260,
+            placeholder_text="Теги: отпуск AND NOT возмещено"
+        )
+        self.tag_filter_entry.grid(row=0, column=0, padx=10, pady=(10, 5), sticky="e")
+        self.tag_filter_entry.bind("<Return>", self._on_tag_filter)
+
         # Фрейм для таблицы
         table_frame = ctk.CTkFrame(self)
         table_frame.grid(row=1, column=0, sticky="nsew", padx=10, pady=5)
@@ -42,13 +63,13 @@ class TransactionsFrame(BaseFrame):
         table_frame.grid_rowconfigure(0, weight=1)
 
         # Создание Treeview
-        columns = ("Дата", "Тип", "Категория", "Сумма", "Описание")
+        columns = ("Дата", "Тип", "Категория", "Сумма", "Описание", "Теги")
         self.tree = ttk.Treeview(
             table_frame,
             columns=columns,
             show="headings",
             height=15,
-            selectmode="browse"
+            selectmode="extended"
         )
 
         # Настройка колонок
@@ -57,7 +78,8 @@ class TransactionsFrame(BaseFrame):
             "Тип": 80,
             "Категория": 120,
             "Сумма": 100,
-            "Описание": 200
+            "Описание": 200,
+            "Теги": 120
         }
 
         for col in columns:
@@ -100,7 +122,8 @@ class TransactionsFrame(BaseFrame):
         buttons = [
             ("🔄 Обновить", self.refresh_table, "blue"),
             ("✏️ Редактировать", self.edit_selected, "orange"),
-            ("🗑️ Удалить", self.delete_selected, "red")
+            ("🗑️ Удалить", self.delete_selected, "red"),
+            ("☑ Массово", self.bulk_edit_selected, "green")
         ]
 
         for i, (text, command, color) in enumerate(buttons):
@@ -114,6 +137,33 @@ class TransactionsFrame(BaseFrame):
             )
             btn.grid(row=0, column=i, padx=5, pady=5)
 
+        ctk.CTkLabel(btn_frame, text="Показывать:").grid(row=0, column=len(buttons), padx=(15, 5), pady=5)
+        self.limit_combo = ctk.CTkComboBox(
+            btn_frame,
+            values=list(ROW_LIMITS),
+            command=self._on_limit_change,
+            width=80
+        )
+        self.limit_combo.set("50")
+        self.limit_combo.grid(row=0, column=len(buttons) + 1, padx=5, pady=5)
+
+        # Сохраненные фильтры: результат хранится готовым в контроллере
+        ctk.CTkLabel(btn_frame, text="Фильтр:").grid(row=0, column=len(buttons) + 2, padx=(15, 5), pady=5)
+        self.filter_combo = ctk.CTkComboBox(
+            btn_frame,
+            values=[ALL_TRANSACTIONS],
+            command=self._on_saved_filter,
+            width=160
+        )
+        self.filter_combo.set(ALL_TRANSACTIONS)
+        self.filter_combo.grid(row=0, column=len(buttons) + 3, padx=5, pady=5)
+        ctk.CTkButton(
+            btn_frame,
+            text="⚙",
+            command=self._manage_filters,
+            width=30
+        ).grid(row=0, column=len(buttons) + 4, padx=5, pady=5)
+
     @staticmethod
     def _darken_color(color_name: str) -> str:
         """Затемнение цвета для эффекта hover"""
@@ -135,13 +185,41 @@ class TransactionsFrame(BaseFrame):
         for item in self.tree.get_children():
             self.tree.delete(item)
 
+        self._update_filter_list()
+
         # Получение транзакций
         try:
-            transactions = self.db.get_transactions(limit=50)
+            if self.filter_id:
+                transactions = self.controller.get_filter_transactions(self.filter_id, limit=self.row_limit)
+                title = self._filter_title()
+            elif self.tag_query:
+                transactions = self.db.filter_transactions(self.tag_query, limit=self.row_limit)
+                title = f"Операции с тегами: {self.tag_query}"
+            else:
+                transactions = self.db.get_transactions(limit=self.row_limit)
+                title = "Последние операции"
+        except ValueError as e:
+            self.title_label.configure(text=f"Ошибка фильтра: {e}")
+            return
         except Exception as e:
             print(f"Ошибка получения транзакций: {e}")
             return
 
+        self.title_label.configure(text=title)
+
+        # Необычные расходы (по статистике в валюте отчетов)
+        anomalous = set()
+        if self.controller and transactions:
+            try:
+                detector = self.controller.get_anomaly_detector()
+                amounts = self.db.amounts_in(transactions)
+                anomalous = {t.id for t, amount in zip(transactions, amounts)
+                             if detector.check(t, int(amount))}
+            except Exception as e:
+                print(f"Ошибка проверки необычных расходов: {e}")
+
+        self.tree.tag_configure('anomaly', background='#FDE68A')
+
         # Добавление в таблицу
         for transaction in transactions:
             # Форматирование даты
@@ -157,32 +235,81 @@ class TransactionsFrame(BaseFrame):
             type_str = "Доход" if transaction.type == TransactionType.INCOME.value else "Расход"
 
             # Форматирование суммы
-            amount_str = f"{transaction.amount:,.2f} ₽".replace(",", " ")
+            amount_str = format_minor(transaction.amount_minor, currency_symbol(transaction.currency))
+            if transaction.id in anomalous:
+                amount_str = "⚠ " + amount_str
 
             # Обрезание описания
             description = transaction.description
             if len(description) > 30:
                 description = description[:27] + "..."
 
+            # Операция с разбивкой - все ее категории
+            category = transaction.category
+            if transaction.splits:
+                category = "✂ " + ", ".join(dict.fromkeys(name for name, _ in transaction.lines()))
+
             values = (
                 date_str,
                 type_str,
-                transaction.category,
+                category,
                 amount_str,
-                description
+                description,
+                ", ".join(transaction.tags)
             )
 
             item = self.tree.insert("", "end", values=values, tags=(transaction.id,))
 
             # Раскраска строк
-            if transaction.type == TransactionType.INCOME.value:
+            if transaction.id in anomalous:
+                self.tree.item(item, tags=(transaction.id, 'anomaly'))
+            elif transaction.type == TransactionType.INCOME.value:
                 self.tree.tag_configure('income', background='#D1FAE5')
                 self.tree.item(item, tags=(transaction.id, 'income'))
             else:
                 self.tree.tag_configure('expense', background='#FEE2E2')
                 self.tree.item(item, tags=(transaction.id, 'expense'))
 
-    def _on_double_click(self):
+    def _update_filter_list(self):
+        """Список сохраненных фильтров (выбранный мог быть удален)"""
+        if not self.controller:
+            return
+        filters = self.controller.get_saved_filters()
+        self.filter_combo.configure(values=[ALL_TRANSACTIONS, *(f.name for f in filters)])
+        saved = self.controller.get_saved_filter(self.filter_id) if self.filter_id else None
+        if saved is None:
+            self.filter_id = None
+        self.filter_combo.set(saved.name if saved else ALL_TRANSACTIONS)
+
+    def _filter_title(self) -> str:
+        """Заголовок с итогами сохраненного фильтра"""
+        saved = self.controller.get_saved_filter(self.filter_id)
+        summary = self.controller.get_filter_view(self.filter_id).summary()
+        currency = currency_symbol(self.db.reporting_currency)
+        return f"{saved.name}: {summary['count']} опер., итог {summary['net']:,.2f} {currency}"
+
+    def _on_saved_filter(self, name: str):
+        """Выбор сохраненного фильтра"""
+        saved = next((f for f in self.controller.get_saved_filters() if f.name == name), None)
+        self.filter_id = saved.id if saved else None
+        self.update_data()
+
+    def _manage_filters(self):
+        """Окно сохраненных фильтров"""
+        if self.on_manage_filters_callback:
+            self.on_manage_filters_callback()
+
+    def _on_tag_filter(self, event=None):
+        """Применение фильтра тегов"""
+        self.tag_query = self.tag_filter_entry.get().strip()
+        self.update_data()
+
+    def _on_limit_change(self, label: str):
+        """Смена числа показываемых операций"""
+        self.row_limit = ROW_LIMITS.get(label, 50)
+        self.update_data()
+
+    def _on_double_click(self, event=None):
         """Обработка двойного клика"""
         if self.on_edit_callback:
             self.on_edit_callback()
@@ -201,16 +328,30 @@ class TransactionsFrame(BaseFrame):
                 return tags[0]  # Первый тег - ID транзакции
         return None
 
+    def get_selected_transaction_ids(self) -> List[str]:
+        """ID всех выбранных транзакций"""
+        return [self.tree.item(item)['tags'][0] for item in self.tree.selection()
+                if self.tree.item(item)['tags']]
+
     def edit_selected(self):
         """Редактирование выбранной транзакции"""
         if self.on_edit_callback:
             self.on_edit_callback()
 
     def delete_selected(self):
-        """Удаление выбранной транзакции"""
-        transaction_id = self.get_selected_transaction_id()
-        if transaction_id and self.on_delete_callback:
-            self.on_delete_callback(transaction_id)
+        """Удаление выбранных транзакций"""
+        transaction_ids = self.get_selected_transaction_ids()
+        if transaction_ids and self.on_delete_callback:
+            self.on_delete_callback(transaction_ids[0] if len(transaction_ids) == 1 else transaction_ids)
+
+    def bulk_edit_selected(self):
+        """Массовое изменение выбранных транзакций"""
+        transaction_ids = self.get_selected_transaction_ids()
+        if not transaction_ids:
+            messagebox.showwarning("Внимание", "Выберите операции (Ctrl/Shift + клик)")
+            return
+        if self.on_bulk_edit_callback:
+            self.on_bulk_edit_callback(transaction_ids)
 
     def refresh_table(self):
         """Обновление таблицы"""
@@ -5,6 +5,10 @@ from .analytics_window import AnalyticsWindow
 from .categories_window import CategoriesWindow
 from .settings_window import SettingsWindow
 from .export_window import ExportWindow
+from .diagnostics_window import DiagnosticsWindow
+from .recurring_window import RecurringWindow
+from .bulk_edit_window import BulkEditWindow
+from .saved_filters_window import SavedFiltersWindow
 
 
 __all__ = [
@@ -14,5 +18,9 @@ __all__ = [
     "AnalyticsWindow",
     "CategoriesWindow",
     "SettingsWindow",
-    "ExportWindow"
+    "ExportWindow",
+    "DiagnosticsWindow",
+    "RecurringWindow",
+    "BulkEditWindow",
+    "SavedFiltersWindow"
 ]
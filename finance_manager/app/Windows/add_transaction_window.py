@@ -2,9 +2,13 @@
 Окно добавления/редактирования транзакции
 """
 import customtkinter as ctk
+from dataclasses import replace
 from tkinter import messagebox
 
-from ..models import Transaction
+from ..currency import BASE_CURRENCY, CURRENCY_SYMBOLS
+from ..models import Split, Transaction
+from ..money import minor_to_decimal, to_minor
+from ..tags import parse_tags
 
 
 class AddTransactionWindow(ctk.CTkToplevel):
@@ -16,6 +20,7 @@ class AddTransactionWindow(ctk.CTkToplevel):
         self.controller = controller
         self.transaction_id = transaction_id
         self.on_save_callback = on_save
+        self._category_chosen = transaction_id is not None  # категорию выбрал пользователь
 
         # Получаем базу данных через контроллер
         self.db = controller.get_database() if controller else None
@@ -23,17 +28,12 @@ class AddTransactionWindow(ctk.CTkToplevel):
         # Настройка окна
         if transaction_id:
             self.title("Редактировать операцию")
-            self.transaction = None
-            if self.db and hasattr(self.db, 'transactions'):
-                for t in self.db.transactions:
-                    if t.id == transaction_id:
-                        self.transaction = t
-                        break
+            self.transaction = self.db.get_transaction(transaction_id) if self.db else None
         else:
             self.title("Добавить операцию")
             self.transaction = None
 
-        self.geometry("500x600")
+        self.geometry("500x720")
         self.resizable(False, False)
         self.grab_set()  # Модальное окно
 
@@ -51,7 +51,7 @@ class AddTransactionWindow(ctk.CTkToplevel):
         """Центрирование окна"""
         self.update_idletasks()
         width = 500
-        height = 600
+        height = 720
         x = (self.winfo_screenwidth() // 2) - (width // 2)
         y = (self.winfo_screenheight() // 2) - (height // 2)
         self.geometry(f"{width}x{height}+{x}+{y}")
@@ -59,7 +59,7 @@ class AddTransactionWindow(ctk.CTkToplevel):
     def _create_widgets(self):
         """Создание виджетов"""
         # Основной фрейм
-        main_frame = ctk.CTkFrame(self)
+        main_frame = ctk.CTkScrollableFrame(self)
         main_frame.pack(fill="both", expand=True, padx=20, pady=20)
 
         # Тип операции
@@ -96,29 +96,67 @@ class AddTransactionWindow(ctk.CTkToplevel):
             main_frame,
             variable=self.category_var,
             values=self._get_categories(),
+            command=self._on_category_select,
             width=300
         )
         self.category_combo.pack(pady=(0, 15))
 
-        # Сумма
-        ctk.CTkLabel(main_frame, text="Сумма (₽):",
+        # Сумма и валюта
+        ctk.CTkLabel(main_frame, text="Сумма:",
                      font=("Arial", 12, "bold")).pack(pady=(0, 5))
 
+        amount_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        amount_frame.pack(pady=(0, 15))
+
         self.amount_var = ctk.StringVar()
         self.amount_entry = ctk.CTkEntry(
-            main_frame,
+            amount_frame,
             textvariable=self.amount_var,
             placeholder_text="0.00",
-            width=300
+            width=210
         )
-        self.amount_entry.pack(pady=(0, 15))
+        self.amount_entry.pack(side="left")
+        self.amount_entry.bind("<KeyRelease>", self._update_split_rest)
+
+        self.currency_var = ctk.StringVar(value=self._default_currency())
+        self.currency_combo = ctk.CTkComboBox(
+            amount_frame,
+            variable=self.currency_var,
+            values=self._get_currencies(),
+            width=85
+        )
+        self.currency_combo.pack(side="left", padx=(5, 0))
 
         # Описание
         ctk.CTkLabel(main_frame, text="Описание:",
                      font=("Arial", 12, "bold")).pack(pady=(0, 5))
 
-        self.description_text = ctk.CTkTextbox(main_frame, height=100, width=300)
-        self.description_text.pack(pady=(0, 20))
+        self.description_text = ctk.CTkTextbox(main_frame, height=70, width=300)
+        self.description_text.pack(pady=(0, 15))
+        self.description_text.bind("<KeyRelease>", self._suggest_category)
+
+        # Теги
+        ctk.CTkLabel(main_frame, text="Теги (через запятую):",
+                     font=("Arial", 12, "bold")).pack(pady=(0, 5))
+
+        self.tags_var = ctk.StringVar()
+        self.tags_entry = ctk.CTkEntry(main_frame, textvariable=self.tags_var, width=300,
+                                       placeholder_text="отпуск, к возмещению")
+        self.tags_entry.pack(pady=(0, 15))
+
+        # Разбивка по категориям (остаток относится к основной категории)
+        splits_header = ctk.CTkFrame(main_frame, fg_color="transparent")
+        splits_header.pack(fill="x", pady=(0, 5))
+        ctk.CTkLabel(splits_header, text="Разбивка по категориям:",
+                     font=("Arial", 12, "bold")).pack(side="left", padx=(60, 0))
+        ctk.CTkButton(splits_header, text="➕ Часть", width=80,
+                      command=self._add_split_row).pack(side="right", padx=(0, 60))
+
+        self.split_rows = []
+        self.splits_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        self.splits_frame.pack()
+        self.split_rest_label = ctk.CTkLabel(main_frame, text="", text_color="gray")
+        self.split_rest_label.pack(pady=(0, 15))
 
         # Кнопки
         button_frame = ctk.CTkFrame(main_frame)
@@ -143,6 +181,55 @@ class AddTransactionWindow(ctk.CTkToplevel):
             width=120
         ).pack(side="left", padx=10)
 
+    def _add_split_row(self, category: str = "", amount: str = ""):
+        """Строка части: категория и сумма"""
+        row = ctk.CTkFrame(self.splits_frame, fg_color="transparent")
+        row.pack(pady=2)
+        combo = ctk.CTkComboBox(row, values=self._get_categories(), width=170)
+        combo.set(category)
+        combo.pack(side="left")
+        amount_var = ctk.StringVar(value=amount)
+        entry = ctk.CTkEntry(row, textvariable=amount_var, placeholder_text="0.00", width=90)
+        entry.pack(side="left", padx=5)
+        entry.bind("<KeyRelease>", self._update_split_rest)
+        split_row = (row, combo, amount_var)
+        ctk.CTkButton(row, text="✕", width=30, fg_color="gray",
+                      command=lambda: self._remove_split_row(split_row)).pack(side="left")
+        self.split_rows.append(split_row)
+        self._update_split_rest()
+
+    def _remove_split_row(self, split_row):
+        split_row[0].destroy()
+        self.split_rows.remove(split_row)
+        self._update_split_rest()
+
+    def _get_splits(self):
+        """Части из формы (пустые строки пропускаются)"""
+        splits = []
+        for _, combo, amount_var in self.split_rows:
+            category, amount = combo.get().strip(), amount_var.get().strip()
+            if not category and not amount:
+                continue
+            if not category:
+                raise ValueError("Выберите категорию для каждой части")
+            try:
+                amount_minor = to_minor(amount)
+            except ValueError:
+                raise ValueError(f"Некорректная сумма части «{category}»")
+            splits.append(Split(category=category, amount_minor=amount_minor))
+        return splits
+
+    def _update_split_rest(self, _event=None):
+        """Подсказка: сколько останется в основной категории"""
+        text = ""
+        if self.split_rows:
+            try:
+                rest = to_minor(self.amount_var.get()) - sum(s.amount_minor for s in self._get_splits())
+                text = f"Остаток в основной категории: {minor_to_decimal(rest)}"
+            except ValueError:
+                pass
+        self.split_rest_label.configure(text=text)
+
     def _get_categories(self):
         """Получение категорий в зависимости от типа операции"""
         categories = []
@@ -162,20 +249,53 @@ class AddTransactionWindow(ctk.CTkToplevel):
 
         return categories
 
+    def _default_currency(self) -> str:
+        """Валюта по умолчанию - валюта отчетов"""
+        return self.db.reporting_currency if self.db else BASE_CURRENCY
+
+    def _get_currencies(self):
+        """Известные валюты и валюты из таблицы курсов"""
+        currencies = set(CURRENCY_SYMBOLS)
+        if self.db:
+            currencies.update(self.db.rates.currencies)
+        return sorted(currencies)
+
     def _on_type_change(self):
         """Обработка изменения типа операции"""
         categories = self._get_categories()
         self.category_combo.configure(values=categories)
+        for _, combo, _ in self.split_rows:
+            combo.configure(values=categories)
+        if self._category_chosen and self.category_var.get() not in categories:
+            self._category_chosen = False
+        self._suggest_category()
         if categories and not self.category_var.get():
             self.category_combo.set(categories[0])
 
+    def _on_category_select(self, _value=None):
+        """Категория выбрана вручную - подсказка больше не нужна"""
+        self._category_chosen = True
+
+    def _suggest_category(self, _event=None):
+        """Подстановка категории по вводимому описанию"""
+        if self._category_chosen or not self.controller:
+            return
+        description = self.description_text.get("1.0", "end-1c")
+        category = self.controller.suggest_category(description, self.type_var.get())
+        if category and category != self.category_var.get():
+            self.category_var.set(category)
+
     def _fill_fields(self):
         """Заполнение полей при редактировании"""
         if self.transaction:
             self.type_var.set(self.transaction.type)
             self.category_var.set(self.transaction.category)
-            self.amount_var.set(str(self.transaction.amount))
+            self.amount_var.set(str(minor_to_decimal(self.transaction.amount_minor)))
+            self.currency_var.set(self.transaction.currency)
             self.description_text.insert("1.0", self.transaction.description)
+            self.tags_var.set(", ".join(self.transaction.tags))
+            for split in self.transaction.splits:
+                self._add_split_row(split.category, str(minor_to_decimal(split.amount_minor)))
             self._on_type_change()  # Обновляем категории
 
     def _save_transaction(self):
@@ -187,33 +307,49 @@ class AddTransactionWindow(ctk.CTkToplevel):
                 raise ValueError("Выберите категорию")
 
             try:
-                amount = float(self.amount_var.get().replace(",", "."))
-                if amount <= 0:
-                    raise ValueError("Сумма должна быть положительной")
+                amount_minor = to_minor(self.amount_var.get())
             except ValueError:
                 raise ValueError("Введите корректную положительную сумму")
+            if amount_minor <= 0:
+                raise ValueError("Введите корректную положительную сумму")
+
+            currency = self.currency_var.get().strip().upper()
+            if len(currency) != 3 or not currency.isalpha():
+                raise ValueError("Укажите код валюты из трех букв (RUB, USD, ...)")
 
             description = self.description_text.get("1.0", "end-1c").strip()
+            tags = parse_tags(self.tags_var.get())
+            splits = self._get_splits()
 
             # Создание или обновление транзакции
             if self.transaction:
-                # Обновление существующей
-                self.transaction.type = self.type_var.get()
-                self.transaction.category = category
-                self.transaction.amount = amount
-                self.transaction.description = description
-                transaction = self.transaction
+                # Обновление существующей: новый объект, чтобы база видела прежние значения
+                transaction = replace(
+                    self.transaction,
+                    type=self.type_var.get(),
+                    category=category,
+                    amount_minor=amount_minor,
+                    currency=currency,
+                    description=description,
+                    tags=tags,
+                    splits=splits
+                )
                 action = "обновлена"
             else:
                 # Создание новой
                 transaction = Transaction(
                     type=self.type_var.get(),
                     category=category,
-                    amount=amount,
-                    description=description
+                    amount_minor=amount_minor,
+                    currency=currency,
+                    description=description,
+                    tags=tags,
+                    splits=splits
                 )
                 action = "добавлена"
 
+            transaction.check_splits()
+
             # Сохранение через callback
             if self.on_save_callback:
                 self.on_save_callback(transaction)
@@ -1,20 +1,34 @@
-from datetime import datetime
+import csv
+from tkinter import filedialog
+from tkinter.messagebox import showerror, showinfo
 from tkinter.ttk import Treeview
-from typing import List, Dict
 import customtkinter as ctk
+import numpy as np
+import pandas as pd
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 
 from .base_window import BaseWindow
-from ..models import Transaction, TransactionType
+from ..analytics import AnalyticsService
+from ..pivot import NET
+
+PIVOT_GRANULARITIES = {"День": "day", "Неделя": "week", "Месяц": "month", "Год": "year"}
+PIVOT_TYPES = {"Расходы": "expense", "Доходы": "income", "Баланс": NET}
+PIVOT_MAX_ROWS = 200
+POLL_MS = 100
+COMPARISON_MODES = {
+    "Месяц к прошлому месяцу": "month_over_month",
+    "Месяц к месяцу год назад": "year_over_year",
+    "С начала года к прошлому году": "year_to_date",
+}
 
 
 class AnalyticsWindow(BaseWindow):
     """Окно аналитики с детальными графиками"""
 
-    def __init__(self, parent, transactions: List[Transaction]):
+    def __init__(self, parent, analytics: AnalyticsService):
         super().__init__(parent, "Детальная аналитика", 1000, 700)
-        self.transactions = transactions
+        self.analytics = analytics
         self.setup_analytics()
 
     def setup_analytics(self):
@@ -27,22 +41,93 @@ class AnalyticsWindow(BaseWindow):
         self.summary_tab = self.tabview.add("Сводка")
         self.categories_tab = self.tabview.add("Анализ по категориям")
         self.timeline_tab = self.tabview.add("Временные ряды")
+        self.pivot_tab = self.tabview.add("Сводная таблица")
+        self.comparison_tab = self.tabview.add("Сравнение")
+        self.tags_tab = self.tabview.add("Теги")
 
-        # Заполнение вкладок
+        # Вкладки создаются пустыми, данные считаются в фоне
         self.create_summary_tab()
         self.create_categories_tab()
         self.create_timeline_tab()
+        self.create_pivot_tab()
+        self.create_comparison_tab()
+        self.create_tags_tab()
+        self.load_in_background()
+
+    def load_in_background(self):
+        """Расчет всех вкладок одним фоновым заданием по снимку базы
+
+        Статистика и ряды по всей истории (сотни миллисекунд на больших
+        базах) не задерживают открытие окна; дальнейшие пересчеты по
+        переключателям идут от агрегатов, которые задание оставит базе.
+        """
+        selection = self._selection()
+        future = self.analytics.submit('batch', [
+            'statistics',
+            'amount_percentiles',
+            'category_stats',
+            ('category_percentiles', 'expense'),
+            ('category_percentiles', 'income'),
+            'timeline',
+            ('pivot', PIVOT_GRANULARITIES[self.pivot_granularity.get()], PIVOT_TYPES[self.pivot_type.get()]),
+            COMPARISON_MODES[self.comparison_mode.get()],
+            ('filtered_summary', None),
+        ])
+        self._wait_results(future, selection)
+
+    def _selection(self):
+        """Переключатели вкладок, от которых зависит расчет"""
+        return (self.pivot_granularity.get(), self.pivot_type.get(), self.comparison_mode.get(),
+                self.tag_query_entry.get().strip())
+
+    def _wait_results(self, future, selection):
+        """Заполнение вкладок по готовности (опрос из цикла событий: Tk нельзя вызывать из потока)
+
+        Вкладки, чьи переключатели успели поменять, пересчитываются заново.
+        """
+        if not self.winfo_exists():
+            return
+        if not future.done():
+            self.after(POLL_MS, self._wait_results, future, selection)
+            return
+        try:
+            (stats, percentiles, category_rows, expense_percentiles, income_percentiles,
+             timeline, pivot, comparison, tags) = self.analytics.collect(future)
+        except Exception as e:
+            showerror("Ошибка", f"Ошибка расчета аналитики: {e}", parent=self)
+            return
+        self.show_summary(stats, percentiles)
+        self.update_categories_tab(category_rows, expense_percentiles + income_percentiles)
+        self.show_timeline(timeline)
+        current = self._selection()
+        self.update_pivot_tab(pivot if current[:2] == selection[:2] else None)
+        self.update_comparison_tab(comparison if current[2] == selection[2] else None)
+        if current[3] == selection[3]:
+            self.show_tags(tags)
+        else:
+            self.update_tags_tab()
 
     def create_summary_tab(self):
         """Создание вкладки со сводкой"""
-        # Расчет статистики
-        stats = self.calculate_statistics()
-
-        # Отображение статистики
-        text_widget = ctk.CTkTextbox(self.summary_tab, font=("Arial", 12))
-        text_widget.pack(fill="both", expand=True, padx=10, pady=10)
-
-        summary = f"""
+        self.summary_text = ctk.CTkTextbox(self.summary_tab, font=("Arial", 12))
+        self.summary_text.pack(fill="both", expand=True, padx=10, pady=10)
+        self.summary_text.insert("1.0", "Расчет статистики...")
+        self.summary_text.configure(state="disabled")
+
+    def show_summary(self, stats, percentiles):
+        """Отображение статистики в сводке"""
+        if not stats:
+            text = "Нет операций"
+        else:
+            text = self._format_summary(stats, percentiles, self.analytics.currency_symbol)
+        self.summary_text.configure(state="normal")
+        self.summary_text.delete("1.0", "end")
+        self.summary_text.insert("1.0", text)
+        self.summary_text.configure(state="disabled")
+
+    @classmethod
+    def _format_summary(cls, stats, percentiles, symbol: str) -> str:
+        return f"""
 {'=' * 50}
 ФИНАНСОВАЯ СВОДКА
 {'=' * 50}
@@ -53,54 +138,90 @@ class AnalyticsWindow(BaseWindow):
   • Расходных операций: {stats['expense_count']}
 
 Финансовые показатели:
-  • Общий доход: {stats['total_income']:,.2f} ₽
-  • Общий расход: {stats['total_expense']:,.2f} ₽
-  • Чистый баланс: {stats['net_balance']:,.2f} ₽
+  • Общий доход: {stats['total_income']:,.2f} {symbol}
+  • Общий расход: {stats['total_expense']:,.2f} {symbol}
+  • Чистый баланс: {stats['net_balance']:,.2f} {symbol}
 
 Средние значения:
-  • Средний доход: {stats['avg_income']:,.2f} ₽
-  • Средний расход: {stats['avg_expense']:,.2f} ₽
-  • Средняя операция: {stats['avg_transaction']:,.2f} ₽
-
+  • Средний доход: {stats['avg_income']:,.2f} {symbol}
+  • Средний расход: {stats['avg_expense']:,.2f} {symbol}
+  • Средняя операция: {stats['avg_transaction']:,.2f} {symbol}
+{cls._format_percentiles(percentiles, symbol)}
 Период анализа:
   • Начало: {stats['start_date']}
   • Конец: {stats['end_date']}
   • Дней в периоде: {stats['days_count']}
 """
-        text_widget.insert("1.0", summary)
-        text_widget.configure(state="disabled")
+
+    @staticmethod
+    def _format_percentiles(percentiles, symbol: str) -> str:
+        """Блок распределения сумм расходов для сводки"""
+        if not percentiles:
+            return ""
+        return (
+            "\nРаспределение расходов:\n"
+            f"  • Медиана: {percentiles['median']:,.2f} {symbol}\n"
+            f"  • 90-й перцентиль: {percentiles['p90']:,.2f} {symbol}\n"
+            f"  • 99-й перцентиль: {percentiles['p99']:,.2f} {symbol}\n"
+        )
 
     def create_categories_tab(self):
         """Создание вкладки с анализом по категориям"""
         # Таблица категорий
-        columns = ("Категория", "Тип", "Сумма", "Кол-во", "Доля")
-        tree = Treeview(self.categories_tab, columns=columns, show="headings", height=15)
+        columns = ("Категория", "Тип", "Сумма", "Кол-во", "Доля", "Среднее", "Медиана", "p90", "p99", "Мин", "Макс")
+        self.categories_tree = Treeview(self.categories_tab, columns=columns, show="headings", height=15)
 
         for col in columns:
-            tree.heading(col, text=col)
-            tree.column(col, width=120)
-
-        # Заполнение данными
-        categories_stats = self.analyze_categories()
-        for cat, data in categories_stats.items():
-            tree.insert("", "end", values=(
-                cat,
-                data['type'],
-                f"{data['amount']:,.2f}",
-                data['count'],
-                f"{data['percentage']:.1f}%"
-            ))
+            self.categories_tree.heading(col, text=col)
+            self.categories_tree.column(col, width=150 if col == "Категория" else 85)
+
+        self.categories_tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+    def update_categories_tab(self, rows, percentiles):
+        """Заполнение таблицы категорий с обновлением существующих строк
+
+        percentiles - перцентили категорий обоих типов (category_percentiles).
+        """
+        tree = self.categories_tree
+        percentiles = {f"{p['type']}:{p['category']}": p for p in percentiles}
+        stale = set(tree.get_children())
+
+        for index, row in enumerate(rows):
+            iid = f"{row['type']}:{row['category']}"
+            quantiles = percentiles.get(iid, {})
+            values = (
+                row['category'],
+                'Доход' if row['type'] == 'income' else 'Расход',
+                f"{row['amount']:,.2f}",
+                row['count'],
+                f"{row['share']:.1f}%",
+                f"{row['average']:,.2f}",
+                *(f"{quantiles[q]:,.2f}" if q in quantiles else "—" for q in ('median', 'p90', 'p99')),
+                f"{row['min']:,.2f}",
+                f"{row['max']:,.2f}"
+            )
+            if tree.exists(iid):
+                tree.item(iid, values=values)
+                tree.move(iid, "", index)
+                stale.discard(iid)
+            else:
+                tree.insert("", index, iid=iid, values=values)
 
-        tree.pack(fill="both", expand=True, padx=10, pady=10)
+        if stale:
+            tree.delete(*stale)
 
     def create_timeline_tab(self):
         """Создание вкладки с временными рядами"""
-        # График динамики
-        fig = Figure(figsize=(9, 6))
+        self.timeline_figure = Figure(figsize=(9, 6))
+        self.timeline_canvas = FigureCanvasTkAgg(self.timeline_figure, self.timeline_tab)
+        self.timeline_canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
+
+    def show_timeline(self, timeline_data):
+        """График динамики доходов, расходов и баланса по месяцам"""
+        fig = self.timeline_figure
+        fig.clear()
         ax = fig.add_subplot(111)
-
-        # Подготовка данных
-        timeline_data = self.prepare_timeline_data()
+        symbol = self.analytics.currency_symbol
 
         if timeline_data:
             dates = list(timeline_data.keys())
@@ -118,11 +239,11 @@ class AnalyticsWindow(BaseWindow):
             # Линия баланса
             ax2 = ax.twinx()
             ax2.plot(x, balance, 'b-', linewidth=2, marker='o', label='Баланс')
-            ax2.set_ylabel('Баланс (₽)', color='blue')
+            ax2.set_ylabel(f'Баланс ({symbol})', color='blue')
             ax2.tick_params(axis='y', labelcolor='blue')
 
             ax.set_xlabel('Период')
-            ax.set_ylabel('Сумма (₽)')
+            ax.set_ylabel(f'Сумма ({symbol})')
             ax.set_title('Динамика доходов, расходов и баланса')
             ax.set_xticks([i + width / 2 for i in x])
             ax.set_xticklabels(dates, rotation=45, ha='right')
@@ -131,81 +252,201 @@ class AnalyticsWindow(BaseWindow):
 
             fig.tight_layout()
 
-        canvas = FigureCanvasTkAgg(fig, self.timeline_tab)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
-
-    def calculate_statistics(self) -> Dict:
-        """Расчет статистики"""
-        if not self.transactions:
-            return {}
-
-        # Фильтрация по датам
-        dates = [datetime.strptime(t.date, "%Y-%m-%d %H:%M:%S") for t in self.transactions]
-        start_date = min(dates).strftime("%Y-%m-%d")
-        end_date = max(dates).strftime("%Y-%m-%d")
-
-        income_transactions = [t for t in self.transactions if t.type == TransactionType.INCOME.value]
-        expense_transactions = [t for t in self.transactions if t.type == TransactionType.EXPENSE.value]
-
-        total_income = sum(t.amount for t in income_transactions)
-        total_expense = sum(t.amount for t in expense_transactions)
-
-        return {
-            'total_transactions': len(self.transactions),
-            'income_count': len(income_transactions),
-            'expense_count': len(expense_transactions),
-            'total_income': total_income,
-            'total_expense': total_expense,
-            'net_balance': total_income - total_expense,
-            'avg_income': total_income / len(income_transactions) if income_transactions else 0,
-            'avg_expense': total_expense / len(expense_transactions) if expense_transactions else 0,
-            'avg_transaction': (total_income + total_expense) / len(self.transactions) if self.transactions else 0,
-            'start_date': start_date,
-            'end_date': end_date,
-            'days_count': (max(dates) - min(dates)).days + 1
-        }
-
-    def analyze_categories(self) -> Dict:
-        """Анализ данных по категориям"""
-        categories = {}
-
-        for transaction in self.transactions:
-            cat = transaction.category
-            if cat not in categories:
-                categories[cat] = {
-                    'type': 'Доход' if transaction.type == TransactionType.INCOME.value else 'Расход',
-                    'amount': 0,
-                    'count': 0
-                }
-
-            categories[cat]['amount'] += transaction.amount
-            categories[cat]['count'] += 1
-
-        # Расчет долей
-        for cat in categories:
-            total = sum(categories[c]['amount'] for c in categories
-                        if categories[c]['type'] == categories[cat]['type'])
-            categories[cat]['percentage'] = (categories[cat]['amount'] / total * 100) if total > 0 else 0
-
-        return categories
-
-    def prepare_timeline_data(self) -> Dict:
-        """Подготовка данных для временного ряда"""
-        timeline = {}
-
-        for transaction in self.transactions:
-            date = datetime.strptime(transaction.date, "%Y-%m-%d %H:%M:%S")
-            month_key = date.strftime("%Y-%m")
-
-            if month_key not in timeline:
-                timeline[month_key] = {'income': 0, 'expense': 0, 'balance': 0}
-
-            if transaction.type == TransactionType.INCOME.value:
-                timeline[month_key]['income'] += transaction.amount
-                timeline[month_key]['balance'] += transaction.amount
+        self.timeline_canvas.draw_idle()
+
+    def create_pivot_tab(self):
+        """Создание вкладки со сводной таблицей категория x период"""
+        controls = ctk.CTkFrame(self.pivot_tab)
+        controls.pack(fill="x", padx=10, pady=(10, 0))
+
+        self.pivot_granularity = ctk.CTkComboBox(controls, values=list(PIVOT_GRANULARITIES),
+                                                 command=lambda _: self.update_pivot_tab(), width=110)
+        self.pivot_granularity.set("Месяц")
+        self.pivot_granularity.pack(side="left", padx=5, pady=5)
+
+        self.pivot_type = ctk.CTkComboBox(controls, values=list(PIVOT_TYPES),
+                                          command=lambda _: self.update_pivot_tab(), width=110)
+        self.pivot_type.set("Расходы")
+        self.pivot_type.pack(side="left", padx=5, pady=5)
+
+        ctk.CTkButton(controls, text="📄 CSV", width=80,
+                      command=lambda: self.export_pivot("csv")).pack(side="right", padx=5, pady=5)
+        ctk.CTkButton(controls, text="📊 Excel", width=80,
+                      command=lambda: self.export_pivot("excel")).pack(side="right", padx=5, pady=5)
+
+        self.pivot_total_label = ctk.CTkLabel(controls, text="")
+        self.pivot_total_label.pack(side="left", padx=15)
+
+        self.pivot_figure = Figure(figsize=(9, 6))
+        self.pivot_canvas = FigureCanvasTkAgg(self.pivot_figure, self.pivot_tab)
+        self.pivot_canvas.get_tk_widget().pack(fill="both", expand=True, padx=10, pady=10)
+
+    def _current_pivot(self):
+        return self.analytics.pivot(PIVOT_GRANULARITIES[self.pivot_granularity.get()],
+                                    PIVOT_TYPES[self.pivot_type.get()])
+
+    def update_pivot_tab(self, pivot=None):
+        """Перерисовка тепловой карты сводной таблицы (pivot - уже посчитанная)"""
+        table = (self._current_pivot() if pivot is None else pivot).top(PIVOT_MAX_ROWS)
+        symbol = self.analytics.currency_symbol
+        fig = self.pivot_figure
+        fig.clear()
+        ax = fig.add_subplot(111)
+
+        if len(table.categories) and len(table.periods):
+            values = table.values / 100
+            limit = np.abs(values).max() or 1
+            cmap = 'RdYlGn' if self.pivot_type.get() == "Баланс" else 'YlOrRd'
+            vmin = -limit if self.pivot_type.get() == "Баланс" else 0
+            image = ax.imshow(values, aspect='auto', interpolation='nearest', cmap=cmap, vmin=vmin, vmax=limit)
+            fig.colorbar(image, ax=ax, label=symbol)
+
+            labels = table.labels
+            step = max(1, len(labels) // 24)
+            ax.set_xticks(range(0, len(labels), step))
+            ax.set_xticklabels(labels[::step], rotation=45, ha='right', fontsize=8)
+            row_step = max(1, len(table.categories) // 40)
+            ax.set_yticks(range(0, len(table.categories), row_step))
+            ax.set_yticklabels(table.categories[::row_step], fontsize=8)
+            ax.set_title(f"{self.pivot_type.get()} по категориям и периодам")
+        else:
+            ax.text(0.5, 0.5, 'Нет данных', ha='center', va='center', transform=ax.transAxes)
+            ax.set_axis_off()
+
+        self.pivot_total_label.configure(text=f"Итого: {table.total / 100:,.2f} {symbol}")
+        fig.tight_layout()
+        self.pivot_canvas.draw_idle()
+
+    def export_pivot(self, export_format: str):
+        """Экспорт сводной таблицы в CSV или Excel"""
+        extension = ".csv" if export_format == "csv" else ".xlsx"
+        filename = filedialog.asksaveasfilename(
+            parent=self, defaultextension=extension,
+            filetypes=[("CSV", "*.csv")] if export_format == "csv" else [("Excel", "*.xlsx")],
+            initialfile=f"pivot_{PIVOT_GRANULARITIES[self.pivot_granularity.get()]}{extension}")
+        if not filename:
+            return
+
+        rows = self._current_pivot().to_rows()
+        try:
+            if export_format == "csv":
+                with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
+                    csv.writer(f).writerows(rows)
             else:
-                timeline[month_key]['expense'] += transaction.amount
-                timeline[month_key]['balance'] -= transaction.amount
+                pd.DataFrame(rows[1:], columns=rows[0]).to_excel(filename, sheet_name='Сводная', index=False)
+            showinfo("Успех", f"Сводная таблица сохранена:\n{filename}")
+        except Exception as e:
+            showerror("Ошибка", f"Не удалось сохранить сводную таблицу: {e}")
+
+    def create_comparison_tab(self):
+        """Создание вкладки сравнения периодов"""
+        controls = ctk.CTkFrame(self.comparison_tab)
+        controls.pack(fill="x", padx=10, pady=(10, 0))
+
+        self.comparison_mode = ctk.CTkComboBox(controls, values=list(COMPARISON_MODES), width=260,
+                                               command=lambda _: self.update_comparison_tab())
+        self.comparison_mode.set(next(iter(COMPARISON_MODES)))
+        self.comparison_mode.pack(side="left", padx=5, pady=5)
+
+        self.comparison_label = ctk.CTkLabel(controls, text="", justify="left", anchor="w")
+        self.comparison_label.pack(side="left", fill="x", expand=True, padx=15)
+
+        columns = ("Категория", "Тип", "Сейчас", "Было", "Изменение", "%")
+        self.comparison_tree = Treeview(self.comparison_tab, columns=columns, show="headings", height=15)
+        for col in columns:
+            self.comparison_tree.heading(col, text=col)
+            self.comparison_tree.column(col, width=180 if col == "Категория" else 110)
+        self.comparison_tree.tag_configure('worse', foreground='#DC2626')
+        self.comparison_tree.tag_configure('better', foreground='#059669')
+        self.comparison_tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+    @staticmethod
+    def _format_change(change) -> str:
+        percent = change['percent']
+        arrow = "▲" if change['delta_minor'] > 0 else "▼" if change['delta_minor'] < 0 else "►"
+        suffix = f" ({percent:+.1f}%)" if percent is not None else ""
+        return f"{change['current']:,.2f} {arrow} {change['delta']:+,.2f}{suffix}"
+
+    def update_comparison_tab(self, result=None):
+        """Заполнение таблицы изменений по категориям (result - уже посчитанное сравнение)"""
+        if result is None:
+            result = getattr(self.analytics, COMPARISON_MODES[self.comparison_mode.get()])()
+        symbol = self.analytics.currency_symbol
+        current, previous = result['current_period'], result['previous_period']
+
+        def period_text(period):
+            return period[0] if period[0] == period[1] else f"{period[0]} — {period[1]}"
+
+        self.comparison_label.configure(text=(
+            f"{period_text(current)} против {period_text(previous)} ({symbol})\n"
+            f"Доходы: {self._format_change(result['income'])}   "
+            f"Расходы: {self._format_change(result['expense'])}   "
+            f"Поток: {self._format_change(result['net'])}"
+        ))
+
+        tree = self.comparison_tree
+        tree.delete(*tree.get_children())
+        for row in result['categories']:
+            is_income = row['type'] == 'income'
+            # Рост расходов и падение доходов - хуже
+            worse = (row['delta_minor'] > 0) != is_income
+            tree.insert("", "end", tags=('worse' if worse else 'better',), values=(
+                row['category'],
+                'Доход' if is_income else 'Расход',
+                f"{row['current']:,.2f}",
+                f"{row['previous']:,.2f}",
+                f"{row['delta']:+,.2f}",
+                f"{row['percent']:+.1f}%" if row['percent'] is not None else "новая",
+            ))
+
+    def create_tags_tab(self):
+        """Создание вкладки итогов по запросу тегов"""
+        controls = ctk.CTkFrame(self.tags_tab)
+        controls.pack(fill="x", padx=10, pady=(10, 0))
 
-        return dict(sorted(timeline.items()))
+        self.tag_query_entry = ctk.CTkEntry(controls, width=320,
+                                            placeholder_text="отпуск AND (такси OR отель) NOT возмещено")
+        self.tag_query_entry.pack(side="left", padx=5, pady=5)
+        self.tag_query_entry.bind("<Return>", lambda _: self.update_tags_tab())
+        ctk.CTkButton(controls, text="Показать", width=100,
+                      command=self.update_tags_tab).pack(side="left", padx=5)
+
+        self.tags_label = ctk.CTkLabel(controls, text="", justify="left", anchor="w")
+        self.tags_label.pack(side="left", fill="x", expand=True, padx=15)
+
+        columns = ("Категория", "Тип", "Сумма", "Операций", "Доля")
+        self.tags_tree = Treeview(self.tags_tab, columns=columns, show="headings", height=15)
+        for col in columns:
+            self.tags_tree.heading(col, text=col)
+            self.tags_tree.column(col, width=200 if col == "Категория" else 110)
+        self.tags_tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+    def update_tags_tab(self):
+        """Итоги и категории операций под запросом тегов"""
+        try:
+            summary = self.analytics.filtered_summary(self.tag_query_entry.get().strip() or None)
+        except ValueError as e:
+            showerror("Ошибка", str(e), parent=self)
+            return
+        self.show_tags(summary)
+
+    def show_tags(self, summary):
+        """Отображение итогов запроса тегов"""
+        symbol = self.analytics.currency_symbol
+        self.tags_label.configure(text=(
+            f"Операций: {summary['count']}   "
+            f"Доходы: {summary['income']:,.2f} {symbol}   "
+            f"Расходы: {summary['expense']:,.2f} {symbol}   "
+            f"Поток: {summary['net']:+,.2f} {symbol}"
+        ))
+
+        tree = self.tags_tree
+        tree.delete(*tree.get_children())
+        for row in summary['categories']:
+            tree.insert("", "end", values=(
+                row['category'],
+                'Доход' if row['type'] == 'income' else 'Расход',
+                f"{row['amount']:,.2f}",
+                row['count'],
+                f"{row['share']:.1f}%",
+            ))
@@ -10,10 +10,11 @@ from ..models import Budget
 class BudgetsWindow(BaseWindow):
     """Окно управления бюджетами"""
 
-    def __init__(self, parent, budgets: List[Budget], on_update_budgets=None):
+    def __init__(self, parent, budgets: List[Budget], on_update_budgets=None, spent_of=None):
         super().__init__(parent, "Управление бюджетами", 600, 500)
         self.budgets = budgets
         self.on_update_budgets = on_update_budgets
+        self.spent_of = spent_of  # траты по бюджету за текущий период
         self.setup_budgets_ui()
 
     def setup_budgets_ui(self):
@@ -63,8 +64,7 @@ class BudgetsWindow(BaseWindow):
             self.tree.delete(item)
 
         for budget in self.budgets:
-            # В реальном приложении здесь был бы расчет использованных средств
-            used = 0  # Заглушка
+            used = self.spent_of(budget) if self.spent_of else budget.spent
             remaining = budget.limit - used
 
             self.tree.insert("", "end", values=(
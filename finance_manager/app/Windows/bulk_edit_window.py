@@ -0,0 +1,110 @@
+from tkinter.messagebox import showwarning
+import customtkinter as ctk
+
+from .base_window import BaseWindow
+from ..currency import CURRENCY_SYMBOLS
+from ..models import TransactionType
+from ..tags import parse_tags
+
+KEEP = "— не менять —"
+TYPE_LABELS = {"Расход": TransactionType.EXPENSE.value, "Доход": TransactionType.INCOME.value}
+
+
+class BulkEditWindow(BaseWindow):
+    """Окно массового изменения выбранных операций
+
+    Применяются только поля, отличные от «не менять».
+    """
+
+    def __init__(self, parent, controller, transaction_ids, on_apply=None):
+        super().__init__(parent, f"Массовое изменение ({len(transaction_ids)})", 420, 420)
+        self.controller = controller
+        self.transaction_ids = list(transaction_ids)
+        self.on_apply = on_apply
+        self.setup_bulk_ui()
+
+    def setup_bulk_ui(self):
+        """Настройка интерфейса"""
+        ctk.CTkLabel(
+            self.main_frame,
+            text=f"Выбрано операций: {len(self.transaction_ids)}",
+            font=("Arial", 14, "bold")
+        ).grid(row=0, column=0, columnspan=2, padx=10, pady=(10, 15), sticky="w")
+
+        ctk.CTkLabel(self.main_frame, text="Тип:").grid(row=1, column=0, padx=10, pady=5, sticky="w")
+        self.type_combo = ctk.CTkComboBox(self.main_frame, values=[KEEP, *TYPE_LABELS], width=220,
+                                          command=self._on_type_change)
+        self.type_combo.set(KEEP)
+        self.type_combo.grid(row=1, column=1, padx=10, pady=5)
+
+        ctk.CTkLabel(self.main_frame, text="Категория:").grid(row=2, column=0, padx=10, pady=5, sticky="w")
+        self.category_combo = ctk.CTkComboBox(self.main_frame, values=[KEEP, *self.controller.get_categories()],
+                                              width=220)
+        self.category_combo.set(KEEP)
+        self.category_combo.grid(row=2, column=1, padx=10, pady=5)
+
+        ctk.CTkLabel(self.main_frame, text="Валюта:").grid(row=3, column=0, padx=10, pady=5, sticky="w")
+        self.currency_combo = ctk.CTkComboBox(self.main_frame, values=[KEEP, *CURRENCY_SYMBOLS], width=220)
+        self.currency_combo.set(KEEP)
+        self.currency_combo.grid(row=3, column=1, padx=10, pady=5)
+
+        ctk.CTkLabel(self.main_frame, text="Описание:").grid(row=4, column=0, padx=10, pady=5, sticky="w")
+        self.description_entry = ctk.CTkEntry(self.main_frame, width=220, placeholder_text="не менять")
+        self.description_entry.grid(row=4, column=1, padx=10, pady=5)
+
+        ctk.CTkLabel(self.main_frame, text="Добавить теги:").grid(row=5, column=0, padx=10, pady=5, sticky="w")
+        self.add_tags_entry = ctk.CTkEntry(self.main_frame, width=220, placeholder_text="через запятую")
+        self.add_tags_entry.grid(row=5, column=1, padx=10, pady=5)
+
+        ctk.CTkLabel(self.main_frame, text="Снять теги:").grid(row=6, column=0, padx=10, pady=5, sticky="w")
+        self.remove_tags_entry = ctk.CTkEntry(self.main_frame, width=220, placeholder_text="через запятую")
+        self.remove_tags_entry.grid(row=6, column=1, padx=10, pady=5)
+
+        btn_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+        btn_frame.grid(row=7, column=0, columnspan=2, pady=20)
+        ctk.CTkButton(btn_frame, text="Применить", command=self.apply, width=120).pack(side="left", padx=5)
+        ctk.CTkButton(btn_frame, text="Отмена", command=self.destroy, width=120,
+                      fg_color="gray").pack(side="left", padx=5)
+
+    def _on_type_change(self, label: str):
+        """Список категорий выбранного типа"""
+        if label in TYPE_LABELS:
+            categories = self.controller.get_categories_by_type(TYPE_LABELS[label])
+        else:
+            categories = self.controller.get_categories()
+        self.category_combo.configure(values=[KEEP, *categories])
+        if self.category_combo.get() not in categories:
+            self.category_combo.set(KEEP)
+
+    def get_changes(self) -> dict:
+        """Измененные поля"""
+        changes = {}
+        if self.type_combo.get() in TYPE_LABELS:
+            changes['type'] = TYPE_LABELS[self.type_combo.get()]
+        if self.category_combo.get() not in (KEEP, ""):
+            changes['category'] = self.category_combo.get()
+        if self.currency_combo.get() in CURRENCY_SYMBOLS:
+            changes['currency'] = self.currency_combo.get()
+        description = self.description_entry.get().strip()
+        if description:
+            changes['description'] = description
+        add_tags = parse_tags(self.add_tags_entry.get())
+        if add_tags:
+            changes['add_tags'] = add_tags
+        remove_tags = parse_tags(self.remove_tags_entry.get())
+        if remove_tags:
+            changes['remove_tags'] = remove_tags
+        return changes
+
+    def apply(self):
+        """Применение изменений"""
+        changes = self.get_changes()
+        if not changes:
+            showwarning("Внимание", "Не выбрано ни одного изменения", parent=self)
+            return
+        if 'type' in changes and 'category' not in changes:
+            showwarning("Внимание", "При смене типа выберите категорию", parent=self)
+            return
+        if self.on_apply:
+            self.on_apply(self.transaction_ids, changes)
+        self.destroy()
@@ -2,20 +2,25 @@
 Окно управления категориями
 """
 import customtkinter as ctk
+from dataclasses import replace
 from tkinter import messagebox
 from typing import List
 
 from ..Windows.base_window import BaseWindow
+from ..category_tree import CategoryTree
 from ..models import Category, CategoryType
 
+NO_PARENT = "— нет —"
+
 
 class CategoriesWindow(BaseWindow):
     """Окно управления категориями с разделением на доходы и расходы"""
 
-    def __init__(self, parent, categories: List[Category], on_update_categories=None):
-        super().__init__(parent, "Управление категориями", 600, 500)
+    def __init__(self, parent, categories: List[Category], on_update_categories=None, on_rename_category=None):
+        super().__init__(parent, "Управление категориями", 600, 600)
         self.categories = categories.copy() if categories else []
         self.on_update_categories = on_update_categories
+        self.on_rename_category = on_rename_category
         self.setup_categories_ui()
 
     def setup_categories_ui(self):
@@ -35,6 +40,10 @@ class CategoriesWindow(BaseWindow):
         # Форма добавления новой категории
         self.setup_add_category_form()
 
+        # Переименование и объединение (вместе с операциями)
+        if self.on_rename_category:
+            self.setup_rename_form()
+
         # Кнопки управления
         self.setup_buttons()
 
@@ -112,6 +121,59 @@ class CategoriesWindow(BaseWindow):
         )
         color_combo.grid(row=2, column=1, padx=5, pady=5)
 
+        # Родительская категория того же типа
+        ctk.CTkLabel(form_frame, text="Входит в:").grid(row=2, column=2, padx=5, pady=5, sticky="w")
+        self.parent_combo = ctk.CTkComboBox(form_frame, values=[NO_PARENT, *self._category_names()], width=150)
+        self.parent_combo.set(NO_PARENT)
+        self.parent_combo.grid(row=2, column=3, padx=5, pady=5)
+
+    def setup_rename_form(self):
+        """Форма переименования категории"""
+        form_frame = ctk.CTkFrame(self.main_frame)
+        form_frame.pack(fill="x", padx=10, pady=(0, 10))
+
+        ctk.CTkLabel(
+            form_frame,
+            text="Переименовать или объединить (существующее имя):",
+            font=("Arial", 12, "bold")
+        ).grid(row=0, column=0, columnspan=4, pady=(5, 10), sticky="w")
+
+        self.rename_source_combo = ctk.CTkComboBox(form_frame, values=self._category_names(), width=180)
+        self.rename_source_combo.grid(row=1, column=0, padx=5, pady=5)
+        ctk.CTkLabel(form_frame, text="→").grid(row=1, column=1, padx=5, pady=5)
+        self.rename_target_entry = ctk.CTkEntry(form_frame, width=180, placeholder_text="Новое название")
+        self.rename_target_entry.grid(row=1, column=2, padx=5, pady=5)
+        ctk.CTkButton(form_frame, text="✏️ Применить", command=self.rename_category,
+                      width=110).grid(row=1, column=3, padx=5, pady=5)
+
+    def _category_names(self) -> List[str]:
+        return sorted(c.name for c in self.categories)
+
+    def rename_category(self):
+        """Переименование/объединение с переносом операций, бюджетов и правил"""
+        source = self.rename_source_combo.get().strip()
+        target = self.rename_target_entry.get().strip()
+        if not source or not target or source == target:
+            messagebox.showerror("Ошибка", "Выберите категорию и введите новое название", parent=self)
+            return
+
+        existing = next((c.name for c in self.categories if c.name.lower() == target.lower()), None)
+        question = (f"Объединить '{source}' с '{existing}'? Операции, бюджеты и правила будут перенесены."
+                    if existing else f"Переименовать '{source}' в '{target}' вместе с операциями?")
+        if not messagebox.askyesno("Подтверждение", question, parent=self):
+            return
+
+        categories = self.on_rename_category(source, existing or target)
+        if categories is not None:
+            # Несохраненные добавленные категории остаются в списке
+            saved = {c.name for c in categories}
+            pending = [c for c in self.categories if c.name not in saved and c.name != source]
+            self.categories = list(categories) + pending
+            self.update_categories_list()
+            self.rename_source_combo.configure(values=self._category_names())
+            self.rename_source_combo.set(existing or target)
+            self.rename_target_entry.delete(0, "end")
+
     def setup_buttons(self):
         """Настройка кнопок управления"""
         button_frame = ctk.CTkFrame(self.main_frame)
@@ -149,15 +211,32 @@ class CategoriesWindow(BaseWindow):
             width=100
         ).pack(side="left", padx=5)
 
+    def _tree_lines(self, category_type: CategoryType) -> List[str]:
+        """Строки дерева категорий типа: подкатегории с отступом под родителем"""
+        categories = [cat for cat in self.categories if cat.type == category_type]
+        by_name = {cat.name: cat for cat in categories}
+        tree = CategoryTree(categories)
+        lines = []
+
+        def walk(name, depth):
+            category = by_name[name]
+            color_display = f" ({category.color})" if category.color else ""
+            marker = "•" if depth == 0 else "◦"
+            lines.append(f"{'    ' * depth}{marker} {category.name}{color_display}\n")
+            for child in sorted(tree.children(name)):
+                walk(child, depth + 1)
+
+        for root in sorted(tree.children()):
+            walk(root, 0)
+        return lines
+
     def update_income_list(self):
         """Обновление списка категорий доходов"""
         self.income_listbox.configure(state="normal")
         self.income_listbox.delete("1.0", "end")
 
-        income_categories = [cat for cat in self.categories if cat.type == CategoryType.INCOME]
-        for category in sorted(income_categories, key=lambda x: x.name):
-            color_display = f" ({category.color})" if category.color else ""
-            self.income_listbox.insert("end", f"• {category.name}{color_display}\n")
+        for line in self._tree_lines(CategoryType.INCOME):
+            self.income_listbox.insert("end", line)
 
         self.income_listbox.configure(state="disabled")
 
@@ -166,10 +245,8 @@ class CategoriesWindow(BaseWindow):
         self.expense_listbox.configure(state="normal")
         self.expense_listbox.delete("1.0", "end")
 
-        expense_categories = [cat for cat in self.categories if cat.type == CategoryType.EXPENSE]
-        for category in sorted(expense_categories, key=lambda x: x.name):
-            color_display = f" ({category.color})" if category.color else ""
-            self.expense_listbox.insert("end", f"• {category.name}{color_display}\n")
+        for line in self._tree_lines(CategoryType.EXPENSE):
+            self.expense_listbox.insert("end", line)
 
         self.expense_listbox.configure(state="disabled")
 
@@ -194,15 +271,25 @@ class CategoriesWindow(BaseWindow):
         # Определяем тип
         category_type = CategoryType.INCOME if self.category_type_var.get() == "Доход" else CategoryType.EXPENSE
 
+        # Родитель должен быть того же типа
+        parent = self.parent_combo.get()
+        if parent == NO_PARENT:
+            parent = ""
+        elif not any(c.name == parent and c.type == category_type for c in self.categories):
+            messagebox.showerror("Ошибка", f"Категория '{parent}' другого типа или не существует")
+            return
+
         # Создаем новую категорию
         new_category = Category(
             name=name,
             type=category_type,
-            color=self.color_var.get()
+            color=self.color_var.get(),
+            parent=parent
         )
 
         self.categories.append(new_category)
         self.update_categories_list()
+        self.parent_combo.configure(values=[NO_PARENT, *self._category_names()])
         self.new_category_entry.delete(0, "end")
 
         messagebox.showinfo("Успех", f"Категория '{name}' добавлена")
@@ -223,15 +310,20 @@ class CategoriesWindow(BaseWindow):
             if income_cats:
                 category_to_delete = income_cats[-1]
                 if messagebox.askyesno("Подтверждение", f"Удалить категорию '{category_to_delete.name}'?"):
-                    self.categories.remove(category_to_delete)
-                    self.update_categories_list()
+                    self._remove_category(category_to_delete)
         else:
             expense_cats = [cat for cat in self.categories if cat.type == CategoryType.EXPENSE]
             if expense_cats:
                 category_to_delete = expense_cats[-1]
                 if messagebox.askyesno("Подтверждение", f"Удалить категорию '{category_to_delete.name}'?"):
-                    self.categories.remove(category_to_delete)
-                    self.update_categories_list()
+                    self._remove_category(category_to_delete)
+
+    def _remove_category(self, category: Category):
+        """Удаление из списка; подкатегории переходят к ее родителю"""
+        self.categories.remove(category)
+        self.categories = [replace(c, parent=category.parent) if c.parent == category.name else c
+                           for c in self.categories]
+        self.update_categories_list()
 
     def save_categories(self):
         """Сохранение категорий"""
@@ -0,0 +1,126 @@
+"""
+Окно диагностики производительности
+"""
+import customtkinter as ctk
+from tkinter import filedialog, messagebox
+from tkinter.ttk import Treeview
+from datetime import datetime
+
+from .base_window import BaseWindow
+from ..profiling import metrics
+
+
+class DiagnosticsWindow(BaseWindow):
+    """Окно с метриками времени, счетчиками и профилированием"""
+
+    def __init__(self, parent):
+        super().__init__(parent, "Диагностика", 900, 600)
+        self.setup_diagnostics_ui()
+        self.update_metrics()
+
+    def setup_diagnostics_ui(self):
+        """Настройка интерфейса диагностики"""
+        self.tabview = ctk.CTkTabview(self.main_frame)
+        self.tabview.pack(fill="both", expand=True, padx=10, pady=(10, 5))
+
+        self.timings_tab = self.tabview.add("Время")
+        self.counters_tab = self.tabview.add("Счетчики")
+        self.profile_tab = self.tabview.add("Профиль")
+
+        # Таблица времени
+        columns = ("Операция", "Вызовов", "Среднее, мс", "p95, мс", "Макс, мс", "Всего, мс")
+        self.timings_tree = Treeview(self.timings_tab, columns=columns, show="headings", height=15)
+        for col in columns:
+            self.timings_tree.heading(col, text=col)
+            self.timings_tree.column(col, width=90 if col != "Операция" else 300)
+        self.timings_tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        # Счетчики
+        self.counters_text = ctk.CTkTextbox(self.counters_tab, font=("Courier", 12))
+        self.counters_text.pack(fill="both", expand=True, padx=10, pady=10)
+
+        # Профиль
+        self.profile_text = ctk.CTkTextbox(self.profile_tab, font=("Courier", 11))
+        self.profile_text.pack(fill="both", expand=True, padx=10, pady=10)
+
+        # Кнопки
+        button_frame = ctk.CTkFrame(self.main_frame)
+        button_frame.pack(pady=(0, 10))
+
+        ctk.CTkButton(button_frame, text="🔄 Обновить",
+                      command=self.update_metrics, width=110).pack(side="left", padx=5)
+        ctk.CTkButton(button_frame, text="🧹 Сбросить",
+                      command=self.reset_metrics, width=110).pack(side="left", padx=5)
+        ctk.CTkButton(button_frame, text="💾 Сохранить JSON",
+                      command=self.dump_metrics, width=140).pack(side="left", padx=5)
+
+        self.profile_btn = ctk.CTkButton(button_frame, text="",
+                                         command=self.toggle_profiling, width=180)
+        self.profile_btn.pack(side="left", padx=5)
+        self._update_profile_button()
+
+        ctk.CTkButton(button_frame, text="❌ Закрыть",
+                      command=self.destroy, width=100).pack(side="left", padx=5)
+
+    def update_metrics(self):
+        """Обновление отображаемых метрик"""
+        snapshot = metrics.snapshot()
+
+        for item in self.timings_tree.get_children():
+            self.timings_tree.delete(item)
+
+        timings = sorted(snapshot['timings'].items(), key=lambda x: x[1]['total_ms'], reverse=True)
+        for name, stats in timings:
+            self.timings_tree.insert("", "end", values=(
+                name,
+                stats['count'],
+                f"{stats['mean_ms']:.2f}",
+                f"{stats['p95_ms']:.2f}",
+                f"{stats['max_ms']:.2f}",
+                f"{stats['total_ms']:.1f}"
+            ))
+
+        self.counters_text.configure(state="normal")
+        self.counters_text.delete("1.0", "end")
+        for name, value in sorted(snapshot['counters'].items()):
+            self.counters_text.insert("end", f"{name:<40} {value}\n")
+        self.counters_text.configure(state="disabled")
+
+    def reset_metrics(self):
+        """Сброс метрик"""
+        metrics.reset()
+        self.update_metrics()
+
+    def dump_metrics(self):
+        """Сохранение метрик в JSON"""
+        filename = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=".json",
+            initialfile=f"metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            filetypes=[("JSON", "*.json")]
+        )
+        if not filename:
+            return
+
+        try:
+            metrics.dump_json(filename)
+            messagebox.showinfo("Успех", f"Метрики сохранены:\n{filename}", parent=self)
+        except IOError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить метрики: {e}", parent=self)
+
+    def toggle_profiling(self):
+        """Включение/выключение cProfile"""
+        if metrics.is_profiling:
+            report = metrics.stop_profiling()
+            self.profile_text.delete("1.0", "end")
+            self.profile_text.insert("1.0", report)
+            self.tabview.set("Профиль")
+        else:
+            metrics.start_profiling()
+        self._update_profile_button()
+
+    def _update_profile_button(self):
+        if metrics.is_profiling:
+            self.profile_btn.configure(text="⏹️ Остановить профиль", fg_color="#DC2626")
+        else:
+            self.profile_btn.configure(text="⏺️ Запустить профиль", fg_color="#059669")
@@ -9,6 +9,9 @@ from typing import List
 
 from .base_window import BaseWindow
 from ..models import Transaction
+from ..currency import currency_symbol
+from ..money import format_minor
+from ..utils import category_summary, format_splits
 
 
 class ExportWindow(BaseWindow):
@@ -207,8 +210,10 @@ class ExportWindow(BaseWindow):
                     'Тип': 'Доход' if t.type == 'income' else 'Расход',
                     'Категория': t.category,
                     'Сумма': t.amount,
-                    'Валюта': 'RUB',
-                    'Описание': t.description
+                    'Валюта': t.currency,
+                    'Описание': t.description,
+                    'Теги': ", ".join(t.tags),
+                    'Разбивка': format_splits(t)
                 })
 
             filename = os.path.join(folder, f"transactions_{timestamp}.xlsx")
@@ -220,7 +225,7 @@ class ExportWindow(BaseWindow):
 
                 # Лист сводки
                 if self.include_summary_var.get():
-                    summary = df.groupby(['Тип', 'Категория'])['Сумма'].sum().reset_index()
+                    summary = category_summary(self.transactions, by_currency=False)
                     summary.to_excel(writer, sheet_name='Сводка', index=False)
 
                 # Лист бюджетов (если есть)
@@ -262,7 +267,7 @@ class ExportWindow(BaseWindow):
             filename = os.path.join(folder, f"transactions_{timestamp}.csv")
 
             with open(filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                fieldnames = ['ID', 'Дата', 'Тип', 'Категория', 'Сумма', 'Описание']
+                fieldnames = ['ID', 'Дата', 'Тип', 'Категория', 'Сумма', 'Валюта', 'Описание', 'Теги', 'Разбивка']
                 writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
 
                 writer.writeheader()
@@ -273,7 +278,10 @@ class ExportWindow(BaseWindow):
                         'Тип': 'Доход' if t.type == 'income' else 'Расход',
                         'Категория': t.category,
                         'Сумма': t.amount,
-                        'Описание': t.description
+                        'Валюта': t.currency,
+                        'Описание': t.description,
+                        'Теги': ", ".join(t.tags),
+                        'Разбивка': format_splits(t)
                     })
 
             return filename
@@ -318,18 +326,25 @@ class ExportWindow(BaseWindow):
 
             # Сводка
             if self.include_summary_var.get():
-                income = sum(t.amount for t in self.transactions if t.type == 'income')
-                expense = sum(t.amount for t in self.transactions if t.type == 'expense')
-                balance = income - expense
+                # Итоги по каждой валюте отдельно, без пересчета
+                totals = {}
+                for t in self.transactions:
+                    income, expense = totals.get(t.currency, (0, 0))
+                    if t.type == 'income':
+                        income += t.amount_minor
+                    else:
+                        expense += t.amount_minor
+                    totals[t.currency] = (income, expense)
+                currencies = sorted(totals)
 
                 summary_data = [
-                    ["Показатель", "Сумма (₽)"],
-                    ["Доходы", f"{income:,.2f}"],
-                    ["Расходы", f"{expense:,.2f}"],
-                    ["Баланс", f"{balance:,.2f}"]
+                    ["Показатель"] + [f"Сумма ({currency_symbol(c)})" for c in currencies],
+                    ["Доходы"] + [format_minor(totals[c][0], "") for c in currencies],
+                    ["Расходы"] + [format_minor(totals[c][1], "") for c in currencies],
+                    ["Баланс"] + [format_minor(totals[c][0] - totals[c][1], "") for c in currencies]
                 ]
 
-                summary_table = Table(summary_data, colWidths=[2 * inch, 2 * inch])
+                summary_table = Table(summary_data, colWidths=[2 * inch] * (len(currencies) + 1))
                 summary_table.setStyle(TableStyle([
                     ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
                     ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
@@ -356,7 +371,7 @@ class ExportWindow(BaseWindow):
                 for t in self.transactions[:50]:  # Ограничиваем количество
                     date_str = t.date[:10] if len(t.date) > 10 else t.date
                     type_str = "Доход" if t.type == 'income' else "Расход"
-                    amount_str = f"{t.amount:,.2f} ₽"
+                    amount_str = format_minor(t.amount_minor, currency_symbol(t.currency))
                     desc = t.description[:30] + "..." if len(t.description) > 30 else t.description
 
                     table_data.append([date_str, type_str, t.category, amount_str, desc])
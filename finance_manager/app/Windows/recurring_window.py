@@ -0,0 +1,162 @@
+from datetime import date, timedelta
+from typing import List
+from tkinter.ttk import Treeview
+from tkinter.messagebox import showerror, showinfo
+import customtkinter as ctk
+
+from .base_window import BaseWindow
+from ..currency import currency_symbol
+from ..models import RecurrenceFrequency, RecurringRule, TransactionType
+from ..money import format_minor, to_minor
+from ..recurring import next_occurrence, parse_day, upcoming
+
+FREQUENCY_LABELS = {
+    RecurrenceFrequency.WEEKLY.value: "неделя",
+    RecurrenceFrequency.MONTHLY.value: "месяц",
+    RecurrenceFrequency.YEARLY.value: "год",
+}
+
+
+class RecurringWindow(BaseWindow):
+    """Окно управления повторяющимися операциями"""
+
+    def __init__(self, parent, rules: List[RecurringRule], categories: List[str],
+                 currency: str, on_update_rules=None):
+        super().__init__(parent, "Повторяющиеся операции", 820, 560)
+        self.rules = list(rules)
+        self.categories = categories
+        self.currency = currency
+        self.on_update_rules = on_update_rules
+        self.setup_recurring_ui()
+
+    def setup_recurring_ui(self):
+        """Настройка интерфейса"""
+        columns = ("Описание", "Категория", "Сумма", "Период", "Начало", "Следующая")
+        self.tree = Treeview(self.main_frame, columns=columns, show="headings", height=8)
+
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=120)
+
+        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+        self.upcoming_label = ctk.CTkLabel(self.main_frame, text="", justify="left", anchor="w")
+        self.upcoming_label.pack(fill="x", padx=10)
+
+        self.update_rules_table()
+
+        # Форма добавления правила
+        form_frame = ctk.CTkFrame(self.main_frame)
+        form_frame.pack(fill="x", padx=10, pady=10)
+
+        ctk.CTkLabel(form_frame, text="Тип:").grid(row=0, column=0, padx=5, pady=5)
+        self.type_combo = ctk.CTkComboBox(form_frame, values=["Расход", "Доход"], width=100)
+        self.type_combo.grid(row=0, column=1, padx=5, pady=5)
+
+        ctk.CTkLabel(form_frame, text="Категория:").grid(row=0, column=2, padx=5, pady=5)
+        self.category_combo = ctk.CTkComboBox(form_frame, values=self.categories, width=150)
+        self.category_combo.grid(row=0, column=3, padx=5, pady=5)
+
+        ctk.CTkLabel(form_frame, text="Сумма:").grid(row=0, column=4, padx=5, pady=5)
+        self.amount_entry = ctk.CTkEntry(form_frame, width=100, placeholder_text="0.00")
+        self.amount_entry.grid(row=0, column=5, padx=5, pady=5)
+
+        ctk.CTkLabel(form_frame, text="Период:").grid(row=1, column=0, padx=5, pady=5)
+        self.frequency_combo = ctk.CTkComboBox(form_frame, values=list(FREQUENCY_LABELS.values()), width=100)
+        self.frequency_combo.set(FREQUENCY_LABELS[RecurrenceFrequency.MONTHLY.value])
+        self.frequency_combo.grid(row=1, column=1, padx=5, pady=5)
+
+        ctk.CTkLabel(form_frame, text="Начало:").grid(row=1, column=2, padx=5, pady=5)
+        self.start_entry = ctk.CTkEntry(form_frame, width=150)
+        self.start_entry.insert(0, date.today().isoformat())
+        self.start_entry.grid(row=1, column=3, padx=5, pady=5)
+
+        ctk.CTkLabel(form_frame, text="Описание:").grid(row=1, column=4, padx=5, pady=5)
+        self.description_entry = ctk.CTkEntry(form_frame, width=100)
+        self.description_entry.grid(row=1, column=5, padx=5, pady=5)
+
+        # Кнопки
+        btn_frame = ctk.CTkFrame(self.main_frame)
+        btn_frame.pack(pady=10)
+
+        ctk.CTkButton(btn_frame, text="➕ Добавить правило",
+                      command=self.add_rule).pack(side="left", padx=5)
+        ctk.CTkButton(btn_frame, text="🗑️ Удалить",
+                      command=self.delete_rule).pack(side="left", padx=5)
+        ctk.CTkButton(btn_frame, text="💾 Сохранить все",
+                      command=self.save_rules).pack(side="left", padx=5)
+
+    def update_rules_table(self):
+        """Обновление таблицы правил и ближайших вхождений"""
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+
+        today = date.today()
+        for rule in self.rules:
+            after = parse_day(rule.last_posted) if rule.last_posted else today - timedelta(days=1)
+            following = next_occurrence(rule, after)
+            self.tree.insert("", "end", iid=rule.id, values=(
+                rule.description or rule.category,
+                rule.category,
+                format_minor(rule.amount_minor, currency_symbol(rule.currency)),
+                FREQUENCY_LABELS.get(rule.frequency, rule.frequency),
+                rule.start_date,
+                following.strftime("%d.%m.%Y") if following else "—",
+            ))
+
+        # Ближайшие вхождения всех правил за 30 дней
+        soon = list(upcoming(self.rules, today, today + timedelta(days=30)))[:5]
+        lines = [f"{day:%d.%m} - {rule.description or rule.category}: "
+                 f"{format_minor(rule.amount_minor, currency_symbol(rule.currency))}"
+                 for day, rule in soon]
+        self.upcoming_label.configure(text="Ближайшие 30 дней:\n" + "\n".join(lines) if lines else "")
+
+    def add_rule(self):
+        """Добавление нового правила"""
+        try:
+            category = self.category_combo.get()
+            amount_minor = to_minor(self.amount_entry.get())
+            start = parse_day(self.start_entry.get().strip())
+
+            if not category or amount_minor <= 0:
+                raise ValueError("Заполните все поля корректно")
+
+            frequency = next(code for code, label in FREQUENCY_LABELS.items()
+                             if label == self.frequency_combo.get())
+
+            rule = RecurringRule(
+                type=(TransactionType.INCOME.value if self.type_combo.get() == "Доход"
+                      else TransactionType.EXPENSE.value),
+                category=category,
+                amount_minor=amount_minor,
+                currency=self.currency,
+                description=self.description_entry.get().strip(),
+                frequency=frequency,
+                day=start.weekday() if frequency == RecurrenceFrequency.WEEKLY.value else start.day,
+                month=start.month,
+                start_date=start.isoformat(),
+            )
+
+            self.rules.append(rule)
+            self.update_rules_table()
+
+            self.amount_entry.delete(0, "end")
+            self.description_entry.delete(0, "end")
+
+        except (ValueError, StopIteration) as e:
+            showerror("Ошибка", str(e) or "Заполните все поля корректно")
+
+    def delete_rule(self):
+        """Удаление выбранного правила"""
+        selection = self.tree.selection()
+        if not selection:
+            return
+        self.rules = [r for r in self.rules if r.id not in selection]
+        self.update_rules_table()
+
+    def save_rules(self):
+        """Сохранение правил"""
+        if self.on_update_rules:
+            self.on_update_rules(self.rules)
+        showinfo("Успех", "Повторяющиеся операции сохранены!")
+        self.destroy()
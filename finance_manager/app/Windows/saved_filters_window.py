@@ -0,0 +1,210 @@
+from datetime import date
+from tkinter.ttk import Treeview
+from tkinter.messagebox import askyesno, showerror
+import customtkinter as ctk
+
+from .base_window import BaseWindow
+from ..currency import currency_symbol
+from ..models import SavedFilter, TransactionType
+from ..money import from_minor, to_minor
+from ..saved_filters import PERIOD_LABELS, describe_filter
+
+TYPE_LABELS = {"Все": "", "Расход": TransactionType.EXPENSE.value, "Доход": TransactionType.INCOME.value}
+CUSTOM_PERIOD = "Свои даты"
+
+
+class SavedFiltersWindow(BaseWindow):
+    """Окно сохраненных фильтров
+
+    Выбор строки загружает фильтр в форму для изменения; «Новый» очищает
+    форму.
+    """
+
+    def __init__(self, parent, controller, on_change=None):
+        super().__init__(parent, "Сохраненные фильтры", 860, 560)
+        self.controller = controller
+        self.on_change = on_change
+        self.editing_id = None
+        self.setup_filters_ui()
+
+    def setup_filters_ui(self):
+        """Настройка интерфейса"""
+        columns = ("Название", "Условия", "Операций", "Итог")
+        self.tree = Treeview(self.main_frame, columns=columns, show="headings", height=8,
+                             selectmode="browse")
+        widths = {"Название": 140, "Условия": 420, "Операций": 80, "Итог": 120}
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=widths[col])
+        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+
+        # Форма фильтра
+        form_frame = ctk.CTkFrame(self.main_frame)
+        form_frame.pack(fill="x", padx=10, pady=10)
+
+        ctk.CTkLabel(form_frame, text="Название:").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.name_entry = ctk.CTkEntry(form_frame, width=150)
+        self.name_entry.grid(row=0, column=1, padx=5, pady=5)
+
+        ctk.CTkLabel(form_frame, text="Тип:").grid(row=0, column=2, padx=5, pady=5, sticky="w")
+        self.type_combo = ctk.CTkComboBox(form_frame, values=list(TYPE_LABELS), width=100)
+        self.type_combo.grid(row=0, column=3, padx=5, pady=5)
+
+        ctk.CTkLabel(form_frame, text="Категории:").grid(row=0, column=4, padx=5, pady=5, sticky="w")
+        self.categories_entry = ctk.CTkEntry(form_frame, width=180, placeholder_text="через запятую")
+        self.categories_entry.grid(row=0, column=5, padx=5, pady=5)
+
+        ctk.CTkLabel(form_frame, text="Теги:").grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        self.tags_entry = ctk.CTkEntry(form_frame, width=150, placeholder_text="отпуск AND NOT возмещено")
+        self.tags_entry.grid(row=1, column=1, padx=5, pady=5)
+
+        ctk.CTkLabel(form_frame, text="Сумма от:").grid(row=1, column=2, padx=5, pady=5, sticky="w")
+        self.min_entry = ctk.CTkEntry(form_frame, width=100, placeholder_text="0.00")
+        self.min_entry.grid(row=1, column=3, padx=5, pady=5)
+
+        ctk.CTkLabel(form_frame, text="до:").grid(row=1, column=4, padx=5, pady=5, sticky="w")
+        self.max_entry = ctk.CTkEntry(form_frame, width=180, placeholder_text="без ограничения")
+        self.max_entry.grid(row=1, column=5, padx=5, pady=5)
+
+        ctk.CTkLabel(form_frame, text="Период:").grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        self.period_combo = ctk.CTkComboBox(form_frame, values=[*PERIOD_LABELS.values(), CUSTOM_PERIOD],
+                                            width=150)
+        self.period_combo.grid(row=2, column=1, padx=5, pady=5)
+
+        ctk.CTkLabel(form_frame, text="С:").grid(row=2, column=2, padx=5, pady=5, sticky="w")
+        self.start_entry = ctk.CTkEntry(form_frame, width=100, placeholder_text="ГГГГ-ММ-ДД")
+        self.start_entry.grid(row=2, column=3, padx=5, pady=5)
+
+        ctk.CTkLabel(form_frame, text="По:").grid(row=2, column=4, padx=5, pady=5, sticky="w")
+        self.end_entry = ctk.CTkEntry(form_frame, width=180, placeholder_text="ГГГГ-ММ-ДД")
+        self.end_entry.grid(row=2, column=5, padx=5, pady=5)
+
+        ctk.CTkLabel(form_frame, text="Описание:").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+        self.text_entry = ctk.CTkEntry(form_frame, width=150, placeholder_text="содержит текст")
+        self.text_entry.grid(row=3, column=1, padx=5, pady=5)
+
+        # Кнопки
+        btn_frame = ctk.CTkFrame(self.main_frame)
+        btn_frame.pack(pady=10)
+
+        ctk.CTkButton(btn_frame, text="➕ Новый",
+                      command=self.clear_form).pack(side="left", padx=5)
+        ctk.CTkButton(btn_frame, text="💾 Сохранить фильтр",
+                      command=self.save_filter).pack(side="left", padx=5)
+        ctk.CTkButton(btn_frame, text="🗑️ Удалить",
+                      command=self.delete_filter).pack(side="left", padx=5)
+
+        self.clear_form()
+        self.update_filters_table()
+
+    def update_filters_table(self):
+        """Обновление таблицы фильтров с итогами их представлений"""
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+
+        currency = currency_symbol(self.controller.get_database().reporting_currency)
+        for saved in self.controller.get_saved_filters():
+            try:
+                summary = self.controller.get_filter_view(saved.id).summary()
+                count, total = summary['count'], f"{summary['net']:,.2f} {currency}"
+            except ValueError as e:
+                count, total = "—", str(e)
+            self.tree.insert("", "end", iid=saved.id, values=(
+                saved.name,
+                describe_filter(saved, currency),
+                count,
+                total,
+            ))
+
+    def clear_form(self):
+        """Очистка формы для нового фильтра"""
+        self._reset_form()
+        self.tree.selection_remove(self.tree.selection())
+
+    def _reset_form(self):
+        self.editing_id = None
+        for entry in (self.name_entry, self.categories_entry, self.tags_entry, self.min_entry,
+                      self.max_entry, self.start_entry, self.end_entry, self.text_entry):
+            entry.delete(0, "end")
+        self.type_combo.set("Все")
+        self.period_combo.set(PERIOD_LABELS["month"])
+
+    def _on_select(self, event=None):
+        """Загрузка выбранного фильтра в форму"""
+        selection = self.tree.selection()
+        saved = self.controller.get_saved_filter(selection[0]) if selection else None
+        if saved is None:
+            return
+        self._reset_form()
+        self.editing_id = saved.id
+        self.name_entry.insert(0, saved.name)
+        self.type_combo.set(next(label for label, code in TYPE_LABELS.items() if code == saved.type))
+        self.categories_entry.insert(0, ", ".join(saved.categories))
+        self.tags_entry.insert(0, saved.tag_query)
+        if saved.min_amount_minor:
+            self.min_entry.insert(0, f"{from_minor(saved.min_amount_minor):.2f}")
+        if saved.max_amount_minor:
+            self.max_entry.insert(0, f"{from_minor(saved.max_amount_minor):.2f}")
+        self.period_combo.set(PERIOD_LABELS.get(saved.period, CUSTOM_PERIOD) if saved.period else
+                              (CUSTOM_PERIOD if saved.start or saved.end else PERIOD_LABELS[""]))
+        self.start_entry.insert(0, saved.start)
+        self.end_entry.insert(0, saved.end)
+        self.text_entry.insert(0, saved.text)
+
+    @staticmethod
+    def _parse_day(text: str) -> str:
+        text = text.strip()
+        if text:
+            date.fromisoformat(text)
+        return text
+
+    def get_filter(self) -> SavedFilter:
+        """Фильтр из полей формы"""
+        name = self.name_entry.get().strip()
+        if not name:
+            raise ValueError("Введите название фильтра")
+        period = next((code for code, label in PERIOD_LABELS.items() if label == self.period_combo.get()), "")
+        custom = self.period_combo.get() == CUSTOM_PERIOD
+        min_text, max_text = self.min_entry.get().strip(), self.max_entry.get().strip()
+        saved = SavedFilter(
+            name=name,
+            type=TYPE_LABELS.get(self.type_combo.get(), ""),
+            categories=[c.strip() for c in self.categories_entry.get().split(",") if c.strip()],
+            tag_query=self.tags_entry.get().strip(),
+            min_amount_minor=to_minor(min_text) if min_text else 0,
+            max_amount_minor=to_minor(max_text) if max_text else 0,
+            text=self.text_entry.get().strip(),
+            period=period,
+            start=self._parse_day(self.start_entry.get()) if custom else "",
+            end=self._parse_day(self.end_entry.get()) if custom else "",
+        )
+        if self.editing_id:
+            saved.id = self.editing_id
+        return saved
+
+    def save_filter(self):
+        """Сохранение фильтра из формы"""
+        try:
+            saved = self.get_filter()
+            self.controller.save_filter(saved)
+        except ValueError as e:
+            showerror("Ошибка", str(e), parent=self)
+            return
+        self.update_filters_table()
+        self.tree.selection_set(saved.id)
+        if self.on_change:
+            self.on_change()
+
+    def delete_filter(self):
+        """Удаление выбранного фильтра"""
+        selection = self.tree.selection()
+        if not selection:
+            return
+        saved = self.controller.get_saved_filter(selection[0])
+        if saved and askyesno("Подтверждение", f"Удалить фильтр «{saved.name}»?", parent=self):
+            self.controller.delete_filter(saved.id)
+            self.clear_form()
+            self.update_filters_table()
+            if self.on_change:
+                self.on_change()
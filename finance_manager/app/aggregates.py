@@ -0,0 +1,117 @@
+"""
+Помесячные агрегаты по категориям
+
+MonthlyRollup - матрица сумм (копейки) ключ x месяц, где ключ -
+категория*2 + признак дохода (как в analytics.category_stats). Строится
+одним bincount по колонкам и дальше поддерживается приращениями при
+добавлении, удалении и изменении транзакций.
+"""
+from itertools import count
+from typing import Tuple
+
+import numpy as np
+
+from .columnar import LedgerColumns
+
+
+# Версии агрегатов общие для всех объектов: пересозданный агрегат не совпадет
+# по версии ни с одним прежним (Forecaster сверяет обученное состояние по ней)
+_versions = count(1)
+
+
+def month_index(months: np.ndarray) -> np.ndarray:
+    """Номер месяца от 1970-01 для datetime64"""
+    return months.astype('datetime64[M]').astype(np.int64)
+
+
+class MonthlyRollup:
+    """Суммы и количества операций по (категория, тип) и месяцам"""
+
+    def __init__(self, first_month: int, sums: np.ndarray, counts: np.ndarray):
+        self.first_month = first_month  # номер месяца первого столбца
+        self.sums = sums                # int64, ключи x месяцы
+        self.counts = counts            # int64, ключи x месяцы
+        self.version = next(_versions)
+
+    @classmethod
+    def from_columns(cls, columns: LedgerColumns, n_categories: int) -> 'MonthlyRollup':
+        """Построение по колонкам одним проходом"""
+        n_keys = 2 * max(n_categories, 1)
+        if not len(columns):
+            empty = np.zeros((n_keys, 0), dtype=np.int64)
+            return cls(0, empty, empty.copy())
+
+        months = month_index(columns.dates)
+        first = int(months[0])
+        n_months = int(months[-1]) - first + 1
+        cells = (columns.categories.astype(np.int64) * 2 + columns.is_income) * n_months + (months - first)
+
+        size = n_keys * n_months
+        sums = np.rint(np.bincount(cells, weights=columns.amounts, minlength=size)).astype(np.int64)
+        counts = np.bincount(cells, minlength=size).astype(np.int64)
+        return cls(first, sums.reshape(n_keys, n_months), counts.reshape(n_keys, n_months))
+
+    def copy(self) -> 'MonthlyRollup':
+        """Независимая копия (для снимков хранилища)"""
+        return MonthlyRollup(self.first_month, self.sums.copy(), self.counts.copy())
+
+    @property
+    def n_months(self) -> int:
+        return self.sums.shape[1]
+
+    @property
+    def months(self) -> np.ndarray:
+        """Месяцы столбцов (datetime64[M])"""
+        return (np.arange(self.n_months) + self.first_month).astype('datetime64[M]')
+
+    def _ensure(self, key: int, month: int):
+        """Расширение матрицы под ключ и месяц"""
+        n_keys, n_months = self.sums.shape
+        if not n_months:
+            self.first_month = month
+        add_rows = max(0, key + 1 - n_keys)
+        add_before = max(0, self.first_month - month)
+        add_after = max(0, month - (self.first_month + n_months - 1))
+        if add_rows or add_before or add_after:
+            if add_rows:
+                add_rows += add_rows % 2  # ключи идут парами (расход, доход)
+            pad = ((0, add_rows), (add_before, add_after))
+            self.sums = np.pad(self.sums, pad)
+            self.counts = np.pad(self.counts, pad)
+            self.first_month -= add_before
+
+    def add(self, category_code: int, is_income: bool, month: np.datetime64, amount_minor: int, count: int = 1):
+        """Приращение ячейки (отрицательные значения - удаление)"""
+        key = category_code * 2 + int(is_income)
+        index = int(month_index(np.asarray(month)))
+        self._ensure(key, index)
+        column = index - self.first_month
+        self.sums[key, column] += amount_minor
+        self.counts[key, column] += count
+        self.version = next(_versions)
+
+    def move_category(self, source_code: int, target_code: int):
+        """Перенос сумм категории в другую (переименование, объединение)"""
+        if source_code == target_code:
+            return
+        self._ensure(max(source_code, target_code) * 2 + 1, self.first_month)
+        for parity in (0, 1):
+            source, target = source_code * 2 + parity, target_code * 2 + parity
+            self.sums[target] += self.sums[source]
+            self.counts[target] += self.counts[source]
+            self.sums[source] = 0
+            self.counts[source] = 0
+        self.version = next(_versions)
+
+    def column(self, month: np.datetime64) -> int:
+        """Индекс столбца месяца (может быть вне матрицы)"""
+        return int(month_index(np.asarray(month))) - self.first_month
+
+    def totals(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Доходы и расходы по месяцам"""
+        return self.sums[1::2].sum(axis=0), self.sums[0::2].sum(axis=0)
+
+    def net(self) -> np.ndarray:
+        """Чистый поток по месяцам"""
+        income, expense = self.totals()
+        return income - expense
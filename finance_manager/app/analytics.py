@@ -0,0 +1,575 @@
+"""
+Аналитика без зависимостей от UI
+
+Чистые функции принимают список транзакций и возвращают обычные данные.
+Необязательный amounts - суммы транзакций (копейки), уже пересчитанные
+в одну валюту; без него берутся amount_minor как есть.
+AnalyticsService оборачивает хранилище и кэширует результаты в его
+query_cache.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .category_tree import CategoryTree
+from .columnar import LedgerColumns
+from .comparison import Period, compare_periods, month_period, period_sums, shift_period
+from .currency import currency_symbol
+from .forecast import Z_95, Forecaster
+from .models import Budget, Transaction, TransactionType
+from .money import from_minor
+from .pivot import PivotTable, pivot_columns, pivot_rollup
+from .query_cache import cached_query
+from .sketches import MonthlySketches
+
+PERCENTILES = (0.5, 0.9, 0.99)
+BUDGET_PERIODS = {'weekly': 'week', 'неделя': 'week', 'monthly': 'month', 'месяц': 'month',
+                  'yearly': 'year', 'год': 'year'}
+
+
+def _amounts(transactions: List[Transaction], amounts: Optional[Sequence[int]]) -> List[int]:
+    if amounts is None:
+        return [t.amount_minor for t in transactions]
+    return amounts.tolist() if hasattr(amounts, 'tolist') else list(amounts)
+
+
+def calculate_statistics(transactions: List[Transaction], amounts: Sequence[int] = None) -> Dict:
+    """Общая статистика по транзакциям"""
+    if not transactions:
+        return {}
+
+    dates = [datetime.strptime(t.date, "%Y-%m-%d %H:%M:%S") for t in transactions]
+    start_date = min(dates)
+    end_date = max(dates)
+
+    income_count = 0
+    income_minor = 0
+    expense_minor = 0
+    for t, amount in zip(transactions, _amounts(transactions, amounts)):
+        if t.type == TransactionType.INCOME.value:
+            income_count += 1
+            income_minor += amount
+        else:
+            expense_minor += amount
+    expense_count = len(transactions) - income_count
+    total_income = from_minor(income_minor)
+    total_expense = from_minor(expense_minor)
+
+    return {
+        'total_transactions': len(transactions),
+        'income_count': income_count,
+        'expense_count': expense_count,
+        'total_income': total_income,
+        'total_expense': total_expense,
+        'net_balance': from_minor(income_minor - expense_minor),
+        'avg_income': total_income / income_count if income_count else 0,
+        'avg_expense': total_expense / expense_count if expense_count else 0,
+        'avg_transaction': (total_income + total_expense) / len(transactions),
+        'start_date': start_date.strftime("%Y-%m-%d"),
+        'end_date': end_date.strftime("%Y-%m-%d"),
+        'days_count': (end_date - start_date).days + 1
+    }
+
+
+def analyze_categories(transactions: List[Transaction], amounts: Sequence[int] = None) -> Dict:
+    """Суммы, количество и доли по категориям"""
+    sums: Dict[str, int] = {}
+    counts: Dict[str, int] = {}
+    kinds: Dict[str, str] = {}
+    income = TransactionType.INCOME.value
+
+    for transaction, amount in zip(transactions, _amounts(transactions, amounts)):
+        # Без разбивки строка одна - lines() не вызывается
+        lines = transaction.lines(amount) if transaction.splits else ((transaction.category, amount),)
+        for cat, line_amount in lines:
+            if cat in sums:
+                sums[cat] += line_amount
+                counts[cat] += 1
+            else:
+                sums[cat] = line_amount
+                counts[cat] = 1
+                kinds[cat] = 'Доход' if transaction.type == income else 'Расход'
+
+    # Расчет долей: итоги по типам считаются один раз
+    totals = {}
+    for cat, amount in sums.items():
+        totals[kinds[cat]] = totals.get(kinds[cat], 0) + amount
+
+    categories = {}
+    for cat, amount in sums.items():
+        total = totals[kinds[cat]]
+        categories[cat] = {
+            'type': kinds[cat],
+            'amount': from_minor(amount),
+            'count': counts[cat],
+            'percentage': (amount / total * 100) if total > 0 else 0,
+        }
+    return categories
+
+
+def prepare_timeline_data(transactions: List[Transaction], amounts: Sequence[int] = None) -> Dict:
+    """Доходы, расходы и баланс по месяцам"""
+    timeline = {}
+
+    for transaction, amount in zip(transactions, _amounts(transactions, amounts)):
+        month_key = transaction.date[:7]
+
+        if month_key not in timeline:
+            timeline[month_key] = {'income': 0, 'expense': 0}
+
+        if transaction.type == TransactionType.INCOME.value:
+            timeline[month_key]['income'] += amount
+        else:
+            timeline[month_key]['expense'] += amount
+
+    return {
+        month: {
+            'income': from_minor(data['income']),
+            'expense': from_minor(data['expense']),
+            'balance': from_minor(data['income'] - data['expense']),
+        }
+        for month, data in sorted(timeline.items())
+    }
+
+
+def category_stats(columns: LedgerColumns, category_names: List[str]) -> List[Dict]:
+    """Статистика по категориям за один проход по колонкам
+
+    Для каждой пары (категория, тип): сумма, количество, доля внутри типа,
+    среднее, минимум и максимум. Строки отсортированы по убыванию суммы.
+    """
+    if not len(columns):
+        return []
+
+    size = 2 * len(category_names)
+    keys = columns.categories.astype(np.int64) * 2 + columns.is_income
+    amounts = columns.amounts
+
+    # bincount с float-весами точен до 2**53 копеек, затем обратно в int64
+    sums = np.rint(np.bincount(keys, weights=amounts, minlength=size)).astype(np.int64)
+    counts = np.bincount(keys, minlength=size)
+    limits = np.iinfo(np.int64)
+    mins = np.full(size, limits.max, dtype=np.int64)
+    np.minimum.at(mins, keys, amounts)
+    maxs = np.full(size, limits.min, dtype=np.int64)
+    np.maximum.at(maxs, keys, amounts)
+
+    type_totals = {
+        TransactionType.EXPENSE.value: int(sums[0::2].sum()),
+        TransactionType.INCOME.value: int(sums[1::2].sum()),
+    }
+
+    rows = []
+    for key in np.flatnonzero(counts):
+        t_type = TransactionType.INCOME.value if key % 2 else TransactionType.EXPENSE.value
+        amount_minor = int(sums[key])
+        count = int(counts[key])
+        total = type_totals[t_type]
+        rows.append({
+            'category': category_names[key // 2],
+            'type': t_type,
+            'amount': from_minor(amount_minor),
+            'amount_minor': amount_minor,
+            'count': count,
+            'share': amount_minor / total * 100 if total > 0 else 0.0,
+            'average': from_minor(amount_minor) / count,
+            'min': from_minor(mins[key]),
+            'max': from_minor(maxs[key]),
+        })
+
+    rows.sort(key=lambda r: r['amount'], reverse=True)
+    return rows
+
+
+def _percentiles(sketch) -> Dict:
+    median, p90, p99 = (from_minor(round(q)) for q in sketch.quantiles(PERCENTILES))
+    return {'count': sketch.count, 'median': median, 'p90': p90, 'p99': p99}
+
+
+def sketch_percentiles(sketches: MonthlySketches, category_names: List[str],
+                       transaction_type: str = TransactionType.EXPENSE.value,
+                       start: str = None, end: str = None) -> List[Dict]:
+    """Медиана, p90 и p99 сумм по категориям за месяцы [start, end] ("YYYY-MM")
+
+    Месячные скетчи категорий объединяются; суммы не сортируются.
+    Строки отсортированы по убыванию медианы.
+    """
+    is_income = int(transaction_type == TransactionType.INCOME.value)
+    lo = np.datetime64(start, 'M') if start else None
+    hi = np.datetime64(end, 'M') if end else None
+
+    rows = []
+    for key in sketches.keys():
+        if key % 2 != is_income or key // 2 >= len(category_names):
+            continue
+        merged = sketches.merged([key], lo, hi)
+        if merged.count <= 0:
+            continue
+        rows.append({
+            'category': category_names[key // 2],
+            'type': transaction_type,
+            **_percentiles(merged),
+        })
+
+    rows.sort(key=lambda r: r['median'], reverse=True)
+    return rows
+
+
+def last_months(count: int, now: datetime = None) -> List[Tuple[int, int]]:
+    """Последние count месяцев (год, месяц) от старых к новым"""
+    now = now or datetime.now()
+    months = []
+    for i in range(count):
+        month = now.month - i
+        year = now.year
+        while month <= 0:
+            month += 12
+            year -= 1
+        months.append((year, month))
+    return list(reversed(months))
+
+
+class AnalyticsService:
+    """Сервис аналитики поверх хранилища (Database)
+
+    Результаты кэшируются в query_cache хранилища и вытесняются только
+    изменениями, от которых они зависят. Суммы - в валюте отчетов, поэтому
+    агрегаты по всей истории зависят и от настроек.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._executor = None
+        self._forecasters: Dict[str, Forecaster] = {}
+
+    @property
+    def query_cache(self):
+        return self._store.query_cache
+
+    def submit(self, method_name: str, *args) -> Future:
+        """Выполнение метода сервиса в фоновом потоке
+
+        Метод считается по снимку хранилища на момент вызова: изменения,
+        сделанные тем временем в потоке интерфейса, на результат не влияют.
+        Результат забирается через collect.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analytics")
+        snapshot = self._store.snapshot()
+        future = self._executor.submit(getattr(AnalyticsService(snapshot), method_name), *args)
+        future.snapshot = snapshot
+        return future
+
+    def collect(self, future: Future):
+        """Результат submit (в потоке интерфейса, когда future.done())
+
+        Помесячные агрегаты, построенные снимком, переходят в хранилище, если
+        оно с тех пор не менялось: следующий расчет начнется с готовых.
+        """
+        result = future.result()
+        self._store.adopt_aggregates(future.snapshot)
+        return result
+
+    def batch(self, calls: Sequence) -> List:
+        """Несколько методов подряд - для submit, чтобы все считались по одному снимку
+
+        calls - имена методов или кортежи (имя, аргументы...).
+        """
+        results = []
+        for call in calls:
+            name, *args = (call,) if isinstance(call, str) else call
+            results.append(getattr(self, name)(*args))
+        return results
+
+    def clear_cache(self):
+        self.query_cache.clear()
+
+    @property
+    def currency(self) -> str:
+        """Код валюты отчетов"""
+        return self._store.reporting_currency
+
+    @property
+    def currency_symbol(self) -> str:
+        return currency_symbol(self.currency)
+
+    @cached_query(tables=('transactions', 'settings'))
+    def statistics(self) -> Dict:
+        """Общая статистика"""
+        transactions = self._store.transactions
+        return calculate_statistics(transactions, self._store.amounts_in(transactions))
+
+    @cached_query(tables=('transactions', 'settings'))
+    def category_stats(self, transaction_type: Optional[str] = None) -> List[Dict]:
+        """Статистика по категориям (все типы или только income/expense)"""
+        rows = category_stats(self._store.get_columns(), self._store.category_names)
+        if transaction_type is None:
+            return rows
+        return [r for r in rows if r['type'] == transaction_type]
+
+    @cached_query(tables=('transactions', 'settings'))
+    def timeline(self) -> Dict:
+        """Помесячный временной ряд"""
+        transactions = self._store.transactions
+        return prepare_timeline_data(transactions, self._store.amounts_in(transactions))
+
+    @cached_query(lambda self, transaction_type='expense', start=None, end=None:
+                  ((start, end) if start and end else None, None),
+                  tables=('transactions', 'settings'))
+    def category_percentiles(self, transaction_type: str = TransactionType.EXPENSE.value,
+                             start: str = None, end: str = None) -> List[Dict]:
+        """Медиана, p90, p99 по категориям за месяцы [start, end] ("YYYY-MM")"""
+        return sketch_percentiles(self._store.get_amount_sketches(), self._store.category_names,
+                                  transaction_type, start, end)
+
+    @cached_query(lambda self, transaction_type='expense', start=None, end=None:
+                  ((start, end) if start and end else None, None),
+                  tables=('transactions', 'settings'))
+    def amount_percentiles(self, transaction_type: str = TransactionType.EXPENSE.value,
+                           start: str = None, end: str = None) -> Dict:
+        """Медиана, p90, p99 сумм операций типа по всем категориям"""
+        sketches = self._store.get_amount_sketches()
+        is_income = int(transaction_type == TransactionType.INCOME.value)
+        keys = [key for key in sketches.keys() if key % 2 == is_income]
+        merged = sketches.merged(keys, np.datetime64(start, 'M') if start else None,
+                                 np.datetime64(end, 'M') if end else None)
+        return _percentiles(merged) if merged.count > 0 else {}
+
+    @cached_query(tables=('transactions', 'settings'))
+    def pivot(self, granularity: str = 'month', transaction_type: str = TransactionType.EXPENSE.value,
+              start: str = None, end: str = None) -> PivotTable:
+        """Сводная таблица категория x период за даты [start, end] ("YYYY-MM-DD")
+
+        transaction_type - expense, income или net (доходы минус расходы).
+        Месяцы и годы берутся из помесячных агрегатов, дни и недели - из колонок.
+        """
+        lo = np.datetime64(start, 'D') if start else None
+        hi = np.datetime64(end, 'D') if end else None
+        names = self._store.category_names
+        if granularity in ('month', 'year') and start is None and end is None:
+            rollup = self._store.get_monthly_rollup()
+            return pivot_rollup(rollup, names, granularity, transaction_type)
+        return pivot_columns(self._store.get_columns(), names, granularity, transaction_type, lo, hi)
+
+    def month_totals(self, year: int = None, month: int = None) -> Dict:
+        """Доходы и расходы за месяц (по умолчанию - текущий)"""
+        return self._store.get_monthly_summary(year, month)
+
+    @cached_query(lambda self, current, previous: ((min(current[0], previous[0]), max(current[1], previous[1])), None),
+                  tables=('transactions', 'settings'))
+    def compare_periods(self, current: Period, previous: Period) -> Dict:
+        """Изменения по категориям и итогам между двумя периодами ("YYYY-MM", "YYYY-MM")"""
+        return compare_periods(self._store.get_monthly_rollup(), self._store.category_names, current, previous)
+
+    def month_over_month(self, year: int = None, month: int = None) -> Dict:
+        """Месяц (по умолчанию - текущий) против предыдущего"""
+        now = datetime.now()
+        current = month_period(year or now.year, month or now.month)
+        return self.compare_periods(current, shift_period(current, -1))
+
+    def year_over_year(self, year: int = None, month: int = None) -> Dict:
+        """Месяц (по умолчанию - текущий) против того же месяца год назад"""
+        now = datetime.now()
+        current = month_period(year or now.year, month or now.month)
+        return self.compare_periods(current, shift_period(current, -12))
+
+    def year_to_date(self, year: int = None) -> Dict:
+        """С начала года по текущий месяц против того же периода прошлого года"""
+        now = datetime.now()
+        year = year or now.year
+        current = (f"{year:04d}-01", f"{year:04d}-{now.month:02d}")
+        return self.compare_periods(current, shift_period(current, -12))
+
+    def balance_overview(self) -> Dict:
+        """Общий баланс и показатели текущего месяца (с изменением к прошлому)"""
+        now = datetime.now()
+        return self._balance_overview(now.year, now.month)
+
+    @cached_query(tables=('transactions', 'settings'))
+    def _balance_overview(self, year: int, month: int) -> Dict:
+        # Месяц входит в ключ кэша: с началом нового месяца запись не переиспользуется
+        summary = self.month_totals(year, month)
+        change = self.month_over_month(year, month)
+        return {
+            'currency': summary['currency'],
+            'balance': self._store.get_total_balance(),
+            'balance_minor': self._store.get_total_balance_minor(),
+            'monthly_income': summary['income'],
+            'monthly_expense': summary['expense'],
+            'monthly_income_minor': summary['income_minor'],
+            'monthly_expense_minor': summary['expense_minor'],
+            'monthly_income_change': change['income']['percent'],
+            'monthly_expense_change': change['expense']['percent'],
+        }
+
+    def category_tree(self) -> CategoryTree:
+        """Дерево категорий справочника и категорий из операций"""
+        return CategoryTree(self._store.categories, self._store.category_names)
+
+    @cached_query(lambda self, transaction_type='expense', start=None, end=None:
+                  ((start, end) if start and end else None, None),
+                  tables=('transactions', 'settings', 'categories'))
+    def category_tree_totals(self, transaction_type: str = TransactionType.EXPENSE.value,
+                             start: str = None, end: str = None) -> Dict:
+        """Собственные суммы и итоги поддеревьев категорий (копейки) за месяцы [start, end]
+
+        Суммы листьев берутся из помесячных агрегатов и поднимаются по дереву.
+        """
+        rollup = self._store.get_monthly_rollup()
+        if start or end:
+            sums = period_sums(rollup, (start or '0001-01', end or '9999-12'))
+        else:
+            sums = rollup.sums.sum(axis=1)
+        parity = 1 if transaction_type == TransactionType.INCOME.value else 0
+        tree = self.category_tree()
+        own = tree.node_values(sums[parity::2], self._store.category_names)
+        return {'tree': tree, 'own': own, 'total': tree.rollup(own)}
+
+    def category_breakdown(self, parent: str = None, transaction_type: str = TransactionType.EXPENSE.value,
+                           start: str = None, end: str = None) -> List[Dict]:
+        """Подкатегории parent (None - верхний уровень) с итогами, по убыванию
+
+        Операции, записанные прямо в parent, идут отдельной строкой (own=True).
+        """
+        data = self.category_tree_totals(transaction_type, start, end)
+        tree, own, total = data['tree'], data['own'], data['total']
+        rows = []
+        for name in tree.children(parent):
+            node = tree.index[name]
+            if total[node] > 0:
+                rows.append({'category': name, 'amount': from_minor(int(total[node])),
+                             'has_children': bool(tree.children(name)), 'own': False})
+        if parent in tree and own[tree.index[parent]] > 0:
+            rows.append({'category': parent, 'amount': from_minor(int(own[tree.index[parent]])),
+                         'has_children': False, 'own': True})
+        rows.sort(key=lambda r: r['amount'], reverse=True)
+        return rows
+
+    @cached_query(tables=('transactions', 'settings'))
+    def filtered_summary(self, tag_query: str = None, start: str = None, end: str = None,
+                         categories: Tuple[str, ...] = None) -> Dict:
+        """Итоги и категории для операций под фильтром тегов, дат ("YYYY-MM-DD") и категорий"""
+        columns = self._store.get_filtered_columns(tag_query, start, end, categories)
+        income = int(columns.amounts[columns.is_income].sum())
+        expense = int(columns.amounts[~columns.is_income].sum())
+        return {
+            'count': columns.transaction_count(),
+            'income': from_minor(income),
+            'expense': from_minor(expense),
+            'net': from_minor(income - expense),
+            'categories': category_stats(columns, self._store.category_names),
+        }
+
+    def top_expense_categories(self, limit: int = 10) -> List[Tuple[str, float]]:
+        """Крупнейшие категории расходов"""
+        rows = self.category_stats(TransactionType.EXPENSE.value)[:limit]
+        return [(r['category'], r['amount']) for r in rows]
+
+    def trends(self, months: int = 6) -> List[Dict]:
+        """Доходы и расходы за последние months месяцев"""
+        result = []
+        for year, month in last_months(months):
+            summary = self._store.get_monthly_summary(year, month)
+            result.append({
+                'label': f"{month:02d}/{year}",
+                'income': summary['income'],
+                'expense': summary['expense'],
+            })
+        return result
+
+    def forecast(self, months: int = 6) -> Dict:
+        """Прогноз баланса на months месяцев вперед с 95% интервалом
+
+        Модель обучается на закрытых месяцах и дообучается приращениями;
+        текущий месяц прогнозируется целиком от баланса на его начало.
+        Пустой словарь - истории меньше трех месяцев.
+        """
+        now = datetime.now()
+        return self._forecast(months, (now.year - 1970) * 12 + now.month - 1)
+
+    @cached_query(tables=('transactions', 'settings'))
+    def _forecast(self, months: int, current: int) -> Dict:
+        # Текущий месяц (номер от 1970-01) входит в ключ кэша: с новым месяцем модель дообучается
+        currency = self.currency
+        rollup = self._store.get_monthly_rollup(currency)
+
+        forecaster = self._forecasters.setdefault(currency, Forecaster())
+        if not forecaster.fit(rollup, current):
+            return {}
+
+        mean, stderr = forecaster.predict(months)
+        net = rollup.net()
+        start = max(current - rollup.first_month, 0)
+        opening = self._store.get_total_balance_minor(currency) - int(net[start:].sum())
+
+        balance = opening + np.cumsum(mean[:, 0])
+        band = Z_95 * np.sqrt(np.cumsum(stderr[:, 0] ** 2))
+
+        # Фактический баланс на конец последних закрытых месяцев
+        history = min(12, start)
+        closed_net = net[:start]
+        history_balance = opening - np.concatenate((np.cumsum(closed_net[::-1])[::-1][1:], [0]))
+        history_balance = history_balance[len(history_balance) - history:] if history else history_balance[:0]
+
+        names = self._store.category_names
+        expense_keys = np.arange(0, mean.shape[1] - 1, 2)
+        expense_keys = expense_keys[expense_keys // 2 < len(names)]
+        next_month = np.maximum(mean[0, 1 + expense_keys], 0)
+        order = np.argsort(next_month)[::-1][:5]
+
+        def labels(first, count):
+            return [f"{(first + i) % 12 + 1:02d}/{(first + i) // 12 + 1970}" for i in range(count)]
+
+        return {
+            'months': labels(current, months),
+            'balance': balance / 100,
+            'lower': (balance - band) / 100,
+            'upper': (balance + band) / 100,
+            'net': mean[:, 0] / 100,
+            'opening_balance': opening / 100,
+            'history_months': labels(current - history, history),
+            'history_balance': history_balance / 100,
+            'top_expenses': [(names[expense_keys[i] // 2], float(next_month[i]) / 100)
+                             for i in order if next_month[i] > 0],
+            'fitted_months': forecaster.n_months,
+        }
+
+    def budget_spent(self, budget: Budget, now: datetime = None) -> float:
+        """Траты по бюджету за текущий период (с подкатегориями и частями разбивки)"""
+        now = now or datetime.now()
+        today = np.datetime64(now.date(), 'D')
+        period = BUDGET_PERIODS.get(budget.period, 'month')
+        if period == 'week':
+            start = today - (today.astype(np.int64) + 3) % 7  # понедельник
+        else:
+            start = today.astype('datetime64[M]' if period == 'month' else 'datetime64[Y]').astype('datetime64[D]')
+
+        wanted = {budget.category, *self.category_tree().descendants(budget.category)}
+        columns = self._store.get_columns(start=datetime.strptime(str(start), "%Y-%m-%d"), end=now)
+        names = self._store.category_names
+        codes = np.array([code for code, name in enumerate(names) if name in wanted], dtype=np.int32)
+        mask = columns.filter_mask(start.astype('datetime64[s]'), (today + 1).astype('datetime64[s]'), codes)
+        mask &= columns.is_income == (budget.type == TransactionType.INCOME.value)
+        return from_minor(int(columns.amounts[mask].sum()))
+
+    def budget_usage(self, limit: int = 8) -> List[Dict]:
+        """Использование бюджетов"""
+        return self._budget_usage(limit, date.today())
+
+    @cached_query(tables=('budgets', 'transactions', 'settings', 'categories'))
+    def _budget_usage(self, limit: int, today: date) -> List[Dict]:
+        # День входит в ключ кэша: периоды бюджетов (неделя, месяц, год) считаются от него
+        now = datetime(today.year, today.month, today.day)
+        result = []
+        for budget in self._store.budgets[:limit]:
+            spent = self.budget_spent(budget, now)
+            percentage = (spent / budget.limit * 100) if budget.limit > 0 else 0
+            result.append({
+                'category': budget.category,
+                'limit': budget.limit,
+                'spent': spent,
+                'percentage': percentage,
+            })
+        return result
@@ -0,0 +1,350 @@
+"""
+Поиск необычных расходов
+
+По каждой категории расходов ведется онлайн-статистика Уэлфорда
+(количество, среднее, M2) по log(1 + сумма): суммы покупок распределены
+примерно логнормально, и в логарифмах редкие крупные траты хорошо
+отделяются z-оценкой. По неделям (с понедельника) ведутся суммы расходов
+и их первые два момента - для поиска всплесков недельных трат.
+
+Обновление на одну транзакцию - O(1). Статистика истории складывается
+из сумм по партициям (количество, сумма и сумма квадратов логарифмов,
+недельные итоги): для одновалютных партиций они хранятся в манифесте
+(transaction_stats), поэтому построение не читает старые годы с диска.
+"""
+import math
+from datetime import date
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+
+from .columnar import LedgerColumns
+from .models import Transaction, TransactionType
+
+Z_THRESHOLD = 3.0
+MIN_COUNT = 5
+MIN_WEEKS = 4
+
+AMOUNT = "amount"
+WEEK = "week"
+
+_EPOCH = date(1970, 1, 1).toordinal()
+
+# Суммы для статистики: {'categories': {категория: [n, s1, s2]}, 'weeks': {неделя: сумма в копейках}}
+ExpenseStats = Dict[str, Dict]
+
+
+def _log_amount(amount_minor) -> np.ndarray:
+    return np.log1p(np.asarray(amount_minor, dtype=np.float64) / 100)
+
+
+def week_index(dates: np.ndarray) -> np.ndarray:
+    """Номер недели (с понедельника) для datetime64"""
+    # 1970-01-01 - четверг
+    return (dates.astype('datetime64[D]').astype(np.int64) + 3) // 7
+
+
+def _transaction_week(transaction: Transaction):
+    try:
+        return int(week_index(np.array([np.datetime64(transaction.date, 's')]))[0])
+    except ValueError:
+        return None
+
+
+def empty_stats() -> ExpenseStats:
+    return {'categories': {}, 'weeks': {}}
+
+
+def transaction_stats(transactions: Iterable[Transaction]) -> Dict[str, ExpenseStats]:
+    """Суммы статистики расходов по валютам операций (для записи в манифест)"""
+    result = {}
+    weeks = {}  # день -> неделя: в партиции дней намного меньше, чем операций
+    income = TransactionType.INCOME.value
+    for t in transactions:
+        if t.type == income:
+            continue
+        day = t.date[:10]
+        week = weeks.get(day)
+        if week is None:
+            try:
+                week = weeks[day] = (date.fromisoformat(day).toordinal() - _EPOCH + 3) // 7
+            except ValueError:
+                continue
+        stats = result.setdefault(t.currency, empty_stats())
+        categories = stats['categories']
+        total = 0
+        for category, amount in t.lines():
+            x = math.log1p(amount / 100)
+            sums = categories.setdefault(category, [0, 0.0, 0.0])
+            sums[0] += 1
+            sums[1] += x
+            sums[2] += x * x
+            total += amount
+        stats['weeks'][week] = stats['weeks'].get(week, 0) + total
+    return result
+
+
+def column_stats(columns: LedgerColumns, category_names: Sequence[str]) -> ExpenseStats:
+    """Суммы статистики расходов по колонкам (суммы - в валюте колонок)"""
+    expense = ~columns.is_income
+    codes = columns.categories[expense]
+    values = _log_amount(columns.amounts[expense])
+    size = len(category_names)
+    count = np.bincount(codes, minlength=size)
+    s1 = np.bincount(codes, weights=values, minlength=size)
+    s2 = np.bincount(codes, weights=values ** 2, minlength=size)
+    stats = empty_stats()
+    stats['categories'] = {category_names[c]: [int(count[c]), float(s1[c]), float(s2[c])]
+                           for c in np.flatnonzero(count)}
+
+    weeks = week_index(columns.dates[expense])
+    if len(weeks):
+        first = weeks.min()
+        totals = np.bincount(weeks - first, weights=columns.amounts[expense])
+        stats['weeks'] = {int(first + w): float(totals[w]) for w in np.flatnonzero(totals)}
+    return stats
+
+
+def merge_stats(parts: Iterable[ExpenseStats]) -> ExpenseStats:
+    """Сложение сумм статистики (партиций); ключи недель из JSON - строки"""
+    result = empty_stats()
+    categories, weeks = result['categories'], result['weeks']
+    for part in parts:
+        for name, (n, s1, s2) in part['categories'].items():
+            sums = categories.setdefault(name, [0, 0.0, 0.0])
+            sums[0] += n
+            sums[1] += s1
+            sums[2] += s2
+        for week, total in part['weeks'].items():
+            weeks[int(week)] = weeks.get(int(week), 0) + total
+    return result
+
+
+def add_stats(stats: ExpenseStats, part: ExpenseStats, sign: int = 1):
+    """Прибавление (sign=-1 - вычитание) сумм статистики на месте
+
+    Ключи недель - строки, как в манифесте после чтения JSON; опустевшие
+    категории и недели удаляются.
+    """
+    categories, weeks = stats['categories'], stats['weeks']
+    for name, (n, s1, s2) in part['categories'].items():
+        sums = categories.setdefault(name, [0, 0.0, 0.0])
+        sums[0] += sign * n
+        sums[1] += sign * s1
+        sums[2] += sign * s2
+        if sums[0] <= 0:
+            del categories[name]
+    for week, total in part['weeks'].items():
+        week = str(week)
+        weeks[week] = weeks.get(week, 0) + sign * total
+        if not weeks[week]:
+            del weeks[week]
+
+
+class AnomalyDetector:
+    """Онлайн-статистика расходов по категориям и неделям"""
+
+    def __init__(self, z_threshold: float = Z_THRESHOLD, min_count: int = MIN_COUNT):
+        self.z_threshold = z_threshold
+        self.min_count = min_count
+        self._codes: Dict[str, int] = {}
+        self._count = np.zeros(0)
+        self._mean = np.zeros(0)
+        self._m2 = np.zeros(0)
+        self._weeks: Dict[int, int] = {}
+        self._week_n = 0
+        self._week_s1 = 0.0
+        self._week_s2 = 0.0
+
+    def _code(self, category: str) -> int:
+        code = self._codes.get(category)
+        if code is None:
+            code = self._codes[category] = len(self._codes)
+            if code >= len(self._count):
+                grow = max(8, len(self._count))
+                self._count = np.pad(self._count, (0, grow))
+                self._mean = np.pad(self._mean, (0, grow))
+                self._m2 = np.pad(self._m2, (0, grow))
+        return code
+
+    # Пакетная обработка
+
+    def _column_codes(self, columns: LedgerColumns, category_names: Sequence[str]) -> np.ndarray:
+        mapping = np.array([self._code(name) for name in category_names] or [0], dtype=np.int64)
+        return mapping[columns.categories]
+
+    def fit(self, columns: LedgerColumns, category_names: Sequence[str]):
+        """Построение статистики по истории одним векторным проходом"""
+        self.fit_stats(column_stats(columns, category_names))
+
+    def fit_stats(self, stats: ExpenseStats):
+        """Построение статистики по готовым суммам (merge_stats по партициям)"""
+        self.__init__(self.z_threshold, self.min_count)
+        for name in stats['categories']:
+            self._code(name)
+
+        size = len(self._count)
+        count, s1, s2 = np.zeros(size), np.zeros(size), np.zeros(size)
+        for name, sums in stats['categories'].items():
+            code = self._codes[name]
+            count[code], s1[code], s2[code] = sums
+        mean = np.divide(s1, count, out=np.zeros(size), where=count > 0)
+        self._count, self._mean = count, mean
+        self._m2 = np.maximum(s2 - count * mean ** 2, 0)
+
+        self._weeks = {int(week): int(round(total)) for week, total in stats['weeks'].items()
+                       if round(total) > 0}
+        if self._weeks:
+            logs = _log_amount(list(self._weeks.values()))
+            self._week_n = len(self._weeks)
+            self._week_s1 = float(logs.sum())
+            self._week_s2 = float((logs ** 2).sum())
+
+    def score(self, columns: LedgerColumns, category_names: Sequence[str]) -> np.ndarray:
+        """z-оценки сумм расходов относительно остальных операций категории
+
+        Оценка без учета самой строки (leave-one-out); для доходов и
+        категорий с малым числом операций - NaN.
+        """
+        codes = self._column_codes(columns, category_names)
+        x = _log_amount(columns.amounts)
+        n = self._count[codes]
+        mean = self._mean[codes]
+        m2 = self._m2[codes]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            n_other = n - 1
+            mean_other = (n * mean - x) / n_other
+            m2_other = np.maximum(m2 - (x - mean) * (x - mean_other), 0)
+            std_other = np.sqrt(m2_other / (n_other - 1))
+            z = (x - mean_other) / std_other
+
+        valid = (~columns.is_income) & (n_other >= self.min_count) & (std_other > 0)
+        return np.where(valid, z, np.nan)
+
+    def flag(self, columns: LedgerColumns, category_names: Sequence[str]) -> np.ndarray:
+        """Маска необычно крупных расходов"""
+        z = self.score(columns, category_names)
+        return np.nan_to_num(z, nan=0.0) > self.z_threshold
+
+    def weekly_spikes(self) -> List[Dict]:
+        """Недели с необычно большими расходами (по убыванию z)"""
+        if self._week_n <= MIN_WEEKS:
+            return []
+        weeks = np.fromiter(self._weeks.keys(), dtype=np.int64, count=len(self._weeks))
+        totals = np.fromiter(self._weeks.values(), dtype=np.float64, count=len(self._weeks))
+        z = np.array([self._week_z(w, t) for w, t in zip(weeks, totals)])
+        spikes = np.flatnonzero(z > self.z_threshold)
+        return [
+            {
+                'week_start': (weeks[i] * 7 - 3).astype('datetime64[D]'),
+                'total_minor': int(totals[i]),
+                'z': float(z[i]),
+            }
+            for i in spikes[np.argsort(z[spikes])[::-1]]
+        ]
+
+    # Онлайн-обновление
+
+    def _amount_z(self, code: int, x: float, included: bool) -> float:
+        n, mean, m2 = self._count[code], self._mean[code], self._m2[code]
+        if included:
+            # Исключаем саму операцию из статистики
+            if n <= 1:
+                return 0.0
+            mean_other = (n * mean - x) / (n - 1)
+            m2 = max(m2 - (x - mean) * (x - mean_other), 0.0)
+            n, mean = n - 1, mean_other
+        if n < self.min_count or m2 <= 0:
+            return 0.0
+        return (x - mean) / np.sqrt(m2 / (n - 1))
+
+    def _week_z(self, week: int, total: float) -> float:
+        """z-оценка недели относительно остальных недель"""
+        value = float(_log_amount(total))
+        n = self._week_n
+        s1, s2 = self._week_s1, self._week_s2
+        if week in self._weeks:
+            old = float(_log_amount(self._weeks[week]))
+            n, s1, s2 = n - 1, s1 - old, s2 - old ** 2
+        if n < MIN_WEEKS:
+            return 0.0
+        mean = s1 / n
+        variance = max(s2 / n - mean ** 2, 0.0) * n / (n - 1)
+        if variance <= 0:
+            return 0.0
+        return (value - mean) / np.sqrt(variance)
+
+    def check(self, transaction: Transaction, amount_minor: int, included: bool = True) -> List[str]:
+        """Причины считать операцию необычной: AMOUNT и/или WEEK
+
+        amount_minor - сумма в валюте, в которой ведется статистика.
+        included - операция уже учтена в статистике.
+        """
+        if transaction.type == TransactionType.INCOME.value:
+            return []
+
+        reasons = []
+        if any(self._amount_z(self._code(category), float(_log_amount(amount)), included) > self.z_threshold
+               for category, amount in transaction.lines(amount_minor)):
+            reasons.append(AMOUNT)
+
+        week = _transaction_week(transaction)
+        if week is not None:
+            total = self._weeks.get(week, 0) + (0 if included else amount_minor)
+            if self._week_z(week, total) > self.z_threshold:
+                reasons.append(WEEK)
+        return reasons
+
+    def _update(self, transaction: Transaction, amount_minor: int, sign: int):
+        for category, amount in transaction.lines(amount_minor):
+            self._update_category(self._code(category), float(_log_amount(amount)), sign)
+        self._update_week(transaction, amount_minor, sign)
+
+    def _update_category(self, code: int, x: float, sign: int):
+        n, mean = self._count[code], self._mean[code]
+        if sign > 0:
+            n += 1
+            delta = x - mean
+            mean += delta / n
+            self._m2[code] += delta * (x - mean)
+        elif n > 1:
+            mean_new = (n * mean - x) / (n - 1)
+            self._m2[code] = max(self._m2[code] - (x - mean) * (x - mean_new), 0.0)
+            n, mean = n - 1, mean_new
+        else:
+            n, mean, self._m2[code] = 0, 0.0, 0.0
+        self._count[code], self._mean[code] = n, mean
+
+    def _update_week(self, transaction: Transaction, amount_minor: int, sign: int):
+        week = _transaction_week(transaction)
+        if week is None:
+            return
+        old = self._weeks.get(week, 0)
+        new = old + sign * amount_minor
+        if old > 0:
+            value = float(_log_amount(old))
+            self._week_n -= 1
+            self._week_s1 -= value
+            self._week_s2 -= value ** 2
+        if new > 0:
+            value = float(_log_amount(new))
+            self._week_n += 1
+            self._week_s1 += value
+            self._week_s2 += value ** 2
+            self._weeks[week] = new
+        else:
+            self._weeks.pop(week, None)
+
+    def observe(self, transaction: Transaction, amount_minor: int) -> List[str]:
+        """Проверка новой операции по прежней статистике и ее учет, O(1)"""
+        if transaction.type == TransactionType.INCOME.value:
+            return []
+        reasons = self.check(transaction, amount_minor, included=False)
+        self._update(transaction, amount_minor, 1)
+        return reasons
+
+    def forget(self, transaction: Transaction, amount_minor: int):
+        """Исключение удаленной операции из статистики"""
+        if transaction.type != TransactionType.INCOME.value:
+            self._update(transaction, amount_minor, -1)
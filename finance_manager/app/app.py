@@ -5,19 +5,29 @@ import customtkinter as ctk
 from tkinter import messagebox
 import csv
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import pandas as pd
 
 from .database import Database
+from .anomaly import AMOUNT, WEEK
 from .controller import AppController
 from .models import Transaction
+from .money import to_minor
+from .profiling import metrics
+from .tags import parse_tag_query
+from .utils import category_summary, format_splits
 
 from .Windows import (
     AddTransactionWindow,
     AnalyticsWindow,
     BudgetsWindow,
     CategoriesWindow,
-    SettingsWindow
+    SettingsWindow,
+    DiagnosticsWindow,
+    RecurringWindow,
+    BulkEditWindow,
+    SavedFiltersWindow
 )
 
 from .Frames import (
@@ -27,6 +37,8 @@ from .Frames import (
     QuickActionsFrame
 )
 
+EXTERNAL_CHECK_MS = 2000  # период проверки изменений, записанных другими процессами
+
 
 class FinanceApp:
     """Главный класс приложения"""
@@ -42,6 +54,8 @@ class FinanceApp:
 
         self.db = Database()
         self.controller = AppController(self.db)
+        self._export_executor = None  # поток записи файлов экспорта
+        self._post_due_recurring()
 
         self._create_menu()
         self._create_main_interface()
@@ -49,8 +63,22 @@ class FinanceApp:
         self.update_ui()
 
         self.controller.add_update_callback(self.update_ui)
+        self._bind_history_keys()
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.root.after(EXTERNAL_CHECK_MS, self._poll_external_changes)
+
+    def _poll_external_changes(self):
+        """Периодическая проверка изменений, записанных другими процессами"""
+        self.controller.check_external_changes()
+        self.root.after(EXTERNAL_CHECK_MS, self._poll_external_changes)
+
+    def _bind_history_keys(self):
+        """Ctrl+Z / Ctrl+Y (в том числе в русской раскладке)"""
+        for key in ("<Control-z>", "<Control-Z>", "<Control-Cyrillic_ya>", "<Control-Cyrillic_YA>"):
+            self.root.bind(key, lambda event: self.undo())
+        for key in ("<Control-y>", "<Control-Y>", "<Control-Cyrillic_en>", "<Control-Cyrillic_EN>"):
+            self.root.bind(key, lambda event: self.redo())
 
     def _create_menu(self):
         menu_frame = ctk.CTkFrame(self.root, height=40)
@@ -58,11 +86,15 @@ class FinanceApp:
 
         menu_items = [
             ("➕ Добавить операцию", self.open_add_transaction),
+            ("↶ Отменить", self.undo),
+            ("↷ Повторить", self.redo),
             ("📊 Аналитика", self.open_analytics),
             ("🗂️ Категории", self.open_categories),
             ("💰 Бюджеты", self.open_budgets),
+            ("🔁 Повторяющиеся", self.open_recurring),
             ("⚙️ Настройки", self.open_settings),
             ("📤 Экспорт", self.export_data),
+            ("🩺 Диагностика", self.open_diagnostics),
             ("ℹ️ О программе", self.show_about)
         ]
 
@@ -113,7 +145,9 @@ class FinanceApp:
             content_frame,
             controller=self.controller,
             on_delete=self.delete_transaction,
-            on_edit=self.edit_transaction
+            on_edit=self.edit_transaction,
+            on_bulk_edit=self.bulk_edit_transactions,
+            on_manage_filters=self.open_saved_filters
         )
         self.transactions_frame.grid(
             row=0, column=0,
@@ -147,13 +181,15 @@ class FinanceApp:
     def update_ui(self):
         """Обновление всего интерфейса"""
         try:
-            if hasattr(self, 'balance_frame'):
-                self.balance_frame.refresh()
-            if hasattr(self, 'transactions_frame'):
-                self.transactions_frame.refresh()
-            if hasattr(self, 'charts_frame'):
-                self.charts_frame.refresh()
+            with metrics.measure("FinanceApp.update_ui"):
+                if hasattr(self, 'balance_frame'):
+                    self.balance_frame.refresh()
+                if hasattr(self, 'transactions_frame'):
+                    self.transactions_frame.refresh()
+                if hasattr(self, 'charts_frame'):
+                    self.charts_frame.refresh()
         except Exception as e:
+            metrics.increment("errors.update_ui")
             print(f"Ошибка обновления UI: {e}")
             import traceback
             traceback.print_exc()
@@ -180,12 +216,34 @@ class FinanceApp:
     def _handle_transaction_save(self, transaction):
         """Обработка сохранения транзакции"""
         try:
-            self.controller.add_transaction(transaction)
+            reasons = self.controller.add_transaction(transaction)
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось сохранить транзакцию: {str(e)}")
+            return
+
+        self._warn_anomaly(reasons)
+
+    def _warn_anomaly(self, reasons):
+        """Предупреждение о необычном расходе"""
+        messages = {
+            AMOUNT: "сумма заметно больше обычной для этой категории",
+            WEEK: "расходы за эту неделю заметно выше обычного",
+        }
+        if reasons:
+            text = "\n".join(f"• {messages[r]}" for r in reasons if r in messages)
+            messagebox.showwarning("Необычный расход", f"Операция сохранена, но:\n{text}")
+
+    def delete_transaction(self, transaction_id):
+        """Удаление транзакции (или списка транзакций одной операцией)"""
+        if isinstance(transaction_id, (list, tuple)):
+            if messagebox.askyesno("Подтверждение", f"Удалить выбранные операции ({len(transaction_id)})?"):
+                try:
+                    removed = self.controller.delete_transactions(transaction_id)
+                    messagebox.showinfo("Успех", f"Удалено операций: {removed}")
+                except Exception as e:
+                    messagebox.showerror("Ошибка", f"Не удалось удалить транзакции: {str(e)}")
+            return
 
-    def delete_transaction(self, transaction_id: str):
-        """Удаление транзакции"""
         if messagebox.askyesno("Подтверждение", "Удалить выбранную операцию?"):
             try:
                 self.controller.delete_transaction(transaction_id)
@@ -193,17 +251,36 @@ class FinanceApp:
             except Exception as e:
                 messagebox.showerror("Ошибка", f"Не удалось удалить транзакцию: {str(e)}")
 
+    def bulk_edit_transactions(self, transaction_ids):
+        """Открытие окна массового изменения"""
+        try:
+            window = BulkEditWindow(
+                self.root,
+                controller=self.controller,
+                transaction_ids=transaction_ids,
+                on_apply=self._handle_bulk_edit
+            )
+            window.transient(self.root)
+            window.grab_set()
+            self.root.wait_window(window)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось открыть окно: {str(e)}")
+
+    def _handle_bulk_edit(self, transaction_ids, changes):
+        """Применение массового изменения"""
+        try:
+            changed = self.controller.edit_transactions(transaction_ids, **changes)
+            self._show_status(f"Изменено операций: {changed}")
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось изменить транзакции: {str(e)}")
+
     def edit_transaction(self):
         """Редактирование транзакции"""
         try:
             transaction_id = self.transactions_frame.get_selected_transaction_id()
             if transaction_id:
                 # Находим транзакцию
-                transaction = None
-                for t in self.db.transactions:
-                    if t.id == transaction_id:
-                        transaction = t
-                        break
+                transaction = self.db.get_transaction(transaction_id)
 
                 if transaction:
                     window = AddTransactionWindow(
@@ -236,7 +313,7 @@ class FinanceApp:
         try:
             window = AnalyticsWindow(
                 self.root,
-                transactions=self.db.transactions
+                analytics=self.controller.analytics
             )
             window.transient(self.root)
             window.grab_set()
@@ -252,7 +329,8 @@ class FinanceApp:
             window = CategoriesWindow(
                 self.root,
                 categories=self.db.categories,  # Теперь передаем объекты Category
-                on_update_categories=self._handle_categories_update
+                on_update_categories=self._handle_categories_update,
+                on_rename_category=self._handle_category_rename
             )
             window.transient(self.root)
             window.grab_set()
@@ -265,19 +343,29 @@ class FinanceApp:
     def _handle_categories_update(self, categories):
         """Обработка обновления категорий"""
         try:
-            self.db.save_categories(categories)
-            self.controller.notify_update()  # Уведомляем об обновлении
+            self.controller.save_category_objects(categories)
             messagebox.showinfo("Успех", "Категории обновлены")
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось сохранить категории: {str(e)}")
 
+    def _handle_category_rename(self, old_name, new_name):
+        """Переименование/объединение категории; возвращает новый список категорий"""
+        try:
+            moved = self.controller.rename_category(old_name, new_name)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось переименовать категорию: {str(e)}")
+            return None
+        self._show_status(f"Перенесено операций: {moved}")
+        return self.controller.get_category_objects()
+
     def open_budgets(self):
         """Открытие окна бюджетов"""
         try:
             window = BudgetsWindow(
                 self.root,
                 budgets=self.db.budgets,
-                on_update_budgets=self._handle_budgets_update
+                on_update_budgets=self._handle_budgets_update,
+                spent_of=self.controller.analytics.budget_spent
             )
             window.transient(self.root)
             window.grab_set()
@@ -297,6 +385,55 @@ class FinanceApp:
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось сохранить бюджеты: {str(e)}")
 
+    def _post_due_recurring(self):
+        """Проведение наступивших повторяющихся операций"""
+        try:
+            posted = self.controller.post_due_recurring()
+            if posted:
+                print(f"Проведено повторяющихся операций: {posted}")
+        except Exception as e:
+            print(f"Ошибка проведения повторяющихся операций: {e}")
+
+    def open_recurring(self):
+        """Открытие окна повторяющихся операций"""
+        try:
+            window = RecurringWindow(
+                self.root,
+                rules=self.db.recurring_rules,
+                categories=[cat.name for cat in self.db.categories],
+                currency=self.db.reporting_currency,
+                on_update_rules=self._handle_recurring_update
+            )
+            window.transient(self.root)
+            window.grab_set()
+            self.root.wait_window(window)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось открыть повторяющиеся операции: {str(e)}")
+            import traceback
+            traceback.print_exc()
+
+    def _handle_recurring_update(self, rules):
+        """Обработка обновления повторяющихся операций"""
+        try:
+            self.db.recurring_rules = rules
+            self.db.save_recurring_rules()
+            self.controller.post_due_recurring()
+            self.controller.notify_update()
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить повторяющиеся операции: {str(e)}")
+
+    def open_saved_filters(self):
+        """Открытие окна сохраненных фильтров"""
+        try:
+            window = SavedFiltersWindow(self.root, self.controller)
+            window.transient(self.root)
+            window.grab_set()
+            self.root.wait_window(window)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось открыть сохраненные фильтры: {str(e)}")
+            import traceback
+            traceback.print_exc()
+
     def open_settings(self):
         """Открытие окна настроек"""
         try:
@@ -330,6 +467,18 @@ class FinanceApp:
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось сохранить настройки: {str(e)}")
 
+    def open_diagnostics(self):
+        """Открытие окна диагностики"""
+        try:
+            window = DiagnosticsWindow(self.root)
+            window.transient(self.root)
+            window.grab_set()
+            self.root.wait_window(window)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось открыть диагностику: {str(e)}")
+            import traceback
+            traceback.print_exc()
+
     def quick_add_income(self):
         """Быстрое добавление дохода"""
         self._quick_add("income")
@@ -348,8 +497,8 @@ class FinanceApp:
         amount = dialog.get_input()
         if amount:
             try:
-                amount_float = float(amount.replace(',', '.'))
-                if amount_float <= 0:
+                amount_minor = to_minor(amount)
+                if amount_minor <= 0:
                     raise ValueError("Сумма должна быть положительной")
 
                 # Получаем категории соответствующего типа
@@ -361,15 +510,20 @@ class FinanceApp:
                 if not categories:
                     categories = ["Прочее"]
 
+                # Самая частая категория типа по истории
+                category = self.controller.suggest_category("", transaction_type) or categories[0]
+
                 transaction = Transaction(
                     type=transaction_type,
-                    category=categories[0],
-                    amount=amount_float,
+                    category=category,
+                    amount_minor=amount_minor,
+                    currency=self.db.reporting_currency,
                     description="Быстрое добавление"
                 )
 
-                self.controller.add_transaction(transaction)
+                reasons = self.controller.add_transaction(transaction)
                 messagebox.showinfo("Успех", "Операция добавлена")
+                self._warn_anomaly(reasons)
 
             except ValueError as e:
                 messagebox.showerror("Ошибка", str(e))
@@ -393,7 +547,10 @@ class FinanceApp:
                     'Тип': 'Доход' if transaction.type == 'income' else 'Расход',
                     'Категория': transaction.category,
                     'Сумма': transaction.amount,
-                    'Описание': transaction.description
+                    'Валюта': transaction.currency,
+                    'Описание': transaction.description,
+                    'Теги': ", ".join(transaction.tags),
+                    'Разбивка': format_splits(transaction)
                 })
 
             if not data:
@@ -408,7 +565,7 @@ class FinanceApp:
             with pd.ExcelWriter(filename, engine='openpyxl') as writer:
                 df.to_excel(writer, sheet_name='Все операции', index=False)
 
-                summary = df.groupby(['Тип', 'Категория'])['Сумма'].sum().reset_index()
+                summary = category_summary(self.db.transactions)
                 summary.to_excel(writer, sheet_name='Сводка', index=False)
 
             messagebox.showinfo("Успех", f"Отчет сохранен в файл:\n{filename}")
@@ -443,11 +600,17 @@ class FinanceApp:
                 return
 
             if export_type == "1":
-                self._export_json()
-            elif export_type == "2":
-                self._export_excel()
-            elif export_type == "3":
-                self._export_csv()
+                self._export_in_background(self._write_json, "Данные экспортированы в JSON")
+            elif export_type in ("2", "3"):
+                select = self._transactions_for_export()
+                if select is None:
+                    return
+                if export_type == "2":
+                    self._export_in_background(lambda snapshot: self._write_excel(select(snapshot)),
+                                               "Транзакции экспортированы в Excel")
+                else:
+                    self._export_in_background(lambda snapshot: self._write_csv(select(snapshot)),
+                                               "Транзакции экспортированы в CSV")
             else:
                 messagebox.showerror("Ошибка", "Выберите 1, 2 или 3")
 
@@ -455,113 +618,161 @@ class FinanceApp:
             messagebox.showerror("Ошибка", f"Не удалось экспортировать данные: {str(e)}")
             print(f"Ошибка экспорта: {e}")
 
-    def _export_json(self):
-        """Экспорт в JSON"""
-        try:
-            data = {
-                'transactions': [t.to_dict() for t in self.db.transactions],
-                'budgets': [{
-                    'category': b.category,
-                    'limit': b.limit,
-                    'period': b.period,
-                    'spent': getattr(b, 'spent', 0),
-                    'type': getattr(b, 'type', 'expense')
-                } for b in self.db.budgets] if hasattr(self.db, 'budgets') else [],
-                'settings': self.db.settings.to_dict() if hasattr(self.db, 'settings') else {},
-                'categories': [cat.to_dict() for cat in self.db.categories] if hasattr(self.db, 'categories') else [],
-                'export_date': datetime.now().isoformat(),
-                'app_version': '1.0.0'
-            }
-
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"finance_backup_{timestamp}.json"
+    def _transactions_for_export(self):
+        """Выбор транзакций для экспорта с необязательным фильтром (None - отмена)
 
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
-
-            messagebox.showinfo("Экспорт", f"✅ Данные экспортированы в JSON:\n{filename}")
-
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Ошибка экспорта в JSON: {str(e)}")
-
-    def _export_excel(self):
-        """Экспорт транзакций в Excel"""
+        Название сохраненного фильтра берет его готовый результат, иначе
+        ввод считается запросом тегов. Возвращает функцию снимок -> операции:
+        сам отбор выполняется в фоновом потоке.
+        """
+        dialog = ctk.CTkInputDialog(
+            text="Фильтр по тегам или название сохраненного фильтра\n(пусто - все операции):\n"
+                 "например: отпуск AND NOT возмещено",
+            title="Экспорт данных"
+        )
+        query = dialog.get_input()
+        if query is None:
+            return None
+        saved = next((f for f in self.controller.get_saved_filters()
+                      if f.name.lower() == query.strip().lower()), None)
+        if saved:
+            ids = self.controller.get_filter_view(saved.id).ids()
+            return lambda snapshot: snapshot.get_transactions_by_ids(ids)
         try:
-            if not self.db.transactions:
-                messagebox.showwarning("Внимание", "Нет транзакций для экспорта")
-                return
-
-            # Подготовка данных
-            data = []
-            for transaction in self.db.transactions:
-                data.append({
-                    'ID': transaction.id,
-                    'Дата': transaction.date,
-                    'Тип': 'Доход' if transaction.type == 'income' else 'Расход',
-                    'Категория': transaction.category,
-                    'Сумма': transaction.amount,
-                    'Валюта': 'RUB',
-                    'Описание': transaction.description
-                })
-
-            df = pd.DataFrame(data)
-
-            # Создание имени файла
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"transactions_{timestamp}.xlsx"
-
-            # Сохранение в Excel
-            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='Транзакции', index=False)
-
-                # Добавляем сводку
-                summary = df.groupby(['Тип', 'Категория'])['Сумма'].sum().reset_index()
-                summary.to_excel(writer, sheet_name='Сводка', index=False)
-
-                # Добавляем статистику по месяцам
-                df['Дата'] = pd.to_datetime(df['Дата'], errors='coerce')
-                df['Месяц'] = df['Дата'].dt.strftime('%Y-%m')
-                monthly_stats = df.groupby(['Месяц', 'Тип'])['Сумма'].sum().unstack(fill_value=0)
-                monthly_stats.to_excel(writer, sheet_name='По месяцам')
-
-            messagebox.showinfo("Экспорт", f"✅ Транзакции экспортированы в Excel:\n{filename}")
-
+            parse_tag_query(query)
+        except ValueError as e:
+            messagebox.showerror("Ошибка", f"Некорректный фильтр тегов: {e}")
+            return None
+        if not query.strip():
+            return lambda snapshot: snapshot.transactions
+        return lambda snapshot: snapshot.filter_transactions(query)
+
+    def _export_in_background(self, write, done_text: str):
+        """Запись файла экспорта в фоновом потоке
+
+        Поток читает снимок базы, поэтому операции можно менять, пока файл
+        пишется. write(снимок) возвращает имя файла (None - нечего выгружать).
+        """
+        if self._export_executor is None:
+            self._export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+        future = self._export_executor.submit(write, self.db.snapshot())
+        self._show_status("Экспорт...")
+        self._wait_export(future, done_text)
+
+    def _wait_export(self, future, done_text: str):
+        """Итог экспорта (опрос из цикла событий: Tk нельзя вызывать из потока)"""
+        if not future.done():
+            self.root.after(100, self._wait_export, future, done_text)
+            return
+        try:
+            filename = future.result()
         except ImportError:
             messagebox.showerror("Ошибка",
                                  "Для экспорта в Excel установите:\n"
                                  "pip install pandas openpyxl")
+            return
         except Exception as e:
-            messagebox.showerror("Ошибка", f"Ошибка экспорта в Excel: {str(e)}")
+            messagebox.showerror("Ошибка", f"Ошибка экспорта: {str(e)}")
+            return
+        if filename is None:
+            messagebox.showwarning("Внимание", "Нет транзакций для экспорта")
+        else:
+            messagebox.showinfo("Экспорт", f"✅ {done_text}:\n{filename}")
 
-    def _export_csv(self):
-        """Экспорт транзакций в CSV"""
-        try:
-            if not self.db.transactions:
-                messagebox.showwarning("Внимание", "Нет транзакций для экспорта")
-                return
+    @staticmethod
+    def _write_json(snapshot) -> str:
+        """Экспорт всех данных снимка в JSON"""
+        data = {
+            'transactions': [t.to_dict() for t in snapshot.transactions],
+            'budgets': [{
+                'category': b.category,
+                'limit': b.limit,
+                'period': b.period,
+                'spent': getattr(b, 'spent', 0),
+                'type': getattr(b, 'type', 'expense')
+            } for b in snapshot.budgets],
+            'settings': snapshot.settings.to_dict(),
+            'categories': [cat.to_dict() for cat in snapshot.categories],
+            'export_date': datetime.now().isoformat(),
+            'app_version': '1.0.0'
+        }
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"finance_backup_{timestamp}.json"
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+        return filename
 
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"transactions_{timestamp}.csv"
+    @staticmethod
+    def _write_excel(transactions):
+        """Экспорт транзакций в Excel"""
+        if not transactions:
+            return None
+
+        # Подготовка данных
+        data = []
+        for transaction in transactions:
+            data.append({
+                'ID': transaction.id,
+                'Дата': transaction.date,
+                'Тип': 'Доход' if transaction.type == 'income' else 'Расход',
+                'Категория': transaction.category,
+                'Сумма': transaction.amount,
+                'Валюта': transaction.currency,
+                'Описание': transaction.description,
+                'Теги': ", ".join(transaction.tags),
+                'Разбивка': format_splits(transaction)
+            })
+
+        df = pd.DataFrame(data)
+
+        # Создание имени файла
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"transactions_{timestamp}.xlsx"
+
+        # Сохранение в Excel
+        with pd.ExcelWriter(filename, engine='openpyxl') as writer:
+            df.to_excel(writer, sheet_name='Транзакции', index=False)
+
+            # Добавляем сводку (операции с разбивкой - по частям)
+            summary = category_summary(transactions)
+            summary.to_excel(writer, sheet_name='Сводка', index=False)
+
+            # Добавляем статистику по месяцам
+            df['Дата'] = pd.to_datetime(df['Дата'], errors='coerce')
+            df['Месяц'] = df['Дата'].dt.strftime('%Y-%m')
+            monthly_stats = df.groupby(['Месяц', 'Валюта', 'Тип'])['Сумма'].sum().unstack(fill_value=0)
+            monthly_stats.to_excel(writer, sheet_name='По месяцам')
+        return filename
 
-            with open(filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                fieldnames = ['ID', 'Дата', 'Тип', 'Категория', 'Сумма', 'Описание']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+    @staticmethod
+    def _write_csv(transactions):
+        """Экспорт транзакций в CSV"""
+        if not transactions:
+            return None
 
-                writer.writeheader()
-                for transaction in self.db.transactions:
-                    writer.writerow({
-                        'ID': transaction.id,
-                        'Дата': transaction.date,
-                        'Тип': 'Доход' if transaction.type == 'income' else 'Расход',
-                        'Категория': transaction.category,
-                        'Сумма': transaction.amount,
-                        'Описание': transaction.description
-                    })
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"transactions_{timestamp}.csv"
 
-            messagebox.showinfo("Экспорт", f"✅ Транзакции экспортированы в CSV:\n{filename}")
+        with open(filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
+            fieldnames = ['ID', 'Дата', 'Тип', 'Категория', 'Сумма', 'Валюта', 'Описание', 'Теги', 'Разбивка']
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
 
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Ошибка экспорта в CSV: {str(e)}")
+            writer.writeheader()
+            for transaction in transactions:
+                writer.writerow({
+                    'ID': transaction.id,
+                    'Дата': transaction.date,
+                    'Тип': 'Доход' if transaction.type == 'income' else 'Расход',
+                    'Категория': transaction.category,
+                    'Сумма': transaction.amount,
+                    'Валюта': transaction.currency,
+                    'Описание': transaction.description,
+                    'Теги': ", ".join(transaction.tags),
+                    'Разбивка': format_splits(transaction)
+                })
+        return filename
 
     @staticmethod
     def show_about():
@@ -586,6 +797,29 @@ class FinanceApp:
 
         messagebox.showinfo("О программе", about_text)
 
+    def undo(self):
+        """Отмена последнего действия"""
+        try:
+            description = self.controller.undo()
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось отменить действие: {str(e)}")
+            return
+        self._show_status(f"Отменено: {description}" if description else "Нечего отменять")
+
+    def redo(self):
+        """Повтор отмененного действия"""
+        try:
+            description = self.controller.redo()
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось повторить действие: {str(e)}")
+            return
+        self._show_status(f"Повторено: {description}" if description else "Нечего повторять")
+
+    def _show_status(self, text: str):
+        """Короткое сообщение в заголовке окна"""
+        self.root.title(f"Personal Finance Manager — {text}")
+        self.root.after(3000, lambda: self.root.title("Personal Finance Manager"))
+
     def on_closing(self):
         """Обработка закрытия приложения"""
         if messagebox.askokcancel("Выход", "Вы уверены, что хотите выйти?"):
@@ -595,8 +829,10 @@ class FinanceApp:
                     self.db.save_all()
                 self.root.destroy()
             except Exception as e:
-                messagebox.showerror("Ошибка", f"Ошибка при сохранении данных: {str(e)}")
-                self.root.destroy()
+                # Несохраненные правки пропадут при выходе - решает пользователь
+                if messagebox.askyesno("Ошибка", f"Ошибка при сохранении данных: {str(e)}\n\n"
+                                                 "Выйти без сохранения?"):
+                    self.root.destroy()
 
     def run(self):
         """Запуск приложения"""
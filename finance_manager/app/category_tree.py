@@ -0,0 +1,115 @@
+"""
+Иерархия категорий
+
+Категория может ссылаться на родителя (Транспорт -> Такси / Бензин).
+Итоги по дереву получаются из сумм листьев (строк помесячных агрегатов)
+подъемом по уровням снизу вверх: O(узлов), без повторного просмотра
+операций. Категории операций, которых нет в справочнике, считаются
+корнями; ссылки на неизвестного родителя и циклы игнорируются.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .models import Category
+
+
+class CategoryTree:
+    """Дерево категорий с подъемом сумм от листьев к корням"""
+
+    def __init__(self, categories: Sequence[Category], extra_names: Iterable[str] = ()):
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        for name in [c.name for c in categories] + list(extra_names):
+            if name and name not in self.index:
+                self.index[name] = len(self.names)
+                self.names.append(name)
+
+        declared = {c.name: c.parent for c in categories if c.parent}
+        self.parents = np.full(len(self.names), -1, dtype=np.int64)
+        for name, parent in declared.items():
+            if parent in self.index and parent != name:
+                self.parents[self.index[name]] = self.index[parent]
+        self._break_cycles()
+
+        self.depths = np.zeros(len(self.names), dtype=np.int64)
+        for node in range(len(self.names)):
+            self.depths[node] = self._depth(node)
+        # Уровни снизу вверх (без корней) для подъема сумм
+        self._levels = [np.flatnonzero(self.depths == depth)
+                        for depth in range(int(self.depths.max(initial=0)), 0, -1)]
+        self._children: Dict[int, List[int]] = {}
+        for node, parent in enumerate(self.parents):
+            self._children.setdefault(int(parent), []).append(node)
+
+    def _break_cycles(self):
+        """Узел, замыкающий цикл, становится корнем"""
+        state = np.zeros(len(self.names), dtype=np.int8)  # 0 - не виден, 1 - на пути, 2 - проверен
+        for start in range(len(self.names)):
+            path, node = [], start
+            while node >= 0 and state[node] == 0:
+                state[node] = 1
+                path.append(node)
+                node = int(self.parents[node])
+            if node >= 0 and state[node] == 1:
+                self.parents[node] = -1
+            state[path] = 2
+
+    def _depth(self, node: int) -> int:
+        depth = 0
+        while self.parents[node] >= 0:
+            node = int(self.parents[node])
+            depth += 1
+        return depth
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def parent(self, name: str) -> Optional[str]:
+        node = self.index.get(name)
+        if node is None or self.parents[node] < 0:
+            return None
+        return self.names[self.parents[node]]
+
+    def children(self, name: str = None) -> List[str]:
+        """Дочерние категории (None - корни)"""
+        node = -1 if name is None else self.index.get(name)
+        if node is None:
+            return []
+        return [self.names[child] for child in self._children.get(node, [])]
+
+    def path(self, name: str) -> List[str]:
+        """Цепочка от корня до категории"""
+        result = []
+        while name is not None:
+            result.append(name)
+            name = self.parent(name)
+        return result[::-1]
+
+    def descendants(self, name: str) -> List[str]:
+        """Все потомки категории"""
+        result, stack = [], list(self.children(name))
+        while stack:
+            child = stack.pop()
+            result.append(child)
+            stack.extend(self.children(child))
+        return result
+
+    def node_values(self, values: np.ndarray, category_names: Sequence[str]) -> np.ndarray:
+        """Собственные суммы узлов из сумм по кодам категорий (строки - коды)"""
+        values = np.asarray(values)
+        result = np.zeros((len(self.names),) + values.shape[1:], dtype=values.dtype)
+        codes = [code for code, name in enumerate(category_names[:len(values)]) if name in self.index]
+        if codes:
+            np.add.at(result, [self.index[category_names[c]] for c in codes], values[codes])
+        return result
+
+    def rollup(self, own: np.ndarray) -> np.ndarray:
+        """Итоги поддеревьев: собственные суммы, поднятые по уровням к корням"""
+        totals = np.array(own, copy=True)
+        for nodes in self._levels:
+            np.add.at(totals, self.parents[nodes], totals[nodes])
+        return totals
@@ -0,0 +1,189 @@
+"""
+Автоматическое определение категории по описанию
+
+Наивный байесовский классификатор (мультиномиальный) на хэшированных
+токенах: слова описания и их префиксы (для ввода "на лету") хэшируются в
+фиксированное число признаков, поэтому словарь не хранится и не растет.
+Классы - пары (тип операции, категория). Модель - матрица счетчиков
+класс x признак: обучение на одной операции - O(токенов), удаление -
+то же с обратным знаком, предсказание - O(токенов x классов).
+"""
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+N_FEATURES = 1 << 14
+ALPHA = 1.0
+PREFIX_LENGTH = 4
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Слова в нижнем регистре и их префиксы (без цифр)"""
+    tokens = []
+    for word in _TOKEN_RE.findall((text or "").lower()):
+        if word.isdigit():
+            continue
+        tokens.append(word)
+        if len(word) > PREFIX_LENGTH:
+            tokens.append(word[:PREFIX_LENGTH] + "*")
+    return tokens
+
+
+def hash_tokens(text: str, n_features: int = N_FEATURES) -> np.ndarray:
+    """Индексы признаков токенов описания (crc32 стабилен между запусками)"""
+    return np.array([zlib.crc32(token.encode("utf-8")) % n_features for token in tokenize(text)],
+                    dtype=np.int64)
+
+
+class CategoryClassifier:
+    """Наивный Байес по описаниям с дообучением"""
+
+    def __init__(self, n_features: int = N_FEATURES, alpha: float = ALPHA):
+        self.n_features = n_features
+        self.alpha = alpha
+        self._classes: Dict[Tuple[str, str], int] = {}
+        self._labels: List[Tuple[str, str]] = []
+        self._feature_counts = np.zeros((0, n_features), dtype=np.int64)
+        self._token_totals = np.zeros(0, dtype=np.int64)
+        self._doc_counts = np.zeros(0, dtype=np.int64)
+        self._log_likelihood = None  # кэш для пакетного предсказания
+
+    def __len__(self) -> int:
+        """Количество операций в обучении"""
+        return int(self._doc_counts.sum())
+
+    def _class(self, t_type: str, category: str) -> int:
+        key = (t_type, category)
+        code = self._classes.get(key)
+        if code is None:
+            code = self._classes[key] = len(self._labels)
+            self._labels.append(key)
+            if code >= len(self._doc_counts):
+                grow = max(8, len(self._doc_counts))
+                self._feature_counts = np.pad(self._feature_counts, ((0, grow), (0, 0)))
+                self._token_totals = np.pad(self._token_totals, (0, grow))
+                self._doc_counts = np.pad(self._doc_counts, (0, grow))
+        return code
+
+    # Обучение
+
+    def fit(self, descriptions: Sequence[str], types: Sequence[str], categories: Sequence[str]):
+        """Обучение с нуля по истории одним проходом bincount"""
+        self.__init__(self.n_features, self.alpha)
+        codes = np.array([self._class(t, c) for t, c in zip(types, categories)], dtype=np.int64)
+        features = [hash_tokens(text, self.n_features) for text in descriptions]
+        lengths = np.array([len(f) for f in features], dtype=np.int64)
+
+        n_classes = len(self._doc_counts)
+        cells = np.repeat(codes, lengths) * self.n_features
+        if len(cells):
+            cells += np.concatenate(features)
+        self._feature_counts = np.bincount(cells, minlength=n_classes * self.n_features) \
+            .reshape(n_classes, self.n_features)
+        self._token_totals = np.bincount(codes, weights=lengths, minlength=n_classes).astype(np.int64)
+        self._doc_counts = np.bincount(codes, minlength=n_classes)
+
+    def learn(self, description: str, t_type: str, category: str, weight: int = 1):
+        """Учет одной операции (weight=-1 - исключение из обучения)"""
+        code = self._class(t_type, category)
+        features = hash_tokens(description, self.n_features)
+        if weight < 0 and self._doc_counts[code] <= 0:
+            return
+        np.add.at(self._feature_counts[code], features, weight)
+        self._token_totals[code] += weight * len(features)
+        self._doc_counts[code] += weight
+        self._log_likelihood = None
+
+    def forget(self, description: str, t_type: str, category: str):
+        """Исключение удаленной операции"""
+        self.learn(description, t_type, category, -1)
+
+    def move_category(self, source: str, target: str):
+        """Перенос обучения категории в другую (переименование, объединение)"""
+        for t_type, category in list(self._labels):
+            if category != source:
+                continue
+            code, target_code = self._classes[(t_type, source)], self._class(t_type, target)
+            self._feature_counts[target_code] += self._feature_counts[code]
+            self._token_totals[target_code] += self._token_totals[code]
+            self._doc_counts[target_code] += self._doc_counts[code]
+            self._feature_counts[code] = 0
+            self._token_totals[code] = 0
+            self._doc_counts[code] = 0
+        self._log_likelihood = None
+
+    # Предсказание
+
+    def _log_prior(self) -> np.ndarray:
+        return np.log(self._doc_counts + self.alpha)
+
+    def _log_norm(self) -> np.ndarray:
+        return np.log(self._token_totals + self.alpha * self.n_features)
+
+    def _type_mask(self, t_type: Optional[str]) -> np.ndarray:
+        n = len(self._doc_counts)
+        mask = np.zeros(n, dtype=bool)
+        mask[:len(self._labels)] = [t_type is None or label[0] == t_type for label in self._labels]
+        return mask & (self._doc_counts > 0)
+
+    def prior(self, t_type: str = None) -> Optional[str]:
+        """Самая частая категория типа (для ввода без описания)"""
+        mask = self._type_mask(t_type)
+        if not mask.any():
+            return None
+        return self._labels[int(np.argmax(np.where(mask, self._doc_counts, -1)))][1]
+
+    def predict_proba(self, description: str, t_type: str = None) -> List[Tuple[str, float]]:
+        """Категории типа с вероятностями по убыванию"""
+        mask = self._type_mask(t_type)
+        if not mask.any():
+            return []
+        classes = np.flatnonzero(mask)
+        features = hash_tokens(description, self.n_features)
+        counts = self._feature_counts[np.ix_(classes, features)]
+        scores = (self._log_prior()[classes]
+                  + np.log(counts + self.alpha).sum(axis=1)
+                  - len(features) * self._log_norm()[classes])
+        probs = np.exp(scores - scores.max())
+        probs /= probs.sum()
+        order = np.argsort(-probs)
+        return [(self._labels[classes[i]][1], float(probs[i])) for i in order]
+
+    def predict(self, description: str, t_type: str = None) -> Optional[str]:
+        """Наиболее вероятная категория (без описания - самая частая)"""
+        if not hash_tokens(description, self.n_features).size:
+            return self.prior(t_type)
+        ranked = self.predict_proba(description, t_type)
+        return ranked[0][0] if ranked else None
+
+    def predict_batch(self, descriptions: Sequence[str], types: Sequence[str]) -> List[Optional[str]]:
+        """Категории для набора операций одним векторным проходом"""
+        n_docs = len(descriptions)
+        if not n_docs or not len(self._labels):
+            return [None] * n_docs
+
+        if self._log_likelihood is None:
+            self._log_likelihood = np.log(self._feature_counts + self.alpha)
+        features = [hash_tokens(text, self.n_features) for text in descriptions]
+        lengths = np.array([len(f) for f in features], dtype=np.int64)
+        flat = np.concatenate(features) if lengths.sum() else np.zeros(0, dtype=np.int64)
+
+        # Сумма log-правдоподобий токенов каждого документа: классы x документы
+        doc_index = np.repeat(np.arange(n_docs), lengths)
+        scores = np.zeros((len(self._doc_counts), n_docs))
+        for code in range(len(self._labels)):
+            scores[code] = np.bincount(doc_index, weights=self._log_likelihood[code, flat], minlength=n_docs)
+        scores += self._log_prior()[:, None] - lengths[None, :] * self._log_norm()[:, None]
+
+        type_names = sorted({label[0] for label in self._labels} | set(types))
+        type_codes = np.array([type_names.index(t) for t in types], dtype=np.int64)
+        allowed = np.column_stack([self._type_mask(name) for name in type_names])
+        scores[~allowed[:, type_codes]] = -np.inf
+
+        best = np.argmax(scores, axis=0)
+        valid = np.isfinite(scores[best, np.arange(n_docs)])
+        return [self._labels[b][1] if ok else None for b, ok in zip(best, valid)]
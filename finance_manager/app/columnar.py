@@ -0,0 +1,240 @@
+"""
+Колоночное представление транзакций для векторных расчетов
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .models import Transaction, TransactionType
+from .tags import TagIndex
+
+
+def parse_dates(date_strings: List[str]) -> np.ndarray:
+    """Разбор дат транзакций в datetime64[s] (некорректные даты -> NaT)"""
+    try:
+        return np.array(date_strings, dtype='datetime64[s]')
+    except ValueError:
+        result = np.empty(len(date_strings), dtype='datetime64[s]')
+        for i, value in enumerate(date_strings):
+            try:
+                result[i] = np.datetime64(value, 's')
+            except ValueError:
+                result[i] = np.datetime64('NaT')
+        return result
+
+
+class LedgerColumns:
+    """Массивы по строкам учета транзакций, отсортированные по дате
+
+    Операция без разбивки - одна строка; с разбивкой - по строке на часть
+    (и на остаток), строки одной операции идут подряд. Суммы строк в
+    итоге равны сумме операции, поэтому агрегаты не считают ее дважды.
+
+    dates      - datetime64[s]
+    amounts    - суммы в копейках, int64 (всегда положительные)
+    signed     - суммы в копейках со знаком (доход +, расход -)
+    is_income  - признак дохода
+    categories - коды категорий (индексы в общем словаре категорий)
+    currencies - коды валют (индексы в общем словаре валют)
+    secondary  - вторая и следующие строки разбивки (операции считаются по ~secondary)
+    tags       - битовые карты тегов (TagIndex), у всех строк операции одинаковые
+    rows       - номера транзакций в исходном списке (только у колонок одной партиции)
+    """
+
+    def __init__(self, dates: np.ndarray, amounts: np.ndarray,
+                 is_income: np.ndarray, categories: np.ndarray, currencies: np.ndarray,
+                 tags: TagIndex = None, rows: Optional[np.ndarray] = None,
+                 secondary: Optional[np.ndarray] = None):
+        self.dates = dates
+        self.amounts = amounts
+        self.is_income = is_income
+        self.categories = categories
+        self.currencies = currencies
+        self.secondary = secondary if secondary is not None else np.zeros(len(dates), dtype=bool)
+        self.tags = tags if tags is not None else TagIndex(len(dates))
+        self.rows = rows
+        self.signed = np.where(is_income, amounts, -amounts)
+        self._cumulative = None
+
+    def __len__(self):
+        return len(self.dates)
+
+    def transaction_count(self) -> int:
+        """Количество операций (строки разбивки одной операции - одна)"""
+        return len(self) - int(self.secondary.sum())
+
+    @classmethod
+    def empty(cls) -> 'LedgerColumns':
+        return cls(
+            np.empty(0, dtype='datetime64[s]'),
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=bool),
+            np.empty(0, dtype=np.int32),
+            np.empty(0, dtype=np.int16),
+        )
+
+    @classmethod
+    def from_transactions(cls, transactions: List[Transaction], category_codes: Dict[str, int],
+                          currency_codes: Dict[str, int]) -> 'LedgerColumns':
+        """Построение колонок; транзакции с некорректной датой пропускаются"""
+        if not transactions:
+            return cls.empty()
+
+        dates = parse_dates([t.date for t in transactions])
+        amounts = np.fromiter((t.amount_minor for t in transactions), dtype=np.int64,
+                              count=len(transactions))
+        income_value = TransactionType.INCOME.value
+        is_income = np.fromiter((t.type == income_value for t in transactions), dtype=bool,
+                                count=len(transactions))
+        categories = np.fromiter(
+            (category_codes.setdefault(t.category, len(category_codes)) for t in transactions),
+            dtype=np.int32, count=len(transactions)
+        )
+        currencies = np.fromiter(
+            (currency_codes.setdefault(t.currency, len(currency_codes)) for t in transactions),
+            dtype=np.int16, count=len(transactions)
+        )
+        source = np.arange(len(transactions))
+        secondary = np.zeros(len(transactions), dtype=bool)
+
+        split = [i for i, t in enumerate(transactions) if t.splits]
+        if split:
+            # Первая строка разбивки - на месте операции, остальные - в конец
+            extra_source, extra_amounts, extra_categories = [], [], []
+            for i in split:
+                lines = transactions[i].lines()
+                categories[i] = category_codes.setdefault(lines[0][0], len(category_codes))
+                amounts[i] = lines[0][1]
+                for category, amount in lines[1:]:
+                    extra_source.append(i)
+                    extra_amounts.append(amount)
+                    extra_categories.append(category_codes.setdefault(category, len(category_codes)))
+            extra_source = np.array(extra_source, dtype=np.int64)
+            source = np.concatenate((source, extra_source))
+            dates = dates[source]
+            amounts = np.concatenate((amounts, np.array(extra_amounts, dtype=np.int64)))
+            is_income = is_income[source]
+            categories = np.concatenate((categories, np.array(extra_categories, dtype=np.int32)))
+            currencies = currencies[source]
+            secondary = np.concatenate((secondary, np.ones(len(extra_source), dtype=bool)))
+
+        valid = np.flatnonzero(~np.isnat(dates))
+        if split:
+            # По дате, затем по операции: строки разбивки остаются рядом
+            order = valid[np.lexsort((source[valid], dates[valid]))]
+        else:
+            order = valid[np.argsort(dates[valid], kind='stable')]
+        rows = source[order]
+
+        # Теги: все строки операции в отсортированных колонках
+        tag_rows: Dict[str, List[int]] = {}
+        tagged = np.fromiter((bool(t.tags) for t in transactions), dtype=bool, count=len(transactions))
+        for position in np.flatnonzero(tagged[rows]):
+            for tag in transactions[rows[position]].tags:
+                tag_rows.setdefault(tag, []).append(position)
+
+        return cls(dates[order], amounts[order], is_income[order], categories[order], currencies[order],
+                   TagIndex.from_rows(len(order), tag_rows), rows, secondary[order])
+
+    @classmethod
+    def concat(cls, parts: List['LedgerColumns']) -> 'LedgerColumns':
+        """Склейка колонок партиций, уже упорядоченных по времени"""
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return cls(
+            np.concatenate([p.dates for p in parts]),
+            np.concatenate([p.amounts for p in parts]),
+            np.concatenate([p.is_income for p in parts]),
+            np.concatenate([p.categories for p in parts]),
+            np.concatenate([p.currencies for p in parts]),
+            TagIndex.concat([p.tags for p in parts]),
+            secondary=np.concatenate([p.secondary for p in parts]),
+        )
+
+    def with_amounts(self, amounts: np.ndarray) -> 'LedgerColumns':
+        """Те же строки с другими суммами (например, пересчитанными в валюту)"""
+        return LedgerColumns(self.dates, amounts, self.is_income, self.categories, self.currencies,
+                             self.tags, self.rows, self.secondary)
+
+    def select(self, mask: np.ndarray) -> 'LedgerColumns':
+        """Подмножество строк по маске (порядок по дате сохраняется)"""
+        return LedgerColumns(self.dates[mask], self.amounts[mask], self.is_income[mask],
+                             self.categories[mask], self.currencies[mask], self.tags.select(mask),
+                             self.rows[mask] if self.rows is not None else None,
+                             self._secondary_after(mask))
+
+    def _secondary_after(self, mask: np.ndarray) -> np.ndarray:
+        """Признак secondary после выборки: первая оставшаяся строка операции становится основной"""
+        if not self.secondary.any():
+            return self.secondary[mask]
+        index = np.arange(len(self))
+        starts = np.maximum.accumulate(np.where(self.secondary, 0, index))
+        kept = np.concatenate((np.zeros(1, dtype=np.int64), np.cumsum(mask)))
+        return (kept[index] - kept[starts] > 0)[mask]
+
+    def filter_mask(self, start: np.datetime64 = None, end: np.datetime64 = None,
+                    categories: np.ndarray = None, tag_query=None) -> np.ndarray:
+        """Маска строк: даты [start, end), коды категорий и запрос тегов (None - без условия)"""
+        mask = self.tags.evaluate(tag_query)
+        if start is not None or end is not None:
+            lo = np.searchsorted(self.dates, start) if start is not None else 0
+            hi = np.searchsorted(self.dates, end) if end is not None else len(self)
+            mask[:lo] = False
+            mask[hi:] = False
+        if categories is not None:
+            mask &= np.isin(self.categories, categories)
+        return mask
+
+    @property
+    def cumulative(self) -> np.ndarray:
+        """Префиксные суммы signed с ведущим нулем (len + 1), int64"""
+        if self._cumulative is None:
+            self._cumulative = np.concatenate((np.zeros(1, dtype=np.int64), np.cumsum(self.signed)))
+        return self._cumulative
+
+    def net_before(self, moments: np.ndarray) -> np.ndarray:
+        """Сумма signed по транзакциям строго раньше каждого момента"""
+        idx = np.searchsorted(self.dates, moments.astype('datetime64[s]'), side='left')
+        return self.cumulative[idx]
+
+    def total(self) -> int:
+        """Чистый поток в копейках"""
+        return int(self.cumulative[-1])
+
+
+def period_starts(start: np.datetime64, end: np.datetime64, granularity: str) -> np.ndarray:
+    """Начала периодов (datetime64[D]), покрывающих [start, end]"""
+    start_day = start.astype('datetime64[D]')
+    end_day = end.astype('datetime64[D]')
+
+    if granularity == 'day':
+        return np.arange(start_day, end_day + 1)
+    if granularity == 'week':
+        # 1970-01-01 - четверг; приводим к понедельнику
+        first = start_day - (start_day.astype(np.int64) + 3) % 7
+        return np.arange(first, end_day + 1, 7)
+    if granularity == 'month':
+        months = np.arange(start_day.astype('datetime64[M]'), end_day.astype('datetime64[M]') + 1)
+        return months.astype('datetime64[D]')
+    if granularity == 'year':
+        years = np.arange(start_day.astype('datetime64[Y]'), end_day.astype('datetime64[Y]') + 1)
+        return years.astype('datetime64[D]')
+
+    raise ValueError(f"Неизвестная гранулярность: {granularity}")
+
+
+def next_period_starts(starts: np.ndarray, granularity: str) -> np.ndarray:
+    """Начало следующего периода для каждого начала периода"""
+    if granularity == 'day':
+        return starts + 1
+    if granularity == 'week':
+        return starts + 7
+    if granularity == 'month':
+        return (starts.astype('datetime64[M]') + 1).astype('datetime64[D]')
+    if granularity == 'year':
+        return (starts.astype('datetime64[Y]') + 1).astype('datetime64[D]')
+
+    raise ValueError(f"Неизвестная гранулярность: {granularity}")
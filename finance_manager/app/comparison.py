@@ -0,0 +1,88 @@
+"""
+Сравнение периодов (месяц к месяцу, год к году)
+
+Суммы периодов берутся из помесячных агрегатов (MonthlyRollup): для
+периода из k месяцев это сумма k столбцов матрицы, поэтому стоимость не
+зависит от числа транзакций.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .aggregates import MonthlyRollup
+from .models import TransactionType
+from .money import from_minor
+
+Period = Tuple[str, str]  # первый и последний месяц включительно, "YYYY-MM"
+
+
+def month_period(year: int, month: int) -> Period:
+    key = f"{year:04d}-{month:02d}"
+    return key, key
+
+
+def shift_period(period: Period, months: int) -> Period:
+    """Период, сдвинутый на months месяцев (отрицательные - назад)"""
+    first, last = (np.datetime64(p, 'M') + months for p in period)
+    return str(first), str(last)
+
+
+def percent_change(current: int, previous: int) -> Optional[float]:
+    """Изменение в процентах; None - база сравнения нулевая"""
+    if previous == 0:
+        return None
+    return (current - previous) / abs(previous) * 100
+
+
+def period_sums(rollup: MonthlyRollup, period: Period) -> np.ndarray:
+    """Суммы ключей (категория*2 + доход) за период"""
+    first = rollup.column(np.datetime64(period[0], 'M'))
+    last = rollup.column(np.datetime64(period[1], 'M'))
+    lo, hi = max(first, 0), min(last + 1, rollup.n_months)
+    if lo >= hi:
+        return np.zeros(rollup.sums.shape[0], dtype=np.int64)
+    return rollup.sums[:, lo:hi].sum(axis=1)
+
+
+def _change(current: int, previous: int) -> Dict:
+    return {
+        'current': from_minor(current),
+        'previous': from_minor(previous),
+        'delta': from_minor(current - previous),
+        'current_minor': current,
+        'previous_minor': previous,
+        'delta_minor': current - previous,
+        'percent': percent_change(current, previous),
+    }
+
+
+def compare_periods(rollup: MonthlyRollup, category_names: Sequence[str],
+                    current: Period, previous: Period) -> Dict:
+    """Доходы, расходы, чистый поток и категории: текущий период против прошлого
+
+    Категории отсортированы по модулю изменения.
+    """
+    now = period_sums(rollup, current)
+    before = period_sums(rollup, previous)
+
+    categories: List[Dict] = []
+    for key in np.flatnonzero((now != 0) | (before != 0)):
+        if key // 2 >= len(category_names):
+            continue
+        categories.append({
+            'category': category_names[key // 2],
+            'type': TransactionType.INCOME.value if key % 2 else TransactionType.EXPENSE.value,
+            **_change(int(now[key]), int(before[key])),
+        })
+    categories.sort(key=lambda r: abs(r['delta_minor']), reverse=True)
+
+    income_now, income_before = int(now[1::2].sum()), int(before[1::2].sum())
+    expense_now, expense_before = int(now[0::2].sum()), int(before[0::2].sum())
+    return {
+        'current_period': current,
+        'previous_period': previous,
+        'income': _change(income_now, income_before),
+        'expense': _change(expense_now, expense_before),
+        'net': _change(income_now - expense_now, income_before - expense_before),
+        'categories': categories,
+    }
@@ -1,9 +1,22 @@
 """
 Контроллер для управления данными и обновлением UI
 """
-from typing import Callable, List
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import replace
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
 import threading
-from .models import Category
+from .analytics import AnalyticsService
+from .anomaly import AnomalyDetector
+from .classifier import CategoryClassifier, tokenize
+from .history import (AddTransactionCommand, AddTransactionsCommand, CategoriesCommand, CommandHistory,
+                      DeleteTransactionCommand, DeleteTransactionsCommand, ReassignCategoryCommand,
+                      UpdateTransactionCommand, UpdateTransactionsCommand)
+from .models import Category, SavedFilter, Transaction
+from .profiling import metrics
+from .recurring import due_occurrences, occurrence_transaction
+from .saved_filters import FilterView
+from .tags import parse_tag_query
 
 
 class AppController:
@@ -11,8 +24,19 @@ class AppController:
 
     def __init__(self, database):
         self._db = database
+        self.analytics = AnalyticsService(database)
         self._update_callbacks = []
         self._lock = threading.Lock()
+        self._anomalies = None
+        self._anomaly_currency = None
+        self._classifier = None
+        self._classifier_fit: Optional[Future] = None  # обучение в фоне
+        self._classifier_backlog: List[Tuple[str, tuple]] = []  # изменения после снимка для обучения
+        self._executor = None
+        self.history = CommandHistory()
+        self._replaying = False
+        self._views: Dict[str, FilterView] = {}
+        database.add_reload_callback(self._on_external_change)
 
     def add_update_callback(self, callback: Callable):
         """Добавление callback для обновления UI"""
@@ -30,10 +54,12 @@ class AppController:
         with self._lock:
             callbacks = self._update_callbacks.copy()
 
+        metrics.increment("controller.notify_update")
         for callback in callbacks:
             try:
                 callback()
             except Exception as e:
+                metrics.increment("errors.update_callback")
                 print(f"Ошибка в callback обновления: {e}")
 
     @property
@@ -45,6 +71,27 @@ class AppController:
         """Получение базы данных (совместимость)"""
         return self._db
 
+    def _on_external_change(self):
+        """Данные изменены другим процессом: производные структуры построятся заново
+
+        Классификатор переобучается в фоне, до готовности подсказывает прежний.
+        """
+        self._views.clear()
+        self._anomalies = None
+        self._refit_classifier()
+
+    def check_external_changes(self) -> bool:
+        """Подхват изменений из других окон и процессов с общим каталогом данных"""
+        try:
+            changed = self._db.refresh()
+        except Exception as e:
+            print(f"Ошибка проверки изменений данных: {e}")
+            return False
+        if changed:
+            metrics.increment("controller.external_change")
+            self.notify_update()
+        return changed
+
     def get_categories(self) -> List[str]:
         """Получение всех категорий (для совместимости)"""
         return [cat.name for cat in self._db.categories]
@@ -68,32 +115,484 @@ class AppController:
     def save_category_objects(self, categories: List[Category]):
         """Сохранение объектов категорий"""
         if hasattr(self._db, 'save_categories'):
+            before = list(self._db.categories)
             self._db.save_categories(categories)
+            self._record(CategoriesCommand(before, categories))
             self.notify_update()
 
-    def add_transaction(self, transaction):
-        """Добавление транзакции"""
+    def reassign_category(self, sources: List[str], target: Category) -> int:
+        """Перенос категорий sources (с операциями, бюджетами и правилами) в target
+
+        Возвращает количество перенесенных операций.
+        """
+        categories = list(self._db.categories)
+        budgets = list(self._db.budgets)
+        rules = list(self._db.recurring_rules)
+        filters = list(self._db.saved_filters)
+        try:
+            pairs = self._db.reassign_categories(sources, target)
+        except Exception as e:
+            print(f"Ошибка переноса категорий: {e}")
+            raise
+
+        for name in sources:
+            self._train('move_category', name, target.name)
+        self._anomalies = None  # статистика категорий пересчитается по запросу
+        self._views.clear()  # условия фильтров по категориям изменились
+
+        moved: Dict[str, List[str]] = {}
+        split = []  # операции с разбивкой сохраняются целиком
+        for old, _ in pairs:
+            if old.splits:
+                split.append(old)
+            else:
+                moved.setdefault(old.category, []).append(old.id)
+        self._record(ReassignCategoryCommand(sources, target, moved, categories, budgets, rules, split, filters))
+        self.notify_update()
+        return len(pairs)
+
+    def rename_category(self, old_name: str, new_name: str) -> int:
+        """Переименование категории; если новое имя занято - объединение с ней"""
+        existing = {c.name: c for c in self._db.categories}
+        if new_name in existing:
+            return self.reassign_category([old_name], existing[new_name])
+        source = existing.get(old_name)
+        if source is None:
+            raise ValueError(f"Категория '{old_name}' не найдена")
+        return self.reassign_category([old_name], replace(source, name=new_name))
+
+    def merge_categories(self, sources: List[str], target_name: str) -> int:
+        """Объединение категорий в существующую"""
+        target = next((c for c in self._db.categories if c.name == target_name), None)
+        if target is None:
+            raise ValueError(f"Категория '{target_name}' не найдена")
+        return self.reassign_category(sources, target)
+
+    def restore_category_assignment(self, moved: Dict[str, List[str]], categories: List[Category],
+                                    budgets, rules, split: List[Transaction] = (), filters: List[SavedFilter] = None):
+        """Возврат операций в исходные категории и прежних списков (отмена переноса)"""
+        category_of = {tid: name for name, ids in moved.items() for tid in ids}
+        transactions = self._db.get_transactions_by_ids(category_of)
+        pairs = self._db.update_transactions([replace(t, category=category_of[t.id]) for t in transactions]
+                                             + list(split))
+        self._db.budgets = budgets
+        self._db.recurring_rules = rules
+        self._db.save_budgets()
+        self._db.save_recurring_rules()
+        if filters is not None:
+            self._db.saved_filters = filters
+            self._db.save_saved_filters()
+        self._db.save_categories(categories)
+        for old, new in pairs:
+            self._learn(old, -1)
+            self._learn(new)
+        self._anomalies = None
+        self._views.clear()
+        self.notify_update()
+
+    # Сохраненные фильтры
+
+    def get_saved_filters(self) -> List[SavedFilter]:
+        return self._db.saved_filters
+
+    def get_saved_filter(self, filter_id: str) -> Optional[SavedFilter]:
+        return next((f for f in self._db.saved_filters if f.id == filter_id), None)
+
+    def save_filter(self, saved: SavedFilter) -> FilterView:
+        """Добавление или замена фильтра (по id); возвращает его представление"""
+        parse_tag_query(saved.tag_query)  # ошибка в запросе - до сохранения
+        filters = [f for f in self._db.saved_filters if f.id != saved.id]
+        position = next((i for i, f in enumerate(self._db.saved_filters) if f.id == saved.id), len(filters))
+        filters.insert(position, saved)
+        self._db.saved_filters = filters
+        self._db.save_saved_filters()
+        self._views.pop(saved.id, None)
+        self.notify_update()
+        return self.get_filter_view(saved.id)
+
+    def delete_filter(self, filter_id: str):
+        self._db.saved_filters = [f for f in self._db.saved_filters if f.id != filter_id]
+        self._db.save_saved_filters()
+        self._views.pop(filter_id, None)
+        self.notify_update()
+
+    def get_filter_view(self, filter_id: str, today: date = None) -> FilterView:
+        """Материализованный результат фильтра
+
+        Строится при первом обращении и после изменений в обход
+        контроллера (версия хранилища не совпала), смены валюты отчетов или
+        начала нового периода; иначе возвращается готовым.
+        """
+        saved = self.get_saved_filter(filter_id)
+        if saved is None:
+            raise ValueError(f"Фильтр '{filter_id}' не найден")
+        view = self._views.get(filter_id)
+        if (view is None or view.version != self._db.version
+                or not view.is_current(self._db.reporting_currency, today)):
+            with metrics.measure("filters.build"):
+                view = FilterView.build(saved, self._db, today)
+            self._views[filter_id] = view
+        return view
+
+    def get_filter_transactions(self, filter_id: str, limit: int = None) -> List[Transaction]:
+        """Операции фильтра, последние first"""
+        ids = self.get_filter_view(filter_id).ids(limit)
+        by_id = {t.id: t for t in self._db.get_transactions_by_ids(ids)}
+        return [by_id[tid] for tid in ids if tid in by_id]
+
+    def _update_views(self, version: int, removed: List[Transaction] = (), added: List[Transaction] = ()):
+        """Приращение построенных представлений фильтров
+
+        version - версия хранилища до изменения: если представление с ней
+        не согласовано, оно отбрасывается и построится заново.
+        """
+        for filter_id, view in list(self._views.items()):
+            if view.version != version:
+                del self._views[filter_id]
+                continue
+            view.apply(removed, added)
+            view.version = self._db.version
+
+    # Отмена и повтор
+
+    def _record(self, command):
+        """Запись действия пользователя в историю (кроме самих отмены/повтора)"""
+        if not self._replaying:
+            self.history.record(command)
+
+    def _replay(self, command, method: str) -> Optional[str]:
+        self._replaying = True
+        try:
+            getattr(command, method)(self)
+        finally:
+            self._replaying = False
+        metrics.increment(f"history.{method}")
+        return command.description
+
+    def undo(self) -> Optional[str]:
+        """Отмена последнего действия; возвращает его описание (None - нечего отменять)"""
+        command = self.history.pop_undo()
+        if command is None:
+            return None
+        return self._replay(command, "undo")
+
+    def redo(self) -> Optional[str]:
+        """Повтор отмененного действия; возвращает его описание"""
+        command = self.history.pop_redo()
+        if command is None:
+            return None
+        return self._replay(command, "redo")
+
+    def get_anomaly_detector(self) -> AnomalyDetector:
+        """Детектор необычных расходов (строится при первом обращении)
+
+        Статистика старых партиций берется из манифеста, поэтому построение
+        не загружает всю историю.
+        """
+        currency = self._db.reporting_currency
+        if self._anomalies is None or self._anomaly_currency != currency:
+            detector = AnomalyDetector()
+            with metrics.measure("anomaly.fit"):
+                detector.fit_stats(self._db.get_expense_stats(currency))
+            self._anomalies = detector
+            self._anomaly_currency = currency
+        return self._anomalies
+
+    @staticmethod
+    def _fit_classifier(snapshot) -> CategoryClassifier:
+        """Обучение по всей истории снимка (в фоновом потоке)"""
+        transactions = snapshot.transactions
+        classifier = CategoryClassifier()
+        with metrics.measure("classifier.fit"):
+            classifier.fit([t.description for t in transactions],
+                           [t.type for t in transactions],
+                           [t.category for t in transactions])
+        return classifier
+
+    def _refit_classifier(self):
+        """Переобучение после изменений, которые нельзя доучить (чужие, на месте)
+
+        Уже построенный классификатор не сбрасывается: он дообучается как
+        обычно и подсказывает, пока новый обучается в фоне. Если классификатор
+        еще не нужен был, он и не строится.
+        """
+        if self._classifier is not None or self._classifier_fit is not None:
+            self._start_fit()
+
+    def _start_fit(self):
+        """Обучение в фоне по снимку текущих данных"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="classifier")
+        self._classifier_backlog = []
+        self._classifier_fit = self._executor.submit(self._fit_classifier, self._db.snapshot())
+
+    def get_classifier(self, wait: bool = True) -> Optional[CategoryClassifier]:
+        """Классификатор категорий
+
+        Обучается по истории в фоновом потоке при первом обращении; изменения,
+        сделанные тем временем, доучиваются при подхвате результата.
+        wait=False - не ждать обучения (None, пока классификатора нет).
+        """
+        if self._classifier is None and self._classifier_fit is None:
+            self._start_fit()
+        future = self._classifier_fit
+        if future is not None and (future.done() or (wait and self._classifier is None)):
+            classifier = future.result()
+            for method, args in self._classifier_backlog:
+                getattr(classifier, method)(*args)
+            self._classifier = classifier
+            self._classifier_fit = None
+            self._classifier_backlog = []
+        return self._classifier
+
+    def _train(self, method: str, *args):
+        """Изменение обучения: в построенном классификаторе и в очереди для обучаемого"""
+        if self._classifier is not None:
+            getattr(self._classifier, method)(*args)
+        if self._classifier_fit is not None:
+            self._classifier_backlog.append((method, args))
+
+    def suggest_category(self, description: str, transaction_type: str) -> Optional[str]:
+        """Подсказка категории по описанию (только из существующих категорий типа)
+
+        Без описания - самая частая категория типа по счетчикам манифеста,
+        без загрузки истории. По описанию подсказывает классификатор; пока он
+        обучается в фоне, подсказки нет (None).
+        """
+        categories = self._db.get_categories_by_type(transaction_type)
+        try:
+            if not tokenize(description):
+                counts = self._db.category_counts()
+                category = max(categories, key=lambda name: counts.get(name, 0), default=None)
+                return category if counts.get(category) else None
+            classifier = self.get_classifier(wait=False)
+            category = classifier.predict(description, transaction_type) if classifier else None
+        except Exception as e:
+            print(f"Ошибка определения категории: {e}")
+            return None
+        if category in categories:
+            return category
+        return None
+
+    def categorize(self, transactions: List[Transaction]) -> int:
+        """Заполнение пустых категорий пакетом (например, при импорте)
+
+        Возвращает количество заполненных.
+        """
+        pending = [t for t in transactions if not t.category]
+        if not pending:
+            return 0
+        predicted = self.get_classifier().predict_batch([t.description for t in pending],
+                                                        [t.type for t in pending])
+        filled = 0
+        for transaction, category in zip(pending, predicted):
+            if category:
+                transaction.category = category
+                filled += 1
+        return filled
+
+    def _learn(self, transaction: Transaction, weight: int = 1):
+        """Дообучение классификатора, если он построен или обучается"""
+        self._train('learn', transaction.description, transaction.type, transaction.category, weight)
+
+    def _reporting_amount(self, transaction: Transaction) -> int:
+        """Сумма транзакции в валюте отчетов"""
+        return self._db.rates.convert_minor(transaction.amount_minor, transaction.currency,
+                                            self._db.reporting_currency, transaction.date)
+
+    def add_transaction(self, transaction) -> List[str]:
+        """Добавление транзакции
+
+        Возвращает причины считать расход необычным (пустой список - все в норме).
+        """
+        # Статистика строится до вставки, чтобы операция не учлась дважды
+        detector = self.get_anomaly_detector()
+        version = self._db.version
         try:
+            transaction.check_splits()
             self._db.add_transaction(transaction)
-            self.notify_update()
         except Exception as e:
             print(f"Ошибка добавления транзакции: {e}")
             raise
+        self._update_views(version, added=[transaction])
+
+        reasons = []
+        try:
+            reasons = detector.observe(transaction, self._reporting_amount(transaction))
+        except Exception as e:
+            self._anomalies = None
+            print(f"Ошибка проверки транзакции: {e}")
+        if reasons:
+            metrics.increment("anomaly.flagged")
+        self._learn(transaction)
+        self._record(AddTransactionCommand(transaction))
+        self.notify_update()
+        return reasons
 
     def delete_transaction(self, transaction_id):
         """Удаление транзакции"""
+        version = self._db.version
         try:
+            old = self._db.get_transaction(transaction_id)
             self._db.delete_transaction(transaction_id)
-            self.notify_update()
         except Exception as e:
             print(f"Ошибка удаления транзакции: {e}")
             raise
+        self._update_views(version, removed=[old] if old is not None else [])
+
+        if old is not None:
+            self._learn(old, -1)
+            if self._anomalies is not None:
+                self._anomalies.forget(old, self._reporting_amount(old))
+            self._record(DeleteTransactionCommand(old))
+        self.notify_update()
+
+    # Пакетные операции: одно сохранение и одно уведомление
+
+    def add_transactions(self, transactions: List[Transaction]) -> List[Transaction]:
+        """Пакетное добавление; возвращает добавленные"""
+        version = self._db.version
+        try:
+            added = self._db.add_transactions(transactions)
+        except Exception as e:
+            print(f"Ошибка пакетного добавления: {e}")
+            raise
+        self._update_views(version, added=added)
+
+        if added:
+            if self._anomalies is not None:
+                for transaction in added:
+                    self._anomalies.observe(transaction, self._reporting_amount(transaction))
+            for transaction in added:
+                self._learn(transaction)
+            self._record(AddTransactionsCommand(added))
+            self.notify_update()
+        return added
+
+    def delete_transactions(self, transaction_ids) -> int:
+        """Пакетное удаление; возвращает количество удаленных"""
+        version = self._db.version
+        try:
+            removed = self._db.delete_transactions(transaction_ids)
+        except Exception as e:
+            print(f"Ошибка пакетного удаления: {e}")
+            raise
+        self._update_views(version, removed=removed)
+
+        if removed:
+            for old in removed:
+                self._learn(old, -1)
+                if self._anomalies is not None:
+                    self._anomalies.forget(old, self._reporting_amount(old))
+            self._record(DeleteTransactionsCommand(removed))
+            self.notify_update()
+        return len(removed)
+
+    def update_transactions(self, transactions: List[Transaction]) -> int:
+        """Пакетное обновление; возвращает количество измененных"""
+        version = self._db.version
+        try:
+            pairs = self._db.update_transactions(transactions)
+        except Exception as e:
+            print(f"Ошибка пакетного обновления: {e}")
+            raise
+
+        if not pairs:
+            return 0
+        if any(old is new for old, new in pairs):
+            # Объекты изменены на месте - прежние значения неизвестны, отменить нельзя
+            self._anomalies = None
+            self._refit_classifier()
+            self._views.clear()
+            self.history.clear()
+        else:
+            self._update_views(version, [old for old, _ in pairs], [new for _, new in pairs])
+            for old, new in pairs:
+                self._learn(old, -1)
+                self._learn(new)
+                if self._anomalies is not None:
+                    self._anomalies.forget(old, self._reporting_amount(old))
+                    self._anomalies.observe(new, self._reporting_amount(new))
+            self._record(UpdateTransactionsCommand(pairs))
+        self.notify_update()
+        return len(pairs)
+
+    def edit_transactions(self, transaction_ids, add_tags: List[str] = (), remove_tags: List[str] = (),
+                          **changes) -> int:
+        """Одинаковое изменение полей у набора транзакций (категория, тип, описание, теги...)"""
+        if not changes and not add_tags and not remove_tags:
+            return 0
+        edited = []
+        for t in self._db.get_transactions_by_ids(transaction_ids):
+            new = replace(t, **changes)
+            if add_tags or remove_tags:
+                tags = [tag for tag in t.tags if tag not in remove_tags]
+                new.tags = tags + [tag for tag in add_tags if tag not in tags]
+            if new != t:
+                edited.append(new)
+        return self.update_transactions(edited) if edited else 0
+
+    def tag_transactions(self, transaction_ids, add: List[str] = (), remove: List[str] = ()) -> int:
+        """Добавление и снятие тегов у набора транзакций"""
+        return self.edit_transactions(transaction_ids, add_tags=add, remove_tags=remove)
+
+    def recategorize(self, transaction_ids, category: str) -> int:
+        """Перенос набора транзакций в другую категорию"""
+        return self.edit_transactions(transaction_ids, category=category)
+
+    def post_due_recurring(self, today: date = None) -> int:
+        """Проведение наступивших повторяющихся операций одним пакетом
+
+        Возвращает количество добавленных транзакций.
+        """
+        today = today or date.today()
+        due = due_occurrences(self._db.recurring_rules, today)
+        if not due:
+            return 0
+
+        transactions = [occurrence_transaction(rule, day) for rule, days in due for day in days]
+        version = self._db.version
+        try:
+            added = self._db.add_transactions(transactions)
+        except Exception as e:
+            print(f"Ошибка проведения повторяющихся операций: {e}")
+            raise
+
+        for rule, days in due:
+            rule.last_posted = days[-1].isoformat()
+        self._db.save_recurring_rules()
+        self._update_views(version, added=added)
+
+        if added:
+            self._anomalies = None  # пересчет статистики при следующем обращении
+            for transaction in added:
+                self._learn(transaction)
+            self.notify_update()
+        return len(added)
 
     def update_transaction(self, transaction):
         """Обновление транзакции"""
+        version = self._db.version
         try:
+            transaction.check_splits()
+            old = self._db.get_transaction(transaction.id)
             self._db.update_transaction(transaction)
-            self.notify_update()
         except Exception as e:
             print(f"Ошибка обновления транзакции: {e}")
             raise
+
+        if old is transaction:
+            # Объект изменен на месте - прежние значения неизвестны, отменить нельзя
+            self._anomalies = None
+            self._refit_classifier()
+            self._views.clear()
+            self.history.clear()
+        elif old is not None:
+            self._update_views(version, [old], [transaction])
+            self._learn(old, -1)
+            self._learn(transaction)
+            self._record(UpdateTransactionCommand(old, transaction))
+            if self._anomalies is not None:
+                self._anomalies.forget(old, self._reporting_amount(old))
+                self._anomalies.observe(transaction, self._reporting_amount(transaction))
+        self.notify_update()
@@ -0,0 +1,149 @@
+"""
+Валюты и локальная таблица курсов
+
+Курсы читаются из rates.json в каталоге данных (без обращения к сети):
+
+    {"base": "RUB",
+     "rates": {"USD": [["2024-01-01", 92.5], ["2024-02-01", 90.1]]}}
+
+Курс - цена одной единицы валюты в базовой валюте. Запись действует
+с указанной даты до следующей; до первой записи берется первый курс.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+BASE_CURRENCY = "RUB"
+CURRENCY_SYMBOLS = {
+    "RUB": "₽",
+    "USD": "$",
+    "EUR": "€",
+    "GBP": "£",
+}
+
+
+def currency_symbol(code: str) -> str:
+    """Символ валюты для отображения (или сам код)"""
+    return CURRENCY_SYMBOLS.get(code, code)
+
+
+def currency_code(value: str) -> str:
+    """Код валюты по символу из настроек ("₽" -> "RUB")"""
+    for code, symbol in CURRENCY_SYMBOLS.items():
+        if value == symbol:
+            return code
+    return value.upper() if value else BASE_CURRENCY
+
+
+class ExchangeRateTable:
+    """Курсы валют к базовой валюте по датам"""
+
+    def __init__(self, base: str = BASE_CURRENCY, rates: Dict[str, Sequence[Tuple[str, float]]] = None):
+        self.base = base
+        self._dates: Dict[str, np.ndarray] = {}
+        self._rates: Dict[str, np.ndarray] = {}
+        self._missing = set()
+        self.version = 0
+        for code, points in (rates or {}).items():
+            self._set_points(code, points)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ExchangeRateTable':
+        return cls(data.get('base', BASE_CURRENCY), data.get('rates', {}))
+
+    def copy(self) -> 'ExchangeRateTable':
+        """Независимая копия (ряды курсов не меняются на месте и не копируются)"""
+        table = ExchangeRateTable(self.base)
+        table._dates = dict(self._dates)
+        table._rates = dict(self._rates)
+        table._missing = set(self._missing)
+        table.version = self.version
+        return table
+
+    def to_dict(self) -> Dict:
+        return {
+            'base': self.base,
+            'rates': {
+                code: [[str(d.astype('datetime64[D]')), float(r)]
+                       for d, r in zip(self._dates[code], self._rates[code])]
+                for code in sorted(self._dates)
+            }
+        }
+
+    @property
+    def currencies(self) -> List[str]:
+        """Валюты, для которых можно посчитать курс"""
+        return sorted({self.base} | set(self._dates))
+
+    def _set_points(self, code: str, points: Sequence[Tuple[str, float]]):
+        points = sorted((np.datetime64(date, 's'), float(rate)) for date, rate in points)
+        if any(rate <= 0 for _, rate in points):
+            raise ValueError(f"Курс {code} должен быть положительным")
+        self._dates[code] = np.array([d for d, _ in points], dtype='datetime64[s]')
+        self._rates[code] = np.array([r for _, r in points], dtype=np.float64)
+
+    def set_series(self, code: str, points: Sequence[Tuple[str, float]]):
+        """Замена всех курсов валюты рядом (дата, курс)"""
+        self._set_points(code, points)
+        self._missing.discard(code)
+        self.version += 1
+
+    def set_rate(self, code: str, date: str, rate: float):
+        """Добавление (замена) курса на дату"""
+        points = {str(d.astype('datetime64[D]')): float(r)
+                  for d, r in zip(self._dates.get(code, []), self._rates.get(code, []))}
+        points[date[:10]] = rate
+        self._set_points(code, points.items())
+        self._missing.discard(code)
+        self.version += 1
+
+    def rates_at(self, code: str, dates: np.ndarray) -> np.ndarray:
+        """Курсы валюты к базовой на каждую дату (векторно)"""
+        if code == self.base:
+            return np.ones(len(dates))
+
+        known = self._dates.get(code)
+        if known is None or not len(known):
+            if code not in self._missing:
+                self._missing.add(code)
+                print(f"Нет курса для валюты {code}, используется 1:1")
+            return np.ones(len(dates))
+
+        idx = np.searchsorted(known, dates.astype('datetime64[s]'), side='right') - 1
+        return self._rates[code][np.clip(idx, 0, len(known) - 1)]
+
+    def convert(self, amounts_minor: np.ndarray, currency_codes: np.ndarray,
+                currency_names: Sequence[str], dates: np.ndarray, target: str) -> np.ndarray:
+        """Пересчет сумм (копейки, int64) в целевую валюту по курсам на даты
+
+        currency_codes - коды валют строк (индексы в currency_names).
+        """
+        if not len(amounts_minor):
+            return amounts_minor.astype(np.int64)
+
+        factors = np.empty(len(amounts_minor))
+        target_rates = self.rates_at(target, dates)
+        for code in np.unique(currency_codes):
+            mask = currency_codes == code
+            name = currency_names[code]
+            if name == target:
+                factors[mask] = 1.0
+            else:
+                factors[mask] = self.rates_at(name, dates[mask]) / target_rates[mask]
+
+        return np.rint(amounts_minor * factors).astype(np.int64)
+
+    def convert_minor(self, amount_minor: int, source: str, target: str,
+                      date: Optional[str] = None) -> int:
+        """Пересчет одной суммы (по умолчанию - по последнему курсу)"""
+        if source == target:
+            return amount_minor
+        try:
+            moment = np.array([np.datetime64(date, 's')]) if date else None
+        except ValueError:
+            moment = None
+        if moment is None:
+            moment = np.array([np.datetime64(datetime.now(), 's')])
+        factor = self.rates_at(source, moment)[0] / self.rates_at(target, moment)[0]
+        return int(round(amount_minor * factor))
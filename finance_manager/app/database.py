@@ -3,14 +3,106 @@
 """
 import json
 import os
-from dataclasses import asdict
-from typing import List, Dict
+import weakref
+from dataclasses import asdict, replace
+from operator import attrgetter, is_, itemgetter
+from typing import List, Dict, Optional, Set, Tuple
 from datetime import datetime, timedelta
-from .models import Transaction, Budget, Settings, TransactionType, Category, CategoryType
+
+import numpy as np
+
+from .aggregates import MonthlyRollup
+from .anomaly import ExpenseStats, add_stats, column_stats, empty_stats, merge_stats, transaction_stats
+from .columnar import LedgerColumns, parse_dates, period_starts, next_period_starts
+from .currency import BASE_CURRENCY, ExchangeRateTable, currency_code
+from .money import from_minor, to_minor
+from .profiling import timed, measure
+from .query_cache import QueryCache, cached_query
+from .sharing import DirectoryLock, file_signature, merge_json, merge_records
+from .sketches import MonthlySketches
+from .tags import parse_tag_query
+from .models import (Transaction, Budget, Settings, TransactionType, Category, CategoryType, RecurringRule,
+                     SavedFilter)
+
+
+MANIFEST_VERSION = 3  # 2 - счетчики категорий по партициям, 3 - статистика расходов
+UNKNOWN_PARTITION = "unknown"
+JOURNAL_MIN_OPS = 256  # журнал партиции сжимается, когда записей в нем больше этого
+JOURNAL_SHARE = 4      # и больше 1/JOURNAL_SHARE строк партиции
+
+
+def month_key(date_str: str) -> str:
+    """Ключ месяца "YYYY-MM" для зависимостей кэша"""
+    return date_str[:7]
+
+
+def _month_range(year: int, month: int) -> Tuple[str, str]:
+    key = f"{year:04d}-{month:02d}"
+    return key, key
+
+
+def _series_end(start: datetime, end: datetime, granularity: str) -> datetime:
+    """Последний день последнего периода ряда (у недели, месяца и года - позже end)"""
+    starts = period_starts(np.datetime64(start), np.datetime64(end), granularity)
+    last = (next_period_starts(starts[-1:], granularity)[0] - 1).item()
+    return datetime(last.year, last.month, last.day)
+
+
+def _rows_of(partition: List[Transaction], transactions: List[Transaction]) -> List[int]:
+    """Номера строк, где лежат эти объекты (по строке на каждый)
+
+    Поиск идет с конца и останавливается на последнем найденном: новые
+    операции дописываются в конец, поэтому отмена и повтор недавних
+    действий не просматривают партицию.
+    """
+    wanted = {id(t) for t in transactions}
+    rows = []
+    for row in range(len(partition) - 1, -1, -1):
+        if id(partition[row]) in wanted:
+            rows.append(row)
+            if len(rows) == len(transactions):
+                break
+    return rows[::-1]
+
+
+def _without_rows(partition: List[Transaction], rows: List[int]) -> List[Transaction]:
+    """Копия партиции без указанных строк"""
+    result = list(partition)
+    for row in reversed(rows):
+        del result[row]
+    return result
+
+
+def _budget_key(budget: Dict) -> Tuple:
+    return budget.get('category'), budget.get('period'), budget.get('type')
+
+
+def partition_key(date_str: str) -> str:
+    """Ключ партиции (год) для даты транзакции"""
+    year = date_str[:4]
+    if len(year) == 4 and year.isdigit():
+        return year
+    return UNKNOWN_PARTITION
 
 
 class Database:
-    """Класс для работы с данными"""
+    """Класс для работы с данными
+
+    Транзакции хранятся по годам: transactions/<год>.json и manifest.json
+    со списком партиций, их итогами и счетчиками категорий. Партиции
+    загружаются по требованию. Изменения партиции дописываются в ее журнал
+    (<год>.journal, строка на операцию), а итоги манифеста сдвигаются на
+    разницу; файл партиции целиком перезаписывается, только когда журнал
+    разрастается (_append_journal) или прежние значения неизвестны.
+
+    Суммы хранятся в валюте транзакции; агрегаты считаются в валюте отчетов
+    (настройка currency) по локальной таблице курсов rates.json.
+
+    Списки партиций не меняются на месте: изменение собирает новый список
+    и подменяет его целиком (_set_partition). Поэтому snapshot() дает
+    согласованное представление для чтения из фоновых потоков без
+    копирования операций.
+    """
 
     def __init__(self, data_dir: str = None):
         if data_dir is None:
@@ -22,34 +114,68 @@ class Database:
         os.makedirs(self.data_dir, exist_ok=True)
 
         self.transactions_file = os.path.join(self.data_dir, "transactions.json")
+        self.transactions_dir = os.path.join(self.data_dir, "transactions")
+        self.manifest_file = os.path.join(self.transactions_dir, "manifest.json")
         self.budgets_file = os.path.join(self.data_dir, "budgets.json")
+        self.recurring_file = os.path.join(self.data_dir, "recurring.json")
         self.settings_file = os.path.join(self.data_dir, "settings.json")
+        self.filters_file = os.path.join(self.data_dir, "filters.json")
         self.categories_file = os.path.join(self.data_dir, "categories.json")
+        self.rates_file = os.path.join(self.data_dir, "rates.json")
+        self.lock_file = os.path.join(self.data_dir, ".lock")
+
+        os.makedirs(self.transactions_dir, exist_ok=True)
 
-        self.transactions: List[Transaction] = self._load_transactions()
-        self.budgets: List[Budget] = self._load_budgets()
-        self.settings: Settings = self._load_settings()
-        self.categories: List[Category] = self._load_categories()
+        self._partitions: Dict[str, List[Transaction]] = {}
+        self._dirty_partitions: Set[str] = set()
+        self._pending: Dict[str, Optional[List[Tuple]]] = {}  # изменения для журнала; None - перезапись
+        self._columns: Dict[str, LedgerColumns] = {}
+        self._range_columns: Dict[Tuple, LedgerColumns] = {}
+        self._postings: Dict[str, Dict[str, List[int]]] = {}
+        self._ids: Dict[str, Dict[str, List[Transaction]]] = {}  # id -> строки с ним по партициям
+        self._category_codes: Dict[str, int] = {}
+        self._currency_codes: Dict[str, int] = {}
+        self._rollups: Dict[str, MonthlyRollup] = {}
+        self._sketches: Dict[str, MonthlySketches] = {}
+        self.version = 0  # Увеличивается при любом изменении данных
+        self.query_cache = QueryCache()
+        self._snapshots = weakref.WeakSet()  # открытые снимки (DatabaseSnapshot)
+
+        # Совместная работа процессов: подписи прочитанных файлов, их содержимое
+        # (база для слияния) и партиции в том виде, в каком они лежат на диске
+        self._lock = DirectoryLock(self.lock_file)
+        self._signatures: Dict[str, Tuple] = {}
+        self._bases: Dict[str, object] = {}
+        self._synced: Dict[str, List[Transaction]] = {}
+        self._reload_callbacks = []
+
+        with self._lock:
+            self.rates = self._load_rates()
+            self._manifest: Dict = self._load_manifest()
+            self.budgets: List[Budget] = self._load_budgets()
+            self.recurring_rules: List[RecurringRule] = self._load_recurring_rules()
+            self.settings: Settings = self._load_settings()
+            self.saved_filters: List[SavedFilter] = self._load_saved_filters()
+            self.categories: List[Category] = self._load_categories()
 
     def _load_categories(self) -> List[Category]:
         """Загрузка категорий из файла"""
-        if os.path.exists(self.categories_file):
-            try:
-                with open(self.categories_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if data and isinstance(data[0], dict) and 'name' in data[0]:
-                        return [Category.from_dict(c) for c in data]
-                    else:
-                        categories = []
-                        for cat_name in data:
-                            if cat_name in ["Зарплата", "Фриланс", "Инвестиции", "Подарки", "Возврат"]:
-                                cat_type = CategoryType.INCOME
-                            else:
-                                cat_type = CategoryType.EXPENSE
-                            categories.append(Category(name=cat_name, type=cat_type))
-                        return categories
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Ошибка загрузки категорий: {e}")
+        try:
+            data = self._read_json(self.categories_file)
+            if data is not None:
+                if data and isinstance(data[0], dict) and 'name' in data[0]:
+                    return [Category.from_dict(c) for c in data]
+                else:
+                    categories = []
+                    for cat_name in data:
+                        if cat_name in ["Зарплата", "Фриланс", "Инвестиции", "Подарки", "Возврат"]:
+                            cat_type = CategoryType.INCOME
+                        else:
+                            cat_type = CategoryType.EXPENSE
+                        categories.append(Category(name=cat_name, type=cat_type))
+                    return categories
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"Ошибка загрузки категорий: {e}")
 
         default_categories = [
             Category(name="Зарплата", type=CategoryType.INCOME, color="#4CAF50", icon="💰"),
@@ -102,33 +228,214 @@ class Database:
         self.categories.append(category)
         self.save_categories()
 
-    def delete_category(self, category_name: str):
-        """Удаление категории"""
+    def delete_category(self, category_name: str, reassign_to: str = None):
+        """Удаление категории
+
+        При заданном reassign_to ее операции, бюджеты и правила переносятся
+        в эту категорию, иначе операции сохраняют прежнее название.
+        """
+        if reassign_to:
+            target = next((c for c in self.categories if c.name == reassign_to), None)
+            if target is None:
+                raise ValueError(f"Категория '{reassign_to}' не найдена")
+            self.reassign_categories([category_name], target)
+            return
         self.categories = [c for c in self.categories if c.name != category_name]
         self.save_categories()
 
     def update_category(self, old_name: str, new_category: Category):
-        """Обновление категории"""
+        """Обновление категории (при смене названия - вместе с операциями)"""
+        if new_category.name != old_name:
+            self.reassign_categories([old_name], new_category)
+            return
         for i, cat in enumerate(self.categories):
             if cat.name == old_name:
                 self.categories[i] = new_category
                 break
         self.save_categories()
 
+    def merge_categories(self, sources: List[str], target_name: str) -> List[Tuple[Transaction, Transaction]]:
+        """Объединение категорий sources в существующую target_name"""
+        target = next((c for c in self.categories if c.name == target_name), None)
+        if target is None:
+            raise ValueError(f"Категория '{target_name}' не найдена")
+        return self.reassign_categories(sources, target)
+
+    def category_counts(self) -> Dict[str, int]:
+        """Количество операций по категориям (из манифеста, без загрузки партиций)"""
+        counts: Dict[str, int] = {}
+        for key in self._partition_keys():
+            if key in self._partitions:
+                entry = {name: len(rows) for name, rows in self._category_postings(key).items()}
+            else:
+                entry = self._manifest['partitions'].get(key, {}).get('categories')
+                if entry is None:
+                    entry = {name: len(rows) for name, rows in self._category_postings(key).items()}
+            for name, count in entry.items():
+                counts[name] = counts.get(name, 0) + count
+        return counts
+
+    @timed()
+    def reassign_categories(self, sources: List[str], target: Category) -> List[Tuple[Transaction, Transaction]]:
+        """Перенос операций, бюджетов и правил категорий sources в target
+
+        Общая основа переименования (target - новое имя), объединения и
+        удаления с переносом; категории сохраненных фильтров тоже меняются. Читаются и перезаписываются только партиции,
+        где по счетчикам манифеста есть эти категории, и только их строки;
+        помесячные агрегаты переносятся целыми строками. Все файлы пишутся
+        по одному разу. Возвращает пары (было, стало) перенесенных операций.
+        """
+        sources = [name for name in dict.fromkeys(sources) if name != target.name]
+        pairs = []
+        for key in self._partitions_with_categories(sources):
+            partition = list(self._get_partition(key))
+            postings = self._category_postings(key)
+            rows = sorted({row for name in sources for row in postings.get(name, ())})
+            changes = []
+            for row in rows:
+                old = partition[row]
+                partition[row] = old.recategorized(sources, target.name)
+                changes.append(('put', old, partition[row]))
+            if rows:
+                self._set_partition(key, partition, changes)
+                pairs.extend(change[1:] for change in changes)
+
+        if pairs:
+            self.query_cache.invalidate({month_key(old.date) for old, _ in pairs}, {*sources, target.name})
+            target_code = self._category_codes.setdefault(target.name, len(self._category_codes))
+            for name in sources:
+                source_code = self._category_codes.get(name)
+                if source_code is None:
+                    continue
+                for rollup in self._rollups.values():
+                    rollup.move_category(source_code, target_code)
+                for sketches in self._sketches.values():
+                    sketches.move_category(source_code, target_code)
+            self.save_transactions()
+
+        self._reassign_budgets(sources, target.name)
+        for i, rule in enumerate(self.recurring_rules):
+            if rule.category in sources:
+                self.recurring_rules[i] = replace(rule, category=target.name)
+        renamed_filters = False
+        for i, saved in enumerate(self.saved_filters):
+            if not set(sources).isdisjoint(saved.categories):
+                names = [target.name if name in sources else name for name in saved.categories]
+                self.saved_filters[i] = replace(saved, categories=list(dict.fromkeys(names)))
+                renamed_filters = True
+
+        # Целевая категория остается на своем месте, новое имя - на месте исходной
+        placed = any(c.name == target.name for c in self.categories)
+        categories = []
+        for category in self.categories:
+            if category.name == target.name:
+                categories.append(target)
+            elif category.name not in sources:
+                categories.append(category)
+            elif not placed:
+                categories.append(target)
+                placed = True
+        if not placed:
+            categories.append(target)
+        # Подкатегории исходных переходят к целевой
+        categories = [replace(c, parent=target.name) if c.parent in sources and c.name != target.name else c
+                      for c in categories]
+
+        self.save_budgets()
+        self.save_recurring_rules()
+        if renamed_filters:
+            self.save_saved_filters()
+        self.save_categories(categories)
+        return pairs
+
+    def _reassign_budgets(self, sources: List[str], target_name: str):
+        """Объединение бюджетов категорий: лимиты и траты складываются"""
+        names = {*sources, target_name}
+        budgets = []
+        combined: Dict[Tuple[str, str], Budget] = {}
+        for budget in self.budgets:
+            if budget.category not in names:
+                budgets.append(budget)
+                continue
+            existing = combined.get((budget.period, budget.type))
+            if existing is None:
+                combined[(budget.period, budget.type)] = replace(budget, category=target_name)
+                budgets.append(combined[(budget.period, budget.type)])
+            else:
+                existing.limit += budget.limit
+                existing.spent += budget.spent
+        self.budgets = budgets
+
     def save_categories(self, categories: List[Category] = None):
         """Сохранение категорий"""
         if categories is not None:
             self.categories = categories
+        self.version += 1
+        self.query_cache.invalidate_table('categories')
 
         try:
             data = [cat.to_dict() for cat in self.categories]
-            with open(self.categories_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            written = self._write_records(self.categories_file, data, itemgetter('name'))
+            if written is not data:
+                self.categories = [Category.from_dict(c) for c in written]
+        except TimeoutError:
+            raise
         except IOError as e:
             print(f"Ошибка сохранения категорий: {e}")
 
-    def _load_transactions(self) -> List[Transaction]:
-        """Загрузка транзакций из файла"""
+    # Партиции транзакций
+    def _load_manifest(self) -> Dict:
+        """Загрузка манифеста партиций (с миграцией из transactions.json)"""
+        try:
+            manifest = self._read_manifest()
+            if manifest is not None:
+                if manifest.get('version', 1) < MANIFEST_VERSION:
+                    self._upgrade_manifest(manifest)
+                return manifest
+        except (json.JSONDecodeError, IOError):
+            print("Ошибка загрузки манифеста транзакций, пересоздаем")
+
+        manifest = {'version': MANIFEST_VERSION, 'partitions': {}}
+        self._manifest = manifest
+        self._rebuild_manifest_from_disk()
+
+        # Миграция старого формата: один файл со всей историей
+        legacy = self._load_legacy_transactions()
+        if legacy:
+            by_key = {}
+            for transaction in legacy:
+                by_key.setdefault(partition_key(transaction.date), []).append(transaction)
+            for key, transactions in by_key.items():
+                self._set_partition(key, self._get_partition(key) + transactions)
+            self.save_transactions()
+            os.replace(self.transactions_file, self.transactions_file + ".bak")
+        elif self._manifest['partitions']:
+            self._save_manifest()
+
+        return self._manifest
+
+    def _upgrade_manifest(self, manifest: Dict):
+        """Пересчет итогов партиций старого манифеста (однократно, с чтением всех партиций)"""
+        self._manifest = manifest
+        for key, entry in list(manifest['partitions'].items()):
+            partition = self._read_partition(key)
+            if key in self._dirty_partitions:  # старый формат сумм - перепишется при сохранении
+                self._partitions[key] = self._synced[key] = partition
+            self._update_manifest_entry(key, partition, entry.get('revision', 0))
+        self._save_manifest()
+
+    def _read_manifest(self) -> Optional[Dict]:
+        """Чтение манифеста с диска (None - манифеста нет)"""
+        self._signatures[self.manifest_file] = file_signature(self.manifest_file)
+        if self._signatures[self.manifest_file] is None:
+            return None
+        with open(self.manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        manifest.setdefault('partitions', {})
+        return manifest
+
+    def _load_legacy_transactions(self) -> List[Transaction]:
+        """Загрузка транзакций из старого единого файла"""
         if os.path.exists(self.transactions_file):
             try:
                 with open(self.transactions_file, 'r', encoding='utf-8') as f:
@@ -139,161 +446,1362 @@ class Database:
 
         return []
 
+    def _rebuild_manifest_from_disk(self):
+        """Восстановление манифеста по файлам партиций"""
+        for filename in sorted(os.listdir(self.transactions_dir)):
+            key, ext = os.path.splitext(filename)
+            if ext != ".json" or filename == os.path.basename(self.manifest_file):
+                continue
+            self._update_manifest_entry(key, self._get_partition(key))
+
+    def _partition_file(self, key: str) -> str:
+        return os.path.join(self.transactions_dir, f"{key}.json")
+
+    def _partition_keys(self) -> List[str]:
+        """Ключи всех партиций от старых к новым"""
+        keys = set(self._manifest['partitions']) | set(self._partitions)
+        return sorted(keys, key=lambda k: (k != UNKNOWN_PARTITION, k))
+
+    def _get_partition(self, key: str) -> List[Transaction]:
+        """Получение партиции с загрузкой с диска при первом обращении"""
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = self._partitions[key] = self._synced[key] = self._read_partition(key)
+        return partition
+
+    def _read_partition(self, key: str) -> List[Transaction]:
+        """Чтение партиции с диска (файл и журнал - под блокировкой, согласованно)"""
+        partition = []
+        path = self._partition_file(key)
+        if os.path.exists(path):
+            try:
+                with self._lock, measure("Database.load_partition"):
+                    with open(path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    journal = self._read_journal(key)
+                partition = [Transaction.from_dict(t) for t in data]
+                if data and 'amount' in data[0]:
+                    # Старый формат с float-суммами - перезапишем при сохранении
+                    self._dirty_partitions.add(key)
+                if journal:
+                    partition = self._replay_journal(partition, journal)
+            except TimeoutError:
+                raise  # пустая партиция вместо занятой затерла бы ее при сохранении
+            except (json.JSONDecodeError, IOError) as e:
+                print(f"Ошибка загрузки партиции {key}: {e}")
+        return partition
+
+    def _journal_file(self, key: str) -> str:
+        return os.path.join(self.transactions_dir, f"{key}.journal")
+
+    def _read_journal(self, key: str) -> List[list]:
+        """Записи журнала партиции: ["add", запись], ["put", запись], ["del", id]"""
+        entries = []
+        try:
+            with open(self._journal_file(key), 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Оборванная запись упавшего сохранения - манифест ее не учел
+                        print(f"Пропущена поврежденная запись журнала партиции {key}")
+        except FileNotFoundError:
+            pass
+        return entries
+
+    @staticmethod
+    def _replay_journal(partition: List[Transaction], journal: List[list]) -> List[Transaction]:
+        """Применение журнала к партиции: новые id - в конец, известные заменяются на месте
+
+        Повторное применение ничего не меняет, поэтому журнал, оставшийся
+        после сбоя между сжатием и его удалением, безопасен.
+        """
+        rows: List[Optional[Transaction]] = list(partition)
+        positions: Dict[str, List[int]] = {}
+        for row, t in enumerate(rows):
+            positions.setdefault(t.id, []).append(row)
+        for op, value in journal:
+            if op == 'del':
+                for row in positions.pop(value, ()):
+                    rows[row] = None
+                continue
+            transaction = Transaction.from_dict(value)
+            if transaction.id in positions:
+                for row in positions[transaction.id]:
+                    rows[row] = transaction
+            else:
+                positions.setdefault(transaction.id, []).append(len(rows))
+                rows.append(transaction)
+        return [t for t in rows if t is not None]
+
+    def _append_journal(self, key: str, changes: List[Tuple]) -> bool:
+        """Дописывание изменений партиции в ее журнал
+
+        False - журнал нужно сжать (он длиннее JOURNAL_MIN_OPS и доли
+        JOURNAL_SHARE партиции) или файла партиции еще нет: тогда партиция
+        записывается целиком.
+        """
+        entry = self._manifest['partitions'].get(key)
+        if entry is None or not os.path.exists(self._partition_file(key)):
+            return False
+        length = entry.get('journal', 0) + len(changes)
+        if length > max(JOURNAL_MIN_OPS, entry.get('count', 0) // JOURNAL_SHARE):
+            return False
+
+        lines = []
+        for change in changes:
+            if change[0] == 'del':
+                lines.append(json.dumps(['del', change[1].id], ensure_ascii=False))
+            else:
+                lines.append(json.dumps([change[0], change[-1].to_dict()], ensure_ascii=False))
+        with open(self._journal_file(key), 'a+b') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")  # после оборванной записи - с новой строки
+            f.write(("\n".join(lines) + "\n").encode('utf-8'))
+        return True
+
+    def _partitions_for_range(self, start: datetime, end: datetime) -> List[str]:
+        """Ключи партиций, пересекающихся с диапазоном дат"""
+        return [key for key in self._partition_keys()
+                if key != UNKNOWN_PARTITION and start.year <= int(key) <= end.year]
+
+    def _find_transaction(self, transaction_id: str, hint_key: str = None) -> Optional[str]:
+        """Поиск ключа партиции, содержащей транзакцию
+
+        Сначала проверяются подсказка и загруженные партиции, затем
+        остальные от новых к старым.
+        """
+        for key in self._search_order(hint_key):
+            if transaction_id in self._partition_ids(key):
+                return key
+        return None
+
+    def _partition_ids(self, key: str) -> Dict[str, List[Transaction]]:
+        """Индекс id -> операции партиции с этим id (ведется по построчным изменениям)
+
+        id не обязательно уникальны (8 символов uuid), поэтому строк может быть несколько.
+        """
+        ids = self._ids.get(key)
+        if ids is None:
+            ids = {}
+            for t in self._get_partition(key):
+                ids.setdefault(t.id, []).append(t)
+            self._ids[key] = ids
+        return ids
+
+    @staticmethod
+    def _update_ids(ids: Dict[str, List[Transaction]], changes: List[Tuple]):
+        for change in changes:
+            if change[0] == 'add':
+                ids.setdefault(change[1].id, []).append(change[1])
+                continue
+            old = change[1]
+            rows = [t for t in ids.get(old.id, ()) if t is not old]
+            if change[0] == 'put':
+                rows.append(change[2])
+            if rows:
+                ids[old.id] = rows
+            else:
+                ids.pop(old.id, None)
+
+    def _search_order(self, hint_key: str = None) -> List[str]:
+        """Порядок просмотра партиций: подсказка, загруженные, остальные (от новых)"""
+        loaded = [key for key in reversed(self._partition_keys()) if key in self._partitions]
+        others = [key for key in reversed(self._partition_keys()) if key not in self._partitions]
+        return ([hint_key] if hint_key else []) + [k for k in loaded + others if k != hint_key]
+
+    def _set_partition(self, key: str, partition: List[Transaction], changes: List[Tuple] = None):
+        """Подмена партиции новым списком (копирование при записи)
+
+        Снимки, которые эту партицию еще не читали, получают ее прежний
+        список - тот, что они увидели бы в момент снятия. changes - то же
+        изменение построчно для журнала: ('add', новая), ('del', прежняя),
+        ('put', прежняя, новая); None - партиция перезапишется целиком.
+        """
+        self._swap_partition(key, partition)
+        self._touch_partition(key, changes)
+
+    def _swap_partition(self, key: str, partition: List[Transaction]):
+        previous = self._get_partition(key)
+        for snapshot in list(self._snapshots):
+            snapshot._retain(key, previous)
+        self._partitions[key] = partition
+
+    def snapshot(self) -> 'DatabaseSnapshot':
+        """Неизменяемое представление данных на текущий момент
+
+        Копируются только словари партиций, кэшей и справочники - O(партиций
+        и категорий); списки операций и колонки общие с базой. Снимок можно
+        читать из другого потока, пока база меняется.
+        """
+        snapshot = DatabaseSnapshot(self)
+        self._snapshots.add(snapshot)
+        return snapshot
+
+    def _touch_partition(self, key: str, changes: List[Tuple] = None):
+        """Пометка партиции измененной и сброс ее колоночного кэша и индекса категорий
+
+        Индекс id при известных изменениях не перестраивается, а обновляется.
+        """
+        ids = self._ids.get(key)
+        if changes is None or (key in self._dirty_partitions and self._pending.get(key) is None):
+            self._pending[key] = None
+        else:
+            self._pending.setdefault(key, []).extend(changes)
+        self._dirty_partitions.add(key)
+        self._drop_partition_caches(key)
+        if ids is not None and changes is not None:
+            self._update_ids(ids, changes)
+            self._ids[key] = ids
+
+    def _drop_partition_caches(self, key: str):
+        self.version += 1
+        self._columns.pop(key, None)
+        self._postings.pop(key, None)
+        self._ids.pop(key, None)
+        self._range_columns.clear()
+
+    def _category_postings(self, key: str) -> Dict[str, List[int]]:
+        """Индекс категория -> номера строк партиции (с кэшем до изменения партиции)"""
+        postings = self._postings.get(key)
+        if postings is None:
+            postings = {}
+            for row, t in enumerate(self._get_partition(key)):
+                for name in t.categories:
+                    postings.setdefault(name, []).append(row)
+            self._postings[key] = postings
+        return postings
+
+    def _partitions_with_categories(self, names) -> List[str]:
+        """Партиции, где есть операции указанных категорий
+
+        Незагруженные партиции проверяются по счетчикам манифеста; без
+        счетчиков (манифест старой версии) партиция просматривается.
+        """
+        names = set(names)
+        keys = []
+        for key in self._partition_keys():
+            if key not in self._partitions:
+                counts = self._manifest['partitions'].get(key, {}).get('categories')
+                if counts is not None and names.isdisjoint(counts):
+                    continue
+            if not names.isdisjoint(self._category_postings(key)):
+                keys.append(key)
+        return keys
+
+    def _partition_columns(self, key: str) -> LedgerColumns:
+        """Колоночное представление партиции (с кэшем)"""
+        columns = self._columns.get(key)
+        if columns is None:
+            columns = LedgerColumns.from_transactions(self._get_partition(key), self._category_codes,
+                                                      self._currency_codes)
+            self._columns[key] = columns
+        return columns
+
+    def _columns_for_keys(self, keys: Tuple[str, ...], currency: Optional[str]) -> LedgerColumns:
+        """Колонки партиций; при заданной валюте суммы пересчитаны в нее
+
+        Кэш ведется по (партиции, валюта): None - исходные суммы.
+        """
+        columns = self._range_columns.get((keys, currency))
+        if columns is not None:
+            return columns
+
+        if currency is None:
+            columns = LedgerColumns.concat([self._partition_columns(k) for k in keys])
+        else:
+            raw = self._columns_for_keys(keys, None)
+            names = self.currency_names
+            if all(names[code] == currency for code in np.unique(raw.currencies)):
+                columns = raw
+            else:
+                with measure("Database.convert_currency"):
+                    columns = raw.with_amounts(
+                        self.rates.convert(raw.amounts, raw.currencies, names, raw.dates, currency)
+                    )
+
+        self._range_columns[(keys, currency)] = columns
+        return columns
+
+    @timed()
+    def get_columns(self, start: datetime = None, end: datetime = None,
+                    currency: str = None) -> LedgerColumns:
+        """Колонки транзакций за диапазон лет (по умолчанию - вся история)
+
+        Суммы пересчитаны в currency (по умолчанию - валюта отчетов).
+        """
+        if start is None and end is None:
+            keys = tuple(k for k in self._partition_keys() if k != UNKNOWN_PARTITION)
+        else:
+            keys = tuple(self._partitions_for_range(start or datetime.min, end or datetime.max))
+
+        return self._columns_for_keys(keys, currency or self.reporting_currency)
+
+    @property
+    def reporting_currency(self) -> str:
+        """Код валюты отчетов по настройкам ("₽" -> "RUB")"""
+        return currency_code(self.settings.currency)
+
+    @property
+    def currency_names(self) -> List[str]:
+        """Коды валют по кодам колоночного представления"""
+        names = [''] * len(self._currency_codes)
+        for name, code in self._currency_codes.items():
+            names[code] = name
+        return names
+
+    def amounts_in(self, transactions: List[Transaction], currency: str = None) -> np.ndarray:
+        """Суммы транзакций (копейки), пересчитанные в валюту, векторно"""
+        currency = currency or self.reporting_currency
+        amounts = np.fromiter((t.amount_minor for t in transactions), dtype=np.int64,
+                              count=len(transactions))
+        codes = np.fromiter(
+            (self._currency_codes.setdefault(t.currency, len(self._currency_codes)) for t in transactions),
+            dtype=np.int16, count=len(transactions)
+        )
+        names = self.currency_names
+        if all(names[code] == currency for code in np.unique(codes)):
+            return amounts
+        dates = parse_dates([t.date for t in transactions])
+        return self.rates.convert(amounts, codes, names, dates, currency)
+
+    def _on_rates_changed(self):
+        """Сброс пересчитанных в валюту колонок и запросов"""
+        self.version += 1
+        self._range_columns = {key: columns for key, columns in self._range_columns.items()
+                               if key[1] is None}
+        self._clear_rollups()
+        self.query_cache.clear()
+
+    def get_monthly_rollup(self, currency: str = None) -> MonthlyRollup:
+        """Помесячные суммы по категориям (строятся один раз, далее - приращениями)"""
+        currency = currency or self.reporting_currency
+        rollup = self._rollups.get(currency)
+        if rollup is None:
+            with measure("Database.build_rollup"):
+                columns = self.get_columns(currency=currency)
+                rollup = MonthlyRollup.from_columns(columns, len(self._category_codes))
+            self._rollups[currency] = rollup
+        return rollup
+
+    def get_amount_sketches(self, currency: str = None) -> MonthlySketches:
+        """Скетчи распределения сумм по категориям и месяцам (далее - приращениями)"""
+        currency = currency or self.reporting_currency
+        sketches = self._sketches.get(currency)
+        if sketches is None:
+            with measure("Database.build_sketches"):
+                sketches = MonthlySketches.from_columns(self.get_columns(currency=currency))
+            self._sketches[currency] = sketches
+        return sketches
+
+    def adopt_aggregates(self, snapshot: 'DatabaseSnapshot'):
+        """Помесячные агрегаты и скетчи, построенные снимком (например, в фоне)
+
+        Берутся, только если база не менялась с момента снятия и своих у нее нет.
+        Коды категорий у снимка свои (дописываются при построении колонок):
+        агрегаты годятся, если коды базы с ними совпадают, новые коды переходят в базу.
+        """
+        codes = snapshot._category_codes
+        if snapshot.version != self.version or any(codes.get(name) != code
+                                                    for name, code in self._category_codes.items()):
+            return
+        self._category_codes.update(codes)
+        for currency, rollup in snapshot._rollups.items():
+            self._rollups.setdefault(currency, rollup)
+        for currency, sketches in snapshot._sketches.items():
+            self._sketches.setdefault(currency, sketches)
+
+    def _clear_rollups(self):
+        """Сброс помесячных агрегатов и скетчей (построятся заново по запросу)"""
+        self._rollups.clear()
+        self._sketches.clear()
+
+    def _update_rollups(self, transactions, sign: int):
+        """Приращение построенных помесячных агрегатов (+1 добавление, -1 удаление)"""
+        income_value = TransactionType.INCOME.value
+        for currency in set(self._rollups) | set(self._sketches):
+            rollup = self._rollups.get(currency)
+            sketches = self._sketches.get(currency)
+            for t in transactions:
+                try:
+                    month = np.datetime64(t.date[:7], 'M')
+                except ValueError:
+                    continue  # как и в колонках, операции без даты не учитываются
+                for category, line_amount in t.lines():
+                    code = self._category_codes.setdefault(category, len(self._category_codes))
+                    amount = self.rates.convert_minor(line_amount, t.currency, currency, t.date)
+                    if rollup is not None:
+                        rollup.add(code, t.type == income_value, month, sign * amount, sign)
+                    if sketches is not None:
+                        sketches.add(code, t.type == income_value, month, amount, sign)
+
+    def _load_rates(self) -> ExchangeRateTable:
+        """Загрузка таблицы курсов"""
+        try:
+            data = self._read_json(self.rates_file)
+            if data is not None:
+                return ExchangeRateTable.from_dict(data)
+        except (json.JSONDecodeError, IOError, ValueError) as e:
+            print(f"Ошибка загрузки курсов валют: {e}")
+        return ExchangeRateTable()
+
+    def reload_rates(self):
+        """Перечитывание таблицы курсов из rates.json"""
+        self.rates = self._load_rates()
+        self._on_rates_changed()
+
+    def save_rates(self):
+        """Сохранение таблицы курсов"""
+        try:
+            data = self.rates.to_dict()
+            written = self._write_records(self.rates_file, data)
+            if written is not data:
+                self.rates = ExchangeRateTable.from_dict(written)
+        except TimeoutError:
+            raise
+        except (IOError, ValueError) as e:
+            print(f"Ошибка сохранения курсов валют: {e}")
+        self._on_rates_changed()
+
+    @property
+    def category_names(self) -> List[str]:
+        """Названия категорий по кодам колоночного представления"""
+        names = [''] * len(self._category_codes)
+        for name, code in self._category_codes.items():
+            names[code] = name
+        return names
+
+    def _net_before_year(self, year: int, currency: str) -> int:
+        """Чистый поток (копейки в currency) по всем партициям раньше указанного года
+
+        Незагруженные одновалютные партиции берутся из итогов манифеста.
+        """
+        total = 0
+        for key in self._partition_keys():
+            if key == UNKNOWN_PARTITION or int(key) >= year:
+                continue
+            net = None
+            if key not in self._partitions:
+                net = self._manifest_net(self._manifest['partitions'].get(key, {}), currency)
+            if net is None:
+                net = self._columns_for_keys((key,), currency).total()
+            total += net
+        return total
+
+    @staticmethod
+    def _manifest_net(entry: Dict, currency: str) -> Optional[int]:
+        """Чистый поток партиции из манифеста, если вся она в валюте currency
+
+        Поддерживаются старые итоги (income_minor / float income) - они в рублях.
+        """
+        if 'totals' in entry:
+            totals = entry['totals']
+            if set(totals) != {currency}:
+                return None if totals else 0
+            return totals[currency]['income_minor'] - totals[currency]['expense_minor']
+
+        if currency != BASE_CURRENCY:
+            return None
+        if 'income_minor' in entry:
+            return entry['income_minor'] - entry['expense_minor']
+        return to_minor(entry.get('income', 0)) - to_minor(entry.get('expense', 0))
+
+    def get_expense_stats(self, currency: str = None) -> ExpenseStats:
+        """Суммы статистики расходов по всей истории (для AnomalyDetector.fit_stats)
+
+        Как и баланс, незагруженные одновалютные партиции берутся из
+        манифеста; остальные считаются по колонкам.
+        """
+        currency = currency or self.reporting_currency
+        parts = []
+        for key in self._partition_keys():
+            if key == UNKNOWN_PARTITION:
+                continue
+            stats = None
+            if key not in self._partitions:
+                stats = self._manifest_stats(self._manifest['partitions'].get(key, {}), currency)
+            if stats is None:
+                stats = column_stats(self._columns_for_keys((key,), currency), self.category_names)
+            parts.append(stats)
+        return merge_stats(parts)
+
+    @staticmethod
+    def _manifest_stats(entry: Dict, currency: str) -> Optional[ExpenseStats]:
+        """Статистика расходов партиции из манифеста, если вся она в валюте currency"""
+        if 'expense_stats' not in entry or not set(entry.get('totals', {})) <= {currency}:
+            return None
+        return entry['expense_stats'].get(currency, empty_stats())
+
+    def get_total_balance_minor(self, currency: str = None) -> int:
+        """Общий баланс по всей истории в копейках валюты отчетов"""
+        currency = currency or self.reporting_currency
+        total = self._net_before_year(datetime.max.year + 1, currency)
+        if UNKNOWN_PARTITION in self._partition_keys():
+            for t in self._get_partition(UNKNOWN_PARTITION):
+                amount = self.rates.convert_minor(t.amount_minor, t.currency, currency, t.date)
+                total += amount if t.type == TransactionType.INCOME.value else -amount
+        return total
+
+    def get_total_balance(self, currency: str = None) -> float:
+        """Общий баланс по всей истории"""
+        return from_minor(self.get_total_balance_minor(currency))
+
+    def _update_manifest_entry(self, key: str, partition: List[Transaction], revision: int = 0):
+        """Пересчет итогов партиции в манифесте (revision - номер записи, в которой она изменилась)"""
+        if not partition:
+            self._manifest['partitions'].pop(key, None)
+            return
+
+        totals = {}
+        categories = {}
+        for t in partition:
+            entry = totals.setdefault(t.currency, {'income_minor': 0, 'expense_minor': 0})
+            if t.type == TransactionType.INCOME.value:
+                entry['income_minor'] += t.amount_minor
+            else:
+                entry['expense_minor'] += t.amount_minor
+            for name in t.categories:
+                categories[name] = categories.get(name, 0) + 1
+
+        self._manifest['partitions'][key] = {
+            'file': os.path.basename(self._partition_file(key)),
+            'count': len(partition),
+            'totals': totals,
+            'categories': categories,
+            'expense_stats': transaction_stats(partition),
+            'revision': revision,
+        }
+
+    def _shift_manifest_entry(self, key: str, partition: List[Transaction], changes: List[Tuple],
+                              revision: int) -> bool:
+        """Сдвиг итогов партиции в манифесте на изменения из журнала - без просмотра партиции
+
+        Запись собирается заново (снимки делят с базой прежнюю). False -
+        итоги так не получить (старый манифест, опустевшая валюта):
+        нужен пересчет _update_manifest_entry.
+        """
+        entry = self._manifest['partitions'].get(key)
+        if not partition or entry is None or not {'totals', 'categories', 'expense_stats'} <= set(entry):
+            return False
+        removed = [change[1] for change in changes if change[0] != 'add']
+        added = [change[-1] for change in changes if change[0] != 'del']
+
+        totals = {currency: dict(sums) for currency, sums in entry['totals'].items()}
+        categories = dict(entry['categories'])
+        stats = {currency: {'categories': {name: list(sums) for name, sums in part['categories'].items()},
+                            'weeks': {str(week): total for week, total in part['weeks'].items()}}
+                 for currency, part in entry['expense_stats'].items()}
+        for sign, transactions in ((-1, removed), (1, added)):
+            for t in transactions:
+                sums = totals.setdefault(t.currency, {'income_minor': 0, 'expense_minor': 0})
+                side = 'income_minor' if t.type == TransactionType.INCOME.value else 'expense_minor'
+                sums[side] += sign * t.amount_minor
+                for name in t.categories:
+                    categories[name] = categories.get(name, 0) + sign
+            for currency, part in transaction_stats(transactions).items():
+                add_stats(stats.setdefault(currency, empty_stats()), part, sign)
+
+        # Нулевые итоги валюты: остались ли в ней операции, знает только пересчет
+        if any(not any(totals[t.currency].values()) for t in removed):
+            return False
+        self._manifest['partitions'][key] = {
+            **entry,
+            'count': len(partition),
+            'totals': totals,
+            'categories': {name: count for name, count in categories.items() if count > 0},
+            'expense_stats': {currency: part for currency, part in stats.items()
+                              if part['categories'] or part['weeks']},
+            'journal': entry.get('journal', 0) + len(changes),
+            'revision': revision,
+        }
+        return True
+
+    def _save_manifest(self):
+        self._manifest['version'] = MANIFEST_VERSION
+        # Служебный файл пишется без отступов: json.dumps без indent кодирует на C,
+        # а манифест со статистикой по неделям переписывается при каждом сохранении
+        self._write_json(self.manifest_file, self._manifest, indent=None)
+        self._signatures[self.manifest_file] = file_signature(self.manifest_file)
+
+    def _read_json(self, path: str):
+        """Чтение JSON-файла (None - файла нет) с запоминанием подписи и содержимого для слияния
+
+        Подпись снимается до чтения: запись, пришедшая во время чтения,
+        будет замечена при следующей проверке.
+        """
+        self._signatures[path] = file_signature(path)
+        self._bases[path] = None
+        if self._signatures[path] is None:
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self._bases[path] = data
+        return data
+
+    def _write_records(self, path: str, data, key=None):
+        """Запись JSON-файла поверх изменений других процессов
+
+        Если файл изменился после нашего чтения, записывается трехстороннее
+        слияние (sharing.merge_json): наши изменения поверх текущего
+        содержимого. Возвращает записанные данные - data, если сливать
+        было нечего.
+        """
+        with self._lock:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    theirs = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                theirs = None
+            base = self._bases.get(path)
+            if theirs is not None and theirs != base:
+                merged = merge_json(base, data, theirs, key)
+                if merged != data:
+                    data = merged
+            self._write_json(path, data)
+            self._bases[path] = data
+            self._signatures[path] = file_signature(path)
+        return data
+
+    @staticmethod
+    def _write_json(path: str, data, indent: Optional[int] = 2):
+        """Атомарная запись JSON через временный файл"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(data, ensure_ascii=False, indent=indent))
+        os.replace(tmp_path, path)
+
+    @property
+    def transactions(self) -> List[Transaction]:
+        """Все транзакции (загружает все партиции)"""
+        result = []
+        for key in self._partition_keys():
+            result.extend(self._get_partition(key))
+        return result
+
+    @transactions.setter
+    def transactions(self, transactions: List[Transaction]):
+        self.query_cache.clear()
+        self._clear_rollups()
+        partitions = {key: [] for key in self._partition_keys()}
+        for transaction in transactions:
+            partitions.setdefault(partition_key(transaction.date), []).append(transaction)
+        for key, partition in partitions.items():
+            self._set_partition(key, partition)
+
     def _load_budgets(self) -> List[Budget]:
         """Загрузка бюджетов из файла"""
-        if os.path.exists(self.budgets_file):
-            try:
-                with open(self.budgets_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return [Budget(**b) for b in data]
-            except (json.JSONDecodeError, IOError):
-                print("Ошибка загрузки бюджетов, создаем новый файл")
+        try:
+            data = self._read_json(self.budgets_file)
+            if data is not None:
+                return [Budget(**b) for b in data]
+        except (json.JSONDecodeError, IOError):
+            print("Ошибка загрузки бюджетов, создаем новый файл")
+
+        return []
+
+    def _load_recurring_rules(self) -> List[RecurringRule]:
+        """Загрузка правил повторяющихся операций"""
+        try:
+            data = self._read_json(self.recurring_file)
+            if data is not None:
+                return [RecurringRule.from_dict(r) for r in data]
+        except (json.JSONDecodeError, IOError, TypeError):
+            print("Ошибка загрузки повторяющихся операций, создаем новый файл")
+
+        return []
+
+    def _load_saved_filters(self) -> List[SavedFilter]:
+        """Загрузка сохраненных фильтров"""
+        try:
+            data = self._read_json(self.filters_file)
+            if data is not None:
+                return [SavedFilter.from_dict(item) for item in data]
+        except (json.JSONDecodeError, IOError, TypeError):
+            print("Ошибка загрузки сохраненных фильтров, создаем новый файл")
 
         return []
 
     def _load_settings(self) -> Settings:
         """Загрузка настроек из файла"""
-        if os.path.exists(self.settings_file):
-            try:
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    return Settings.from_dict(data)
-            except (json.JSONDecodeError, IOError):
-                print("Ошибка загрузки настроек, используем по умолчанию")
+        try:
+            data = self._read_json(self.settings_file)
+            if data is not None:
+                return Settings.from_dict(data)
+        except (json.JSONDecodeError, IOError):
+            print("Ошибка загрузки настроек, используем по умолчанию")
 
         return Settings()
 
+    @timed()
     def save_all(self):
         """Сохранение всех данных"""
         self.save_transactions()
         self.save_budgets()
+        self.save_recurring_rules()
         self.save_settings()
         self.save_categories()
 
+    @timed()
     def save_transactions(self):
-        """Сохранение транзакций"""
+        """Сохранение измененных партиций транзакций
+
+        Под блокировкой каталога: сначала подхватываются изменения других
+        процессов (наши несохраненные правки сливаются с ними), затем
+        измененные партиции записываются с новой ревизией манифеста.
+        Построчные изменения дописываются в журнал партиции, и итоги
+        манифеста сдвигаются на них - стоимость не зависит от размера
+        партиции; иначе партиция перезаписывается целиком, а журнал
+        удаляется.
+        """
+        if not self._dirty_partitions:
+            return
+
         try:
-            data = [t.to_dict() for t in self.transactions]
-            with open(self.transactions_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with self._lock:
+                self._pull_changes(check_manifest=True)
+                revision = self._manifest.get('revision', 0) + 1
+                for key in sorted(self._dirty_partitions):
+                    partition = self._partitions.get(key, [])
+                    changes = self._pending.get(key)
+                    if partition and changes is not None and self._append_journal(key, changes):
+                        if not self._shift_manifest_entry(key, partition, changes, revision):
+                            self._update_manifest_entry(key, partition, revision)
+                    else:
+                        self._write_partition(key, partition)
+                        self._update_manifest_entry(key, partition, revision)
+                    self._synced[key] = partition
+
+                self._manifest['revision'] = revision
+                self._save_manifest()
+                self._dirty_partitions.clear()
+                self._pending.clear()
+        except TimeoutError:
+            # Каталог занят другим процессом: правки остаются несохраненными
+            # (запишутся следующим сохранением), вызывающий сообщает пользователю
+            raise
         except IOError as e:
             print(f"Ошибка сохранения транзакций: {e}")
 
+    def _write_partition(self, key: str, partition: List[Transaction]):
+        """Запись партиции целиком (сжатие журнала); пустая партиция удаляется"""
+        path = self._partition_file(key)
+        if partition:
+            # Без отступов: json.dumps без indent кодирует на C
+            self._write_json(path, [t.to_dict() for t in partition], indent=None)
+        elif os.path.exists(path):
+            os.remove(path)
+        if os.path.exists(self._journal_file(key)):
+            os.remove(self._journal_file(key))
+
     def save_budgets(self):
         """Сохранение бюджетов"""
+        self.version += 1
+        self.query_cache.invalidate_table('budgets')
         try:
             data = [asdict(b) for b in self.budgets]
-            with open(self.budgets_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            written = self._write_records(self.budgets_file, data, _budget_key)
+            if written is not data:
+                self.budgets = [Budget(**b) for b in written]
+        except TimeoutError:
+            raise
         except IOError as e:
             print(f"Ошибка сохранения бюджетов: {e}")
 
+    def save_recurring_rules(self):
+        """Сохранение правил повторяющихся операций"""
+        self.version += 1
+        self.query_cache.invalidate_table('recurring')
+        try:
+            data = [r.to_dict() for r in self.recurring_rules]
+            written = self._write_records(self.recurring_file, data, itemgetter('id'))
+            if written is not data:
+                self.recurring_rules = [RecurringRule.from_dict(r) for r in written]
+        except TimeoutError:
+            raise
+        except IOError as e:
+            print(f"Ошибка сохранения повторяющихся операций: {e}")
+
+    def save_saved_filters(self):
+        """Сохранение фильтров (на данные и кэш запросов не влияет)"""
+        try:
+            data = [f.to_dict() for f in self.saved_filters]
+            written = self._write_records(self.filters_file, data, itemgetter('id'))
+            if written is not data:
+                self.saved_filters = [SavedFilter.from_dict(item) for item in written]
+        except TimeoutError:
+            raise
+        except IOError as e:
+            print(f"Ошибка сохранения фильтров: {e}")
+
     def save_settings(self):
         """Сохранение настроек"""
+        self.version += 1
+        self.query_cache.invalidate_table('settings')
         try:
             data = self.settings.to_dict()
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            written = self._write_records(self.settings_file, data)
+            if written is not data:
+                self.settings = Settings.from_dict(written)
+        except TimeoutError:
+            raise
         except IOError as e:
             print(f"Ошибка сохранения настроек: {e}")
 
+    # Изменения других процессов
+    def add_reload_callback(self, callback):
+        """Подписка на данные, подхваченные из файлов других процессов"""
+        self._reload_callbacks.append(callback)
+
+    def _record_files(self) -> List[Tuple[str, str, object, Optional[str]]]:
+        """Файлы справочников: путь, атрибут, загрузчик, таблица кэша запросов"""
+        return [
+            (self.budgets_file, 'budgets', self._load_budgets, 'budgets'),
+            (self.recurring_file, 'recurring_rules', self._load_recurring_rules, 'recurring'),
+            (self.settings_file, 'settings', self._load_settings, 'settings'),
+            (self.filters_file, 'saved_filters', self._load_saved_filters, None),
+            (self.categories_file, 'categories', self._load_categories, 'categories'),
+            (self.rates_file, 'rates', self._load_rates, None),
+        ]
+
+    def refresh(self) -> bool:
+        """Подхват изменений, записанных другими процессами
+
+        Без изменений обходится проверкой подписей файлов, без блокировки и
+        чтения. Перечитываются только измененные справочники и партиции
+        (по ревизиям манифеста); несохраненные правки сливаются с новыми
+        данными. Возвращает True, если данные изменились.
+        """
+        watched = [self.manifest_file] + [path for path, *_ in self._record_files()]
+        if all(file_signature(path) == self._signatures[path] for path in watched
+               if path in self._signatures):
+            return False
+        with self._lock:
+            return self._pull_changes()
+
+    def _pull_changes(self, check_manifest: bool = False) -> bool:
+        """Перечитывание измененных файлов (вызывается под блокировкой)"""
+        changed = False
+        if check_manifest or file_signature(self.manifest_file) != self._signatures.get(self.manifest_file):
+            try:
+                manifest = self._read_manifest()
+            except (json.JSONDecodeError, IOError) as e:
+                print(f"Ошибка чтения манифеста транзакций: {e}")
+                manifest = None
+            if manifest is not None:
+                changed = self._pull_partitions(manifest)
+        changed = self._pull_records() or changed
+
+        if changed:
+            for callback in self._reload_callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"Ошибка в callback перезагрузки: {e}")
+        return changed
+
+    def _pull_records(self) -> bool:
+        """Перечитывание измененных справочников"""
+        changed = False
+        for path, attribute, load, table in self._record_files():
+            if path not in self._signatures or file_signature(path) == self._signatures[path]:
+                continue
+            changed = True
+            setattr(self, attribute, load())
+            if table:
+                self.query_cache.invalidate_table(table)
+            if attribute == 'rates':
+                self._on_rates_changed()
+        if changed:
+            self.version += 1
+        return changed
+
+    def _pull_partitions(self, manifest: Dict) -> bool:
+        """Перечитывание партиций, ревизия которых в манифесте изменилась
+
+        Загруженные партиции (и все, если построены помесячные агрегаты)
+        сливаются с версией на диске с приращением агрегатов и кэша
+        запросов; незагруженные просто прочитаются при обращении.
+        """
+        ours, theirs = self._manifest['partitions'], manifest['partitions']
+        changed = [key for key in set(ours) | set(theirs)
+                   if key not in ours or key not in theirs
+                   or ours[key].get('revision') != theirs[key].get('revision')]
+        self._manifest = manifest
+        if not changed:
+            return False
+
+        for key in changed:
+            if key not in self._partitions and (self._rollups or self._sketches):
+                # Агрегаты учитывают все партиции: новую читаем как добавленную
+                self._partitions[key] = self._synced[key] = []
+            if key in self._partitions:
+                self._merge_partition(key, self._read_partition(key) if key in theirs else [])
+            else:
+                self._drop_partition_caches(key)
+                self.query_cache.clear()
+        return True
+
+    def _merge_partition(self, key: str, theirs: List[Transaction]):
+        """Слияние загруженной партиции с ее версией на диске
+
+        Неизмененные операции сохраняют прежние объекты, поэтому разница для
+        агрегатов и кэша - только действительно измененные строки. Наши
+        несохраненные правки применяются поверх чужих (merge_records).
+        """
+        base, ours = self._synced.get(key, []), self._partitions[key]
+        known = {t.id: t for t in base}
+        known.update((t.id, t) for t in ours)
+        theirs = [known[t.id] if known.get(t.id) == t else t for t in theirs]
+        merged = theirs if ours is base else merge_records(base, ours, theirs, attrgetter('id'), is_)
+        self._synced[key] = theirs
+
+        if len(merged) == len(ours) and all(map(is_, merged, ours)):
+            return
+        kept, previous = {id(t) for t in merged}, {id(t) for t in ours}
+        removed = [t for t in ours if id(t) not in kept]
+        added = [t for t in merged if id(t) not in previous]
+        self._invalidate_queries(*removed, *added)
+        self._update_rollups(removed, -1)
+        self._update_rollups(added, 1)
+        self._swap_partition(key, merged)
+        self._drop_partition_caches(key)
+        if key in self._dirty_partitions:
+            self._pending[key] = None  # наши правки уже слиты с чужими - запишется целиком
+
     # Методы работы с транзакциями
+    def _invalidate_queries(self, *transactions: Transaction):
+        """Вытеснение кэшированных запросов, затронутых транзакциями"""
+        self.query_cache.invalidate(
+            {month_key(t.date) for t in transactions},
+            {name for t in transactions for name in t.categories}
+        )
+
     def add_transaction(self, transaction: Transaction):
         """Добавление новой транзакции"""
-        self.transactions.append(transaction)
+        key = partition_key(transaction.date)
+        self._set_partition(key, self._get_partition(key) + [transaction], [('add', transaction)])
+        self._invalidate_queries(transaction)
+        self._update_rollups([transaction], 1)
         self.save_transactions()
 
+    @timed()
+    def add_transactions(self, transactions: List[Transaction]) -> List[Transaction]:
+        """Пакетное добавление с одним сохранением
+
+        Транзакции, чей id уже есть в целевой партиции, пропускаются.
+        Возвращает действительно добавленные.
+        """
+        added = []
+        appended: Dict[str, List[Transaction]] = {}
+        known_ids = {}
+        for transaction in transactions:
+            key = partition_key(transaction.date)
+            ids = known_ids.get(key)
+            if ids is None:
+                ids = known_ids[key] = {t.id for t in self._get_partition(key)}
+            if transaction.id in ids:
+                continue
+            appended.setdefault(key, []).append(transaction)
+            ids.add(transaction.id)
+            added.append(transaction)
+
+        if added:
+            for key, new in appended.items():
+                self._set_partition(key, self._get_partition(key) + new, [('add', t) for t in new])
+            self._invalidate_queries(*added)
+            self._update_rollups(added, 1)
+            self.save_transactions()
+        return added
+
     def delete_transaction(self, transaction_id: str):
         """Удаление транзакции по ID"""
-        self.transactions = [t for t in self.transactions if t.id != transaction_id]
+        key = self._find_transaction(transaction_id)
+        if key is None:
+            return
+
+        partition = self._get_partition(key)
+        removed = list(self._partition_ids(key)[transaction_id])
+        rows = _rows_of(partition, removed)
+        removed = [partition[row] for row in rows]
+        self._set_partition(key, _without_rows(partition, rows), [('del', t) for t in removed])
+        self._invalidate_queries(*removed)
+        self._update_rollups(removed, -1)
         self.save_transactions()
 
     def update_transaction(self, transaction: Transaction):
         """Обновление транзакции"""
-        for i, t in enumerate(self.transactions):
-            if t.id == transaction.id:
-                self.transactions[i] = transaction
-                break
+        new_key = partition_key(transaction.date)
+        old_key = self._find_transaction(transaction.id, hint_key=new_key)
+        if old_key is None:
+            return
+
+        old_partition = self._get_partition(old_key)
+        rows = _rows_of(old_partition, self._partition_ids(old_key)[transaction.id])
+        old = old_partition[rows[0]]
+        if old is transaction:
+            # Объект изменен на месте - прежние месяц и категория неизвестны
+            self.query_cache.invalidate({month_key(transaction.date)}, None)
+            self._clear_rollups()
+        else:
+            self._invalidate_queries(old, transaction)
+            self._update_rollups([old], -1)
+            self._update_rollups([transaction], 1)
+
+        # Объект, измененный на месте, в журнал не записать: прежние итоги неизвестны
+        known = old is not transaction
+        if old_key == new_key:
+            partition = list(old_partition)
+            for row in rows:
+                partition[row] = transaction
+            self._set_partition(old_key, partition,
+                                [('put', old_partition[row], transaction) for row in rows] if known else None)
+        else:
+            self._set_partition(old_key, _without_rows(old_partition, rows),
+                                [('del', old_partition[row]) for row in rows] if known else None)
+            self._set_partition(new_key, self._get_partition(new_key) + [transaction],
+                                [('add', transaction)] if known else None)
         self.save_transactions()
 
+    @timed()
+    def delete_transactions(self, transaction_ids) -> List[Transaction]:
+        """Пакетное удаление с одним сохранением; возвращает удаленные"""
+        pending = set(transaction_ids)
+        removed = []
+        for key in self._search_order():
+            if not pending:
+                break
+            partition = self._get_partition(key)
+            found = [t for t in partition if t.id in pending]
+            if found:
+                self._set_partition(key, [t for t in partition if t.id not in pending], [('del', t) for t in found])
+                pending.difference_update(t.id for t in found)
+                removed.extend(found)
+
+        if removed:
+            self._invalidate_queries(*removed)
+            self._update_rollups(removed, -1)
+            self.save_transactions()
+        return removed
+
+    @timed()
+    def update_transactions(self, transactions: List[Transaction]) -> List[Tuple[Transaction, Transaction]]:
+        """Пакетное обновление с одним сохранением; возвращает пары (было, стало)
+
+        Транзакции, которых нет в базе, пропускаются.
+        """
+        by_id = {t.id: t for t in transactions}
+        pairs = []
+        moved = []
+        updated: Dict[str, Tuple[List[Transaction], List[Tuple]]] = {}
+        for key in self._search_order():
+            if len(pairs) == len(by_id):
+                break
+            partition = list(self._get_partition(key))
+            changes = []
+            for i, old in enumerate(partition):
+                new = by_id.get(old.id)
+                if new is None:
+                    continue
+                pairs.append((old, new))
+                if partition_key(new.date) == key:
+                    partition[i] = new
+                    changes.append(('put', old, new))
+                else:
+                    partition[i] = None
+                    moved.append(new)
+                    changes.append(('del', old))
+            if changes:
+                updated[key] = [t for t in partition if t is not None], changes
+
+        # Объекты, измененные на месте, в журнал не записать: прежние итоги неизвестны
+        known = not any(old is new for old, new in pairs)
+        for key, (partition, changes) in updated.items():
+            self._set_partition(key, partition, changes if known else None)
+
+        # Перенос между партициями после просмотра, чтобы не найти запись дважды
+        arrived: Dict[str, List[Transaction]] = {}
+        for new in moved:
+            arrived.setdefault(partition_key(new.date), []).append(new)
+        for key, new in arrived.items():
+            self._set_partition(key, self._get_partition(key) + new, [('add', t) for t in new] if known else None)
+
+        if pairs:
+            if not known:
+                # Объекты изменены на месте - прежние месяцы и категории неизвестны
+                self.query_cache.invalidate({month_key(new.date) for _, new in pairs}, None)
+                self._clear_rollups()
+            else:
+                self._invalidate_queries(*(t for pair in pairs for t in pair))
+                self._update_rollups([old for old, _ in pairs], -1)
+                self._update_rollups([new for _, new in pairs], 1)
+            self.save_transactions()
+        return pairs
+
+    def get_transactions_by_ids(self, transaction_ids) -> List[Transaction]:
+        """Транзакции с указанными ID (за один просмотр партиций)"""
+        pending = set(transaction_ids)
+        found = []
+        for key in self._search_order():
+            if not pending:
+                break
+            for t in self._get_partition(key):
+                if t.id in pending:
+                    found.append(t)
+                    pending.discard(t.id)
+        return found
+
+    def _filter_args(self, start: str, end: str, categories) -> Tuple:
+        """Границы дат ("YYYY-MM-DD" включительно) и коды категорий для filter_mask"""
+        lo = np.datetime64(start, 's') if start else None
+        hi = np.datetime64(end, 'D') + np.timedelta64(1, 'D') if end else None
+        codes = None
+        if categories is not None:
+            codes = np.array([self._category_codes[c] for c in categories if c in self._category_codes],
+                             dtype=np.int32)
+        return lo, hi, codes
+
+    def _filter_keys(self, start: str, end: str) -> List[str]:
+        """Партиции (от старых к новым), пересекающиеся с диапазоном дат"""
+        lo = datetime.strptime(start[:10], "%Y-%m-%d") if start else datetime.min
+        hi = datetime.strptime(end[:10], "%Y-%m-%d") if end else datetime.max
+        return self._partitions_for_range(lo, hi)
+
+    @timed()
+    def filter_transactions(self, tag_query: str = None, start: str = None, end: str = None,
+                            categories: List[str] = None, limit: int = None) -> List[Transaction]:
+        """Транзакции (последние first) по запросу тегов, датам и категориям
+
+        Маска считается по битовым картам тегов колонок каждой партиции;
+        при заданном limit старые партиции не просматриваются.
+        """
+        query = parse_tag_query(tag_query)
+        result = []
+        for key in reversed(self._filter_keys(start, end)):
+            columns = self._partition_columns(key)
+            lo, hi, codes = self._filter_args(start, end, categories)
+            rows = columns.rows[columns.filter_mask(lo, hi, codes, query)][::-1]
+            # Строки разбивки одной операции идут подряд
+            rows = rows[np.concatenate(([True], rows[1:] != rows[:-1]))] if len(rows) else rows
+            partition = self._get_partition(key)
+            result.extend(partition[row] for row in rows)
+            if limit and len(result) >= limit:
+                return result[:limit]
+        return result
+
+    def get_filtered_columns(self, tag_query: str = None, start: str = None, end: str = None,
+                             categories: List[str] = None, currency: str = None) -> LedgerColumns:
+        """Колонки (в валюте отчетов) после фильтра тегов, дат и категорий"""
+        query = parse_tag_query(tag_query)
+        if start or end:
+            keys = tuple(self._filter_keys(start, end))
+            columns = self._columns_for_keys(keys, currency or self.reporting_currency)
+        else:
+            columns = self.get_columns(currency=currency)
+        lo, hi, codes = self._filter_args(start, end, categories)
+        return columns.select(columns.filter_mask(lo, hi, codes, query))
+
+    def tag_names(self) -> List[str]:
+        """Все теги операций"""
+        keys = tuple(k for k in self._partition_keys() if k != UNKNOWN_PARTITION)
+        return self._columns_for_keys(keys, None).tags.tags
+
+    def get_transaction(self, transaction_id: str) -> Optional[Transaction]:
+        """Получение транзакции по ID"""
+        key = self._find_transaction(transaction_id)
+        if key is None:
+            return None
+        return self._partition_ids(key)[transaction_id][0]
+
+    @timed()
     def get_transactions(self, limit: int = None) -> List[Transaction]:
-        """Получение транзакций (последние first)"""
-        transactions = sorted(
-            self.transactions,
-            key=lambda x: datetime.strptime(x.date, "%Y-%m-%d %H:%M:%S"),
-            reverse=True
-        )
+        """Получение транзакций (последние first)
+
+        При заданном limit читаются только самые новые партиции. Возвращается
+        копия списка из кэша: вызывающий может его сортировать и менять.
+        """
+        return list(self._transactions(limit))
+
+    @cached_query()
+    def _transactions(self, limit: int) -> List[Transaction]:
+        transactions = []
+        for key in reversed(self._partition_keys()):
+            partition = sorted(self._get_partition(key), key=lambda x: x.date, reverse=True)
+            transactions.extend(partition)
+            if limit and len(transactions) >= limit:
+                break
 
         if limit:
             transactions = transactions[:limit]
 
         return transactions
 
-    def get_monthly_summary(self, year: int = None, month: int = None) -> Dict:
-        """Сводка за месяц"""
+    @timed()
+    def get_monthly_summary(self, year: int = None, month: int = None, currency: str = None) -> Dict:
+        """Сводка за месяц (в валюте отчетов, если не указана другая)"""
         if year is None:
             year = datetime.now().year
         if month is None:
             month = datetime.now().month
 
-        income = 0.0
-        expense = 0.0
+        return self._monthly_summary(year, month, currency or self.reporting_currency)
 
-        for transaction in self.transactions:
-            try:
-                trans_date = datetime.strptime(transaction.date, "%Y-%m-%d %H:%M:%S")
-                if trans_date.year == year and trans_date.month == month:
-                    if transaction.type == TransactionType.INCOME.value:
-                        income += transaction.amount
-                    else:
-                        expense += transaction.amount
-            except ValueError:
-                continue
+    @cached_query(lambda self, year, month, currency: (_month_range(year, month), None))
+    def _monthly_summary(self, year: int, month: int, currency: str) -> Dict:
+        columns = self.get_columns(datetime(year, 1, 1), datetime(year, 12, 31), currency)
+        month_start = np.datetime64(f"{year:04d}-{month:02d}", 'M')
+        lo, hi = np.searchsorted(columns.dates, [month_start, month_start + 1])
+
+        amounts = columns.amounts[lo:hi]
+        is_income = columns.is_income[lo:hi]
+        income = int(amounts[is_income].sum())
+        expense = int(amounts[~is_income].sum())
 
         return {
-            'income': income,
-            'expense': expense,
-            'balance': income - expense,
+            'income': from_minor(income),
+            'expense': from_minor(expense),
+            'balance': from_minor(income - expense),
+            'income_minor': income,
+            'expense_minor': expense,
+            'balance_minor': income - expense,
+            'currency': currency,
             'year': year,
             'month': month
         }
 
-    def get_expenses_by_category(self) -> Dict[str, float]:
-        """Расходы по категориям"""
-        expenses = {}
-        for transaction in self.transactions:
-            if transaction.type == TransactionType.EXPENSE.value:
-                category = transaction.category
-                expenses[category] = expenses.get(category, 0) + transaction.amount
+    @timed()
+    def get_expenses_by_category(self, currency: str = None) -> Dict[str, float]:
+        """Расходы по категориям (в валюте отчетов, если не указана другая)"""
+        return self._expenses_by_category(currency or self.reporting_currency)
+
+    @cached_query()
+    def _expenses_by_category(self, currency: str) -> Dict[str, float]:
+        columns = self.get_columns(currency=currency)
+        expense = ~columns.is_income
+        names = self.category_names
+        sums = np.bincount(columns.categories[expense], weights=columns.amounts[expense],
+                           minlength=len(names))
+        counts = np.bincount(columns.categories[expense], minlength=len(names))
+
+        expenses = {names[code]: from_minor(int(round(sums[code]))) for code in np.flatnonzero(counts)}
+        if UNKNOWN_PARTITION in self._partition_keys():
+            for t in self._get_partition(UNKNOWN_PARTITION):
+                if t.type == TransactionType.EXPENSE.value:
+                    for category, line_amount in t.lines():
+                        amount = self.rates.convert_minor(line_amount, t.currency, currency, t.date)
+                        expenses[category] = expenses.get(category, 0) + from_minor(amount)
         return expenses
 
+    @timed()
+    def get_balance_series(self, start: datetime = None, end: datetime = None,
+                           granularity: str = 'day', currency: str = None) -> Dict:
+        """Ряд баланса на конец каждого периода (day/week/month/year)
+
+        Начальный баланс берется из итогов более ранних партиций, внутри
+        диапазона - префиксные суммы и searchsorted по колонкам.
+        """
+        if end is None:
+            end = datetime.now()
+        if start is None:
+            start = end - timedelta(days=29)
+
+        # Ряд считается по дням: время отбрасывается, чтобы ключ кэша не менялся в течение дня
+        start, end = datetime(start.year, start.month, start.day), datetime(end.year, end.month, end.day)
+        return self._balance_series(start, end, granularity, currency or self.reporting_currency)
+
+    @cached_query(lambda self, start, end, granularity, currency:
+                  (("", _series_end(start, end, granularity).strftime("%Y-%m")), None))
+    def _balance_series(self, start: datetime, end: datetime, granularity: str, currency: str) -> Dict:
+        starts = period_starts(np.datetime64(start), np.datetime64(end), granularity)
+        ends = next_period_starts(starts, granularity)
+
+        first_year = min(start.year, int(str(starts[0])[:4]))
+        columns = self.get_columns(datetime(first_year, 1, 1), _series_end(start, end, granularity), currency)
+        prior = self._net_before_year(first_year, currency)
+
+        opening = prior + int(columns.net_before(np.array([starts[0]]))[0])
+        balance = prior + columns.net_before(ends)
+
+        return {
+            'periods': starts,
+            'balance': balance / 100,
+            'balance_minor': balance,
+            'opening_balance': from_minor(opening),
+            'opening_balance_minor': opening,
+            'granularity': granularity,
+            'currency': currency,
+        }
+
     def get_balance_history(self, days: int = 30) -> List[float]:
-        """История баланса за N дней"""
+        """История баланса за N дней (баланс на конец каждого дня)"""
         end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
+        start_date = end_date - timedelta(days=days - 1)
+        series = self.get_balance_series(start_date, end_date, 'day')
+        return series['balance'].tolist()
 
-        # Группируем по дням
-        daily_balance = {}
 
-        for transaction in self.transactions:
-            try:
-                trans_date = datetime.strptime(transaction.date, "%Y-%m-%d %H:%M:%S")
-                if start_date <= trans_date <= end_date:
-                    date_key = trans_date.strftime("%Y-%m-%d")
-                    if transaction.type == TransactionType.INCOME.value:
-                        daily_balance[date_key] = daily_balance.get(date_key, 0) + transaction.amount
-                    else:
-                        daily_balance[date_key] = daily_balance.get(date_key, 0) - transaction.amount
-            except ValueError:
-                continue
+class DatabaseSnapshot(Database):
+    """Снимок хранилища только для чтения
+
+    Поддерживает все методы чтения Database (колонки, агрегаты, фильтры),
+    так что сервисы аналитики и экспорта работают с ним как с базой.
+    Партиции, не загруженные в момент снятия, читаются с диска при первом
+    обращении; если база изменит такую партицию раньше, снимок получит ее
+    прежний список (_retain). Помесячные агрегаты копируются, скетчи и
+    кэш запросов у снимка свои.
+    """
+
+    def __init__(self, source: Database):
+        # Пути к файлам и прочие поля - как у базы, изменяемое состояние - копии
+        self.__dict__.update(vars(source))
+        self._partitions = dict(source._partitions)
+        self._dirty_partitions = set()
+        self._columns = dict(source._columns)
+        self._range_columns = dict(source._range_columns)
+        self._postings = dict(source._postings)
+        self._ids = {}  # индексы базы меняются на месте
+        self._category_codes = dict(source._category_codes)
+        self._currency_codes = dict(source._currency_codes)
+        self._rollups = {currency: rollup.copy() for currency, rollup in source._rollups.items()}
+        self._sketches = {}
+        self._snapshots = weakref.WeakSet()
+        self._manifest = {**source._manifest, 'partitions': dict(source._manifest['partitions'])}
+        self.rates = source.rates.copy()
+        self.query_cache = QueryCache()
+        self.budgets = [replace(b) for b in source.budgets]
+        self.recurring_rules = [replace(r) for r in source.recurring_rules]
+        self.settings = Settings.from_dict(source.settings.to_dict())
+        self.saved_filters = list(source.saved_filters)
+        self.categories = list(source.categories)
+
+    def _get_partition(self, key: str) -> List[Transaction]:
+        partition = self._partitions.get(key)
+        if partition is None:
+            # База могла передать прежний список, пока партиция читалась
+            partition = self._partitions.setdefault(key, self._read_partition(key))
+        return partition
+
+    def _retain(self, key: str, partition: List[Transaction]):
+        """Прежний список партиции, которую база сейчас заменит"""
+        self._partitions.setdefault(key, partition)
 
-        # Создаем последовательность дней
-        balance_history = []
-        current_balance = 0
+    def snapshot(self) -> 'DatabaseSnapshot':
+        return self
 
-        for i in range(days):
-            date = (end_date - timedelta(days=i)).strftime("%Y-%m-%d")
-            current_balance += daily_balance.get(date, 0)
-            balance_history.append(current_balance)
+    def _read_only(self, *args, **kwargs):
+        raise RuntimeError("Снимок базы доступен только для чтения")
 
-        return list(reversed(balance_history))
+    _set_partition = _read_only
+    save_transactions = _read_only
+    save_budgets = _read_only
+    save_recurring_rules = _read_only
+    save_saved_filters = _read_only
+    save_settings = _read_only
+    save_categories = _read_only
+    save_rates = _read_only
+    reload_rates = _read_only
+    refresh = _read_only
@@ -1,7 +1,7 @@
 """
 Инициализация категорий по умолчанию
 """
-from models import Category, CategoryType
+from .models import Category, CategoryType
 
 DEFAULT_CATEGORIES = [
     # Доходы
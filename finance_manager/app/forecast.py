@@ -0,0 +1,152 @@
+"""
+Прогноз денежного потока по помесячным агрегатам
+
+Для чистого потока и для каждого ключа (категория, тип) строится линейная
+модель: тренд + сезонные гармоники с периодом 12 месяцев. Все ряды
+решаются одной системой нормальных уравнений (X'X) B = X'Y, поэтому при
+закрытии месяца или правке прошлых данных суммы X'X и X'Y обновляются
+приращениями, без полного пересчета.
+"""
+from typing import Tuple
+
+import numpy as np
+
+from .aggregates import MonthlyRollup
+
+MIN_MONTHS = 3
+SEASON = 12
+Z_95 = 1.96
+
+
+def harmonics_for(n_months: int) -> int:
+    """Число сезонных гармоник по длине истории (короткая история - без сезонности)"""
+    if n_months < SEASON:
+        return 0
+    if n_months < 2 * SEASON:
+        return 1
+    return 2
+
+
+def design(t: np.ndarray, harmonics: int) -> np.ndarray:
+    """Матрица признаков: 1, t, sin/cos гармоник"""
+    t = np.asarray(t, dtype=np.float64)
+    columns = [np.ones_like(t), t]
+    for k in range(1, harmonics + 1):
+        angle = 2 * np.pi * k * t / SEASON
+        columns.extend((np.sin(angle), np.cos(angle)))
+    return np.column_stack(columns)
+
+
+def series_matrix(rollup: MonthlyRollup, n_months: int) -> np.ndarray:
+    """Ряды месяцы x (чистый поток + ключи), дополненные нулями до n_months"""
+    sums = rollup.sums[:, :n_months]
+    income = sums[1::2].sum(axis=0)
+    expense = sums[0::2].sum(axis=0)
+    matrix = np.zeros((n_months, sums.shape[0] + 1))
+    matrix[:sums.shape[1], 0] = income - expense
+    matrix[:sums.shape[1], 1:] = sums.T
+    return matrix
+
+
+class Forecaster:
+    """Модель тренда и сезонности по закрытым месяцам с дообучением"""
+
+    def __init__(self):
+        self._reset()
+        self.full_fits = 0
+        self.incremental_fits = 0
+
+    def _reset(self):
+        self.first_month = None
+        self.harmonics = None
+        self.y_fit = None
+        self.xtx = None
+        self.xty = None
+        self.yty = None
+        self.coef = None
+        self.sigma = None
+        self._xtx_inv = None
+        self._fitted_version = None
+
+    @property
+    def n_months(self) -> int:
+        return 0 if self.y_fit is None else len(self.y_fit)
+
+    def fit(self, rollup: MonthlyRollup, current_month: int) -> bool:
+        """Обновление модели по месяцам раньше current_month (номер от 1970-01)
+
+        Возвращает False, если истории недостаточно.
+        """
+        n_closed = current_month - rollup.first_month if rollup.n_months else 0
+        if n_closed < MIN_MONTHS:
+            self._reset()
+            return False
+
+        if (self._fitted_version == rollup.version and self.first_month == rollup.first_month
+                and self.n_months == n_closed):
+            return True
+
+        y = series_matrix(rollup, n_closed)
+        harmonics = harmonics_for(n_closed)
+        incremental = (self.y_fit is not None and self.first_month == rollup.first_month
+                       and self.harmonics == harmonics and self.n_months <= n_closed)
+
+        if incremental:
+            self._update(y)
+            self.incremental_fits += 1
+        else:
+            x = design(np.arange(n_closed), harmonics)
+            self.xtx = x.T @ x
+            self.xty = x.T @ y
+            self.yty = (y ** 2).sum(axis=0)
+            self.full_fits += 1
+
+        self.first_month = rollup.first_month
+        self.harmonics = harmonics
+        self.y_fit = y
+        self._fitted_version = rollup.version
+        self._solve()
+        return True
+
+    def _update(self, y: np.ndarray):
+        """Приращения X'X, X'Y, Y'Y: измененные старые месяцы и новые закрытые"""
+        old_n, old_k = self.y_fit.shape
+        if y.shape[1] > old_k:
+            # Новые категории: их прошлые значения войдут через разность ниже
+            extra = y.shape[1] - old_k
+            self.y_fit = np.pad(self.y_fit, ((0, 0), (0, extra)))
+            self.xty = np.pad(self.xty, ((0, 0), (0, extra)))
+            self.yty = np.pad(self.yty, (0, extra))
+
+        delta = y[:old_n] - self.y_fit
+        changed = np.flatnonzero(delta.any(axis=1))
+        if len(changed):
+            x_changed = design(changed, self.harmonics)
+            self.xty += x_changed.T @ delta[changed]
+            self.yty += (y[changed] ** 2 - self.y_fit[changed] ** 2).sum(axis=0)
+
+        if len(y) > old_n:
+            x_new = design(np.arange(old_n, len(y)), self.harmonics)
+            self.xtx += x_new.T @ x_new
+            self.xty += x_new.T @ y[old_n:]
+            self.yty += (y[old_n:] ** 2).sum(axis=0)
+
+    def _solve(self):
+        inv = np.linalg.pinv(self.xtx)
+        coef = inv @ self.xty
+        ssr = self.yty - 2 * (coef * self.xty).sum(axis=0) + (coef * (self.xtx @ coef)).sum(axis=0)
+        dof = max(self.n_months - self.xtx.shape[0], 1)
+        self.coef = coef
+        self.sigma = np.sqrt(np.maximum(ssr, 0) / dof)
+        self._xtx_inv = inv
+
+    def predict(self, steps: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Прогноз на steps месяцев от первого незакрытого: (среднее, ст. ошибка)
+
+        Столбец 0 - чистый поток, далее - ключи rollup.
+        """
+        x = design(np.arange(self.n_months, self.n_months + steps), self.harmonics)
+        mean = x @ self.coef
+        leverage = ((x @ self._xtx_inv) * x).sum(axis=1)
+        stderr = np.sqrt(1 + leverage)[:, None] * self.sigma[None, :]
+        return mean, stderr
@@ -0,0 +1,271 @@
+"""
+История изменений для отмены и повтора
+
+Каждая команда хранит только обратимую разницу (добавленную/удаленную
+транзакцию, пару "было/стало" или прежний список категорий), а не
+снимок данных. Отмена и повтор выполняются через обычные методы
+контроллера, поэтому проходят через те же инкрементальные индексы,
+агрегаты и кэши, что и исходное действие.
+
+Размер истории ограничен числом шагов и оценкой занимаемой памяти:
+при превышении отбрасываются самые старые команды.
+"""
+from collections import deque
+from dataclasses import replace
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .models import Budget, Category, RecurringRule, SavedFilter, Transaction
+
+MAX_STEPS = 200
+MAX_BYTES = 8 * 1024 * 1024
+
+_OBJECT_OVERHEAD = 400  # dataclass, словарь атрибутов и строки id/даты
+
+
+def transaction_size(transaction: Transaction) -> int:
+    """Оценка памяти, занимаемой копией транзакции"""
+    return (_OBJECT_OVERHEAD * (1 + len(transaction.splits))
+            + 2 * (len(transaction.description) + len(transaction.category)
+                   + sum(len(tag) for tag in transaction.tags)
+                   + sum(len(s.category) + len(s.description) for s in transaction.splits)))
+
+
+def _copy(transaction: Transaction) -> Transaction:
+    """Копия, не зависящая от дальнейших изменений объекта в базе"""
+    return replace(transaction, tags=list(transaction.tags),
+                   splits=[replace(s) for s in transaction.splits])
+
+
+class Command:
+    """Обратимое изменение данных"""
+
+    description = ""
+
+    def undo(self, controller):
+        raise NotImplementedError
+
+    def redo(self, controller):
+        raise NotImplementedError
+
+    @property
+    def size(self) -> int:
+        return _OBJECT_OVERHEAD
+
+
+class AddTransactionCommand(Command):
+    def __init__(self, transaction: Transaction):
+        self.transaction = _copy(transaction)
+        self.description = f"добавление «{transaction.category}»"
+
+    def undo(self, controller):
+        controller.delete_transaction(self.transaction.id)
+
+    def redo(self, controller):
+        controller.add_transaction(_copy(self.transaction))
+
+    @property
+    def size(self) -> int:
+        return transaction_size(self.transaction)
+
+
+class DeleteTransactionCommand(Command):
+    def __init__(self, transaction: Transaction):
+        self.transaction = _copy(transaction)
+        self.description = f"удаление «{transaction.category}»"
+
+    def undo(self, controller):
+        controller.add_transaction(_copy(self.transaction))
+
+    def redo(self, controller):
+        controller.delete_transaction(self.transaction.id)
+
+    @property
+    def size(self) -> int:
+        return transaction_size(self.transaction)
+
+
+class UpdateTransactionCommand(Command):
+    def __init__(self, before: Transaction, after: Transaction):
+        self.before = _copy(before)
+        self.after = _copy(after)
+        self.description = f"изменение «{after.category}»"
+
+    def undo(self, controller):
+        controller.update_transaction(_copy(self.before))
+
+    def redo(self, controller):
+        controller.update_transaction(_copy(self.after))
+
+    @property
+    def size(self) -> int:
+        return transaction_size(self.before) + transaction_size(self.after)
+
+
+class DeleteTransactionsCommand(Command):
+    def __init__(self, transactions: List[Transaction]):
+        self.transactions = [_copy(t) for t in transactions]
+        self.description = f"удаление {len(transactions)} операций"
+
+    def undo(self, controller):
+        controller.add_transactions([_copy(t) for t in self.transactions])
+
+    def redo(self, controller):
+        controller.delete_transactions([t.id for t in self.transactions])
+
+    @property
+    def size(self) -> int:
+        return sum(transaction_size(t) for t in self.transactions)
+
+
+class UpdateTransactionsCommand(Command):
+    def __init__(self, pairs: List[Tuple[Transaction, Transaction]]):
+        self.before = [_copy(old) for old, _ in pairs]
+        self.after = [_copy(new) for _, new in pairs]
+        self.description = f"изменение {len(pairs)} операций"
+
+    def undo(self, controller):
+        controller.update_transactions([_copy(t) for t in self.before])
+
+    def redo(self, controller):
+        controller.update_transactions([_copy(t) for t in self.after])
+
+    @property
+    def size(self) -> int:
+        return sum(transaction_size(t) for t in self.before) + sum(transaction_size(t) for t in self.after)
+
+
+class AddTransactionsCommand(Command):
+    def __init__(self, transactions: List[Transaction]):
+        self.transactions = [_copy(t) for t in transactions]
+        self.description = f"добавление {len(transactions)} операций"
+
+    def undo(self, controller):
+        controller.delete_transactions([t.id for t in self.transactions])
+
+    def redo(self, controller):
+        controller.add_transactions([_copy(t) for t in self.transactions])
+
+    @property
+    def size(self) -> int:
+        return sum(transaction_size(t) for t in self.transactions)
+
+
+class CategoriesCommand(Command):
+    def __init__(self, before: List[Category], after: List[Category]):
+        self.before = [replace(c) for c in before]
+        self.after = [replace(c) for c in after]
+        self.description = "изменение категорий"
+
+    def undo(self, controller):
+        controller.save_category_objects([replace(c) for c in self.before])
+
+    def redo(self, controller):
+        controller.save_category_objects([replace(c) for c in self.after])
+
+    @property
+    def size(self) -> int:
+        return _OBJECT_OVERHEAD * (1 + len(self.before) + len(self.after))
+
+
+class ReassignCategoryCommand(Command):
+    """Переименование/объединение категорий вместе с операциями
+
+    Хранятся только ID перенесенных операций по исходным категориям и
+    прежние списки категорий, бюджетов, правил и фильтров; операции с
+    разбивкой - копиями целиком.
+    """
+
+    def __init__(self, sources: List[str], target: Category, moved: Dict[str, List[str]],
+                 categories: List[Category], budgets: List[Budget], rules: List[RecurringRule],
+                 split: List[Transaction] = (), filters: List[SavedFilter] = ()):
+        self.sources = list(sources)
+        self.target = replace(target)
+        self.moved = moved
+        self.categories = [replace(c) for c in categories]
+        self.budgets = [replace(b) for b in budgets]
+        self.rules = [replace(r) for r in rules]
+        self.split = [_copy(t) for t in split]
+        self.filters = [replace(f, categories=list(f.categories)) for f in filters]
+        self.description = f"перенос в «{target.name}»"
+
+    def undo(self, controller):
+        controller.restore_category_assignment(self.moved, [replace(c) for c in self.categories],
+                                               [replace(b) for b in self.budgets],
+                                               [replace(r) for r in self.rules],
+                                               [_copy(t) for t in self.split],
+                                               [replace(f, categories=list(f.categories)) for f in self.filters])
+
+    def redo(self, controller):
+        controller.reassign_category(self.sources, replace(self.target))
+
+    @property
+    def size(self) -> int:
+        ids = sum(len(ids) for ids in self.moved.values())
+        return (_OBJECT_OVERHEAD * (1 + len(self.categories) + len(self.budgets) + len(self.rules)
+                                    + len(self.filters)) + 100 * ids
+                + sum(transaction_size(t) for t in self.split))
+
+
+class CommandHistory:
+    """Стеки отмены и повтора с ограничением по шагам и памяти"""
+
+    def __init__(self, max_steps: int = MAX_STEPS, max_bytes: int = MAX_BYTES):
+        self.max_steps = max_steps
+        self.max_bytes = max_bytes
+        self._undo: Deque[Command] = deque()
+        self._redo: List[Command] = []
+        self._bytes = 0
+
+    @property
+    def memory(self) -> int:
+        """Оценка памяти, занятой историей"""
+        return self._bytes
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def _push_undo(self, command: Command):
+        self._undo.append(command)
+        self._bytes += command.size
+        while self._undo and (len(self._undo) > self.max_steps or self._bytes > self.max_bytes):
+            self._bytes -= self._undo.popleft().size
+
+    def record(self, command: Command):
+        """Новое действие пользователя: история повтора сбрасывается"""
+        for dropped in self._redo:
+            self._bytes -= dropped.size
+        self._redo.clear()
+        self._push_undo(command)
+
+    def pop_undo(self) -> Optional[Command]:
+        """Команда для отмены (переходит в стек повтора)"""
+        if not self._undo:
+            return None
+        command = self._undo.pop()
+        self._redo.append(command)
+        return command
+
+    def pop_redo(self) -> Optional[Command]:
+        """Команда для повтора (возвращается в стек отмены)"""
+        if not self._redo:
+            return None
+        command = self._redo.pop()
+        self._bytes -= command.size
+        self._push_undo(command)
+        return command
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._bytes = 0
+
+    def peek_undo(self) -> Optional[Command]:
+        return self._undo[-1] if self._undo else None
+
+    def peek_redo(self) -> Optional[Command]:
+        return self._redo[-1] if self._redo else None
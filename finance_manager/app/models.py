@@ -1,10 +1,13 @@
 """
 Модели данных
 """
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass, field, replace
 from datetime import datetime
 from enum import Enum
-from typing import Dict, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .currency import BASE_CURRENCY
+from .money import from_minor, to_minor
 
 
 class TransactionType(Enum):
@@ -13,6 +16,13 @@ class TransactionType(Enum):
     EXPENSE = "expense"
 
 
+class RecurrenceFrequency(Enum):
+    """Периодичность повторяющихся операций"""
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+    YEARLY = "yearly"
+
+
 class CategoryType(Enum):
     """Типы категорий"""
     INCOME = "income"
@@ -27,13 +37,15 @@ class Category:
     type: CategoryType = CategoryType.EXPENSE
     color: str = ""  # Цвет для отображения
     icon: str = ""  # Иконка
+    parent: str = ""  # Родительская категория ("" - верхний уровень)
 
     def to_dict(self):
         return {
             'name': self.name,
             'type': self.type.value,
             'color': self.color,
-            'icon': self.icon
+            'icon': self.icon,
+            'parent': self.parent
         }
 
     @classmethod
@@ -42,19 +54,51 @@ class Category:
             name=data['name'],
             type=CategoryType(data.get('type', 'expense')),
             color=data.get('color', ''),
-            icon=data.get('icon', '')
+            icon=data.get('icon', ''),
+            parent=data.get('parent', '')
         )
 
 
+@dataclass
+class Split:
+    """Строка разбивки операции: часть суммы в своей категории"""
+    category: str
+    amount_minor: int
+    description: str = ""
+
+    @property
+    def amount(self) -> float:
+        return from_minor(self.amount_minor)
+
+    def to_dict(self):
+        data = {'category': self.category, 'amount_minor': self.amount_minor}
+        if self.description:
+            data['description'] = self.description
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict):
+        return cls(**data)
+
+
 @dataclass
 class Transaction:
-    """Модель транзакции"""
+    """Модель транзакции
+
+    Сумма хранится целым числом копеек (amount_minor) в валюте currency;
+    amount - float-представление для отображения и совместимости.
+    splits - разбивка суммы по категориям (хранится внутри записи);
+    не покрытый разбивкой остаток относится к category.
+    """
     id: Optional[str] = None
     date: str = ""
     type: str = TransactionType.EXPENSE.value
     category: str = ""
-    amount: float = 0.0
+    amount_minor: int = 0
     description: str = ""
+    currency: str = BASE_CURRENCY
+    tags: List[str] = field(default_factory=list)
+    splits: List[Split] = field(default_factory=list)
 
     def __post_init__(self):
         if not self.id:
@@ -63,15 +107,151 @@ class Transaction:
         if not self.date:
             self.date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+    @property
+    def amount(self) -> float:
+        return from_minor(self.amount_minor)
+
+    @amount.setter
+    def amount(self, value):
+        self.amount_minor = to_minor(value)
+
+    def lines(self, amount_minor: int = None) -> List[Tuple[str, int]]:
+        """Строки учета (категория, копейки): разбивка и остаток; в сумме - amount_minor
+
+        amount_minor - сумма операции в другой валюте: части пересчитываются пропорционально,
+        копейки округления достаются частям с наибольшими остатками (сумма сохраняется точно).
+        """
+        if not self.splits:
+            return [(self.category, self.amount_minor if amount_minor is None else amount_minor)]
+        lines = [(s.category, s.amount_minor) for s in self.splits]
+        rest = self.amount_minor - sum(amount for _, amount in lines)
+        if rest:
+            lines.append((self.category, rest))
+        if amount_minor is not None and amount_minor != self.amount_minor and self.amount_minor:
+            shares = [divmod(amount * amount_minor, self.amount_minor) for _, amount in lines]
+            left = amount_minor - sum(share for share, _ in shares)
+            order = sorted(range(len(lines)), key=lambda i: shares[i][1], reverse=True)
+            extra = set(order[:left])
+            lines = [(category, share + (i in extra))
+                     for i, ((category, _), (share, _)) in enumerate(zip(lines, shares))]
+        return lines
+
+    @property
+    def categories(self) -> List[str]:
+        """Все категории операции (основная и из разбивки), без повторов"""
+        return list(dict.fromkeys([self.category] + [s.category for s in self.splits]))
+
+    def check_splits(self):
+        """Проверка разбивки: положительные части, не больше суммы операции"""
+        if any(s.amount_minor <= 0 for s in self.splits):
+            raise ValueError("Суммы частей должны быть положительными")
+        if sum(s.amount_minor for s in self.splits) > self.amount_minor:
+            raise ValueError("Сумма частей больше суммы операции")
+        if any(not s.category for s in self.splits):
+            raise ValueError("У каждой части должна быть категория")
+
+    def recategorized(self, sources: Iterable[str], target: str) -> 'Transaction':
+        """Копия с заменой категорий sources на target (и в разбивке)"""
+        sources = set(sources)
+        return replace(
+            self,
+            category=target if self.category in sources else self.category,
+            splits=[replace(s, category=target) if s.category in sources else s for s in self.splits],
+        )
+
     def to_dict(self):
-        return {
+        data = {
             'id': self.id,
             'date': self.date,
             'type': self.type,
             'category': self.category,
-            'amount': self.amount,
-            'description': self.description
+            'amount_minor': self.amount_minor,
+            'description': self.description,
+            'currency': self.currency
         }
+        if self.tags:
+            data['tags'] = list(self.tags)
+        if self.splits:
+            data['splits'] = [s.to_dict() for s in self.splits]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict):
+        data = dict(data)
+        if 'amount' in data:
+            # Старый формат: сумма в рублях числом с плавающей точкой
+            data['amount_minor'] = to_minor(data.pop('amount'))
+        if 'splits' in data:
+            data['splits'] = [Split.from_dict(s) for s in data['splits']]
+        return cls(**data)
+
+
+@dataclass
+class RecurringRule:
+    """Правило повторяющейся операции
+
+    weekly  - каждые interval недель, day - день недели (0 - понедельник);
+    monthly - каждые interval месяцев в день day (31 - последний день);
+    yearly  - каждые interval лет, month и day задают дату.
+    Даты правила - "YYYY-MM-DD"; last_posted - последнее проведенное вхождение.
+    """
+    id: Optional[str] = None
+    type: str = TransactionType.EXPENSE.value
+    category: str = ""
+    amount_minor: int = 0
+    currency: str = BASE_CURRENCY
+    description: str = ""
+    frequency: str = RecurrenceFrequency.MONTHLY.value
+    interval: int = 1
+    day: int = 1
+    month: int = 1
+    start_date: str = ""
+    end_date: str = ""
+    last_posted: str = ""
+    active: bool = True
+
+    def __post_init__(self):
+        if not self.id:
+            import uuid
+            self.id = str(uuid.uuid4())[:8]
+        if not self.start_date:
+            self.start_date = datetime.now().strftime("%Y-%m-%d")
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict):
+        return cls(**data)
+
+
+@dataclass
+class SavedFilter:
+    """Сохраненный фильтр операций
+
+    Пустые поля не ограничивают выборку. period - окно от текущей даты
+    (month/quarter/year - этот месяц, квартал, год); без него - даты
+    start/end ("YYYY-MM-DD" включительно). Суммы - копейки в валюте отчетов.
+    """
+    id: Optional[str] = None
+    name: str = ""
+    type: str = ""
+    categories: List[str] = field(default_factory=list)
+    tag_query: str = ""
+    min_amount_minor: int = 0
+    max_amount_minor: int = 0
+    text: str = ""
+    period: str = ""
+    start: str = ""
+    end: str = ""
+
+    def __post_init__(self):
+        if not self.id:
+            import uuid
+            self.id = str(uuid.uuid4())[:8]
+
+    def to_dict(self):
+        return asdict(self)
 
     @classmethod
     def from_dict(cls, data: Dict):
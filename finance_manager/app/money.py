@@ -0,0 +1,41 @@
+"""
+Денежные суммы в минимальных единицах (копейках/центах)
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Union
+
+MINOR_UNITS = 100
+_CENT = Decimal("0.01")
+
+
+def to_minor(value: Union[str, int, float, Decimal]) -> int:
+    """Перевод суммы в копейки с округлением половины вверх
+
+    Строки допускают запятую и пробелы-разделители ("1 234,50").
+    """
+    if isinstance(value, str):
+        value = value.replace(" ", "").replace(" ", "").replace(",", ".")
+    try:
+        amount = Decimal(str(value)) if not isinstance(value, Decimal) else value
+        return int((amount.quantize(_CENT, rounding=ROUND_HALF_UP) * MINOR_UNITS).to_integral_value())
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Некорректная сумма: {value}")
+
+
+def from_minor(minor: int) -> float:
+    """Копейки -> float (для графиков и совместимости)"""
+    return int(minor) / MINOR_UNITS
+
+
+def minor_to_decimal(minor: int) -> Decimal:
+    """Копейки -> точное Decimal-значение ("12.30")"""
+    return (Decimal(int(minor)) / MINOR_UNITS).quantize(_CENT)
+
+
+def format_minor(minor: int, currency: str = "₽") -> str:
+    """Точное форматирование суммы в копейках: "1 234 567.89 ₽" """
+    minor = int(minor)
+    sign = "-" if minor < 0 else ""
+    units, cents = divmod(abs(minor), MINOR_UNITS)
+    text = f"{sign}{units:,}.{cents:02d}".replace(",", " ")
+    return f"{text} {currency}" if currency else text
@@ -0,0 +1,141 @@
+"""
+Сводные таблицы категория x период
+
+Матрица сумм (копейки) по категориям и дням/неделям/месяцам/годам с
+итогами строк и столбцов. Дни и недели считаются одним bincount по
+колонкам; месяцы и годы берутся из помесячных агрегатов (MonthlyRollup),
+которые уже поддерживаются приращениями.
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .aggregates import MonthlyRollup
+from .columnar import LedgerColumns, period_starts
+from .models import TransactionType
+
+GRANULARITIES = ('day', 'week', 'month', 'year')
+NET = 'net'
+
+
+class PivotTable:
+    """Сводная таблица: строки - категории, столбцы - периоды"""
+
+    def __init__(self, categories: List[str], periods: np.ndarray, granularity: str, values: np.ndarray):
+        self.categories = categories   # названия строк
+        self.periods = periods         # начала периодов, datetime64[D]
+        self.granularity = granularity
+        self.values = values           # int64, строки x периоды
+
+    @property
+    def row_totals(self) -> np.ndarray:
+        return self.values.sum(axis=1)
+
+    @property
+    def column_totals(self) -> np.ndarray:
+        return self.values.sum(axis=0)
+
+    @property
+    def total(self) -> int:
+        return int(self.values.sum())
+
+    @property
+    def labels(self) -> List[str]:
+        """Подписи периодов"""
+        if self.granularity == 'year':
+            return [str(p)[:4] for p in self.periods.astype('datetime64[Y]')]
+        if self.granularity == 'month':
+            return [str(p) for p in self.periods.astype('datetime64[M]')]
+        return [str(p) for p in self.periods]
+
+    def top(self, limit: int) -> 'PivotTable':
+        """Первые limit строк (строки уже отсортированы по итогу)"""
+        return PivotTable(self.categories[:limit], self.periods, self.granularity, self.values[:limit])
+
+    def to_rows(self) -> List[List]:
+        """Таблица с заголовком и итогами в рублях (для CSV/Excel)"""
+        header = ["Категория", *self.labels, "Итого"]
+        rows = [header]
+        for name, values, total in zip(self.categories, self.values, self.row_totals):
+            rows.append([name, *(values / 100).tolist(), total / 100])
+        rows.append(["Итого", *(self.column_totals / 100).tolist(), self.total / 100])
+        return rows
+
+
+def _signed_keys(n_keys: int, transaction_type: Optional[str]) -> np.ndarray:
+    """Знаки ключей (категория*2 + доход) для выбранного типа"""
+    signs = np.zeros(n_keys, dtype=np.int64)
+    if transaction_type in (TransactionType.EXPENSE.value, NET):
+        signs[0::2] = -1 if transaction_type == NET else 1
+    if transaction_type in (TransactionType.INCOME.value, NET):
+        signs[1::2] = 1
+    return signs
+
+
+def _finish(matrix: np.ndarray, counts: np.ndarray, category_names: Sequence[str],
+            periods: np.ndarray, granularity: str) -> PivotTable:
+    """Строки с операциями, по убыванию модуля итога"""
+    present = np.flatnonzero(counts[:len(category_names)])
+    order = present[np.argsort(-np.abs(matrix[present].sum(axis=1)), kind='stable')]
+    return PivotTable([category_names[i] for i in order], periods, granularity, matrix[order])
+
+
+def pivot_columns(columns: LedgerColumns, category_names: Sequence[str], granularity: str = 'month',
+                  transaction_type: str = TransactionType.EXPENSE.value,
+                  start: np.datetime64 = None, end: np.datetime64 = None) -> PivotTable:
+    """Сводная таблица по колонкам одним bincount (любая гранулярность)"""
+    lo = np.searchsorted(columns.dates, start) if start is not None else 0
+    hi = np.searchsorted(columns.dates, end + np.timedelta64(1, 'D'), side='left') if end is not None \
+        else len(columns)
+    dates = columns.dates[lo:hi]
+    n_categories = max(len(category_names), 1)
+    if not len(dates):
+        empty = np.zeros((0, 0), dtype=np.int64)
+        return PivotTable([], np.array([], dtype='datetime64[D]'), granularity, empty)
+
+    periods = period_starts(dates[0], dates[-1], granularity)
+    period = np.searchsorted(periods, dates.astype('datetime64[D]'), side='right') - 1
+
+    keys = columns.categories[lo:hi].astype(np.int64) * 2 + columns.is_income[lo:hi]
+    signs = _signed_keys(2 * n_categories, transaction_type)[keys]
+    selected = signs != 0
+    cells = (keys[selected] // 2) * len(periods) + period[selected]
+    size = n_categories * len(periods)
+
+    sums = np.bincount(cells, weights=(columns.amounts[lo:hi] * signs)[selected], minlength=size)
+    counts = np.bincount(keys[selected] // 2, minlength=n_categories)
+    matrix = np.rint(sums).astype(np.int64).reshape(n_categories, len(periods))
+    return _finish(matrix, counts, category_names, periods, granularity)
+
+
+def pivot_rollup(rollup: MonthlyRollup, category_names: Sequence[str], granularity: str = 'month',
+                 transaction_type: str = TransactionType.EXPENSE.value,
+                 start: np.datetime64 = None, end: np.datetime64 = None) -> PivotTable:
+    """Сводная таблица по месяцам или годам из помесячных агрегатов"""
+    if granularity not in ('month', 'year'):
+        raise ValueError(f"Из помесячных агрегатов нельзя получить гранулярность: {granularity}")
+
+    months = rollup.months
+    first = np.searchsorted(months, start.astype('datetime64[M]')) if start is not None else 0
+    last = np.searchsorted(months, end.astype('datetime64[M]'), side='right') if end is not None \
+        else len(months)
+    months = months[first:last]
+    if not len(months):
+        empty = np.zeros((0, 0), dtype=np.int64)
+        return PivotTable([], np.array([], dtype='datetime64[D]'), granularity, empty)
+
+    n_keys = rollup.sums.shape[0]
+    signs = _signed_keys(n_keys, transaction_type)
+    signed = rollup.sums[:, first:last] * signs[:, None]
+    counts = (rollup.counts[:, first:last] * (signs != 0)[:, None]).sum(axis=1)
+    matrix = signed[0::2] + signed[1::2]
+    counts = counts[0::2] + counts[1::2]
+
+    if granularity == 'year':
+        years = months.astype('datetime64[Y]')
+        bounds = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+        matrix = np.add.reduceat(matrix, bounds, axis=1)
+        periods = years[bounds].astype('datetime64[D]')
+    else:
+        periods = months.astype('datetime64[D]')
+    return _finish(matrix, counts, category_names, periods, granularity)
@@ -0,0 +1,169 @@
+"""
+Инструментирование: счетчики, гистограммы времени и профилирование cProfile
+"""
+import cProfile
+import functools
+import io
+import json
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+# Границы корзин гистограммы, мс
+HISTOGRAM_BOUNDS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+
+class TimingStats:
+    """Статистика времени выполнения одной операции"""
+
+    def __init__(self, max_samples: int):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.samples = deque(maxlen=max_samples)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+        ms = seconds * 1000
+        for i, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def to_dict(self) -> Dict:
+        labels = [f"<={b}ms" for b in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1000,
+            'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+            'min_ms': self.min * 1000 if self.count else 0.0,
+            'max_ms': self.max * 1000,
+            'p50_ms': self.percentile(50) * 1000,
+            'p95_ms': self.percentile(95) * 1000,
+            'histogram': dict(zip(labels, self.buckets)),
+        }
+
+
+class Metrics:
+    """Реестр метрик приложения"""
+
+    def __init__(self, max_samples: int = 1000):
+        self.max_samples = max_samples
+        self.enabled = True
+        self._counters: Dict[str, int] = {}
+        self._timings: Dict[str, TimingStats] = {}
+        self._lock = threading.Lock()
+        self._profiler: Optional[cProfile.Profile] = None
+
+    def increment(self, name: str, value: int = 1):
+        """Увеличение счетчика"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def record(self, name: str, seconds: float):
+        """Запись длительности операции"""
+        with self._lock:
+            stats = self._timings.get(name)
+            if stats is None:
+                stats = self._timings[name] = TimingStats(self.max_samples)
+            stats.add(seconds)
+
+    @contextmanager
+    def measure(self, name: str):
+        """Контекстный менеджер для замера времени блока"""
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name: str = None) -> Callable:
+        """Декоратор для замера времени функции"""
+        def decorator(func):
+            metric_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(metric_name, time.perf_counter() - start)
+
+            return wrapper
+
+        return decorator
+
+    def snapshot(self) -> Dict:
+        """Текущие значения всех метрик"""
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'timings': {name: stats.to_dict() for name, stats in sorted(self._timings.items())},
+            }
+
+    def dump_json(self, path: str):
+        """Сохранение метрик в JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+
+    def reset(self):
+        """Сброс всех метрик"""
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+    # Профилирование
+    @property
+    def is_profiling(self) -> bool:
+        return self._profiler is not None
+
+    def start_profiling(self):
+        """Включение cProfile"""
+        if self._profiler is None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop_profiling(self, path: str = None, limit: int = 30) -> str:
+        """Выключение cProfile; возвращает отчет, при path сохраняет .prof"""
+        if self._profiler is None:
+            return ""
+
+        profiler, self._profiler = self._profiler, None
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(limit)
+        return stream.getvalue()
+
+
+metrics = Metrics()
+timed = metrics.timed
+measure = metrics.measure
@@ -0,0 +1,163 @@
+"""
+Кэш результатов запросов с точечной инвалидацией
+
+Каждая запись помнит, от чего зависит: диапазон месяцев ("YYYY-MM"),
+набор категорий и таблицы (transactions, budgets, ...). Изменение
+транзакции вытесняет только записи, чьи зависимости пересекаются с ее
+месяцем и категорией. None в зависимости означает "от всех".
+"""
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from .profiling import metrics
+
+MonthRange = Optional[Tuple[str, str]]
+TRANSACTIONS = 'transactions'
+
+
+class CacheEntry:
+    """Запись кэша с зависимостями"""
+
+    __slots__ = ('value', 'months', 'categories', 'tables')
+
+    def __init__(self, value, months: MonthRange, categories: Optional[frozenset], tables: frozenset):
+        self.value = value
+        self.months = months
+        self.categories = categories
+        self.tables = tables
+
+    def depends_on(self, months: Iterable[str], categories: Optional[Iterable[str]]) -> bool:
+        """Затрагивает ли изменение (месяцы, категории) эту запись"""
+        if TRANSACTIONS not in self.tables:
+            return False
+
+        if self.months is not None:
+            lo, hi = self.months
+            if not any(lo <= m <= hi for m in months):
+                return False
+
+        if self.categories is not None and categories is not None:
+            if self.categories.isdisjoint(categories):
+                return False
+
+        return True
+
+
+class QueryCache:
+    """LRU-кэш запросов со счетчиками попаданий"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Tuple) -> Tuple[bool, object]:
+        """Поиск записи: (найдено, значение)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                metrics.increment("query_cache.misses")
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            metrics.increment("query_cache.hits")
+            return True, entry.value
+
+    def put(self, key: Tuple, value, months: MonthRange = None,
+            categories: Optional[Iterable[str]] = None, tables: Iterable[str] = (TRANSACTIONS,)):
+        """Сохранение результата с зависимостями"""
+        entry = CacheEntry(
+            value,
+            months,
+            frozenset(categories) if categories is not None else None,
+            frozenset(tables),
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, months: Iterable[str], categories: Optional[Iterable[str]] = None):
+        """Вытеснение записей, зависящих от измененных месяцев и категорий"""
+        months = set(months)
+        categories = set(categories) if categories is not None else None
+        with self._lock:
+            stale = [key for key, entry in self._entries.items()
+                     if entry.depends_on(months, categories)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def invalidate_table(self, table: str):
+        """Вытеснение всех записей, зависящих от таблицы"""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if table in entry.tables]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+def cached_query(dependencies: Callable = None, tables: Iterable[str] = (TRANSACTIONS,)):
+    """Декоратор метода с кэшированием в self.query_cache
+
+    dependencies(self, *args) возвращает (диапазон месяцев, категории);
+    без него запись зависит от всех транзакций.
+    """
+    tables = tuple(tables)
+
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if kwargs:
+                # Именованные аргументы приводятся к позиционным, чтобы ключ был один
+                bound = signature.bind(self, *args, **kwargs)
+                bound.apply_defaults()
+                args = bound.args[1:]
+            cache = self.query_cache
+            key = (method.__qualname__, args)
+            found, value = cache.get(key)
+            if found:
+                return value
+
+            value = method(self, *args)
+            months, categories = dependencies(self, *args) if dependencies else (None, None)
+            cache.put(key, value, months=months, categories=categories, tables=tables)
+            return value
+
+        return wrapper
+
+    return decorator
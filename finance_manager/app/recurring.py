@@ -0,0 +1,119 @@
+"""
+Повторяющиеся операции: ленивое построение вхождений правил
+
+Вхождения вычисляются арифметически от даты начала правила, поэтому
+запрос за любой диапазон стоит O(вхождений в диапазоне), а не O(истории),
+и будущие операции нигде не хранятся.
+"""
+import calendar
+import heapq
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from .models import RecurrenceFrequency, RecurringRule, Transaction
+
+
+def parse_day(value: str) -> date:
+    """Дата из "YYYY-MM-DD" (допускается время после даты)"""
+    return datetime.strptime(value[:10], "%Y-%m-%d").date()
+
+
+def _month_day(year: int, month: int, day: int) -> date:
+    """Дата с днем, ограниченным длиной месяца (31 -> последний день)"""
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+def occurrences(rule: RecurringRule, start: date, end: date) -> Iterator[date]:
+    """Даты вхождений правила в [start, end] по возрастанию (лениво)"""
+    if not rule.active:
+        return
+
+    first = parse_day(rule.start_date)
+    lo = max(start, first)
+    hi = min(end, parse_day(rule.end_date)) if rule.end_date else end
+    if lo > hi:
+        return
+
+    step = max(1, int(rule.interval))
+
+    if rule.frequency == RecurrenceFrequency.WEEKLY.value:
+        anchor = first + timedelta(days=(rule.day - first.weekday()) % 7)
+        skip = max(0, -(-(lo - anchor).days // (7 * step)))
+        current = anchor + timedelta(weeks=skip * step)
+        while current <= hi:
+            yield current
+            current += timedelta(weeks=step)
+
+    elif rule.frequency == RecurrenceFrequency.MONTHLY.value:
+        base = first.year * 12 + first.month - 1
+        n = max(0, (lo.year * 12 + lo.month - 1 - base) // step)
+        while True:
+            year, month = divmod(base + n * step, 12)
+            if year > hi.year:
+                return
+            current = _month_day(year, month + 1, rule.day)
+            if current > hi:
+                return
+            if current >= lo:
+                yield current
+            n += 1
+
+    elif rule.frequency == RecurrenceFrequency.YEARLY.value:
+        n = max(0, (lo.year - first.year) // step)
+        while True:
+            year = first.year + n * step
+            if year > hi.year:
+                return
+            current = _month_day(year, rule.month, rule.day)
+            if current > hi:
+                return
+            if current >= lo:
+                yield current
+            n += 1
+
+    else:
+        raise ValueError(f"Неизвестная периодичность: {rule.frequency}")
+
+
+def next_occurrence(rule: RecurringRule, after: date) -> Optional[date]:
+    """Первое вхождение строго после даты"""
+    return next(occurrences(rule, after + timedelta(days=1), date.max), None)
+
+
+def _tagged(rule: RecurringRule, index: int, start: date, end: date):
+    for day in occurrences(rule, start, end):
+        yield day, index, rule
+
+
+def upcoming(rules: Sequence[RecurringRule], start: date, end: date) -> Iterator[Tuple[date, RecurringRule]]:
+    """Вхождения нескольких правил в хронологическом порядке (лениво)"""
+    streams = [_tagged(rule, i, start, end) for i, rule in enumerate(rules)]
+    for day, _, rule in heapq.merge(*streams):
+        yield day, rule
+
+
+def due_occurrences(rules: Sequence[RecurringRule], today: date) -> List[Tuple[RecurringRule, List[date]]]:
+    """Непроведенные вхождения каждого правила по today включительно"""
+    result = []
+    for rule in rules:
+        if rule.last_posted:
+            start = parse_day(rule.last_posted) + timedelta(days=1)
+        else:
+            start = parse_day(rule.start_date)
+        days = list(occurrences(rule, start, today))
+        if days:
+            result.append((rule, days))
+    return result
+
+
+def occurrence_transaction(rule: RecurringRule, day: date) -> Transaction:
+    """Транзакция вхождения; id детерминирован, чтобы не провести его дважды"""
+    return Transaction(
+        id=f"{rule.id}-{day:%Y%m%d}",
+        date=f"{day:%Y-%m-%d} 00:00:00",
+        type=rule.type,
+        category=rule.category,
+        amount_minor=rule.amount_minor,
+        currency=rule.currency,
+        description=rule.description,
+    )
@@ -0,0 +1,158 @@
+"""
+Сохраненные фильтры как материализованные представления
+
+FilterView хранит результат фильтра: ID подходящих операций с датами и
+суммами и нарастающие итоги. Представление строится один раз через
+индексы хранилища (битовые карты тегов, коды категорий, партиции по
+годам), а дальше обновляется приращениями при добавлении, изменении и
+удалении операций через контроллер - O(измененных операций).
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import SavedFilter, Transaction, TransactionType
+from .money import format_minor, from_minor
+from .tags import matches, parse_tag_query
+
+PERIOD_LABELS = {"": "Всё время", "month": "Этот месяц", "quarter": "Этот квартал", "year": "Этот год"}
+
+
+def filter_window(saved: SavedFilter, today: date = None) -> Tuple[str, str]:
+    """Границы дат фильтра ("YYYY-MM-DD" включительно, "" - без границы)"""
+    if not saved.period:
+        return saved.start, saved.end
+    today = today or date.today()
+    if saved.period == 'year':
+        first, months = date(today.year, 1, 1), 12
+    elif saved.period == 'quarter':
+        first, months = date(today.year, (today.month - 1) // 3 * 3 + 1, 1), 3
+    else:
+        first, months = date(today.year, today.month, 1), 1
+    year, month = divmod(first.month - 1 + months, 12)
+    last = date(first.year + year, month + 1, 1) - timedelta(days=1)
+    return first.isoformat(), last.isoformat()
+
+
+def describe_filter(saved: SavedFilter, currency: str = "₽") -> str:
+    """Условия фильтра одной строкой"""
+    parts = []
+    if saved.type:
+        parts.append("доходы" if saved.type == TransactionType.INCOME.value else "расходы")
+    if saved.categories:
+        parts.append(", ".join(saved.categories))
+    if saved.min_amount_minor:
+        parts.append(f"от {format_minor(saved.min_amount_minor, currency)}")
+    if saved.max_amount_minor:
+        parts.append(f"до {format_minor(saved.max_amount_minor, currency)}")
+    if saved.tag_query:
+        parts.append(f"теги: {saved.tag_query}")
+    if saved.text:
+        parts.append(f"«{saved.text}»")
+    if saved.period:
+        parts.append(PERIOD_LABELS.get(saved.period, saved.period).lower())
+    elif saved.start or saved.end:
+        parts.append(f"{saved.start or '…'} — {saved.end or '…'}")
+    return "; ".join(parts) or "все операции"
+
+
+class FilterView:
+    """Материализованный результат сохраненного фильтра"""
+
+    def __init__(self, saved: SavedFilter, currency: str, rates, today: date = None):
+        self.filter = saved
+        self.currency = currency
+        self.rates = rates
+        self.start, self.end = filter_window(saved, today)
+        self._query = parse_tag_query(saved.tag_query)
+        self._categories = set(saved.categories)
+        self._text = saved.text.lower()
+        self.entries: Dict[str, Tuple[str, int, bool]] = {}  # id -> (дата, сумма, доход)
+        self.income_minor = 0
+        self.expense_minor = 0
+        self.version = None  # версия хранилища, с которой представление согласовано
+
+    @classmethod
+    def build(cls, saved: SavedFilter, store, today: date = None) -> 'FilterView':
+        """Построение по индексам хранилища (теги, даты и категории отбираются по колонкам)"""
+        view = cls(saved, store.reporting_currency, store.rates, today)
+        candidates = store.filter_transactions(saved.tag_query, view.start or None, view.end or None,
+                                               saved.categories or None)
+        for transaction in candidates:
+            view.add(transaction)
+        view.version = store.version
+        return view
+
+    def is_current(self, currency: str, today: date = None) -> bool:
+        """Окно дат и валюта не изменились"""
+        return currency == self.currency and filter_window(self.filter, today) == (self.start, self.end)
+
+    def matched_amount(self, transaction: Transaction) -> Optional[int]:
+        """Сумма подходящих строк операции в валюте представления (None - не подходит)"""
+        saved = self.filter
+        if saved.type and transaction.type != saved.type:
+            return None
+        day = transaction.date[:10]
+        if (self.start and day < self.start) or (self.end and day > self.end):
+            return None
+        if self._text and self._text not in transaction.description.lower():
+            return None
+        if not matches(self._query, transaction.tags):
+            return None
+
+        amount = transaction.amount_minor
+        if self._categories:
+            lines = [minor for category, minor in transaction.lines() if category in self._categories]
+            if not lines:
+                return None
+            amount = sum(lines)
+        amount = self.rates.convert_minor(amount, transaction.currency, self.currency, transaction.date)
+        if saved.min_amount_minor and amount < saved.min_amount_minor:
+            return None
+        if saved.max_amount_minor and amount > saved.max_amount_minor:
+            return None
+        return amount
+
+    def add(self, transaction: Transaction):
+        amount = self.matched_amount(transaction)
+        if amount is None:
+            return
+        self.remove(transaction)
+        is_income = transaction.type == TransactionType.INCOME.value
+        self.entries[transaction.id] = (transaction.date, amount, is_income)
+        if is_income:
+            self.income_minor += amount
+        else:
+            self.expense_minor += amount
+
+    def remove(self, transaction: Transaction):
+        entry = self.entries.pop(transaction.id, None)
+        if entry is None:
+            return
+        _, amount, is_income = entry
+        if is_income:
+            self.income_minor -= amount
+        else:
+            self.expense_minor -= amount
+
+    def apply(self, removed: Iterable[Transaction] = (), added: Iterable[Transaction] = ()):
+        """Приращение: прежние версии операций убираются, новые добавляются"""
+        for transaction in removed:
+            self.remove(transaction)
+        for transaction in added:
+            self.add(transaction)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def ids(self, limit: int = None) -> List[str]:
+        """ID операций, последние first"""
+        ordered = sorted(self.entries, key=lambda tid: self.entries[tid][0], reverse=True)
+        return ordered[:limit] if limit else ordered
+
+    def summary(self) -> Dict:
+        return {
+            'count': len(self.entries),
+            'income': from_minor(self.income_minor),
+            'expense': from_minor(self.expense_minor),
+            'net': from_minor(self.income_minor - self.expense_minor),
+        }
@@ -0,0 +1,159 @@
+"""
+Совместная работа нескольких процессов с одним каталогом данных
+
+Два окна приложения или контейнер из run.sh вместе с локальным запуском
+могут писать в один ~/.personal_finance_manager. Запись файлов и чтение
+чужих изменений идут под рекомендательной блокировкой файла .lock
+(fcntl.flock в POSIX, msvcrt.locking в Windows). Изменения замечаются по
+подписи файла (время изменения, размер) и ревизиям манифеста, а при
+записи наши изменения переносятся на текущее содержимое файла
+трехсторонним слиянием: разница с прочитанной версией применяется
+поверх чужой.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from .profiling import measure
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+Signature = Optional[Tuple[int, int]]
+
+
+def file_signature(path: str) -> Signature:
+    """Подпись файла: (время изменения в нс, размер); None - файла нет"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class DirectoryLock:
+    """Межпроцессная блокировка каталога (реентерабельная внутри процесса)"""
+
+    def __init__(self, path: str, timeout: float = 10.0):
+        self.path = path
+        self.timeout = timeout
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def _try_lock(self) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def _unlock(self):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = open(self.path, 'a+b')
+                deadline = time.monotonic() + self.timeout
+                with measure("DirectoryLock.wait"):
+                    while not self._try_lock():
+                        if time.monotonic() > deadline:
+                            raise TimeoutError(f"Каталог данных занят другим процессом: {self.path}")
+                        time.sleep(0.02)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                self._unlock()
+            finally:
+                self._file.close()
+                self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def merge_records(base: List, ours: List, theirs: List, key: Callable[[object], Hashable],
+                  same: Callable[[object, object], bool] = None) -> List:
+    """Трехстороннее слияние списков записей по ключу
+
+    base - версия, от которой мы начинали, ours - наша, theirs - текущая на
+    диске. Наши добавленные и измененные записи берутся из ours, удаленные
+    нами исключаются; остальные записи и чужие добавления - из theirs.
+    Порядок - как в ours, чужие добавления в конце.
+    """
+    same = same or (lambda a, b: a == b)
+    base_by = {key(r): r for r in base}
+    theirs_by = {key(r): r for r in theirs}
+    result = []
+    seen = set()
+    for record in ours:
+        k = key(record)
+        seen.add(k)
+        original = base_by.get(k)
+        if original is None or not same(original, record):
+            result.append(record)
+        elif k in theirs_by:
+            result.append(theirs_by[k])
+    result.extend(r for k, r in theirs_by.items() if k not in base_by and k not in seen)
+    return result
+
+
+def merge_fields(base: Dict, ours: Dict, theirs: Dict) -> Dict:
+    """Трехстороннее слияние словарей по полям (вложенные - рекурсивно)"""
+    result = dict(theirs)
+    for name, value in ours.items():
+        original, current = base.get(name), theirs.get(name)
+        if isinstance(value, dict) and isinstance(original, dict) and isinstance(current, dict):
+            result[name] = merge_fields(original, value, current)
+        elif name not in base or original != value:
+            result[name] = value
+    for name in base:
+        if name not in ours:
+            result.pop(name, None)
+    return result
+
+
+def merge_json(base, ours, theirs, key: Callable[[Dict], Hashable] = None):
+    """Слияние содержимого JSON-файла: списки записей по key, словари по полям
+
+    Файл, которого при нашем чтении не было, сливается с пустой версией.
+    Если форматы не совпадают (например, файл старого формата), побеждает ours.
+    """
+    if theirs is None:
+        return ours
+    if base is None:
+        base = type(theirs)() if isinstance(theirs, (list, dict)) else None
+    if isinstance(ours, dict) and isinstance(base, dict) and isinstance(theirs, dict):
+        return merge_fields(base, ours, theirs)
+    records = [*base, *ours, *theirs] if isinstance(base, list) and isinstance(theirs, list) else None
+    if key is None or records is None or not all(isinstance(r, dict) for r in records):
+        return ours
+    return merge_records(base, ours, theirs, key)
@@ -0,0 +1,161 @@
+"""
+Квантили сумм по категориям и месяцам
+
+QuantileSketch - логарифмическая гистограмма с относительной точностью
+(как DDSketch): сумма x попадает в корзину ceil(log_gamma(x)), и любой
+квантиль восстанавливается с ошибкой не больше RELATIVE_ACCURACY. Сетка
+корзин общая для всех скетчей, поэтому объединение - сложение счетчиков,
+а удаление операции - вычитание единицы из ее корзины.
+
+MonthlySketches хранит скетч на каждую пару (ключ, месяц) с тем же
+ключом, что и MonthlyRollup (категория*2 + признак дохода). Медиана и
+перцентили за любой период получаются объединением месячных скетчей,
+без сортировки сумм.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .aggregates import month_index
+from .columnar import LedgerColumns
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = np.log(GAMMA)
+
+
+def bucket_index(amounts_minor) -> np.ndarray:
+    """Корзины сумм (копейки); суммы меньше 1 копейки - в корзину 0"""
+    values = np.maximum(np.asarray(amounts_minor, dtype=np.float64), 1.0)
+    return np.ceil(np.log(values) / _LOG_GAMMA).astype(np.int64)
+
+
+def bucket_value(index) -> np.ndarray:
+    """Представитель корзины - середина с относительной ошибкой <= точности"""
+    return 2 * GAMMA ** np.asarray(index, dtype=np.float64) / (GAMMA + 1)
+
+
+class QuantileSketch:
+    """Скетч распределения сумм с объединением и удалением"""
+
+    def __init__(self, offset: int = 0, counts: np.ndarray = None):
+        self.offset = offset  # корзина первого счетчика
+        self.counts = np.zeros(0, dtype=np.int64) if counts is None else counts
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    def _ensure(self, lo: int, hi: int):
+        """Расширение счетчиков до корзин [lo, hi]"""
+        if not len(self.counts):
+            self.offset = lo
+        before = max(0, self.offset - lo)
+        after = max(0, hi - (self.offset + len(self.counts) - 1))
+        if before or after:
+            self.counts = np.pad(self.counts, (before, after))
+            self.offset -= before
+
+    def add(self, amount_minor: int, count: int = 1):
+        """Учет суммы (count=-1 - удаление)"""
+        index = int(bucket_index(amount_minor))
+        self._ensure(index, index)
+        self.counts[index - self.offset] += count
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """Добавление счетчиков другого скетча"""
+        if len(other.counts):
+            self._ensure(other.offset, other.offset + len(other.counts) - 1)
+            start = other.offset - self.offset
+            self.counts[start:start + len(other.counts)] += other.counts
+        return self
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        """Квантили (копейки) для долей qs; None - скетч пуст"""
+        total = self.count
+        if total <= 0:
+            return [None] * len(qs)
+        cumulative = np.cumsum(np.maximum(self.counts, 0))
+        ranks = np.asarray(qs, dtype=np.float64) * (cumulative[-1] - 1)
+        positions = np.searchsorted(cumulative, ranks, side='right')
+        return [float(v) for v in bucket_value(positions + self.offset)]
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles([q])[0]
+
+
+class MonthlySketches:
+    """Скетчи сумм по (категория, тип) и месяцам"""
+
+    def __init__(self):
+        self.sketches: Dict[int, Dict[int, QuantileSketch]] = {}  # ключ -> месяц -> скетч
+        self.version = 0
+
+    @classmethod
+    def from_columns(cls, columns: LedgerColumns) -> 'MonthlySketches':
+        """Построение по колонкам: одна сортировка ячеек вместо сортировки сумм"""
+        result = cls()
+        if not len(columns):
+            return result
+
+        keys = columns.categories.astype(np.int64) * 2 + columns.is_income
+        months = month_index(columns.dates)
+        buckets = bucket_index(columns.amounts)
+
+        first_month, lo = int(months.min()), int(buckets.min())
+        n_months = int(months.max()) - first_month + 1
+        n_buckets = int(buckets.max()) - lo + 1
+        cells = (keys * n_months + (months - first_month)) * n_buckets + (buckets - lo)
+        unique, counts = np.unique(cells, return_counts=True)
+
+        groups, positions = unique // n_buckets, unique % n_buckets + lo
+        bounds = np.flatnonzero(np.diff(groups)) + 1
+        for group, pos, cnt in zip(np.split(groups, bounds), np.split(positions, bounds),
+                                   np.split(counts, bounds)):
+            key, month = divmod(int(group[0]), n_months)
+            offset = int(pos[0])
+            sketch_counts = np.zeros(int(pos[-1]) - offset + 1, dtype=np.int64)
+            sketch_counts[pos - offset] = cnt
+            result.sketches.setdefault(key, {})[month + first_month] = QuantileSketch(offset, sketch_counts)
+        return result
+
+    def add(self, category_code: int, is_income: bool, month: np.datetime64, amount_minor: int, count: int = 1):
+        """Учет операции (count=-1 - удаление)"""
+        key = category_code * 2 + int(is_income)
+        index = int(month_index(np.asarray(month)))
+        self.sketches.setdefault(key, {}).setdefault(index, QuantileSketch()).add(amount_minor, count)
+        self.version += 1
+
+    def move_category(self, source_code: int, target_code: int):
+        """Перенос скетчей категории в другую (переименование, объединение)"""
+        if source_code == target_code:
+            return
+        for parity in (0, 1):
+            months = self.sketches.pop(source_code * 2 + parity, {})
+            target = self.sketches.setdefault(target_code * 2 + parity, {})
+            for month, sketch in months.items():
+                if month in target:
+                    target[month].merge(sketch)
+                else:
+                    target[month] = sketch
+        self.version += 1
+
+    def merged(self, keys: Iterable[int], start: np.datetime64 = None, end: np.datetime64 = None) -> QuantileSketch:
+        """Объединенный скетч ключей за месяцы [start, end] (None - без границы)"""
+        lo = int(month_index(np.asarray(start))) if start is not None else None
+        hi = int(month_index(np.asarray(end))) if end is not None else None
+        parts = [sketch for key in keys for month, sketch in self.sketches.get(key, {}).items()
+                 if len(sketch.counts) and (lo is None or month >= lo) and (hi is None or month <= hi)]
+        if not parts:
+            return QuantileSketch()
+
+        # Общий диапазон корзин выделяется один раз
+        offset = min(p.offset for p in parts)
+        counts = np.zeros(max(p.offset + len(p.counts) for p in parts) - offset, dtype=np.int64)
+        for part in parts:
+            position = part.offset - offset
+            counts[position:position + len(part.counts)] += part.counts
+        return QuantileSketch(offset, counts)
+
+    def keys(self) -> List[int]:
+        return sorted(self.sketches)
@@ -0,0 +1,182 @@
+"""
+Теги операций и битовые индексы для фильтрации
+
+У операции может быть несколько тегов (поездка, проект, "к возмещению").
+TagIndex хранит для каждого тега упакованную битовую карту строк колонок
+(np.packbits: 1 бит на строку, 125 КБ на миллион строк). Запросы вида
+"отпуск AND (такси OR отель) AND NOT возмещено" вычисляются побайтовыми
+операциями над картами, без просмотра операций.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+OPERATORS = {'and': 'and', 'и': 'and', 'or': 'or', 'или': 'or', 'not': 'not', 'не': 'not'}
+_TOKEN_RE = re.compile(r'\(|\)|"[^"]*"|[^\s()]+')
+
+Query = Tuple  # ('tag', name) | ('not', q) | ('and', a, b) | ('or', a, b)
+
+
+def normalize_tag(tag: str) -> str:
+    return " ".join(tag.strip().lower().split())
+
+
+def parse_tags(text: str) -> List[str]:
+    """Теги из строки через запятую, без повторов"""
+    return list(dict.fromkeys(t for t in (normalize_tag(part) for part in (text or "").split(",")) if t))
+
+
+def parse_tag_query(text: str) -> Optional[Query]:
+    """Разбор запроса: AND/OR/NOT (И/ИЛИ/НЕ), скобки, -тег; пробел - AND
+
+    Пустой запрос - None (без фильтра).
+    """
+    tokens = _TOKEN_RE.findall(text or "")
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def take():
+        nonlocal position
+        position += 1
+        return tokens[position - 1]
+
+    def take_if(token):
+        return take() if peek() == token else None
+
+    def operator(token):
+        return OPERATORS.get(token.lower()) if token else None
+
+    def parse_or():
+        left = parse_and()
+        while operator(peek()) == 'or':
+            take()
+            left = ('or', left, parse_and())
+        return left
+
+    def parse_and():
+        left = parse_not()
+        while peek() is not None and peek() != ')' and operator(peek()) != 'or':
+            if operator(peek()) == 'and':
+                take()
+            left = ('and', left, parse_not())
+        return left
+
+    def parse_not():
+        token = peek()
+        if token is None:
+            raise ValueError("Незаконченный запрос тегов")
+        if operator(token) == 'not':
+            take()
+            return ('not', parse_not())
+        if token.startswith('-') and len(token) > 1:
+            take()
+            return ('not', ('tag', normalize_tag(token[1:])))
+        if token == '(':
+            take()
+            inner = parse_or()
+            if take_if(')') is None:
+                raise ValueError("Не хватает закрывающей скобки")
+            return inner
+        if token == ')' or operator(token):
+            raise ValueError(f"Неожиданное слово в запросе: {token}")
+        take()
+        return ('tag', normalize_tag(token.strip('"')))
+
+    if not tokens:
+        return None
+    query = parse_or()
+    if position != len(tokens):
+        raise ValueError(f"Неожиданное слово в запросе: {tokens[position]}")
+    return query
+
+
+def query_tags(query: Optional[Query]) -> List[str]:
+    """Теги, упомянутые в запросе"""
+    if query is None:
+        return []
+    if query[0] == 'tag':
+        return [query[1]]
+    return [tag for part in query[1:] for tag in query_tags(part)]
+
+
+def matches(query: Optional[Query], tags: Iterable[str]) -> bool:
+    """Подходит ли набор тегов одной операции под запрос"""
+    if query is None:
+        return True
+    kind = query[0]
+    if kind == 'tag':
+        return query[1] in tags
+    if kind == 'not':
+        return not matches(query[1], tags)
+    if kind == 'and':
+        return matches(query[1], tags) and matches(query[2], tags)
+    return matches(query[1], tags) or matches(query[2], tags)
+
+
+class TagIndex:
+    """Битовые карты тегов по строкам колонок"""
+
+    def __init__(self, n_rows: int, bitmaps: Dict[str, np.ndarray] = None):
+        self.n_rows = n_rows
+        self.bitmaps = bitmaps or {}  # тег -> np.packbits(маска строк)
+
+    @classmethod
+    def from_rows(cls, n_rows: int, rows: Dict[str, Iterable[int]]) -> 'TagIndex':
+        """Индекс по номерам строк каждого тега"""
+        bitmaps = {}
+        for tag, positions in rows.items():
+            mask = np.zeros(n_rows, dtype=bool)
+            mask[np.fromiter(positions, dtype=np.int64)] = True
+            bitmaps[tag] = np.packbits(mask)
+        return cls(n_rows, bitmaps)
+
+    @classmethod
+    def concat(cls, parts: Sequence['TagIndex']) -> 'TagIndex':
+        """Склейка индексов подряд идущих колонок"""
+        n_rows = sum(p.n_rows for p in parts)
+        tags = {tag for p in parts for tag in p.bitmaps}
+        if not tags:
+            return cls(n_rows)
+        return cls(n_rows, {tag: np.packbits(np.concatenate([p.mask(tag) for p in parts])) for tag in tags})
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    @property
+    def tags(self) -> List[str]:
+        return sorted(self.bitmaps)
+
+    def count(self, tag: str) -> int:
+        bitmap = self.bitmaps.get(tag)
+        return int(np.unpackbits(bitmap, count=self.n_rows).sum()) if bitmap is not None else 0
+
+    def mask(self, tag: str) -> np.ndarray:
+        """Маска строк с тегом"""
+        bitmap = self.bitmaps.get(tag)
+        if bitmap is None:
+            return np.zeros(self.n_rows, dtype=bool)
+        return np.unpackbits(bitmap, count=self.n_rows).astype(bool)
+
+    def select(self, rows: np.ndarray) -> 'TagIndex':
+        """Индекс для подмножества строк (маска или номера)"""
+        n_rows = int(rows.sum()) if rows.dtype == bool else len(rows)
+        return TagIndex(n_rows, {tag: np.packbits(self.mask(tag)[rows]) for tag in self.bitmaps})
+
+    def _packed(self, query: Query) -> np.ndarray:
+        kind = query[0]
+        if kind == 'tag':
+            bitmap = self.bitmaps.get(query[1])
+            return bitmap if bitmap is not None else np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        if kind == 'not':
+            return np.invert(self._packed(query[1]))
+        left, right = self._packed(query[1]), self._packed(query[2])
+        return np.bitwise_and(left, right) if kind == 'and' else np.bitwise_or(left, right)
+
+    def evaluate(self, query: Optional[Query]) -> np.ndarray:
+        """Маска строк, подходящих под запрос (None - все строки)"""
+        if query is None:
+            return np.ones(self.n_rows, dtype=bool)
+        return np.unpackbits(self._packed(query), count=self.n_rows).astype(bool)
@@ -7,10 +7,32 @@ from datetime import datetime
 from typing import Any, Dict, List
 import pandas as pd
 
+from .models import Transaction
+from .money import format_minor, from_minor, minor_to_decimal, to_minor
+
 
 def format_currency(amount: float, currency: str = "₽") -> str:
-    """Форматирование суммы с валютой"""
-    return f"{amount:,.2f} {currency}".replace(",", " ")
+    """Форматирование суммы с валютой (точное, через копейки)"""
+    return format_minor(to_minor(amount), currency)
+
+
+def format_splits(transaction: Transaction) -> str:
+    """Разбивка операции строкой: "Одежда: 300.00; Техника: 1200.00" (пусто - без разбивки)"""
+    if not transaction.splits:
+        return ""
+    return "; ".join(f"{category}: {minor_to_decimal(amount)}" for category, amount in transaction.lines())
+
+
+def category_summary(transactions: List[Transaction], by_currency: bool = True) -> pd.DataFrame:
+    """Суммы по типу и категории (и валюте); операции с разбивкой учитываются по частям"""
+    keys = ['Тип', 'Категория', 'Валюта'] if by_currency else ['Тип', 'Категория']
+    lines = pd.DataFrame([{
+        'Тип': 'Доход' if t.type == 'income' else 'Расход',
+        'Категория': category,
+        'Валюта': t.currency,
+        'Сумма': from_minor(amount),
+    } for t in transactions for category, amount in t.lines()], columns=['Тип', 'Категория', 'Валюта', 'Сумма'])
+    return lines.groupby(keys)['Сумма'].sum().reset_index()
 
 
 def format_date(date_str: str, format_str: str = "%d.%m.%Y %H:%M") -> str:
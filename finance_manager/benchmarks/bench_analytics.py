@@ -0,0 +1,221 @@
+"""
+Бенчмарки сервиса аналитики
+"""
+from app import analytics
+from app.aggregates import MonthlyRollup
+from app.analytics import AnalyticsService
+from app.anomaly import AnomalyDetector
+from app.category_tree import CategoryTree
+from app.classifier import CategoryClassifier
+from app.comparison import compare_periods
+from app.database import Database
+from app.forecast import Forecaster
+from app.models import Category
+from app.pivot import pivot_columns, pivot_rollup
+from app.sketches import MonthlySketches
+
+
+def bench_calculate_statistics(benchmark, ledger, rows, check_threshold):
+    stats = benchmark(analytics.calculate_statistics, ledger)
+    assert stats['total_transactions'] == rows
+    check_threshold(benchmark, 'calculate_statistics', rows)
+
+
+def bench_analyze_categories(benchmark, ledger, rows, check_threshold):
+    categories = benchmark(analytics.analyze_categories, ledger)
+    assert categories
+    check_threshold(benchmark, 'analyze_categories', rows)
+
+
+def bench_category_stats(benchmark, db, rows, check_threshold):
+    columns = db.get_columns()
+    stats = benchmark(analytics.category_stats, columns, db.category_names)
+    assert sum(r['count'] for r in stats) == rows
+    check_threshold(benchmark, 'category_stats', rows)
+
+
+def bench_prepare_timeline_data(benchmark, ledger, rows, check_threshold):
+    timeline = benchmark(analytics.prepare_timeline_data, ledger)
+    assert timeline
+    check_threshold(benchmark, 'prepare_timeline_data', rows)
+
+
+def bench_balance_overview(benchmark, db, rows, check_threshold):
+    service = AnalyticsService(db)
+
+    def overview():
+        service.clear_cache()
+        return service.balance_overview()
+
+    assert 'balance' in benchmark(overview)
+    check_threshold(benchmark, 'balance_overview', rows)
+
+
+def bench_service_cache_hit(benchmark, db, rows, check_threshold):
+    service = AnalyticsService(db)
+    expected = service.statistics()
+    assert benchmark(service.statistics) is expected
+    check_threshold(benchmark, 'service_cache_hit', rows)
+
+
+def bench_build_rollup(benchmark, db, rows, check_threshold):
+    columns = db.get_columns()
+    rollup = benchmark(MonthlyRollup.from_columns, columns, len(db.category_names))
+    assert rollup.counts.sum() == rows
+    check_threshold(benchmark, 'build_rollup', rows)
+
+
+def bench_forecast_fit(benchmark, db, rows, check_threshold):
+    """Полное обучение по всем категориям сразу"""
+    rollup = db.get_monthly_rollup()
+    current = rollup.first_month + rollup.n_months
+
+    def fit():
+        forecaster = Forecaster()
+        forecaster.fit(rollup, current)
+        return forecaster.predict(12)
+
+    mean, stderr = benchmark(fit)
+    assert mean.shape == stderr.shape == (12, rollup.sums.shape[0] + 1)
+    check_threshold(benchmark, 'forecast_fit', rows)
+
+
+def bench_forecast_refit(benchmark, db, rows, check_threshold):
+    """Дообучение после правки прошлого месяца"""
+    rollup = db.get_monthly_rollup()
+    current = rollup.first_month + rollup.n_months
+    forecaster = Forecaster()
+    forecaster.fit(rollup, current)
+
+    def refit():
+        rollup.add(0, False, rollup.months[-2], 100)
+        return forecaster.fit(rollup, current)
+
+    assert benchmark(refit)
+    assert forecaster.full_fits == 1
+    check_threshold(benchmark, 'forecast_refit', rows)
+
+
+def bench_anomaly_fit(benchmark, db, rows, check_threshold):
+    """Статистика расходов по всей истории одним проходом"""
+    columns = db.get_columns()
+    detector = AnomalyDetector()
+    benchmark(detector.fit, columns, db.category_names)
+    assert detector._count.sum() == (~columns.is_income).sum()
+    check_threshold(benchmark, 'anomaly_fit', rows)
+
+
+def bench_anomaly_fit_manifest(benchmark, data_dir, rows, check_threshold):
+    """Статистика из манифеста при запуске: партиции с диска не читаются"""
+    database = Database(data_dir)
+
+    def fit():
+        detector = AnomalyDetector()
+        detector.fit_stats(database.get_expense_stats())
+        return detector
+
+    detector = benchmark(fit)
+    assert not database._partitions
+    assert detector._count.sum() == (~database.get_columns().is_income).sum()
+    check_threshold(benchmark, 'anomaly_fit_manifest', rows)
+
+
+def bench_anomaly_observe(benchmark, db, rows, check_threshold):
+    """Проверка и учет одной новой операции"""
+    detector = AnomalyDetector()
+    detector.fit(db.get_columns(), db.category_names)
+    transaction = next(t for t in db.get_transactions(limit=100) if t.type == 'expense')
+
+    def observe():
+        detector.observe(transaction, transaction.amount_minor)
+        detector.forget(transaction, transaction.amount_minor)
+
+    benchmark(observe)
+    check_threshold(benchmark, 'anomaly_observe', rows)
+
+
+def _trained_classifier(ledger):
+    classifier = CategoryClassifier()
+    classifier.fit([t.description for t in ledger], [t.type for t in ledger], [t.category for t in ledger])
+    return classifier
+
+
+def bench_classifier_fit(benchmark, ledger, rows, check_threshold):
+    classifier = benchmark(_trained_classifier, ledger)
+    assert len(classifier) == rows
+    check_threshold(benchmark, 'classifier_fit', rows)
+
+
+def bench_classifier_predict(benchmark, ledger, rows, check_threshold):
+    """Подсказка категории при вводе описания"""
+    classifier = _trained_classifier(ledger)
+    category = benchmark(classifier.predict, "Такси домой", 'expense')
+    assert category is not None
+    check_threshold(benchmark, 'classifier_predict', rows)
+
+
+def bench_classifier_predict_batch(benchmark, ledger, rows, check_threshold):
+    """Пакетная классификация всего набора"""
+    classifier = _trained_classifier(ledger)
+    descriptions = [t.description for t in ledger]
+    types = [t.type for t in ledger]
+    predicted = benchmark(classifier.predict_batch, descriptions, types)
+    assert len(predicted) == rows and None not in predicted
+    check_threshold(benchmark, 'classifier_predict_batch', rows)
+
+
+def bench_build_sketches(benchmark, db, rows, check_threshold):
+    columns = db.get_columns()
+    sketches = benchmark(MonthlySketches.from_columns, columns)
+    assert sum(s.count for months in sketches.sketches.values() for s in months.values()) == rows
+    check_threshold(benchmark, 'build_sketches', rows)
+
+
+def bench_category_percentiles(benchmark, db, rows, check_threshold):
+    """Медиана/p90/p99 по всем категориям за всю историю объединением скетчей"""
+    sketches = db.get_amount_sketches()
+    result = benchmark(analytics.sketch_percentiles, sketches, db.category_names)
+    assert result and all(r['median'] <= r['p90'] <= r['p99'] for r in result)
+    check_threshold(benchmark, 'category_percentiles', rows)
+
+
+def bench_pivot_day(benchmark, db, rows, check_threshold):
+    """Категория x день за всю историю (10 лет) одним bincount"""
+    columns = db.get_columns()
+    table = benchmark(pivot_columns, columns, db.category_names, 'day', 'net')
+    assert table.total == columns.total()
+    check_threshold(benchmark, 'pivot_day', rows)
+
+
+def bench_pivot_month_rollup(benchmark, db, rows, check_threshold):
+    """Категория x месяц из помесячных агрегатов"""
+    rollup = db.get_monthly_rollup()
+    table = benchmark(pivot_rollup, rollup, db.category_names, 'month', 'expense')
+    assert table.values.shape[1] == rollup.n_months
+    check_threshold(benchmark, 'pivot_month_rollup', rows)
+
+
+def bench_compare_periods(benchmark, db, rows, check_threshold):
+    """Год к году по категориям из помесячных агрегатов"""
+    rollup = db.get_monthly_rollup()
+    result = benchmark(compare_periods, rollup, db.category_names,
+                       ("2024-01", "2024-12"), ("2023-01", "2023-12"))
+    assert result['categories']
+    check_threshold(benchmark, 'compare_periods', rows)
+
+
+def bench_category_tree_rollup(benchmark, db, rows, check_threshold):
+    """Итоги дерева категорий из помесячных агрегатов: O(узлов), без операций"""
+    rollup = db.get_monthly_rollup()
+    names = db.category_names
+    categories = [Category(name, parent=names[i // 4] if i >= 4 else "") for i, name in enumerate(names)]
+    tree = CategoryTree(categories)
+
+    def tree_totals():
+        own = tree.node_values(rollup.sums.sum(axis=1)[0::2], names)
+        return tree.rollup(own)
+
+    totals = benchmark(tree_totals)
+    roots = [tree.index[name] for name in tree.children()]
+    assert totals[roots].sum() == rollup.sums[0::2].sum()
+    check_threshold(benchmark, 'category_tree_rollup', rows)
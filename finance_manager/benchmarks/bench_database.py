@@ -0,0 +1,173 @@
+"""
+Бенчмарки слоя данных
+"""
+from dataclasses import replace
+from datetime import datetime
+
+import numpy as np
+
+from app.columnar import LedgerColumns
+from app.database import Database
+from app.models import Category, Split
+from app.tags import parse_tag_query
+from benchmarks.synthetic import generate_rates
+
+
+def bench_db_load(benchmark, data_dir, rows, check_threshold):
+    def load():
+        database = Database(data_dir)
+        return len(database.transactions)
+
+    assert benchmark(load) == rows
+    check_threshold(benchmark, 'db_load', rows)
+
+
+def bench_db_save(benchmark, scratch_db, ledger, rows, check_threshold):
+    def save():
+        scratch_db.transactions = ledger
+        scratch_db.save_transactions()
+
+    benchmark(save)
+    check_threshold(benchmark, 'db_save', rows)
+
+
+def uncached(db, method):
+    """Вызов запроса мимо кэша (измеряется сам расчет)"""
+    def call(*args):
+        db.query_cache.clear()
+        return method(*args)
+    return call
+
+
+def bench_get_transactions(benchmark, db, rows, check_threshold):
+    result = benchmark(uncached(db, db.get_transactions))
+    assert len(result) == rows
+    check_threshold(benchmark, 'get_transactions', rows)
+
+
+def bench_get_transactions_limit(benchmark, db, rows, check_threshold):
+    result = benchmark(uncached(db, db.get_transactions), 50)
+    assert len(result) == min(50, rows)
+    check_threshold(benchmark, 'get_transactions_limit', rows)
+
+
+def bench_get_monthly_summary(benchmark, db, rows, check_threshold):
+    summary = benchmark(uncached(db, db.get_monthly_summary), 2024, 6)
+    assert summary['income'] >= 0
+    check_threshold(benchmark, 'get_monthly_summary', rows)
+
+
+def bench_get_balance_history(benchmark, db, rows, check_threshold):
+    series = benchmark(uncached(db, db.get_balance_series), datetime(2016, 1, 1), datetime(2024, 12, 31), 'day')
+    assert len(series['balance']) > 3000
+    check_threshold(benchmark, 'get_balance_history', rows)
+
+
+def bench_get_expenses_by_category(benchmark, db, rows, check_threshold):
+    expenses = benchmark(uncached(db, db.get_expenses_by_category))
+    assert expenses
+    check_threshold(benchmark, 'get_expenses_by_category', rows)
+
+
+def bench_convert_currency(benchmark, db, rows, check_threshold):
+    columns = db.get_columns()
+    rates = generate_rates()
+    names = ["RUB", "USD", "EUR"]
+    codes = np.random.default_rng(1).integers(0, len(names), size=len(columns)).astype(np.int16)
+
+    converted = benchmark(rates.convert, columns.amounts, codes, names, columns.dates, "USD")
+    assert converted.dtype == np.int64 and len(converted) == len(columns)
+    check_threshold(benchmark, 'convert_currency', rows)
+
+
+def bench_query_cache_hit(benchmark, db, rows, check_threshold):
+    expected = db.get_monthly_summary(2024, 6)
+    assert benchmark(db.get_monthly_summary, 2024, 6) is expected
+    check_threshold(benchmark, 'query_cache_hit', rows)
+
+
+def bench_rename_category(benchmark, scratch_db, rows, check_threshold):
+    """Переименование с переносом операций: только партиции и строки категории"""
+    scratch_db.get_monthly_rollup()
+    counts = scratch_db.category_counts()
+    source = min((name for name in counts if name), key=counts.get)
+    names = [source, source + " (новая)"]
+    state = {'turn': 0}
+
+    def rename():
+        old, new = names[state['turn'] % 2], names[(state['turn'] + 1) % 2]
+        state['turn'] += 1
+        category = next((c for c in scratch_db.categories if c.name == old), Category(name=old))
+        return len(scratch_db.reassign_categories([old], replace(category, name=new)))
+
+    assert benchmark(rename) == counts[source]
+    if state['turn'] % 2:
+        rename()  # вернуть исходное название
+    assert scratch_db.category_counts()[source] == counts[source]
+    check_threshold(benchmark, 'rename_category', rows)
+
+
+def bench_tag_filter(benchmark, ledger, rows, check_threshold):
+    """Запрос тегов по битовым картам колонок с выборкой строк"""
+    rng = np.random.default_rng(7)
+    names = ["отпуск", "такси", "отель", "возмещено", "проект"]
+    flags = rng.random((len(ledger), len(names))) < 0.2
+    tagged = [replace(t, tags=[n for n, on in zip(names, row) if on]) for t, row in zip(ledger, flags)]
+    categories = {name: code for code, name in enumerate(dict.fromkeys(t.category for t in tagged))}
+    currencies = {name: code for code, name in enumerate(dict.fromkeys(t.currency for t in tagged))}
+    columns = LedgerColumns.from_transactions(tagged, categories, currencies)
+    query = parse_tag_query("отпуск AND (такси OR отель) AND NOT возмещено")
+
+    def run():
+        return len(columns.select(columns.filter_mask(tag_query=query)))
+
+    expected = int((flags[:, 0] & (flags[:, 1] | flags[:, 2]) & ~flags[:, 3]).sum())
+    assert benchmark(run) == expected
+    check_threshold(benchmark, 'tag_filter', rows)
+
+
+def bench_split_columns(benchmark, ledger, rows, check_threshold):
+    """Колонки с разбивкой: каждая десятая операция - на три части"""
+    split = [replace(t, splits=[Split(t.category, t.amount_minor // 3), Split("Прочие расходы", t.amount_minor // 3)])
+             if i % 10 == 0 and t.amount_minor >= 3 else t for i, t in enumerate(ledger)]
+
+    def build():
+        return LedgerColumns.from_transactions(split, {}, {})
+
+    columns = benchmark(build)
+    assert columns.transaction_count() == rows
+    assert columns.total() == sum(t.amount_minor if t.type == 'income' else -t.amount_minor for t in ledger)
+    check_threshold(benchmark, 'split_columns', rows)
+
+
+def bench_snapshot(benchmark, scratch_db, rows, check_threshold):
+    """Снимок для фонового чтения: копии словарей, без копирования операций"""
+    scratch_db.get_columns()
+    scratch_db.get_monthly_rollup()
+    snapshot = benchmark(scratch_db.snapshot)
+
+    removed = scratch_db.delete_transactions([t.id for t in scratch_db.get_transactions(limit=100)])
+    assert len(snapshot.transactions) == rows
+    assert len(snapshot.get_columns()) == len(scratch_db.get_columns()) + sum(len(t.lines()) for t in removed)
+    scratch_db.add_transactions(removed)
+    check_threshold(benchmark, 'snapshot', rows)
+
+
+def bench_refresh_external(benchmark, scratch_db, scratch_dir, rows, check_threshold):
+    """Подхват операции, добавленной другим процессом: перечитывается одна партиция"""
+    other = Database(scratch_dir)
+    scratch_db.get_monthly_rollup()
+    added = []
+
+    def setup():
+        transaction = replace(other.get_transactions(limit=1)[0], id=f"external-{len(added)}")
+        other.add_transaction(transaction)
+        added.append(transaction.id)
+
+    assert benchmark.pedantic(scratch_db.refresh, setup=setup, rounds=5) is True
+    assert len(scratch_db.transactions) == rows + len(added)
+    assert scratch_db.refresh() is False
+    other.delete_transactions(added)
+    scratch_db.refresh()
+    assert len(scratch_db.transactions) == rows
+    check_threshold(benchmark, 'refresh_external', rows)
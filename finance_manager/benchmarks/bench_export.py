@@ -0,0 +1,48 @@
+"""
+Бенчмарки экспорта
+"""
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("customtkinter")
+
+from app.Windows.export_window import ExportWindow  # noqa: E402
+
+# Excel через openpyxl на миллионе строк занимает минуты
+EXCEL_MAX_ROWS = 100_000
+
+
+@pytest.fixture
+def holder(ledger):
+    """Замена окна экспорта без виджетов"""
+    return SimpleNamespace(
+        transactions=ledger,
+        budgets=[],
+        settings={},
+        categories=[],
+        include_summary_var=SimpleNamespace(get=lambda: True),
+    )
+
+
+def bench_export_json(benchmark, holder, tmp_path, rows, check_threshold):
+    filename = benchmark(ExportWindow._export_json, holder, str(tmp_path), "bench")
+    assert filename
+    check_threshold(benchmark, 'export_json', rows)
+
+
+def bench_export_csv(benchmark, holder, tmp_path, rows, check_threshold):
+    filename = benchmark(ExportWindow._export_csv, holder, str(tmp_path), "bench")
+    assert filename
+    check_threshold(benchmark, 'export_csv', rows)
+
+
+def bench_export_excel(benchmark, holder, tmp_path, rows, check_threshold):
+    pytest.importorskip("openpyxl")
+    if rows > EXCEL_MAX_ROWS:
+        pytest.skip("Excel-экспорт измеряется до 100k строк")
+
+    filename = benchmark.pedantic(ExportWindow._export_excel, args=(holder, str(tmp_path), "bench"),
+                                  rounds=1, iterations=1)
+    assert filename
+    check_threshold(benchmark, 'export_excel', rows)
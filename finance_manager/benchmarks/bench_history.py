@@ -0,0 +1,76 @@
+"""
+Бенчмарки отмены и повтора
+"""
+from app.controller import AppController
+from app.models import SavedFilter
+
+
+def bench_undo_redo_delete(benchmark, scratch_db, rows, check_threshold):
+    """Отмена и повтор удаления: одна транзакция, без снимков данных"""
+    controller = AppController(scratch_db)
+    scratch_db.get_monthly_rollup()  # агрегаты обновляются приращениями
+    transaction = scratch_db.get_transactions(limit=1)[0]
+    controller.delete_transaction(transaction.id)
+
+    def cycle():
+        controller.undo()
+        controller.redo()
+
+    benchmark(cycle)
+    assert scratch_db.get_transaction(transaction.id) is None
+    assert controller.history.memory < 4096
+    check_threshold(benchmark, 'undo_redo_delete', rows)
+
+
+def bench_bulk_recategorize(benchmark, scratch_db, rows, check_threshold):
+    """Массовая смена категории: один проход по партициям и одно сохранение"""
+    controller = AppController(scratch_db)
+    scratch_db.get_monthly_rollup()
+    ids = [t.id for t in scratch_db.get_transactions(limit=5000)]
+    categories = scratch_db.get_categories_by_type('expense')[:2]
+    controller.recategorize(ids, categories[0])  # дальше каждый вызов меняет все строки
+    state = {'turn': 0}
+
+    def recategorize():
+        state['turn'] += 1
+        return controller.recategorize(ids, categories[state['turn'] % 2])
+
+    assert benchmark(recategorize) == len(ids)
+    check_threshold(benchmark, 'bulk_recategorize', rows)
+
+
+def bench_bulk_delete_undo(benchmark, scratch_db, rows, check_threshold):
+    """Удаление 5000 операций и его отмена пакетом"""
+    controller = AppController(scratch_db)
+    scratch_db.get_monthly_rollup()
+    ids = [t.id for t in scratch_db.get_transactions(limit=5000)]
+    before = len(scratch_db.transactions)
+
+    def cycle():
+        controller.delete_transactions(ids)
+        controller.undo()
+
+    benchmark(cycle)
+    assert len(scratch_db.transactions) == before
+    check_threshold(benchmark, 'bulk_delete_undo', rows)
+
+
+def bench_saved_filter_update(benchmark, scratch_db, rows, check_threshold):
+    """Удаление и отмена при открытых сохраненных фильтрах: представления
+    обновляются приращениями, без повторного построения"""
+    controller = AppController(scratch_db)
+    scratch_db.get_monthly_rollup()
+    category = scratch_db.get_categories_by_type('expense')[0]
+    views = [controller.save_filter(SavedFilter(name="Категория", categories=[category])),
+             controller.save_filter(SavedFilter(name="Расходы", type='expense', period='year'))]
+    transaction = scratch_db.get_transactions(limit=1)[0]
+    totals = [view.summary() for view in views]
+
+    def cycle():
+        controller.delete_transaction(transaction.id)
+        controller.undo()
+
+    benchmark(cycle)
+    assert [controller.get_filter_view(view.filter.id) for view in views] == views
+    assert [view.summary() for view in views] == totals
+    check_threshold(benchmark, 'saved_filter_update', rows)
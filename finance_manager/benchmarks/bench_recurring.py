@@ -0,0 +1,41 @@
+"""
+Бенчмарки повторяющихся операций
+"""
+from datetime import date
+from itertools import islice
+
+from app.controller import AppController
+from app.database import Database
+from app.models import RecurrenceFrequency, RecurringRule
+from app.recurring import upcoming
+
+RULES = [
+    RecurringRule(id=f"r{i:03d}", category="Жилье", amount_minor=100 * (i + 1),
+                  frequency=(RecurrenceFrequency.WEEKLY.value if i % 3 == 0
+                             else RecurrenceFrequency.MONTHLY.value),
+                  day=i % 28 + 1 if i % 3 else i % 7, start_date="2015-01-01")
+    for i in range(50)
+]
+
+
+def bench_recurring_upcoming(benchmark, check_threshold):
+    """Окно в далеком будущем: стоимость не зависит от длины истории правил"""
+    def window():
+        return list(islice(upcoming(RULES, date(2900, 1, 1), date(2900, 12, 31)), 100))
+
+    assert len(benchmark(window)) == 100
+    check_threshold(benchmark, 'recurring_upcoming', 0)
+
+
+def bench_recurring_post_due(benchmark, tmp_path, check_threshold):
+    """Проведение 10 лет вхождений 50 правил одним пакетом"""
+    def setup():
+        db = Database(str(tmp_path / f"run{len(list(tmp_path.iterdir()))}"))
+        db.recurring_rules = [RecurringRule(**r.to_dict()) for r in RULES]
+        return (AppController(db),), {}
+
+    def post(controller):
+        return controller.post_due_recurring(date(2024, 12, 31))
+
+    assert benchmark.pedantic(post, setup=setup, rounds=3) > 10000
+    check_threshold(benchmark, 'recurring_post_due', 0)
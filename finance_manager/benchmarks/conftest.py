@@ -0,0 +1,135 @@
+"""
+Общие фикстуры бенчмарков
+
+Запуск (без дисплея):
+    python -m pytest benchmarks --ledger-sizes=1000,100000,1000000
+"""
+import os
+import shutil
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import pytest
+
+from app.database import Database
+from benchmarks.synthetic import generate_ledger
+
+# Пороговые значения среднего времени: фиксированная часть + часть на 1000 строк, мс
+THRESHOLDS_MS = {
+    'db_load': (100, 12),
+    'db_save': (100, 25),
+    'rename_category': (50, 15),
+    'tag_filter': (2, 0.1),
+    'split_columns': (5, 2),
+    'snapshot': (1, 0.01),
+    'refresh_external': (10, 3),
+    'get_transactions': (5, 1),
+    'get_transactions_limit': (2, 0.1),
+    'get_monthly_summary': (5, 2),
+    'get_balance_history': (2, 0.02),
+    'get_expenses_by_category': (5, 1.5),
+    'convert_currency': (2, 0.3),
+    'calculate_statistics': (10, 20),
+    'analyze_categories': (5, 0.7),
+    'category_stats': (2, 0.1),
+    'prepare_timeline_data': (15, 30),
+    'balance_overview': (5, 0.05),
+    'build_rollup': (2, 0.2),
+    'forecast_fit': (5, 0),
+    'forecast_refit': (2, 0),
+    'anomaly_fit': (5, 0.3),
+    'anomaly_fit_manifest': (5, 0.01),
+    'anomaly_observe': (0.2, 0),
+    'classifier_fit': (20, 15),
+    'build_sketches': (10, 1),
+    'category_percentiles': (30, 0),
+    'pivot_day': (15, 0.3),
+    'pivot_month_rollup': (2, 0),
+    'compare_periods': (1, 0),
+    'category_tree_rollup': (1, 0),
+    'classifier_predict': (0.5, 0),
+    'classifier_predict_batch': (20, 20),
+    'service_cache_hit': (0.5, 0),
+    'query_cache_hit': (0.5, 0),
+    'recurring_upcoming': (5, 0),
+    'recurring_post_due': (1500, 0),
+    'undo_redo_delete': (20, 0),
+    'bulk_recategorize': (300, 5),
+    'bulk_delete_undo': (600, 10),
+    'saved_filter_update': (20, 2),
+    'export_json': (50, 20),
+    'export_csv': (50, 15),
+    'export_excel': (1000, 300),
+}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("finance benchmarks")
+    group.addoption("--ledger-sizes", default="1000",
+                    help="размеры синтетических наборов через запятую (1000,100000,1000000)")
+    group.addoption("--no-thresholds", action="store_true", default=False,
+                    help="не проверять пороги регрессии")
+
+
+def pytest_generate_tests(metafunc):
+    if "rows" in metafunc.fixturenames:
+        sizes = [int(s) for s in metafunc.config.getoption("--ledger-sizes").split(",") if s]
+        metafunc.parametrize("rows", sizes, ids=[f"{s}rows" for s in sizes], scope="session")
+
+
+_ledgers = {}
+
+
+@pytest.fixture(scope="session")
+def ledger(rows):
+    """Синтетический набор транзакций заданного размера"""
+    if rows not in _ledgers:
+        _ledgers[rows] = generate_ledger(rows)
+    return _ledgers[rows]
+
+
+@pytest.fixture(scope="session")
+def data_dir(ledger, rows, tmp_path_factory):
+    """Каталог данных с сохраненным набором транзакций"""
+    path = tmp_path_factory.mktemp(f"ledger_{rows}")
+    db = Database(str(path))
+    db.transactions = ledger
+    db.save_transactions()
+    return str(path)
+
+
+@pytest.fixture
+def db(data_dir):
+    """Свежая база с полностью загруженными партициями"""
+    database = Database(data_dir)
+    database.transactions  # прогрев: загрузка всех партиций
+    return database
+
+
+@pytest.fixture
+def scratch_dir(data_dir, tmp_path):
+    """Копия каталога данных для бенчмарков, которые меняют данные"""
+    path = tmp_path / "data"
+    shutil.copytree(data_dir, path)
+    return str(path)
+
+
+@pytest.fixture
+def scratch_db(scratch_dir):
+    """Свежая база над копией каталога: изменения не видны другим бенчмаркам"""
+    database = Database(scratch_dir)
+    database.transactions
+    return database
+
+
+@pytest.fixture
+def check_threshold(request):
+    """Проверка среднего времени бенчмарка против порога"""
+    def check(benchmark, name, rows):
+        if request.config.getoption("--no-thresholds") or benchmark.stats is None:
+            return
+        fixed_ms, per_1k_ms = THRESHOLDS_MS[name]
+        limit = (fixed_ms + per_1k_ms * rows / 1000) / 1000
+        mean = benchmark.stats.stats.mean
+        assert mean <= limit, f"{name}: {mean * 1000:.1f} мс > порога {limit * 1000:.1f} мс"
+    return check
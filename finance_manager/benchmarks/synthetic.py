@@ -0,0 +1,110 @@
+"""
+Генератор синтетических данных для бенчмарков
+"""
+from datetime import datetime
+from typing import List, Sequence
+
+import numpy as np
+
+from app.currency import BASE_CURRENCY, ExchangeRateTable
+from app.default_categories import DEFAULT_CATEGORIES
+from app.models import Category, CategoryType, Transaction, TransactionType
+
+DEFAULT_START = datetime(2015, 1, 1)
+DEFAULT_END = datetime(2024, 12, 31, 23, 59, 59)
+
+DESCRIPTIONS = {
+    TransactionType.INCOME.value: ["Аванс", "Зарплата за месяц", "Проект", "Кэшбэк", "Перевод"],
+    TransactionType.EXPENSE.value: ["Магазин у дома", "Пятерочка", "Такси домой", "Обед",
+                                    "Оплата счета", "Подписка", "Заправка", "Аптека"],
+}
+
+
+def category_weights(categories: Sequence[Category]) -> np.ndarray:
+    """Zipf-подобные веса категорий внутри каждого типа"""
+    weights = np.empty(len(categories))
+    rank = {CategoryType.INCOME: 0, CategoryType.EXPENSE: 0}
+    for i, category in enumerate(categories):
+        rank[category.type] = rank.get(category.type, 0) + 1
+        weights[i] = 1.0 / rank[category.type]
+    return weights
+
+
+def generate_ledger(rows: int,
+                    seed: int = 42,
+                    start: datetime = DEFAULT_START,
+                    end: datetime = DEFAULT_END,
+                    income_share: float = 0.1,
+                    categories: Sequence[Category] = DEFAULT_CATEGORIES,
+                    foreign_share: float = 0.0,
+                    foreign_currencies: Sequence[str] = ("USD", "EUR")) -> List[Transaction]:
+    """Детерминированный набор транзакций
+
+    rows         - количество транзакций
+    seed         - зерно генератора
+    start, end   - равномерный разброс дат
+    income_share - доля доходных операций
+    categories   - категории (по умолчанию из default_categories.py)
+    foreign_share      - доля операций в иностранной валюте
+    foreign_currencies - валюты таких операций
+    """
+    rng = np.random.default_rng(seed)
+
+    income_idx = np.array([i for i, c in enumerate(categories) if c.type == CategoryType.INCOME])
+    expense_idx = np.array([i for i, c in enumerate(categories) if c.type != CategoryType.INCOME])
+    weights = category_weights(categories)
+
+    is_income = rng.random(rows) < income_share
+    income_choice = rng.choice(income_idx, size=rows, p=weights[income_idx] / weights[income_idx].sum())
+    expense_choice = rng.choice(expense_idx, size=rows, p=weights[expense_idx] / weights[expense_idx].sum())
+    category_idx = np.where(is_income, income_choice, expense_choice)
+
+    # Доходы крупнее расходов, распределение сумм логнормальное
+    amounts = np.where(
+        is_income,
+        rng.lognormal(mean=10.5, sigma=0.6, size=rows),
+        rng.lognormal(mean=6.5, sigma=1.1, size=rows),
+    )
+    amounts_minor = np.rint(np.maximum(amounts, 1.0) * 100).astype(np.int64)
+
+    span = int((end - start).total_seconds())
+    offsets = rng.integers(0, span + 1, size=rows)
+    dates = np.datetime64(start, 's') + offsets.astype('timedelta64[s]')
+    date_strings = np.char.replace(np.datetime_as_string(dates, unit='s'), 'T', ' ')
+
+    description_pick = rng.integers(0, 1 << 16, size=rows)
+    is_foreign = rng.random(rows) < foreign_share
+    currency_pick = rng.integers(0, len(foreign_currencies), size=rows)
+    income_value = TransactionType.INCOME.value
+    expense_value = TransactionType.EXPENSE.value
+
+    transactions = []
+    for i in range(rows):
+        t_type = income_value if is_income[i] else expense_value
+        texts = DESCRIPTIONS[t_type]
+        transactions.append(Transaction(
+            id=f"{i:08x}",
+            date=str(date_strings[i]),
+            type=t_type,
+            category=categories[category_idx[i]].name,
+            amount_minor=int(amounts_minor[i]),
+            description=texts[description_pick[i] % len(texts)],
+            currency=foreign_currencies[currency_pick[i]] if is_foreign[i] else BASE_CURRENCY,
+        ))
+
+    return transactions
+
+
+def generate_rates(currencies: Sequence[str] = ("USD", "EUR"),
+                   seed: int = 7,
+                   start: datetime = DEFAULT_START,
+                   end: datetime = DEFAULT_END) -> ExchangeRateTable:
+    """Ежедневные курсы валют (случайное блуждание) за период"""
+    rng = np.random.default_rng(seed)
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D') + 1)
+    table = ExchangeRateTable()
+    for i, code in enumerate(currencies):
+        steps = rng.normal(0, 0.005, size=len(days))
+        rates = (60.0 + 10 * i) * np.exp(np.cumsum(steps))
+        table.set_series(code, zip(days.astype(str), rates))
+    return table
@@ -0,0 +1,3 @@
+"""
+Тесты Personal Finance Manager
+"""
@@ -0,0 +1,53 @@
+"""
+Тесты фонового расчета аналитики по снимку базы
+"""
+from app.analytics import AnalyticsService
+from app.database import Database
+from app.models import Transaction
+
+
+def expense(category, amount_minor, month):
+    return Transaction(date=f"2024-{month:02d}-10 12:00:00", category=category, amount_minor=amount_minor)
+
+
+def filled_database(path):
+    database = Database(path)
+    database.add_transactions([expense("Продукты", 1000, 1), expense("Транспорт", 300, 2),
+                               expense("Новая категория", 500, 2)])
+    return Database(path)
+
+
+def test_batch_in_background_matches_direct_calls(tmp_path):
+    service = AnalyticsService(filled_database(str(tmp_path)))
+
+    future = service.submit('batch', ['statistics', ('category_stats', 'expense'), 'timeline'])
+    future.result()
+
+    direct = AnalyticsService(Database(str(tmp_path)))
+    assert service.collect(future) == [direct.statistics(), direct.category_stats('expense'), direct.timeline()]
+
+
+def test_collect_hands_built_rollup_to_database(tmp_path):
+    database = filled_database(str(tmp_path))
+    service = AnalyticsService(database)
+
+    future = service.submit('category_breakdown')
+    future.result()
+    rows = service.collect(future)
+
+    assert database._rollups
+    assert database.category_names == future.snapshot.category_names
+    assert service.category_breakdown() == rows
+
+
+def test_collect_skips_rollup_after_database_changed(tmp_path):
+    database = filled_database(str(tmp_path))
+    service = AnalyticsService(database)
+
+    future = service.submit('category_breakdown')
+    database.add_transaction(expense("Продукты", 700, 3))
+    future.result()
+    service.collect(future)
+
+    assert not database._rollups
+    assert sum(row['amount'] for row in service.category_breakdown()) == 25.0
@@ -0,0 +1,52 @@
+"""
+Тесты контроллера: подсказка категорий без обучения в потоке интерфейса
+"""
+from app.controller import AppController
+from app.database import Database
+from app.models import Transaction
+
+
+def expense(description, category, day=5):
+    return Transaction(date=f"2023-03-{day:02d} 12:00:00", category=category,
+                       amount_minor=1000, description=description)
+
+
+def filled_database(path):
+    database = Database(path)
+    database.add_transactions([expense("такси домой", "Транспорт", day) for day in range(1, 4)]
+                              + [expense("кофе", "Кафе и рестораны", 9)])
+    return Database(path)
+
+
+def test_empty_description_suggests_most_frequent_category_from_manifest(tmp_path):
+    database = filled_database(str(tmp_path))
+    controller = AppController(database)
+
+    assert controller.suggest_category("", 'expense') == "Транспорт"
+    assert controller._classifier_fit is None
+    assert not database._partitions
+
+
+def test_changes_during_background_fit_are_learned(tmp_path):
+    controller = AppController(filled_database(str(tmp_path)))
+
+    controller.suggest_category("такси", 'expense')  # запускает обучение в фоне
+    controller.add_transaction(expense("кофе с собой", "Кафе и рестораны", 10))
+
+    assert len(controller.get_classifier()) == 5
+
+
+def test_external_change_keeps_serving_previous_classifier(tmp_path):
+    controller = AppController(filled_database(str(tmp_path)))
+    previous = controller.get_classifier()
+    other = AppController(Database(str(tmp_path)))
+    other.add_transaction(expense("такси", "Транспорт", 20))
+
+    controller.check_external_changes()
+    refit = controller._classifier_fit
+
+    assert controller.get_classifier(wait=False) is not None
+    assert controller.suggest_category("такси", 'expense') == "Транспорт"
+    refit.result()
+    assert controller.get_classifier() is not previous
+    assert len(controller.get_classifier()) == 5
@@ -0,0 +1,92 @@
+"""
+Тесты хранилища: журнал партиций и итоги манифеста
+"""
+import json
+import os
+
+from app import database as database_module
+from app.database import Database
+from app.models import Transaction, TransactionType
+
+SUMMARY_FIELDS = ('count', 'totals', 'categories', 'expense_stats')
+
+
+def transaction(transaction_id, amount_minor=1000, category="Продукты", day=5,
+                kind=TransactionType.EXPENSE.value):
+    return Transaction(id=transaction_id, date=f"2024-03-{day:02d} 12:00:00", type=kind,
+                       category=category, amount_minor=amount_minor)
+
+
+def rounded(value):
+    if isinstance(value, dict):
+        return {key: rounded(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [rounded(item) for item in value]
+    return round(value, 9) if isinstance(value, float) else value
+
+
+def summary(entry):
+    """Итоги записи манифеста в виде, как после чтения с диска (суммы квадратов - с точностью до округления)"""
+    return rounded(json.loads(json.dumps({name: entry[name] for name in SUMMARY_FIELDS})))
+
+
+def recomputed_summary(path, key="2024"):
+    fresh = Database(path)
+    fresh._update_manifest_entry(key, fresh._get_partition(key))
+    return summary(fresh._manifest['partitions'][key])
+
+
+def test_small_changes_go_to_journal_and_survive_reload(tmp_path):
+    database = Database(str(tmp_path))
+    database.add_transactions([transaction(f"t{i}", day=1 + i % 28) for i in range(10)])
+    base_file = tmp_path / "transactions" / "2024.json"
+    base_mtime = os.stat(base_file).st_mtime_ns
+
+    database.add_transaction(transaction("new", 700, "Кафе", kind=TransactionType.INCOME.value))
+    database.update_transaction(transaction("t1", 2500, "Транспорт"))
+    database.delete_transaction("t2")
+
+    assert os.stat(base_file).st_mtime_ns == base_mtime
+    assert (tmp_path / "transactions" / "2024.journal").exists()
+    fresh = Database(str(tmp_path))
+    assert [t.to_dict() for t in fresh.transactions] == [t.to_dict() for t in database.transactions]
+    assert summary(database._manifest['partitions']['2024']) == recomputed_summary(str(tmp_path))
+
+
+def test_long_journal_is_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_module, 'JOURNAL_MIN_OPS', 3)
+    database = Database(str(tmp_path))
+    database.add_transaction(transaction("first"))
+
+    for i in range(5):
+        database.add_transaction(transaction(f"t{i}", day=10 + i))
+
+    assert database._manifest['partitions']['2024']['journal'] <= 3
+    assert len(Database(str(tmp_path)).transactions) == 6
+
+
+def test_delete_removes_every_row_with_colliding_id(tmp_path):
+    database = Database(str(tmp_path))
+    database.add_transaction(transaction("same", 100))
+    database.add_transactions([transaction("other")])
+    database._set_partition("2024", database._get_partition("2024") + [transaction("same", 200, day=9)])
+    database.save_transactions()
+
+    database.delete_transaction("same")
+
+    assert [t.id for t in database.transactions] == ["other"]
+    assert [t.id for t in Database(str(tmp_path)).transactions] == ["other"]
+    assert summary(database._manifest['partitions']['2024']) == recomputed_summary(str(tmp_path))
+
+
+def test_journal_left_after_compaction_replays_cleanly(tmp_path):
+    database = Database(str(tmp_path))
+    database.add_transactions([transaction("a"), transaction("b")])
+    database.update_transaction(transaction("a", 300))
+    journal = (tmp_path / "transactions" / "2024.journal").read_bytes()
+
+    # Сбой между записью партиции целиком и удалением журнала
+    database._write_partition("2024", database._get_partition("2024"))
+    (tmp_path / "transactions" / "2024.journal").write_bytes(journal)
+
+    assert [(t.id, t.amount_minor) for t in Database(str(tmp_path)).transactions] == [("a", 300), ("b", 1000)]
@@ -0,0 +1,40 @@
+"""
+Тесты моделей данных
+"""
+from app.models import Split, Transaction
+
+
+def split_transaction(amount_minor, parts, rest_category="Продукты"):
+    return Transaction(category=rest_category, amount_minor=amount_minor,
+                       splits=[Split(category, minor) for category, minor in parts])
+
+
+def test_lines_add_up_to_amount():
+    transaction = split_transaction(1000, [("Кафе", 300), ("Транспорт", 200)])
+
+    assert transaction.lines() == [("Кафе", 300), ("Транспорт", 200), ("Продукты", 500)]
+
+
+def test_converted_lines_add_up_to_converted_amount():
+    transaction = split_transaction(3, [("Кафе", 1), ("Транспорт", 1), ("Продукты", 1)])
+
+    lines = transaction.lines(10)
+
+    assert sum(amount for _, amount in lines) == 10
+    assert sorted(amount for _, amount in lines) == [3, 3, 4]
+
+
+def test_converted_lines_give_remainder_to_largest_fractions():
+    transaction = split_transaction(7, [("Кафе", 1), ("Транспорт", 2)])  # остаток 4 - в Продукты
+
+    # 1/7, 2/7 и 4/7 от 100: 14.29, 28.57, 57.14 - лишняя копейка у 28.57
+    assert transaction.lines(100) == [("Кафе", 14), ("Транспорт", 29), ("Продукты", 57)]
+
+
+def test_converted_lines_stay_exact_for_many_parts():
+    transaction = split_transaction(9973, [(f"Категория {i}", 37 + i) for i in range(50)])
+
+    for amount_minor in (1, 17, 9972, 12345, 10 ** 9 + 7):
+        lines = transaction.lines(amount_minor)
+        assert sum(amount for _, amount in lines) == amount_minor
+        assert all(amount >= 0 for _, amount in lines)
@@ -0,0 +1,158 @@
+"""
+Тесты совместной работы процессов: слияние и блокировка каталога
+"""
+from operator import itemgetter
+
+import pytest
+
+from app.controller import AppController
+from app.database import Database
+from app.models import Budget, Transaction
+from app.sharing import DirectoryLock, merge_fields, merge_json, merge_records
+
+
+def record(key, value):
+    return {'id': key, 'value': value}
+
+
+def expense(transaction_id, amount_minor=1000, date="2024-03-05 12:00:00"):
+    return Transaction(id=transaction_id, date=date, category="Продукты", amount_minor=amount_minor)
+
+
+def test_merge_records_keeps_both_additions():
+    base = [record('a', 1)]
+    ours = base + [record('b', 2)]
+    theirs = base + [record('c', 3)]
+
+    merged = merge_records(base, ours, theirs, itemgetter('id'))
+
+    assert merged == [record('a', 1), record('b', 2), record('c', 3)]
+
+
+def test_merge_records_our_edit_survives_their_delete():
+    base = [record('a', 1), record('b', 2)]
+    ours = [record('a', 10), record('b', 2)]
+    theirs = [record('b', 2)]
+
+    assert merge_records(base, ours, theirs, itemgetter('id')) == [record('a', 10), record('b', 2)]
+
+
+def test_merge_records_our_delete_wins_over_their_edit():
+    base = [record('a', 1), record('b', 2)]
+    ours = [record('b', 2)]
+    theirs = [record('a', 10), record('b', 2)]
+
+    assert merge_records(base, ours, theirs, itemgetter('id')) == [record('b', 2)]
+
+
+def test_merge_records_takes_their_version_of_untouched_records():
+    base = [record('a', 1), record('b', 2)]
+    ours = [record('a', 1), record('b', 20)]
+    theirs = [record('a', 5), record('b', 2)]
+
+    assert merge_records(base, ours, theirs, itemgetter('id')) == [record('a', 5), record('b', 20)]
+
+
+def test_merge_fields_merges_nested_dicts():
+    base = {'currency': '₽', 'window': {'width': 800, 'height': 600}, 'theme': 'dark'}
+    ours = {'currency': '$', 'window': {'width': 1024, 'height': 600}}
+    theirs = {'currency': '₽', 'window': {'width': 800, 'height': 768}, 'theme': 'dark', 'lang': 'ru'}
+
+    merged = merge_fields(base, ours, theirs)
+
+    assert merged == {'currency': '$', 'window': {'width': 1024, 'height': 768}, 'lang': 'ru'}
+
+
+def test_merge_json_old_format_file_ours_wins():
+    # Старый categories.json - список названий, наш - список словарей
+    base = ["Продукты", "Транспорт"]
+    ours = [{'name': "Продукты", 'type': 'expense'}, {'name': "Транспорт", 'type': 'expense'}]
+    theirs = ["Продукты", "Транспорт", "Кафе"]
+
+    assert merge_json(base, ours, theirs, itemgetter('name')) is ours
+
+
+def test_merge_json_file_created_after_our_read():
+    ours = [record('a', 1)]
+    theirs = [record('b', 2)]
+
+    assert merge_json(None, ours, theirs, itemgetter('id')) == [record('a', 1), record('b', 2)]
+
+
+def test_databases_merge_concurrent_additions(tmp_path):
+    first, second = Database(str(tmp_path)), Database(str(tmp_path))
+
+    first.add_transaction(expense("first"))
+    second.add_transaction(expense("second"))
+
+    assert first.refresh() is True
+    for database in (first, second, Database(str(tmp_path))):
+        assert {t.id for t in database.transactions} == {"first", "second"}
+        assert database.get_total_balance_minor() == -2000
+
+
+def test_databases_keep_edit_of_transaction_deleted_elsewhere(tmp_path):
+    first = Database(str(tmp_path))
+    first.add_transaction(expense("shared"))
+    second = Database(str(tmp_path))
+    second.transactions
+
+    second.delete_transaction("shared")
+    first.update_transaction(expense("shared", amount_minor=5000))
+
+    assert Database(str(tmp_path)).get_transaction("shared").amount_minor == 5000
+
+
+def test_refresh_without_changes_is_false(tmp_path):
+    database = Database(str(tmp_path))
+    database.add_transaction(expense("only"))
+
+    assert database.refresh() is False
+
+
+def test_directory_lock_is_reentrant(tmp_path):
+    lock = DirectoryLock(str(tmp_path / ".lock"), timeout=0.1)
+
+    with lock:
+        with lock:
+            assert lock._depth == 2
+        assert lock._depth == 1
+    assert lock._depth == 0 and lock._file is None
+
+
+def test_directory_lock_times_out_while_held_elsewhere(tmp_path):
+    path = str(tmp_path / ".lock")
+    holder, waiter = DirectoryLock(path), DirectoryLock(path, timeout=0.1)
+
+    with holder:
+        with pytest.raises(TimeoutError):
+            waiter.acquire()
+    assert waiter._depth == 0 and waiter._file is None
+
+    with waiter:
+        pass  # после освобождения блокировка снова доступна
+
+
+def test_write_merges_their_budget_change(tmp_path):
+    first, second = Database(str(tmp_path)), Database(str(tmp_path))
+    first.budgets = [Budget(category="Продукты", limit=100.0)]
+    first.save_budgets()
+    second.budgets = second.budgets + [Budget(category="Транспорт", limit=50.0)]
+    second.save_budgets()
+
+    assert {b.category for b in second.budgets} == {"Продукты", "Транспорт"}
+
+
+def test_lock_timeout_reaches_controller_and_keeps_changes(tmp_path):
+    database = Database(str(tmp_path))
+    database._lock.timeout = 0.1
+    controller = AppController(database)
+
+    with DirectoryLock(database.lock_file):
+        with pytest.raises(TimeoutError):
+            controller.add_transaction(expense("pending"))
+        with pytest.raises(TimeoutError):
+            database.save_settings()
+
+    database.save_transactions()  # несохраненная партиция записывается следующим сохранением
+    assert Database(str(tmp_path)).get_transaction("pending") is not None
@@ -0,0 +1,82 @@
+"""
+Тесты скетчей квантилей
+"""
+import numpy as np
+import pytest
+
+from app.sketches import RELATIVE_ACCURACY, MonthlySketches, QuantileSketch
+
+QS = [0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0]
+
+
+def exact_quantiles(values, qs):
+    """Квантили по тому же рангу, что и скетч: элемент floor(q * (n - 1))"""
+    ordered = np.sort(values)
+    return [float(ordered[int(q * (len(ordered) - 1))]) for q in qs]
+
+
+def sketch_of(values) -> QuantileSketch:
+    sketch = QuantileSketch()
+    for value in values:
+        sketch.add(int(value))
+    return sketch
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_quantiles_within_relative_accuracy(seed):
+    rng = np.random.default_rng(seed)
+    values = np.round(rng.lognormal(mean=8, sigma=1.5, size=5000)).astype(np.int64) + 1
+
+    estimates = sketch_of(values).quantiles(QS)
+
+    for estimate, exact in zip(estimates, exact_quantiles(values, QS)):
+        assert abs(estimate - exact) <= RELATIVE_ACCURACY * exact
+
+
+def test_merge_equals_sketch_of_union():
+    rng = np.random.default_rng(4)
+    left = rng.integers(1, 10 ** 6, size=700)
+    right = rng.integers(10 ** 3, 10 ** 8, size=300)
+
+    merged = sketch_of(left).merge(sketch_of(right))
+    union = sketch_of(np.concatenate([left, right]))
+
+    assert merged.count == 1000
+    assert merged.quantiles(QS) == union.quantiles(QS)
+
+
+def test_removal_restores_quantiles():
+    rng = np.random.default_rng(5)
+    values = rng.integers(100, 10 ** 5, size=400)
+    extra = rng.integers(10 ** 6, 10 ** 7, size=50)
+    sketch = sketch_of(values)
+    before = sketch.quantiles(QS)
+
+    for value in extra:
+        sketch.add(int(value))
+    for value in extra:
+        sketch.add(int(value), -1)
+
+    assert sketch.count == len(values)
+    assert sketch.quantiles(QS) == before
+
+
+def test_empty_sketch_has_no_quantiles():
+    assert QuantileSketch().quantiles([0.5]) == [None]
+
+
+def test_monthly_sketches_merge_months_within_accuracy():
+    rng = np.random.default_rng(6)
+    months = [np.datetime64(f"2024-{m:02d}", 'M') for m in range(1, 13)]
+    sketches = MonthlySketches()
+    values = {month: rng.integers(500, 50000, size=200) for month in months}
+    for month, amounts in values.items():
+        for amount in amounts:
+            sketches.add(3, False, month, int(amount))
+
+    merged = sketches.merged([3 * 2], months[3], months[8])
+    expected = np.concatenate([values[month] for month in months[3:9]])
+
+    assert merged.count == len(expected)
+    for estimate, exact in zip(merged.quantiles(QS), exact_quantiles(expected, QS)):
+        assert abs(estimate - exact) <= RELATIVE_ACCURACY * exact
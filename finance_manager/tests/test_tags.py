@@ -0,0 +1,48 @@
+"""
+Тесты запросов тегов
+"""
+import numpy as np
+import pytest
+
+from app.tags import TagIndex, matches, parse_tag_query
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("a", ('tag', 'a')),
+    ("a b", ('and', ('tag', 'a'), ('tag', 'b'))),
+    ("a OR b c", ('or', ('tag', 'a'), ('and', ('tag', 'b'), ('tag', 'c')))),
+    ("a b OR c", ('or', ('and', ('tag', 'a'), ('tag', 'b')), ('tag', 'c'))),
+    ("NOT a b", ('and', ('not', ('tag', 'a')), ('tag', 'b'))),
+    ("a AND NOT b OR c", ('or', ('and', ('tag', 'a'), ('not', ('tag', 'b'))), ('tag', 'c'))),
+    ("a AND (b OR c)", ('and', ('tag', 'a'), ('or', ('tag', 'b'), ('tag', 'c')))),
+    ("NOT (a OR b)", ('not', ('or', ('tag', 'a'), ('tag', 'b')))),
+    ("-a b", ('and', ('not', ('tag', 'a')), ('tag', 'b'))),
+    ("отпуск И такси ИЛИ НЕ отель", ('or', ('and', ('tag', 'отпуск'), ('tag', 'такси')), ('not', ('tag', 'отель')))),
+    ('"Дом и Сад" or x', ('or', ('tag', 'дом и сад'), ('tag', 'x'))),
+])
+def test_parse_precedence(text, expected):
+    assert parse_tag_query(text) == expected
+
+
+def test_parse_empty_query_is_no_filter():
+    assert parse_tag_query("") is None
+    assert parse_tag_query("   ") is None
+
+
+@pytest.mark.parametrize("text", ["a AND", "(a OR b", "a)", "OR a", "NOT"])
+def test_parse_errors(text):
+    with pytest.raises(ValueError):
+        parse_tag_query(text)
+
+
+def test_bitmap_evaluation_matches_per_row_check():
+    rng = np.random.default_rng(3)
+    names = ["a", "b", "c", "d"]
+    rows = [[name for name in names if rng.random() < 0.4] for _ in range(203)]
+    index = TagIndex.from_rows(len(rows), {name: [i for i, tags in enumerate(rows) if name in tags]
+                                           for name in names})
+
+    for text in ["a", "a b", "a OR b c", "NOT a OR b", "(a OR b) AND NOT (c d)", "-a -b", "e", "NOT e"]:
+        query = parse_tag_query(text)
+        expected = [matches(query, tags) for tags in rows]
+        assert index.evaluate(query).tolist() == expected, text